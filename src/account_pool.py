@@ -0,0 +1,217 @@
+"""
+多账户执行池
+- 每个账户一个 TradingClient（各自的私钥 / funder / API 凭证）
+- 下单按 余额、在途订单数、每账户限频额度 选择账户
+- 卖单必须回到持仓所在的账户
+账户文件（POLYMARKET_ACCOUNTS_FILE）格式：
+[
+  {"name": "acc2", "private_key": "0x...", "funder": "0x...",
+   "api_key": "...", "api_secret": "...", "api_passphrase": "...", "signature_type": 1}
+]
+主账户（.env 里的 POLYMARKET_PRIVATE_KEY）永远是第一个，名字为 "main"
+订单 -> 账户 的归属只保留一场市场 + STATE_RETAIN_SECS（撤单 / 查单都在这之内），长跑不随订单数增长
+"""
+from __future__ import annotations
+
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.clock import SYSTEM_CLOCK, Clock
+from src.expiring import ExpiringDict
+from src.lookup import INTERVAL
+from src.rate_limit import PRIORITY_ORDER, RequestScheduler
+from src.quote_router import QuoteSource
+from src.trading import TradingClient
+
+PRIMARY_ACCOUNT = "main"
+
+ClientFactory = Callable[[Any], TradingClient]
+
+
+class _AccountConfig:
+    """在全局 Config 基础上覆盖单个账户的凭证（其余交易参数共用）"""
+    def __init__(self, base, overrides: Dict[str, Any]):
+        self._base = base
+        for k, v in overrides.items():
+            setattr(self, k, v)
+
+    def __getattr__(self, name):
+        return getattr(self._base, name)
+
+
+def load_accounts_file(path: str) -> List[Dict[str, Any]]:
+    if not path:
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if not isinstance(data, list):
+        raise ValueError(f"账户文件必须是 JSON 数组: {path}")
+    return data
+
+
+class AccountSlot:
+    def __init__(self, name: str, client: TradingClient, max_orders_per_min: int):
+        self.name = name
+        self.client = client
+        self.balance: Optional[float] = None
+        self.in_flight = 0
+        # 每账户下单额度：令牌桶，每分钟 max_orders_per_min 个，允许一次性用满
+        self.order_budget: Optional[RequestScheduler] = None
+        if max_orders_per_min > 0:
+            self.order_budget = RequestScheduler(
+                f"orders:{name}", max_orders_per_min / 60.0, max_orders_per_min,
+                reserves={PRIORITY_ORDER: 0.0},
+            )
+
+    def budget_left(self) -> float:
+        if self.order_budget is None:
+            return float(1 << 30)
+        return self.order_budget.available()
+
+    def take_budget(self) -> bool:
+        return self.order_budget is None or self.order_budget.try_acquire(PRIORITY_ORDER)
+
+
+class ExecutionPool:
+    def __init__(self, config, primary: TradingClient, clock: Optional[Clock] = None,
+                 client_factory: Optional[ClientFactory] = None):
+        """
+        client_factory：账户配置 -> TradingClient，机器人传入构造主账户时用的同一个工厂（时钟等接线一致）；
+        不传时按 TradingClient(cfg, clock=clock) 构造
+        """
+        self.config = config
+        self.clock = clock or SYSTEM_CLOCK
+        make_client = client_factory or (lambda cfg: TradingClient(cfg, clock=self.clock))
+        per_min = int(getattr(config, "ACCOUNT_MAX_ORDERS_PER_MIN", 0) or 0)
+        self.accounts: Dict[str, AccountSlot] = {
+            PRIMARY_ACCOUNT: AccountSlot(PRIMARY_ACCOUNT, primary, per_min)
+        }
+        self._lock = threading.Lock()
+        self._order_account: ExpiringDict[str, str] = ExpiringDict()
+        self._order_retain = INTERVAL + float(getattr(config, "STATE_RETAIN_SECS", 900))
+
+        extra = load_accounts_file(getattr(config, "POLYMARKET_ACCOUNTS_FILE", ""))
+        if extra:
+            # 各账户的 ClobClient 初始化互不依赖，并行做
+            with ThreadPoolExecutor(max_workers=min(8, len(extra))) as pool:
+                futs = []
+                for i, acc in enumerate(extra):
+                    name = str(acc.get("name") or f"acc{i + 2}")
+                    if name in self.accounts:
+                        raise ValueError(f"账户名重复: {name}")
+                    cfg = _AccountConfig(config, {
+                        "POLYMARKET_PRIVATE_KEY": acc["private_key"],
+                        "POLYMARKET_FUNDER": acc.get("funder", ""),
+                        "POLYMARKET_API_KEY": acc.get("api_key", ""),
+                        "POLYMARKET_API_SECRET": acc.get("api_secret", ""),
+                        "POLYMARKET_API_PASSPHRASE": acc.get("api_passphrase", ""),
+                        "POLYMARKET_SIGNATURE_TYPE": int(acc.get("signature_type", config.POLYMARKET_SIGNATURE_TYPE)),
+                    })
+                    futs.append((name, pool.submit(make_client, cfg)))
+                for name, fut in futs:
+                    self.accounts[name] = AccountSlot(name, fut.result(), per_min)
+            print(f"✅ 执行池: {len(self.accounts)} 个账户 ({', '.join(self.accounts)})")
+
+    def add_quote_source(self, source: QuoteSource):
+        """报价源（如 BookFeed 的 ws 源）注册到每个账户的客户端，各账户的报价路由一致"""
+        for slot in self.accounts.values():
+            add = getattr(slot.client, "add_quote_source", None)
+            if add is not None:
+                add(source)
+
+    # -----------------------------
+    # 余额
+    # -----------------------------
+    def refresh_balances(self) -> Dict[str, float]:
+        slots = list(self.accounts.values())
+        if len(slots) == 1:
+            slots[0].balance = slots[0].client.get_balance()
+        else:
+            with ThreadPoolExecutor(max_workers=min(8, len(slots))) as pool:
+                for slot, bal in zip(slots, pool.map(lambda s: s.client.get_balance(), slots)):
+                    slot.balance = bal
+        return {s.name: float(s.balance or 0.0) for s in slots}
+
+    def total_balance(self) -> float:
+        return sum(float(s.balance or 0.0) for s in self.accounts.values())
+
+    # -----------------------------
+    # 路由
+    # -----------------------------
+    def pick_account(self, side: str, notional: float, account: Optional[str] = None) -> Optional[AccountSlot]:
+        """
+        SELL / 指定 account：必须用该账户
+        BUY：在 余额够 + 还有限频额度 的账户里，选 在途最少、额度最多、余额最多 的
+        """
+        with self._lock:
+            if account is not None:
+                slot = self.accounts.get(account)
+                if slot is None or slot.budget_left() < 1:
+                    return None
+                return slot
+
+            best: Optional[Tuple[Tuple[float, float, float], AccountSlot]] = None
+            for slot in self.accounts.values():
+                budget = slot.budget_left()
+                if budget < 1:
+                    continue
+                if side.upper() == "BUY" and slot.balance is not None and slot.balance < notional:
+                    continue
+                key = (slot.in_flight, -budget, -float(slot.balance or 0.0))
+                if best is None or key < best[0]:
+                    best = (key, slot)
+            return best[1] if best else None
+
+    def route_order(
+        self,
+        token_id: str,
+        side: str,
+        price: float,
+        size: float,
+        order_type: str = "FOK",
+        account: Optional[str] = None,
+    ) -> Tuple[Optional[str], Optional[str]]:
+        """下单并返回 (order_id, 账户名)；没有可用账户返回 (None, None)"""
+        side_u = side.strip().upper()
+        notional = float(price) * float(size)
+        slot = self.pick_account(side_u, notional, account)
+        if slot is None or not slot.take_budget():
+            print(f"⚠️ 执行池：没有可用账户（side={side_u}, 金额=${notional:.4f}, account={account}）")
+            return None, None
+
+        with self._lock:
+            slot.in_flight += 1
+        try:
+            order_id = slot.client.place_order(
+                token_id=token_id, side=side_u, price=price, size=size, order_type=order_type
+            )
+        finally:
+            with self._lock:
+                slot.in_flight -= 1
+
+        if order_id:
+            with self._lock:
+                now = self.clock.monotonic()
+                self._order_account.evict(now)
+                self._order_account.set(order_id, slot.name, now + self._order_retain)
+                if slot.balance is not None:
+                    slot.balance += -notional if side_u == "BUY" else notional
+        return order_id, slot.name
+
+    def account_for_order(self, order_id: str) -> Optional[str]:
+        with self._lock:
+            return self._order_account.get(order_id)
+
+    def cancel_order(self, order_id: str) -> bool:
+        with self._lock:
+            name = self._order_account.get(order_id, PRIMARY_ACCOUNT)
+        return self.accounts[name].client.cancel_order(order_id)
+
+    def budget_usage(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            name: slot.order_budget.usage()
+            for name, slot in self.accounts.items()
+            if slot.order_budget is not None
+        }
@@ -5,55 +5,225 @@
 - 成交价：买=best_ask，卖=best_bid（盘口价）
 """
 
+import signal
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, Optional
+from typing import Callable, Dict, Optional, Tuple
 
+from src import lookup
+from src.account_pool import PRIMARY_ACCOUNT, ExecutionPool
+from src.clock import SYSTEM_CLOCK, Clock
+from src.clock_sync import ExchangeClock
+from src.complement import execute_pair
+from src.control import ControlServer, ParamUpdate
+from src.expiring import ExpiringSet
+from src.failover import HaNode
+from src.profiler import SamplingProfiler, default_path, tick_phase
+from src.replay import SessionRecorder
+from src.signing import shutdown_signing_service
+from src.slicer import SlicedExecutor, SliceResult
 from src.config import Config
-from src.lookup import find_btc_15min_market, get_market_conditions
+from src.quote_router import QuoteSource
+from src.polling import AdaptivePollPolicy, FixedPollPolicy, PollPolicy, PollState, SideQuote
+from src.rate_limit import budget_usage, configure_schedulers
+from src.lookup import load_market_snapshot, save_market_snapshot
+from src.models import MarketSlot, Position, Quote, TokenPair
+from src.book_feed import BookFeed
+from src.quote_router import QuoteSourceError
+from src.fair_value import FairValueEngine, TrackedMarket
+from src.hedging import LatencyTracker
+from src.market_maker import MakerOrder, MakerQuoter, MarketMaker
+from src.redeem import RedeemItem, RedeemResult, RedemptionWorker, Web3Redeemer
+from src.spot_feed import SpotFeed, SpotRing
+from src.strategy import MarketSnapshot, OrderIntent, SideBook, StrategyEngine
 from src.trading import TradingClient
 
+# _buy_once_guard 里的互补套利标记：(slug, PAIR_GUARD) = 本场成对买入出过单腿
+PAIR_GUARD = "PAIR"
+
 
 class ArbitrageBot:
-    def __init__(self):
-        self.config = Config()
+    def __init__(
+        self,
+        poll_policy: Optional[PollPolicy] = None,
+        config: Optional[Config] = None,
+        clock: Optional[Clock] = None,
+        trading_client: Optional[TradingClient] = None,
+        market_source=None,
+        engine: Optional[StrategyEngine] = None,
+        spot_ring: Optional[SpotRing] = None,
+        redeemer=None,
+    ):
+        """
+        clock / trading_client / market_source 可注入（模拟、回放用）：
+        market_source 需提供 find_btc_15min_market(host, clock=) 和 get_market_conditions(host, market_id)，
+        默认就是 src.lookup 模块
+        engine：策略引擎（默认按 Config 的阈值策略）
+        spot_ring：BTC 现货价环形缓冲（模拟/回放直接往里写）；不传且 SPOT_FEED=true 时订阅 SPOT_WS_URL
+        redeemer：到期赎回后端（模拟用替身）；不传且 REDEEM_ENABLED=true 时用 Web3Redeemer
+        """
+        self.config = config or Config()
         self.config.validate()
-        self.trading_client = TradingClient(self.config)
+        configure_schedulers(self.config)
+        self.markets = market_source or lookup
+
+        # 市场边界 / is_live / 到期都按交易所时间；节奏控制用本地单调时钟
+        base_clock = clock or SYSTEM_CLOCK
+        self._base_clock = base_clock
+        if self.config.CLOCK_SYNC:
+            self.clock: Clock = ExchangeClock(base_clock)
+            if self.markets is lookup and base_clock is SYSTEM_CLOCK:
+                lookup.set_time_sampler(self.clock.observe)
+        else:
+            self.clock = base_clock
+        self._next_clock_sync = 0.0
+
+        # 启动耗时分解（秒）：client_init / market_lookup / balance / total
+        self.startup_timings: Dict[str, float] = {}
 
-        self.market_info: Optional[Dict] = None
-        self.conditions: Optional[Dict[str, str]] = None
+        # 快速启动：客户端初始化放到 fast_start() 里和市场查找并行
+        # trading_client（主账户）负责行情；execution_pool 负责多账户下单
+        self.trading_client: Optional[TradingClient] = None
+        self.execution_pool: Optional[ExecutionPool] = None
+        if trading_client is not None:
+            self.trading_client = trading_client
+            self.execution_pool = ExecutionPool(self.config, trading_client, self.clock)
+        elif not self.config.FAST_START:
+            self._timed("client_init", self._init_clients)
 
-        self.positions: Dict[str, Dict] = {}
-        self._buy_once_guard = set()
+        self.market_info: Optional[MarketSlot] = None
+        self.conditions: Optional[TokenPair] = None
 
-        self._last_roll_check_ts = 0
+        self.positions: Dict[str, Position] = {}
+        # 每场每方向只买一次的标记：按市场到期 + STATE_RETAIN_SECS 淘汰，长跑不随场次增长
+        self._buy_once_guard: ExpiringSet[Tuple[str, str]] = ExpiringSet()
+        self._state_retain = self.config.STATE_RETAIN_SECS
+        # 互补套利的成对持仓（token_id -> Position），和单腿持仓分开：阈值策略不会单独卖掉其中一条腿
+        self.pair_positions: Dict[str, Position] = {}
+
+        self._last_roll_check_mono = float("-inf")
+        self._roll_checked_end = 0
         self._orderbook_fail_streak = 0
 
+        self._last_quotes: Dict[str, Quote] = {}
+        # 行情新鲜度：决策时数据年龄（本地：从请求发出算起；交易所：盘口时间戳到现在），超过上限不用
+        self._max_quote_age = self.config.QUOTE_MAX_AGE_MS / 1000.0
+        self.quote_age = LatencyTracker()
+        self.quote_exchange_age = LatencyTracker()
+
+        # 策略：默认就是 BUY_PRICE / SELL_PRICE 阈值；STRATEGY_VARIANTS 可并行跑多组参数（共用一次行情）
+        self.engine = engine or StrategyEngine.from_config(self.config)
+        self._engine_from_config = engine is None
+
+        # 轮询节奏：默认固定 1 秒；ADAPTIVE_POLL=true 时按离各策略触发价/收盘的距离自适应
+        self._poll_from_config = poll_policy is None
+        if poll_policy is None:
+            poll_policy = (
+                AdaptivePollPolicy.from_config(self.config, self.engine) if self.config.ADAPTIVE_POLL
+                else FixedPollPolicy(1.0)
+            )
+        self.poll_policy = poll_policy
+
+        # 控制面热更新：控制线程整体替换 param_update（不可变），主循环每 tick 开头比版本号再应用
+        self.param_update: Optional[ParamUpdate] = None
+        self.param_version = 0
+        self._control: Optional[ControlServer] = None
+        # 按需采样分析：SIGUSR2 / 控制面 POST /profile 触发，采样交易线程若干秒后写火焰图
+        self.profiler: Optional[SamplingProfiler] = None
+        self._trade_tid: Optional[int] = None
+        # 录制（REPLAY_RECORD）：场次 + 每 tick 的报价写成 JSONL，给 src.replay 回放比对
+        self.recorder: Optional[SessionRecorder] = (
+            SessionRecorder(self.config.REPLAY_RECORD, self.clock, self.config) if self.config.REPLAY_RECORD else None
+        )
+        # 切片执行（SLICE_EXECUTION）：第一次下单时再建（fast_start 时交易客户端是后建的）
+        self._slicer: Optional[SlicedExecutor] = None
+
+        # 主备：HA_LEASE_DB 非空时按租约决定谁交易；备机跟主机的状态日志，接管时恢复
+        self.ha: Optional[HaNode] = HaNode.from_config(self.config) if self.config.HA_LEASE_DB else None
+        self._journal_failed = False
+
+        # BTC 现货参考价：快照里带上开盘以来涨跌 / 最近几秒动量；异动时把轮询睡眠提前叫醒
+        self._spot_feed: Optional[SpotFeed] = None
+        if spot_ring is None and self.config.SPOT_FEED:
+            self._spot_feed = SpotFeed(self.config.SPOT_WS_URL, SpotRing(horizon=self.config.SPOT_MOMENTUM_SECS))
+            spot_ring = self._spot_feed.ring
+        self.spot: Optional[SpotRing] = spot_ring
+        self._wake = threading.Event()
+        self._spot_armed = False
+        if self.spot is not None and self.config.SPOT_ARM_BPS > 0:
+            self.spot.add_listener(self._on_spot_update)
+        # CLOB 盘口推送（USE_WSS）：客户端就绪后注册为报价路由的 ws 源；盘口超过 QUOTE_MAX_AGE_MS 没动就让路由走 REST
+        self._book_feed: Optional[BookFeed] = (
+            BookFeed(self.config.POLYMARKET_WS_URL, max_age=self.config.QUOTE_MAX_AGE_MS / 1000.0)
+            if self.config.USE_WSS and trading_client is None else None
+        )
+        # 公允价：每个现货 tick 在行情线程里批量重算，快照只读结果
+        self.fair: Optional[FairValueEngine] = None
+        self._fair_slug = ""
+        if self.spot is not None and self.config.FAIR_VALUE:
+            self.fair = FairValueEngine.from_config(self.spot, self.config)
+            self.fair.attach()
+
+        # 做市模式：挂单在客户端就绪后再建（快速启动时 trading_client 是后台初始化的）
+        self._quoter: Optional[MakerQuoter] = MakerQuoter.from_config(self.config) if self.config.MAKER_MODE else None
+        self.maker: Optional[MarketMaker] = None
+
         self.stats = {
             "total_buys": 0,
             "total_sells": 0,
             "total_profit": 0.0,
-            "total_invested": 0.0
+            "total_invested": 0.0,
+            "market_rolls": 0,
+            "pair_trades": 0,
+            "leg_retries": 0,
+            "leg_unwinds": 0,
+            "stale_quotes": 0,      # 取回来就已经过期、没交给策略的报价
+            "stale_skips": 0,       # 下单前发现行情已过期而放弃的意图
+            # 到期结算（赎回线程里更新，主线程不写这几个键）
+            "settled_markets": 0,
+            "settlement_pnl": 0.0,
         }
 
+        # 到期赎回：真实时钟下跑后台线程；虚拟时钟（模拟）下每轮主循环里处理一次
+        self.redemption: Optional[RedemptionWorker] = None
+        redeemer_for = None
+        if redeemer is None and self.config.REDEEM_ENABLED:
+            redeemer = Web3Redeemer.from_config(self.config)
+            redeemer_for = self._account_redeemer
+        if redeemer is not None:
+            self.redemption = RedemptionWorker(
+                redeemer, clock=self.clock, poll_interval=self.config.REDEEM_POLL_SECS,
+                max_batch=self.config.REDEEM_MAX_BATCH, on_settled=self._on_settled,
+                redeemer_for=redeemer_for,
+            )
+        self._redeem_inline = base_clock is not SYSTEM_CLOCK
+
+        # 互补套利需要 UP/DOWN 同一时刻的盘口：两边并发取价，两条腿并发下单
+        self._io_pool: Optional[ThreadPoolExecutor] = (
+            ThreadPoolExecutor(max_workers=4, thread_name_prefix="bot-io") if self.config.COMPLEMENT_ARB else None
+        )
+
     def find_market(self) -> bool:
         print("🔍 正在查找BTC 15分钟市场...")
-        market = find_btc_15min_market(self.config.POLYMARKET_HOST)
+        market = self.markets.find_btc_15min_market(self.config.POLYMARKET_HOST, clock=self.clock)
         if not market:
             print("❌ 未找到BTC 15分钟市场")
             return False
 
         self.market_info = market
+        self._watch_spot()
         
         # 检查市场是否live
-        is_live = market.get('is_live', False)
-        start_ts = market.get('start_ts', 0)
-        end_ts = market.get('end_ts', 0)
-        now_ts = int(time.time())
+        is_live = market.is_live
+        start_ts = market.start_ts
+        end_ts = market.end_ts
+        now_ts = int(self.clock.time())
         
-        print(f"✅ 找到市场: {market.get('question')}")
-        print(f"   market_id: {market.get('market_id')}")
-        print(f"   slug: {market.get('slug')}")
+        print(f"✅ 找到市场: {market.question}")
+        print(f"   market_id: {market.market_id}")
+        print(f"   slug: {market.slug}")
         print(f"   is_live: {is_live}")
         print(f"   当前时间: {now_ts} ({time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(now_ts))})")
         if start_ts:
@@ -65,51 +235,176 @@ class ArbitrageBot:
             print("⚠️  市场未开启，尝试查找下一个活跃市场...")
             # 可以在这里添加重新查找逻辑，或者等待市场开启
 
-        conditions = get_market_conditions(self.config.POLYMARKET_HOST, market["market_id"])
+        conditions = self.markets.get_market_conditions(self.config.POLYMARKET_HOST, market.market_id)
         if not conditions:
             print("❌ 无法获取市场条件（UP/DOWN token_id）")
             return False
 
         self.conditions = conditions
-        print(f"✅ UP TokenID: {conditions.get('UP')}")
-        print(f"✅ DOWN TokenID: {conditions.get('DOWN')}")
+        self._save_snapshot()
+        self._record_market()
+        self._watch_book()
+        print(f"✅ UP TokenID: {conditions.up}")
+        print(f"✅ DOWN TokenID: {conditions.down}")
+        return True
+
+    def _make_client(self, config) -> TradingClient:
+        """主账户和执行池里的其它账户都用它构造"""
+        return TradingClient(config, clock=self._base_clock)
+
+    def _init_clients(self) -> TradingClient:
+        client = self._make_client(self.config)
+        self.execution_pool = ExecutionPool(self.config, client, self._base_clock, client_factory=self._make_client)
+        self.trading_client = client
+        return client
+
+    def _timed(self, name: str, fn: Callable):
+        t0 = time.perf_counter()
+        try:
+            return fn()
+        finally:
+            self.startup_timings[name] = time.perf_counter() - t0
+
+    def _save_snapshot(self):
+        if self.market_info and self.conditions:
+            save_market_snapshot(self.config.MARKET_CACHE_FILE, self.market_info, self.conditions)
+
+    def _record_market(self):
+        if self.recorder is not None and self.market_info is not None and self.conditions is not None:
+            self.recorder.market(self.market_info, self.conditions)
+
+    def _use_cached_market(self) -> bool:
+        snap = load_market_snapshot(self.config.MARKET_CACHE_FILE, now=int(self.clock.time()))
+        if not snap:
+            return False
+        self.market_info, self.conditions = snap
+        self._watch_spot()
+        self._watch_book()
+        # 快照只保证“上次看到时”正确：到 end_ts 或盘口连续失败时会用 Gamma 校验
+        self._last_roll_check_mono = self.clock.monotonic()
+        print(f"⚡ 使用缓存市场快照: {self.market_info.slug} (is_live={self.market_info.is_live})")
+        print(f"✅ UP TokenID: {self.conditions.up}")
+        print(f"✅ DOWN TokenID: {self.conditions.down}")
         return True
 
+    def fast_start(self) -> bool:
+        """
+        快速启动：客户端初始化（含 web3/py_clob_client 导入）、市场查找、余额查询并行执行
+        有未过期的市场快照时直接复用，不等 Gamma
+        """
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=3, thread_name_prefix="fast-start") as pool:
+            fut_client = pool.submit(self._timed, "client_init", self._init_clients)
+
+            def _balance():
+                fut_client.result()
+                self._timed("clock_sync", lambda: self.sync_clock(samples=3))
+                return self._timed("balance", self.check_balance)
+
+            fut_balance = pool.submit(_balance)
+
+            ok = self._timed("market_lookup", lambda: self._use_cached_market() or self.find_market())
+
+            try:
+                fut_client.result()
+            except Exception as e:
+                print(f"❌ 交易客户端初始化失败: {e}")
+                return False
+            try:
+                fut_balance.result()
+            except Exception as e:
+                print(f"⚠️ 启动时查询余额失败: {e}")
+
+        self.startup_timings["total"] = time.perf_counter() - t0
+        return ok
+
+    def print_startup_timings(self):
+        if not self.startup_timings:
+            return
+        parts = " | ".join(
+            f"{k}={self.startup_timings[k] * 1000:.0f}ms"
+            for k in ("client_init", "clock_sync", "market_lookup", "balance", "total")
+            if k in self.startup_timings
+        )
+        print(f"⏱️  启动耗时: {parts}")
+
+    def sync_clock(self, samples: int = 1, force: bool = False) -> bool:
+        """
+        向 CLOB 对时（每 CLOCK_SYNC_INTERVAL 秒一次；samples>1 时连续取样，启动时用）
+        没开 CLOCK_SYNC 或还没有交易客户端时什么都不做
+        """
+        clock = self.clock
+        if not isinstance(clock, ExchangeClock) or self.trading_client is None:
+            return False
+        mono = clock.monotonic()
+        if not force and mono < self._next_clock_sync:
+            return False
+        self._next_clock_sync = mono + self.config.CLOCK_SYNC_INTERVAL
+        fetch = getattr(self.trading_client, "get_server_time", None)
+        if fetch is None:
+            return False
+        ok = False
+        for _ in range(max(1, samples)):
+            ok = clock.sample(fetch) or ok
+        return ok
+
     def _roll_market_if_needed(self, force: bool = False) -> bool:
-        now = time.time()
-        if not force and (now - self._last_roll_check_ts) < 10:
-            return True
-        self._last_roll_check_ts = now
+        now = self.clock.time()
+        mono = self.clock.monotonic()
+        info = self.market_info
+        if not force:
+            ended = info is not None and now >= info.end_ts
+            # 当前场还没到 end_ts（交易所时间）：边界是日历算出来的，不用去 Gamma 问
+            if info is not None and not ended and self._orderbook_fail_streak < 8:
+                return True
+            # 刚过边界的第一次检查立即做；之后没切成功再按 10 秒节奏重试
+            just_ended = ended and self._roll_checked_end != info.end_ts
+            if not just_ended and (mono - self._last_roll_check_mono) < 10:
+                return True
+        self._last_roll_check_mono = mono
+        if info is not None:
+            self._roll_checked_end = info.end_ts
 
-        latest = find_btc_15min_market(self.config.POLYMARKET_HOST)
+        latest = self.markets.find_btc_15min_market(self.config.POLYMARKET_HOST, clock=self.clock)
         if not latest:
             return True
 
-        cur_slug = (self.market_info or {}).get("slug") or ""
-        latest_slug = latest.get("slug") or ""
+        cur_slug = self.market_info.slug if self.market_info else ""
+        latest_slug = latest.slug
 
         if latest_slug and cur_slug and latest_slug != cur_slug:
             print(f"\n🔁 发现新场次：{cur_slug} -> {latest_slug}，正在切换...")
-            self.market_info = latest
+            if self.maker is not None:
+                self.maker.cancel_all()
+            # 先把上一场的持仓交给赎回（下面拿新场 token 失败时 market_info 不动，下一次检查再切）
+            self._queue_redemption(self.market_info, self.conditions)
+            if self.positions or self.pair_positions:
+                print("🧹 切场：清空上一场持仓记录（避免跨场 token_id 不一致）")
+                self.positions.clear()
+                self.pair_positions.clear()
 
-            conditions = get_market_conditions(self.config.POLYMARKET_HOST, latest["market_id"])
+            conditions = self.markets.get_market_conditions(self.config.POLYMARKET_HOST, latest.market_id)
             if not conditions:
                 print("❌ 新场次无法获取 UP/DOWN token_id，稍后重试...")
                 return False
 
+            self.market_info = latest
+            self._watch_spot()
             self.conditions = conditions
-
-            if self.positions:
-                print("🧹 切场：清空上一场持仓记录（避免跨场 token_id 不一致）")
-                self.positions.clear()
+            self._save_snapshot()
+            self._record_market()
+            self._watch_book()
 
             self._orderbook_fail_streak = 0
+            self._last_quotes.clear()
+            self._buy_once_guard.evict(self.clock.time())
+            self.stats["market_rolls"] += 1
 
-            print(f"✅ 已切换到新场: {latest.get('question')}")
-            print(f"   market_id: {latest.get('market_id')}")
+            print(f"✅ 已切换到新场: {latest.question}")
+            print(f"   market_id: {latest.market_id}")
             print(f"   slug: {latest_slug}")
-            print(f"✅ UP TokenID: {conditions.get('UP')}")
-            print(f"✅ DOWN TokenID: {conditions.get('DOWN')}")
+            print(f"✅ UP TokenID: {conditions.up}")
+            print(f"✅ DOWN TokenID: {conditions.down}")
             return True
 
         if self._orderbook_fail_streak >= 8:
@@ -119,11 +414,54 @@ class ArbitrageBot:
 
         return True
 
+    def _queue_redemption(self, market: Optional[MarketSlot], tokens: Optional[TokenPair]):
+        """上一场的持仓（单腿 + 成对）按账户分组交给赎回线程，等结算后换回 USDC"""
+        if self.redemption is None or market is None or tokens is None or not self._may_trade():
+            return
+        # 账户 -> (token_id -> 份额, 成本)
+        groups: Dict[str, Tuple[Dict[str, float], float]] = {}
+        for book in (self.positions, self.pair_positions):
+            for token_id in tokens:
+                pos = book.get(token_id)
+                if pos is not None and pos.slug == market.slug:
+                    sizes, cost = groups.get(pos.account or PRIMARY_ACCOUNT, ({}, 0.0))
+                    sizes[token_id] = sizes.get(token_id, 0.0) + pos.size
+                    groups[pos.account or PRIMARY_ACCOUNT] = (sizes, cost + pos.price * pos.size)
+        for account, (sizes, cost) in groups.items():
+            self.redemption.submit(RedeemItem(market.slug, market.condition_id, market.end_ts, tokens, sizes, cost,
+                                              account))
+            print(f"📮 已登记到期赎回: {market.slug}（账户 {account}，{len(sizes)} 个方向）")
+
+    def _account_redeemer(self, account: str) -> Optional[Web3Redeemer]:
+        """赎回线程第一次遇到某个执行池账户时调用：用该账户的私钥 / funder / 钱包类型"""
+        slot = self.execution_pool.accounts.get(account) if self.execution_pool is not None else None
+        return Web3Redeemer.from_config(slot.client.config) if slot is not None else None
+
+    def _on_settled(self, result: RedeemResult):
+        """赎回线程回调：记结算盈亏，刷新余额让资金马上可用于下一场"""
+        self.stats["settled_markets"] += 1
+        self.stats["settlement_pnl"] += result.payout - result.item.cost
+        if result.payout > 0 and self.execution_pool is not None:
+            try:
+                self.execution_pool.refresh_balances()
+            except Exception as e:
+                print(f"⚠️ 赎回后刷新余额失败: {e}")
+
     def check_balance(self) -> bool:
-        balance = self.trading_client.get_balance()
-        print(f"💰 当前余额: ${balance:.6f} USDC")
+        balances = self.execution_pool.refresh_balances()
+        print(f"💰 当前余额: ${self.execution_pool.total_balance():.6f} USDC")
+        if len(balances) > 1:
+            for name, bal in balances.items():
+                print(f"     - {name}: ${bal:.6f}")
         return True
 
+    def positions_by_account(self) -> Dict[str, Dict[str, Position]]:
+        """跨账户统一持仓视图：{account: {token_id: pos}}"""
+        out: Dict[str, Dict[str, Position]] = {}
+        for token_id, pos in self.positions.items():
+            out.setdefault(pos.account or PRIMARY_ACCOUNT, {})[token_id] = pos
+        return out
+
     def _pct(self, price: float) -> float:
         p = float(price)
         if p < 0:
@@ -132,110 +470,538 @@ class ArbitrageBot:
             p = 1.0
         return p * 100.0
 
+    def _apply_params(self):
+        """tick 之间应用控制面发布的参数：先改配置，再重建依赖这些参数的对象（引用替换，热路径无锁）"""
+        upd = self.param_update
+        if upd is None or upd.version == self.param_version:
+            return
+        for k, v in upd.values.items():
+            setattr(self.config, k, v)
+        if self._engine_from_config:
+            self.engine = StrategyEngine.from_config(self.config)
+        if self._poll_from_config and self.config.ADAPTIVE_POLL:
+            self.poll_policy = AdaptivePollPolicy.from_config(self.config, self.engine)
+        if self._quoter is not None:
+            self._quoter = MakerQuoter.from_config(self.config)
+        self._max_quote_age = self.config.QUOTE_MAX_AGE_MS / 1000.0
+        self.param_version = upd.version
+        changed = ", ".join(f"{k}={v}" for k, v in upd.values.items())
+        print(f"🎛️ 参数已热更新（v{upd.version}）: {changed}")
+
+    def last_quotes(self) -> Dict[str, Quote]:
+        return dict(self._last_quotes)
+
+    def start_profile(self, seconds: Optional[float] = None, path: Optional[str] = None) -> Optional[SamplingProfiler]:
+        """开始一次采样（任意线程可调）；上一次还没采完返回 None"""
+        if self.profiler is not None and self.profiler.running:
+            return None
+        seconds = float(seconds or self.config.PROFILE_SECS)
+        tid = self._trade_tid if self._trade_tid is not None else threading.get_ident()
+        self.profiler = SamplingProfiler(self.config.PROFILE_INTERVAL_MS / 1000.0, [tid],
+                                         on_done=lambda prof: self._profile_done(prof, path))
+        print(f"🔥 开始采样分析 {seconds:g}s（每 {self.config.PROFILE_INTERVAL_MS:g}ms 一次）")
+        return self.profiler.start(seconds)
+
+    def _profile_done(self, prof: SamplingProfiler, path: Optional[str]):
+        try:
+            files = prof.write(path or default_path(self.config.PROFILE_DIR))
+        except OSError as e:
+            print(f"⚠️ 火焰图写入失败: {e}")
+            return
+        phases = ", ".join(f"{k}={v}" for k, v in prof.by_phase().items())
+        print(f"🔥 采样完成：{prof.sample_count} 个样本（{phases}）-> {', '.join(files)}")
+
     def scan_and_trade(self):
-        if not self.conditions or not self.market_info:
+        self._apply_params()
+        with tick_phase("fetch"):
+            snap = self._fetch_snapshot()
+        if snap is None:
+            return
+        if self._quoter is not None:
+            with tick_phase("post"):
+                self._make_markets(snap)
             return
-        for side_name, token_id in self.conditions.items():
-            self._check_and_trade_token(token_id, side_name)
+        with tick_phase("decide"):
+            intents = list(self.engine.evaluate(snap))
+        if not intents:
+            return
+        with tick_phase("post"):
+            groups: Dict[str, list] = {}
+            for intent in intents:
+                if intent.group:
+                    groups.setdefault(intent.group, []).append(intent)
+                else:
+                    self._execute_intent(intent)
+            for legs in groups.values():
+                self._execute_pair(legs)
 
-    def _check_and_trade_token(self, token_id: str, side_name: str):
-        slug = (self.market_info or {}).get("slug") or ""
-        buy_guard_key = (slug, side_name)
+    def _make_markets(self, snap: MarketSnapshot):
+        """做市：先对账（成交记进持仓），再让挂单向目标收敛"""
+        if not self._may_trade():
+            return
+        if self.maker is None:
+            self.maker = MarketMaker.from_config(self.trading_client, self.config, clock=self.clock,
+                                                 on_fill=self._on_maker_fill)
+        if self.maker.reconcile() > 0:
+            snap = snap._replace(sides=tuple(s._replace(position=self.positions.get(s.token_id)) for s in snap.sides))
+        self.maker.sync(self._quoter.targets(snap))
 
-        # 优先使用get_price获取真实价格（比orderbook更准确）
-        up_price_info = self.trading_client.get_price(token_id, side="BUY")
-        down_price_info = self.trading_client.get_price(token_id, side="SELL")
-        
-        best_ask = None
-        best_bid = None
-        if up_price_info and "price" in up_price_info:
-            best_ask = float(up_price_info["price"])
-        if down_price_info and "price" in down_price_info:
-            best_bid = float(down_price_info["price"])
-        
-        # 如果get_price失败，回退到get_best_price（orderbook）
-        if best_ask is None:
-            best_ask = self.trading_client.get_best_price(token_id, side="buy")
-        if best_bid is None:
-            best_bid = self.trading_client.get_best_price(token_id, side="sell")
-
-        if best_ask is None or best_bid is None:
-            self._orderbook_fail_streak += 1
-            if self._orderbook_fail_streak >= 3:
-                print(f"⚠️  [{side_name}] 连续{self._orderbook_fail_streak}次无法获取价格，可能市场无效")
+    def _on_maker_fill(self, order: MakerOrder, qty: float):
+        token_id = order.token_id
+        pos = self.positions.get(token_id)
+        if order.side == "BUY":
+            if pos is None:
+                slug = self.market_info.slug if self.market_info else ""
+                # 做市挂单走主账户（self.trading_client），持仓记在主账户名下，按账户赎回 / 卖出时才对得上
+                self.positions[token_id] = Position(token_id, order.side_name, "BUY", order.price, qty,
+                                                    order.order_id, slug, PRIMARY_ACCOUNT)
+            else:
+                size = pos.size + qty
+                avg = (pos.price * pos.size + order.price * qty) / size
+                self.positions[token_id] = pos._replace(price=avg, size=round(size, 2))
+            self.stats["total_buys"] += 1
+            self.stats["total_invested"] += order.price * qty
+            print(f"✅ [{order.side_name}] 挂单买入成交 {qty} @ ${order.price:.4f}")
+            return
+        if pos is None:
             return
+        qty = min(qty, pos.size)
+        profit = (order.price - pos.price) * qty
+        self.stats["total_profit"] += profit
+        self.stats["total_sells"] += 1
+        remaining = round(pos.size - qty, 2)
+        if remaining > 0:
+            self.positions[token_id] = pos._replace(size=remaining)
         else:
-            self._orderbook_fail_streak = 0
+            del self.positions[token_id]
+        print(f"✅ [{order.side_name}] 挂单卖出成交 {qty} @ ${order.price:.4f} | 利润: ${profit:.4f}")
+
+    def _fetch_snapshot(self) -> Optional[MarketSnapshot]:
+        """本 tick 唯一一次取行情：UP/DOWN 各一次 get_quote，所有策略共用"""
+        if not self.conditions or not self.market_info:
+            return None
+        slug = self.market_info.slug
+        sides = []
+        pairs = list(self.conditions.items())
+        fair = self._track_fair()
+        # get_quote：优先 get_price（比orderbook更准确），失败回退 orderbook；已解析成 float
+        if self._io_pool is not None:
+            quotes = list(self._io_pool.map(self._fetch_quote, [t for _, t in pairs]))
+        else:
+            get_quote = self.trading_client.get_quote
+            quotes = [get_quote(t) for _, t in pairs]
+        mono = self.clock.monotonic()
+        for (side_name, token_id), quote in zip(pairs, quotes):
+            if self.recorder is not None:
+                self.recorder.quote(token_id, quote)
+            best_ask, best_bid = quote.ask, quote.bid
+            self._last_quotes[side_name] = quote
+            age = quote.age(mono)
+            if age is not None:
+                self.quote_age.add(age)
+            if quote.exchange_ts is not None:
+                self.quote_exchange_age.add(max(0.0, self.clock.time() - quote.exchange_ts))
+
+            if self._max_quote_age > 0 and age is not None and age > self._max_quote_age:
+                # 慢请求回来的价 / 两条腿隔得太久：本 tick 这一边不交给策略
+                self.stats["stale_quotes"] += 1
+                print(f"⏱️  [{side_name}] 行情已过期 {age * 1000:.0f}ms > {self._max_quote_age * 1000:.0f}ms，本轮不用")
+                best_ask = best_bid = None
+            elif best_ask is None or best_bid is None:
+                self._orderbook_fail_streak += 1
+                if self._orderbook_fail_streak >= 3:
+                    print(f"⚠️  [{side_name}] 连续{self._orderbook_fail_streak}次无法获取价格，可能市场无效")
+            else:
+                self._orderbook_fail_streak = 0
+                print(
+                    f"   🎲 [{side_name}] Ask(买): ${best_ask:.4f} ({self._pct(best_ask):.2f}%) | "
+                    f"Bid(卖): ${best_bid:.4f} ({self._pct(best_bid):.2f}%)"
+                )
+
+            # 位置参数构造（热路径）：token_id, side_name, ask, bid, position, bought
+            sides.append(SideBook(
+                token_id, side_name, best_ask, best_bid,
+                self.positions.get(token_id), (slug, side_name) in self._buy_once_guard,
+                self._pair_size(token_id), fair.fair(token_id) if fair is not None else None,
+            ))
+        info = self.market_info
+        now = self.clock.time()
+        spot = self.spot.view(info.start_ts, now) if self.spot is not None else None
+        return MarketSnapshot(now, slug, info.start_ts, info.end_ts, tuple(sides), spot)
+
+    def _fetch_quote(self, token_id: str) -> Quote:
+        """IO 线程里取报价：打上 fetch 标签，采样分析时这些线程也算进来"""
+        with tick_phase("fetch"):
+            return self.trading_client.get_quote(token_id)
+
+    def _track_fair(self) -> Optional[FairValueEngine]:
+        """切场后第一次取快照时把当前场登记给公允价引擎（立刻算一次，不等下一个现货 tick）"""
+        if self.fair is None or self.market_info is None or self.conditions is None:
+            return self.fair
+        info = self.market_info
+        if self._fair_slug != info.slug:
+            self._fair_slug = info.slug
+            self.fair.track([TrackedMarket(info.slug, info.start_ts, info.end_ts,
+                                           self.conditions.up, self.conditions.down)])
+            self.fair.recompute(self.clock.time())
+        return self.fair
+
+    def _watch_spot(self):
+        if self.spot is not None and self.market_info is not None:
+            self.spot.watch(self.market_info.start_ts)
 
+    def _watch_book(self):
+        if self._book_feed is not None and self.conditions is not None:
+            self._book_feed.track(self.conditions)
+
+    def _on_spot_update(self, ring: SpotRing):
+        """现货行情线程回调：动量刚越过 SPOT_ARM_BPS 时叫醒主循环（只在越线那一下，不会连续唤醒）"""
+        armed = abs(ring.momentum_bps()) >= self.config.SPOT_ARM_BPS
+        if armed and not self._spot_armed:
+            self._wake.set()
+        self._spot_armed = armed
+
+    def _pair_size(self, token_id: str) -> float:
+        pos = self.pair_positions.get(token_id)
+        return pos.size if pos is not None else 0.0
+
+    def _execute_pair(self, legs: list):
+        """互补套利：两条腿并发 FOK，单腿失败时补单 / 平仓 / 转单腿持仓"""
+        if len(legs) != 2 or self._io_pool is None:
+            return
+        if not self._may_trade() or self._stale_for_order(tuple(it.side_name for it in legs)):
+            return
+        slug = self.market_info.slug if self.market_info else ""
+        side = legs[0].side
+        # 本场成对买入出过单腿（已平仓 / 转单腿持仓）：不再重复触发，免得每个 tick 都买了又亏着平
+        pair_guard = (slug, PAIR_GUARD)
+        if side == "BUY" and pair_guard in self._buy_once_guard:
+            return
+        if side == "BUY":
+            # 已有单腿持仓的 token：这条腿固定走那个账户，落单时才能并进同一个持仓（卖 / 赎回都按账户）
+            legs = [
+                it._replace(account=self.positions[it.token_id].account) if it.token_id in self.positions else it
+                for it in legs
+            ]
+        else:
+            # 成对卖出必须从买入时的账户卖
+            legs = [
+                it._replace(account=self.pair_positions[it.token_id].account)
+                for it in legs if it.token_id in self.pair_positions
+            ]
+            if len(legs) != 2:
+                return
+        print(f"\n⚖️ 互补套利触发{'买入' if side == 'BUY' else '卖出'}：{legs[0].reason}")
+
+        res = execute_pair(
+            legs,
+            route=self.execution_pool.route_order,
+            requote=self.trading_client.get_quote,
+            pool=self._io_pool,
+            fee=self.config.COMPLEMENT_FEE,
+        )
+        self.stats["leg_retries"] += res.retried
+        self.stats["leg_unwinds"] += res.unwound
+        self.stats["total_profit"] += res.unwind_pnl
+
+        if side == "BUY":
+            if res.complete:
+                self.stats["pair_trades"] += 1
+            # 成对成交 -> 成对持仓；落单的腿 -> 普通单腿持仓（交给阈值策略按 SELL_PRICE 退出）
+            for leg in (res.filled if res.complete else res.naked):
+                it = leg.intent
+                pos = Position(it.token_id, it.side_name, "BUY", leg.price, it.size, leg.order_id, slug, leg.account)
+                self.stats["total_buys"] += 1
+                self.stats["total_invested"] += leg.price * it.size
+                if res.complete or not self._merge_position(pos):
+                    self.pair_positions[it.token_id] = pos
+            if not res.complete and (res.filled or res.naked or res.unwound):
+                self._buy_once_guard.add(pair_guard, self._state_expiry())
+                print(f"🚫 互补套利：本场出过单腿，{slug} 不再成对买入")
+            if res.complete:
+                cost = sum(leg.price for leg in res.filled)
+                print(f"✅ 成对买入完成：成本 ${cost:.4f}/对 x {legs[0].size}")
+            return
+
+        for leg in res.filled:
+            pos = self.pair_positions.pop(leg.intent.token_id, None)
+            if pos is None:
+                continue
+            self.stats["total_sells"] += 1
+            self.stats["total_profit"] += (leg.price - pos.price) * leg.intent.size
+        for leg in res.naked:
+            pos = self.pair_positions.get(leg.intent.token_id)
+            if pos is not None and self._merge_position(pos):
+                del self.pair_positions[leg.intent.token_id]
+        if res.complete:
+            self.stats["pair_trades"] += 1
+            print("✅ 成对卖出完成")
+
+    def _merge_position(self, pos: Position) -> bool:
+        """
+        落单的腿并进同 token 的单腿持仓：数量相加、按数量加权的成本价，订单号沿用已有持仓
+        已有持仓在别的账户上时不合并（卖单要从持有份额的账户发），返回 False，由调用方留在成对持仓里
+        """
+        old = self.positions.get(pos.token_id)
+        if old is None:
+            self.positions[pos.token_id] = pos
+            return True
+        if (old.account or PRIMARY_ACCOUNT) != (pos.account or PRIMARY_ACCOUNT):
+            print(f"⚠️ [{pos.side_name}] 落单的腿在账户 {pos.account}，已有持仓在 {old.account}：不合并，留在成对持仓里")
+            return False
+        size = round(old.size + pos.size, 2)
+        price = (old.price * old.size + pos.price * pos.size) / size if size > 0 else old.price
+        self.positions[pos.token_id] = old._replace(size=size, price=price)
+        return True
+
+    # -----------------------------
+    # 主备
+    # -----------------------------
+    def _may_trade(self) -> bool:
+        """租约还在本机（本地比较，不做 I/O）"""
+        return self.ha is None or self.ha.is_leader()
+
+    def _ha_state(self) -> Dict:
+        return {
+            "slug": self.market_info.slug if self.market_info else "",
+            "positions": [p._asdict() for p in self.positions.values()],
+            "pairs": [p._asdict() for p in self.pair_positions.values()],
+            "guards": sorted(list(k) for k in self._buy_once_guard),
+            "stats": self.stats,
+            "maker_orders": [o.order_id for o in self.maker.table.orders()] if self.maker is not None else [],
+        }
+
+    def _journal_state(self):
+        if self.ha is None or not self.ha.is_leader():
+            return
+        ok = self.ha.journal_state(self._ha_state())
+        if not ok and not self._journal_failed:
+            print("⚠️ 状态日志写入被拒绝（租约已易主），停止交易")
+        self._journal_failed = not ok
+
+    def _drop_leader_state(self):
+        """不再是主机：持仓 / 成对持仓 / 已买标记 / 做市挂单表都以新主机的日志为准，本机的作废
+        （挂单由新主机按快照撤；备机切场时也不会把这些过期持仓交给赎回）"""
+        self.positions.clear()
+        self.pair_positions.clear()
+        self._buy_once_guard.clear()
+        if self.maker is not None:
+            self.maker.table.clear()
+
+    def _standby(self, until: Optional[float] = None) -> bool:
+        """备机：跟日志、跟着切场，直到拿到租约；返回是否成为主机（False = 到了 until）"""
+        print(f"🕒 备机待命（{self.ha.node_id}），等待租约...")
+        self._drop_leader_state()
+        next_roll = 0.0
+        while until is None or self.clock.time() < until:
+            if self.ha.wait_for_leadership(self.ha.poll):
+                self._take_over()
+                return True
+            self.ha.follow()
+            mono = self.clock.monotonic()
+            if mono >= next_roll:
+                next_roll = mono + 1.0
+                self.sync_clock()
+                self._roll_market_if_needed()
+        return False
+
+    def _take_over(self):
+        """接管：应用最后的快照 + 之后的 guard，撤掉旧主机留下的挂单"""
+        t0 = time.perf_counter()
+        self._drop_leader_state()
+        state, guards = self.ha.recovered()
+        slug = self.market_info.slug if self.market_info else ""
+        restored = 0
+        if state is not None:
+            # 只恢复当前场的持仓 / 标记：旧场的持仓由旧主机切场时交给了赎回
+            for p in state.get("positions", ()):
+                if p.get("slug") == slug:
+                    self.positions[p["token_id"]] = Position(**p)
+                    restored += 1
+            for p in state.get("pairs", ()):
+                if p.get("slug") == slug:
+                    self.pair_positions[p["token_id"]] = Position(**p)
+                    restored += 1
+            guards = [tuple(g) for g in state.get("guards", ())] + guards
+            for k, v in state.get("stats", {}).items():
+                if k in self.stats:
+                    self.stats[k] = v
+            orphans = state.get("maker_orders") or []
+            cancel = getattr(self.trading_client, "cancel_orders", None)
+            if orphans and cancel is not None:
+                try:
+                    n = len(cancel(orphans))
+                    print(f"🧹 接管：撤掉旧主机的 {n}/{len(orphans)} 张挂单")
+                except Exception as e:
+                    print(f"⚠️ 接管撤单失败: {e}")
+        self._buy_once_guard.update((g for g in guards if g[0] == slug), self._state_expiry())
+        self._journal_failed = False
         print(
-            f"   🎲 [{side_name}] Ask(买): ${best_ask:.4f} ({self._pct(best_ask):.2f}%) | "
-            f"Bid(卖): ${best_bid:.4f} ({self._pct(best_bid):.2f}%)"
+            f"👑 已接管交易（fencing={self.ha.fencing}）：恢复 {restored} 个持仓、"
+            f"{len(self._buy_once_guard)} 个已买标记，用时 {(time.perf_counter() - t0) * 1000:.0f}ms"
         )
 
-        has_position = token_id in self.positions
-        already_tried_buy = buy_guard_key in self._buy_once_guard
+    def _state_expiry(self) -> float:
+        """当前场的状态保留到什么时候（交易所时间）"""
+        info = self.market_info
+        end_ts = info.end_ts if info is not None and info.end_ts else self.clock.time()
+        return end_ts + self._state_retain
 
-        # ✅ 买入：Ask <= BUY_PRICE（价格低时买入）
-        if (not has_position) and (not already_tried_buy):
-            if best_ask <= float(self.config.BUY_PRICE):
-                print(f"\n🎯 [{side_name}] 触发买入：Ask=${best_ask:.4f} <= {self.config.BUY_PRICE:.4f}（盘口价成交）")
-                
-                # 标准化价格：真实ask + 小buffer，最大0.99
-                order_price = min(0.99, best_ask + 0.005)
-                order_price = round(order_price, 4)
-                order_size = round(float(self.config.ORDER_SIZE), 2)
+    def _stale_for_order(self, side_names) -> bool:
+        """下单前再看一次：策略用的行情到现在是否已超过 QUOTE_MAX_AGE_MS（前面的腿 / 意图执行会耗时）"""
+        if self._max_quote_age <= 0:
+            return False
+        mono = self.clock.monotonic()
+        for side_name in side_names:
+            q = self._last_quotes.get(side_name)
+            age = q.age(mono) if q is not None else None
+            if age is not None and age > self._max_quote_age:
+                self.stats["stale_skips"] += 1
+                print(f"⏱️  [{side_name}] 下单前行情已过期 {age * 1000:.0f}ms，放弃本次{'/'.join(side_names)}意图")
+                return True
+        return False
+
+    @property
+    def slicer(self) -> Optional[SlicedExecutor]:
+        if self._slicer is None and self.config.SLICE_EXECUTION and self.execution_pool is not None:
+            self._slicer = SlicedExecutor.from_config(self.execution_pool.route_order, self._book_levels,
+                                                      self.config, clock=self.clock)
+        return self._slicer
+
+    def _book_levels(self, token_id: str, depth: int) -> Dict:
+        """切片每轮重读盘口：有 ws 本地盘口就读本地的，不可用时回落到 REST"""
+        if self._book_feed is not None:
+            try:
+                return self._book_feed.levels(token_id, depth)
+            except QuoteSourceError:
+                pass
+        return self.trading_client.get_top_levels(token_id, depth)
+
+    def _print_slices(self, side_name: str, res: SliceResult, size: float):
+        slip = res.slippage_bps
+        print(f"🔪 [{side_name}] 切片 {res.slices} 张（失败 {res.failed}）成交 {res.filled:g}/{size:g} "
+              f"VWAP={res.vwap if res.vwap is None else round(res.vwap, 4)} 到达价={res.arrival} "
+              f"滑点={'-' if slip is None else f'{slip:.1f}bps'} {res.elapsed * 1000:.0f}ms ({res.reason})")
 
-                order_id = self.trading_client.place_order(
+    def _execute_intent(self, intent: OrderIntent):
+        side_name = intent.side_name
+        token_id = intent.token_id
+        if not self._may_trade() or self._stale_for_order((side_name,)):
+            return
+        slug = self.market_info.slug if self.market_info else ""
+
+        # ✅ 买入（每方向每场只买一次）
+        if intent.side == "BUY":
+            buy_guard_key = (slug, side_name)
+            if token_id in self.positions or buy_guard_key in self._buy_once_guard:
+                return
+            # 主备：先把“这边试过了”写进日志再下单，写不进去（租约已易主）就不下
+            if self.ha is not None and not self.ha.journal_guard(slug, side_name):
+                print(f"⚠️ [{side_name}] 写状态日志失败（租约已不在本机），放弃买入")
+                return
+            print(f"\n🎯 [{side_name}] 触发买入：{intent.reason}（盘口价成交）")
+
+            slicer = self.slicer
+            price, size = intent.ref_price, intent.size
+            if slicer is not None:
+                res = slicer.execute(intent)
+                self._print_slices(side_name, res, intent.size)
+                order_id, account = (res.order_ids[0] if res.order_ids else None), res.account
+                price, size = res.vwap or intent.ref_price, res.filled
+            else:
+                order_id, account = self.execution_pool.route_order(
                     token_id=token_id,
                     side="BUY",
-                    price=order_price,
-                    size=order_size,
-                    order_type="FOK",  # 使用FOK确保全成或取消
+                    price=intent.price,
+                    size=intent.size,
+                    order_type=intent.order_type,
+                    account=intent.account,
                 )
 
-                self._buy_once_guard.add(buy_guard_key)
-
-                if order_id:
-                    self.positions[token_id] = {
-                        "side": "BUY",
-                        "price": float(best_ask),
-                        "size": float(self.config.ORDER_SIZE),
-                        "order_id": order_id,
-                        "side_name": side_name,
-                        "slug": slug,
-                    }
-                    self.stats["total_buys"] += 1
-                    self.stats["total_invested"] += float(best_ask) * float(self.config.ORDER_SIZE)
-                    print(f"✅ [{side_name}] 买单已提交: {order_id}")
-                else:
-                    print(f"❌ [{side_name}] 买单提交失败（本场已标记尝试过，不再重复买）")
-
-        # ✅ 卖出：Bid >= SELL_PRICE 且有持仓
-        if has_position:
-            pos = self.positions[token_id]
-            if best_bid >= float(self.config.SELL_PRICE):
-                # 标准化价格：使用合理卖价
-                order_price = max(0.01, best_bid - 0.005)
-                order_price = round(order_price, 4)
-                order_size = round(float(pos["size"]), 2)
-                print(f"\n🎯 [{side_name}] 触发卖出：Bid=${best_bid:.4f} >= {self.config.SELL_PRICE:.4f}（盘口价成交）")
-
-                order_id = self.trading_client.place_order(
+            self._buy_once_guard.add(buy_guard_key, self._state_expiry())
+
+            if order_id:
+                self.positions[token_id] = Position(
                     token_id=token_id,
-                    side="SELL",
-                    price=order_price,
-                    size=order_size,
-                    order_type="FOK",  # 使用FOK确保全成或取消
+                    side_name=side_name,
+                    side="BUY",
+                    price=price,
+                    size=size,
+                    order_id=order_id,
+                    slug=slug,
+                    account=account,
                 )
+                self.stats["total_buys"] += 1
+                self.stats["total_invested"] += price * size
+                print(f"✅ [{side_name}] 买单已提交: {order_id} (账户={account})")
+            else:
+                print(f"❌ [{side_name}] 买单提交失败（本场已标记尝试过，不再重复买）")
+            return
 
-                if order_id:
-                    profit = (float(best_bid) - float(pos["price"])) * float(pos["size"])
-                    self.stats["total_profit"] += profit
-                    self.stats["total_sells"] += 1
-                    print(f"✅ [{side_name}] 卖单已提交: {order_id} | 估算利润: ${profit:.4f}")
-                    del self.positions[token_id]
-                else:
-                    print(f"❌ [{side_name}] 卖单提交失败（下一轮继续尝试）")
+        # ✅ 卖出：必须有持仓
+        pos = self.positions.get(token_id)
+        if pos is None:
+            return
+        size = min(intent.size, round(pos.size, 2))
+        print(f"\n🎯 [{side_name}] 触发卖出：{intent.reason}（盘口价成交）")
+
+        slicer = self.slicer
+        price = intent.ref_price
+        if slicer is not None:
+            res = slicer.execute(intent._replace(size=size, account=pos.account))
+            self._print_slices(side_name, res, size)
+            order_id = res.order_ids[0] if res.order_ids else None
+            price, size = res.vwap or intent.ref_price, res.filled
+        else:
+            order_id, _ = self.execution_pool.route_order(
+                token_id=token_id,
+                side="SELL",
+                price=intent.price,
+                size=size,
+                order_type=intent.order_type,
+                account=pos.account,
+            )
+
+        if order_id:
+            profit = (price - pos.price) * size
+            self.stats["total_profit"] += profit
+            self.stats["total_sells"] += 1
+            print(f"✅ [{side_name}] 卖单已提交: {order_id} | 估算利润: ${profit:.4f}")
+            remaining = round(pos.size - size, 2)
+            if remaining > 0:
+                self.positions[token_id] = pos._replace(size=remaining)
+            else:
+                del self.positions[token_id]
+        else:
+            print(f"❌ [{side_name}] 卖单提交失败（下一轮继续尝试）")
+
+    def _poll_state(self) -> PollState:
+        m = self.market_info
+        slug = m.slug if m else ""
+        sides: Dict[str, SideQuote] = {}
+        fair = self.fair
+        for side_name, token_id in (self.conditions.items() if self.conditions else ()):
+            q = self._last_quotes.get(side_name)
+            ask, bid = (q.ask, q.bid) if q is not None else (None, None)
+            has_position = token_id in self.positions
+            sides[side_name] = SideQuote(
+                ask=ask,
+                bid=bid,
+                can_buy=(not has_position) and (slug, side_name) not in self._buy_once_guard,
+                has_position=has_position,
+                fair=fair.fair(token_id) if fair is not None else None,
+            )
+        now = self.clock.time()
+        start_ts = m.start_ts if m else 0
+        end_ts = m.end_ts if m else 0
+        return PollState(
+            now=now,
+            start_ts=start_ts,
+            end_ts=end_ts,
+            is_live=bool(start_ts and end_ts and start_ts <= now < end_ts) or bool(m and m.is_live),
+            sides=sides,
+            spot_momentum_bps=self.spot.momentum_bps() if self.spot is not None else 0.0,
+        )
 
     def print_status(self):
         print(f"\n📊 当前状态:")
@@ -243,12 +1009,72 @@ class ArbitrageBot:
         print(f"   卖出次数: {self.stats['total_sells']}")
         print(f"   总投入: ${self.stats['total_invested']:.4f}")
         print(f"   总利润: ${self.stats['total_profit']:.4f}")
+        for name, u in budget_usage().items():
+            rejected = u["rejected"]
+            detail = " / ".join(f"{p} {n}" for p, n in rejected.items() if n)
+            print(
+                f"   限频[{name}]: 已用 {u['used_pct']:.0f}% | 暂停 {u['blocked_for']:.1f}s | "
+                f"429 次数 {u['throttled_429']} | 拒绝 {sum(rejected.values())}" + (f"（{detail}）" if detail else "")
+            )
+        if self.trading_client is not None:
+            for name, h in self.trading_client.hedge_stats().items():
+                print(
+                    f"   对冲[{name}]: 对冲率 {h['hedge_rate'] * 100:.1f}% | 胜出 {h['hedge_win_rate'] * 100:.0f}% | "
+                    f"p99 主请求 {h['primary_ms']['p99']}ms -> 实际 {h['effective_ms']['p99']}ms"
+                )
+        if self.trading_client is not None:
+            for name, q in self.trading_client.quote_stats().items():
+                if q["calls"]:
+                    print(
+                        f"   报价源[{name}]: {q['state']} | 成功率 {q['success_rate'] if q['success_rate'] is not None else '-'} | "
+                        f"p50 {q['p50_ms']}ms | 采用 {q['served']} | 熔断 {q['trips']} 次"
+                    )
+        if len(self.quote_age):
+            ex = self.quote_exchange_age
+            ex_txt = f" | 交易所 p50 {ex.percentile(0.5) * 1000:.0f}ms p99 {ex.percentile(0.99) * 1000:.0f}ms" if len(ex) else ""
+            print(
+                f"   行情年龄: p50 {self.quote_age.percentile(0.5) * 1000:.0f}ms p99 {self.quote_age.percentile(0.99) * 1000:.0f}ms"
+                f"{ex_txt} | 过期未用 {self.stats['stale_quotes']} | 下单前过期 {self.stats['stale_skips']}"
+            )
+        if isinstance(self.clock, ExchangeClock) and self.clock.sync.synced:
+            c = self.clock.sync.stats()
+            print(f"   对时: 交易所偏移 {c['offset_ms']:+.0f}ms ±{c['error_ms']:.0f}ms | 最小 RTT {c['min_rtt_ms']}ms | 样本 {c['samples']}")
+        if self.spot is not None and self.market_info is not None:
+            v = self.spot.view(self.market_info.start_ts, self.clock.time())
+            if v is not None:
+                move = f"{v.move_bps:+.1f}bp" if v.move_bps is not None else "-"
+                print(
+                    f"   现货: ${v.price:,.2f} | 开盘以来 {move} | {self.spot.horizon:.0f}s 动量 {v.momentum_bps:+.1f}bp | "
+                    f"延迟 {v.age * 1000:.0f}ms"
+                )
+        if self.fair is not None and self.conditions is not None:
+            up = self.fair.fair(self.conditions.up)
+            if up is not None:
+                print(f"   公允价: UP {up:.4f} / DOWN {1.0 - up:.4f} | σ {self.fair.sigma * 1e4:.2f}bp/√s")
         print(f"   当前持仓: {len(self.positions)} 个")
-        if self.positions:
-            for _, pos in self.positions.items():
-                print(f"     - {pos['side_name']}: {pos['size']} @ ${pos['price']:.4f} (slug={pos.get('slug')})")
+        if self.redemption is not None:
+            r = self.redemption.stats()
+            print(
+                f"   到期赎回: 待结算 {r['pending']} 场 | 已赎回 {r['redeemed']} 场 ${r['redeemed_usdc']:.4f} | "
+                f"输 {r['lost']} 场 | 结算盈亏 ${self.stats['settlement_pnl']:.4f}"
+            )
+        if self.maker is not None:
+            m = self.maker.stats()
+            print(
+                f"   做市: 挂单 {m['open']} | 已挂 {m['placed']} | 撤单 {m['canceled']}（{m['cancel_batches']} 批） | "
+                f"成交 {m['fills']} | requote p50 {m['requote_p50_ms']}ms p99 {m['requote_p99_ms']}ms"
+            )
+        if self.config.COMPLEMENT_ARB:
+            print(
+                f"   互补套利: 成交 {self.stats['pair_trades']} 对 | 成对持仓 {len(self.pair_positions)} 腿 | "
+                f"补单 {self.stats['leg_retries']} | 平仓 {self.stats['leg_unwinds']}"
+            )
+        for account, positions in self.positions_by_account().items():
+            for pos in positions.values():
+                print(f"     - [{account}] {pos.side_name}: {pos.size} @ ${pos.price:.4f} (slug={pos.slug})")
 
-    def run(self):
+    def run(self, until: Optional[float] = None):
+        """until: 时钟到达该时间（unix 秒）后退出；None 表示一直运行"""
         mode_str = "🔸 模拟模式" if self.config.DRY_RUN else "🔴 实盘模式"
         print(f"\n🚀 BTC 15分钟套利机器人启动")
         print(f"   模式: {mode_str}")
@@ -257,37 +1083,107 @@ class ArbitrageBot:
         print(f"   订单大小: {self.config.ORDER_SIZE} shares")
         print("=" * 60)
 
-        if not self.find_market():
-            return
+        if self.config.FAST_START:
+            if not self.fast_start():
+                return
+        else:
+            t0 = time.perf_counter()
+            self._timed("clock_sync", lambda: self.sync_clock(samples=3))
+            if not self._timed("market_lookup", self.find_market):
+                return
+            self._timed("balance", self.check_balance)
+            self.startup_timings["total"] = (
+                time.perf_counter() - t0 + self.startup_timings.get("client_init", 0.0)
+            )
+        self.print_startup_timings()
 
-        self.check_balance()
+        if self._spot_feed is not None:
+            try:
+                self._spot_feed.start()
+            except Exception as e:
+                print(f"⚠️ 现货行情启动失败: {e}")
+        if self._book_feed is not None:
+            try:
+                self._book_feed.start()
+                self.execution_pool.add_quote_source(QuoteSource("ws", self._book_feed.fetch))
+            except Exception as e:
+                print(f"⚠️ 盘口推送启动失败: {e}")
+        if self.redemption is not None and not self._redeem_inline:
+            self.redemption.start()
+        if self.config.CONTROL_PORT > 0:
+            try:
+                self._control = ControlServer(self, self.config.CONTROL_HOST, self.config.CONTROL_PORT,
+                                              self.config.CONTROL_TOKEN).start()
+            except OSError as e:
+                print(f"⚠️ 控制面启动失败: {e}")
+        self._trade_tid = threading.get_ident()
+        # kill -USR2 <pid>：采 PROFILE_SECS 秒（信号处理只能在主线程注册）
+        if (self.config.PROFILE_SIGNAL and hasattr(signal, "SIGUSR2")
+                and threading.current_thread() is threading.main_thread()):
+            signal.signal(signal.SIGUSR2, lambda signum, frame: self.start_profile())
 
         print("\n🔄 开始扫描市场（自动进入下一场已开启）...")
         print("=" * 60)
 
         scan_count = 0
         try:
-            while True:
+            if self.ha is not None:
+                self.ha.start()
+                if not self._standby(until):
+                    return
+            while until is None or self.clock.time() < until:
+                if self.ha is not None and not self.ha.is_leader():
+                    print("⚠️ 租约已失效，停止交易转为备机")
+                    if not self._standby(until):
+                        break
                 scan_count += 1
-                timestamp = datetime.now().strftime("%H:%M:%S")
+                timestamp = datetime.fromtimestamp(self.clock.time()).strftime("%H:%M:%S")
                 print(f"\n[扫描 #{scan_count}] {timestamp}")
 
-                if not self._roll_market_if_needed():
-                    time.sleep(2)
+                with tick_phase("roll"):
+                    self.sync_clock()
+                    rolled = self._roll_market_if_needed()
+                if not rolled:
+                    self.clock.sleep(2)
                     continue
 
                 self.scan_and_trade()
+                self._journal_state()
+                if self.redemption is not None and self._redeem_inline:
+                    self.redemption.pump()
 
                 if scan_count % 20 == 0:
                     self.print_status()
 
-                time.sleep(1)
+                interval = self.poll_policy.next_interval(self._poll_state())
+                with tick_phase("idle"):
+                    self.clock.wait(self._wake, interval)
 
         except KeyboardInterrupt:
             print("\n\n⚠️ 用户中断")
         finally:
             print("\n" + "=" * 60)
             print("🏁 机器人停止")
+            if self._spot_feed is not None:
+                self._spot_feed.stop()
+            if self._book_feed is not None:
+                self._book_feed.stop()
+            if self.maker is not None:
+                n = self.maker.cancel_all()
+                print(f"🧹 做市：已撤掉 {n} 张挂单")
+            if self.redemption is not None:
+                self.redemption.stop()
+            if self._control is not None:
+                self._control.stop()
+            if self.profiler is not None and self.profiler.running:
+                self.profiler.stop()
+            if self.recorder is not None:
+                self.recorder.close()
+            if self._slicer is not None:
+                self._slicer.shutdown()
+            shutdown_signing_service()
+            if self.ha is not None:
+                self.ha.stop()
             self.print_status()
             print("=" * 60)
 
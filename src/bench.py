@@ -0,0 +1,570 @@
+"""
+微基准（离线，基于 src.sim 的交易所替身 + 虚拟时钟）
+
+用法：
+    python -m src.bench ticks [--n 20000]
+    python -m src.bench gamma [--n 2000]
+    python -m src.bench fair [--n 5000]
+    python -m src.bench maker [--n 300]
+    python -m src.bench quotes [--n 600]
+    python -m src.bench soak [--n 60]        # n = 模拟天数；内存在预热后还在涨时退出码 1
+    python -m src.bench slicing [--n 100]    # n = 父单数
+    python -m src.bench signing [--n 400]    # n = 一串订单的张数（真实 ECDSA 签名，假私钥）
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import gc
+import os
+import resource
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+from src.clock import VirtualClock
+from src.sim import INTERVAL, SimConfig, SimExchange
+
+
+class _StubClob:
+    """假 ClobClient：返回和真实接口一样的原始格式（价格是字符串）"""
+    def __init__(self, clock: VirtualClock, exchange: SimExchange):
+        self._clock = clock
+        self._exchange = exchange
+
+    def get_price(self, token_id, side):
+        q = self._exchange.quote(token_id)
+        if q is None:
+            return {}
+        return {"price": str(q[1] if side == "BUY" else q[0])}
+
+    def get_server_time(self):
+        return int(self._clock.time())
+
+
+def _make_bot(start_ts: int, seed: int = 0):
+    """真实 ArbitrageBot + 真实 TradingClient（ClobClient 换成本地桩），市场来自 SimExchange"""
+    from src.arbitrage_bot import ArbitrageBot
+    from src.rate_limit import RequestScheduler
+    from src.trading import TradingClient
+
+    clock = VirtualClock(start_ts)
+    exchange = SimExchange(clock, seed=seed)
+    config = SimConfig()
+    config.DRY_RUN = True
+    client = TradingClient(config, scheduler=RequestScheduler("bench", 1e9, 1e9), clock=clock)
+    client.client = _StubClob(clock, exchange)
+    bot = ArbitrageBot(config=config, clock=clock, trading_client=client, market_source=exchange)
+    bot.find_market()
+    return bot, clock
+
+
+def bench_ticks(n: int = 20000, step: float = 0.5) -> Dict[str, Any]:
+    """
+    单 tick 决策路径（切场检查 + scan_and_trade，含 TradingClient 报价解析）的 CPU 时间
+    与每 tick 临时内存峰值；价格来自本地桩，不含网络；日志输出到 /dev/null（格式化开销仍计入）
+    """
+    start_ts = int(time.time()) // INTERVAL * INTERVAL
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        bot, clock = _make_bot(start_ts)
+
+        def tick():
+            bot._roll_market_if_needed()
+            bot.scan_and_trade()
+            clock.advance(step)
+
+        for _ in range(200):  # 预热
+            tick()
+
+        cpu0 = time.process_time()
+        for _ in range(n):
+            tick()
+        cpu = time.process_time() - cpu0
+
+        tracemalloc.start()
+        peaks = 0
+        sample = min(n, 2000)
+        for _ in range(sample):
+            base, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            tick()
+            _, peak = tracemalloc.get_traced_memory()
+            peaks += peak - base
+        tracemalloc.stop()
+
+    return {
+        "ticks": n,
+        "cpu_us_per_tick": round(cpu / n * 1e6, 2),
+        "peak_alloc_bytes_per_tick": round(peaks / sample, 1),
+    }
+
+
+def _synthetic_gamma_list(n_markets: int = 50, start_ts: int = 1_700_000_100) -> bytes:
+    """和 Gamma /markets 列表差不多形状的 payload（每个市场带一堆机器人用不到的字段）"""
+    import json
+    from datetime import datetime, timezone
+
+    out = []
+    for i in range(n_markets):
+        ts = start_ts + (i - n_markets // 2) * INTERVAL
+        iso = lambda t: datetime.fromtimestamp(t, tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        slug = f"btc-updown-15m-{ts}" if i % 2 == 0 else f"eth-updown-15m-{ts}"
+        out.append({
+            "id": str(500000 + i), "slug": slug, "question": f"Bitcoin Up or Down {ts}",
+            "startDate": iso(ts), "endDate": iso(ts + INTERVAL), "closed": False, "active": True,
+            "volume": "1234.5", "enableOrderBook": True,
+            "outcomes": json.dumps(["Up", "Down"]),
+            "clobTokenIds": json.dumps([str(10 ** 70 + i), str(10 ** 70 + i + 1)]),
+            "description": "x" * 600, "image": "https://example.invalid/x.png",
+            "events": [{"id": i, "title": "t" * 80, "tags": ["crypto"] * 5}],
+            "rewardsMinSize": 50, "spread": 0.01, "umaBond": "500", "outcomePrices": "[\"0.5\", \"0.5\"]",
+        })
+    return json.dumps(out).encode()
+
+
+def bench_gamma(n: int = 2000) -> Dict[str, Any]:
+    """Gamma /markets 列表（50 个市场）解码 + 投影的耗时"""
+    from src import gamma_decode
+
+    payload = _synthetic_gamma_list()
+    patterns = ("btc-updown-15m", "bitcoin-up-or-down-15-minute")
+    t0 = time.perf_counter()
+    for _ in range(n):
+        recs = list(gamma_decode.decode_market_list(payload, patterns))
+    dt = time.perf_counter() - t0
+    return {
+        "payload_bytes": len(payload),
+        "decoder": "orjson" if gamma_decode._orjson is not None else "json",
+        "markets_projected": len(recs),
+        "us_per_payload": round(dt / n * 1e6, 1),
+    }
+
+
+def bench_fair(n: int = 5000, sizes=(4, 48, 256)) -> Dict[str, Any]:
+    """公允价：每个现货 tick 重算一批市场（auto = 按 NUMPY_MIN_BATCH 选路径，python = 强制逐场 math.erf）"""
+    import random
+
+    from src import fair_value
+    from src.fair_value import FairValueEngine, TrackedMarket
+    from src.spot_feed import SpotRing
+
+    rng = random.Random(0)
+    t0_ts = 1_700_000_000.0
+    ring = SpotRing(horizon=5.0)
+    price = 60000.0
+    for i in range(3600):  # 一小时历史：开盘价和波动率都有了
+        price *= 1.0 + rng.gauss(0.0, 1e-4)
+        ring.update(t0_ts + i, price)
+    now = t0_ts + 3599
+
+    def run(n_markets: int) -> float:
+        engine = FairValueEngine(ring)
+        engine.track([
+            TrackedMarket(f"m{i}", int(now) - 60 * (i % 15) - 1, int(now) + 60 * (i + 1), f"u{i}", f"d{i}")
+            for i in range(n_markets)
+        ])
+        engine.recompute(now)
+        t = time.perf_counter()
+        for _ in range(n):
+            engine.recompute(now)
+        return round((time.perf_counter() - t) / n * 1e6, 1)
+
+    report: Dict[str, Any] = {}
+    np_mod = fair_value.np
+    for size in sizes:
+        if np_mod is not None:
+            report[f"auto_us_per_tick[{size}]"] = run(size)
+        fair_value.np = None
+        try:
+            report[f"python_us_per_tick[{size}]"] = run(size)
+        finally:
+            fair_value.np = np_mod
+    return report
+
+
+class _RttClient:
+    """
+    几个挂单替身（每场一个，各自的随机路径）外面包一层固定 RTT（每个请求 sleep 一次）
+    token / order id 都带 "k/" 前缀区分是哪一场；batch=False 时没有批量撤单 / 挂单接口
+    """
+    def __init__(self, clients: List[Any], rtt: float, batch: bool):
+        self._clients = clients
+        self._rtt = rtt
+        if not batch:
+            self.cancel_orders = self._cancel_one_by_one
+            self.place_limit_orders = None
+
+    def _route(self, key: str):
+        k, _, rest = key.partition("/")
+        return int(k), rest
+
+    def place_limit_order(self, token_id, side, price, size, post_only=True):
+        time.sleep(self._rtt)
+        k, tok = self._route(token_id)
+        oid = self._clients[k].place_limit_order(tok, side, price, size, post_only)
+        return f"{k}/{oid}" if oid else None
+
+    def place_limit_orders(self, orders, post_only=True):
+        time.sleep(self._rtt)
+        out = []
+        for token_id, side, price, size in orders:
+            k, tok = self._route(token_id)
+            oid = self._clients[k].place_limit_order(tok, side, price, size, post_only)
+            out.append(f"{k}/{oid}" if oid else None)
+        return out
+
+    def cancel_orders(self, order_ids):
+        time.sleep(self._rtt)
+        done = []
+        for oid in order_ids:
+            k, raw = self._route(oid)
+            done.extend(f"{k}/{o}" for o in self._clients[k].cancel_orders([raw]))
+        return done
+
+    def _cancel_one_by_one(self, order_ids):
+        done = []
+        for oid in order_ids:
+            done.extend(self.__class__.cancel_orders(self, [oid]))
+        return done
+
+    def get_order_status(self, order_id):
+        k, raw = self._route(order_id)
+        return self._clients[k].get_order_status(raw)
+
+
+def bench_maker(n: int = 300, n_markets: int = 4, rtt: float = 0.002) -> Dict[str, Any]:
+    """
+    做市撤改单：n_markets 场同时挂 UP/DOWN 买单，每步虚拟时间走 1 秒、按新盘口整体 requote；
+    对比批量和逐个撤单 / 挂单的 requote 延迟 / 撤单吞吐（每个请求固定 rtt 秒）
+    """
+    from src.market_maker import MakerQuoter, MarketMaker
+    from src.sim import SimTradingClient
+    from src.strategy import MarketSnapshot, SideBook
+
+    start_ts = int(time.time()) // INTERVAL * INTERVAL
+    market_id = start_ts // INTERVAL
+    report: Dict[str, Any] = {"markets": n_markets, "rtt_ms": rtt * 1000}
+    for batch in (True, False):
+        clock = VirtualClock(start_ts)
+        exchanges = [SimExchange(clock, seed=k) for k in range(n_markets)]
+        client = _RttClient([SimTradingClient(ex) for ex in exchanges], rtt, batch)
+        quoter = MakerQuoter(half_spread=0.02, size=5.0, stop_secs=0.0)
+        mm = MarketMaker(client, clock=clock, min_rest=0.0, max_actions_per_sec=1e6, reconcile_interval=0.0)
+
+        for _ in range(n):
+            clock.advance(1.0)
+            now = clock.time()
+            targets = []
+            for k, ex in enumerate(exchanges):
+                sides = []
+                for name in ("UP", "DOWN"):
+                    bid, ask = ex.quote(f"{market_id}:{name}")
+                    sides.append(SideBook(f"{k}/{market_id}:{name}", name, ask, bid, None, False))
+                targets.extend(quoter.targets(
+                    MarketSnapshot(now, "bench", start_ts, start_ts + INTERVAL, tuple(sides))))
+            mm.reconcile()  # 对账不计入 requote 延迟（替身状态查询不加 RTT）
+            mm.sync(targets)
+        st = mm.stats()
+        tag = "batch" if batch else "single"
+        report[f"{tag}_requote_p50_ms"] = st["requote_p50_ms"]
+        report[f"{tag}_requote_p99_ms"] = st["requote_p99_ms"]
+        report[f"{tag}_cancels_per_sec"] = st["cancels_per_sec"]
+        report[f"{tag}_cancels_per_sync"] = st["avg_cancel_batch"]
+    return report
+
+
+class _DegradedClob(_StubClob):
+    """/price 在第 [down_from, down_to) 次报价之间全部失败（超时），/book 一直正常但更慢（整本盘口）"""
+    def __init__(self, clock: VirtualClock, exchange: SimExchange, rtt: float, book_rtt: float,
+                 timeout: float, down_from: int, down_to: int):
+        super().__init__(clock, exchange)
+        self._rtt = rtt
+        self._book_rtt = book_rtt
+        self._timeout = timeout
+        self._down = (down_from, down_to)
+        self.quotes = 0
+        self.calls = {"price": 0, "book": 0}
+        self.failed = 0
+
+    def get_price(self, token_id, side):
+        self.calls["price"] += 1
+        if self._down[0] <= self.quotes < self._down[1]:
+            self.failed += 1
+            time.sleep(self._timeout)
+            raise TimeoutError("price endpoint timeout")
+        time.sleep(self._rtt)
+        return super().get_price(token_id, side)
+
+    def get_order_book(self, token_id):
+        self.calls["book"] += 1
+        time.sleep(self._book_rtt)
+        q = self._exchange.quote(token_id)
+        if q is None:
+            return {"asks": [], "bids": []}
+        # 和真实 /book 一样：卖盘按价格从高到低，卖一在最后
+        return {"asks": [{"price": str(round(q[1] + 0.02, 2)), "size": "10"}, {"price": str(q[1]), "size": "10"}],
+                "bids": [{"price": str(round(q[0] - 0.02, 2)), "size": "10"}, {"price": str(q[0]), "size": "10"}]}
+
+
+def bench_quotes(n: int = 600, rtt: float = 0.001, book_rtt: float = 0.003, timeout: float = 0.01) -> Dict[str, Any]:
+    """
+    报价源选择：中间三分之一的 /price 调用全部超时。
+    对比固定顺序（先 price 两边、缺了再 book）和按健康度路由的每次报价请求数 / 延迟
+    """
+    from src.hedging import LatencyTracker
+    from src.rate_limit import RequestScheduler
+    from src.trading import TradingClient
+
+    start_ts = int(time.time()) // INTERVAL * INTERVAL
+    token = f"{start_ts // INTERVAL}:UP"
+    report: Dict[str, Any] = {"quotes": n, "rtt_ms": rtt * 1000, "book_rtt_ms": book_rtt * 1000,
+                              "timeout_ms": timeout * 1000}
+    for routed in (False, True):
+        clock = VirtualClock(start_ts)
+        exchange = SimExchange(clock)
+        config = SimConfig()
+        config.QUOTE_ROUTER = routed
+        config.QUOTE_PROBE_SECS = 0.05
+        config.QUOTE_PROBE_MAX_SECS = 0.2
+        client = TradingClient(config, scheduler=RequestScheduler("bench", 1e9, 1e9))
+        stub = client.client = _DegradedClob(clock, exchange, rtt, book_rtt, timeout, n // 3, 2 * n // 3)
+        lat = LatencyTracker(n)
+        missing = 0
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            for i in range(n):
+                clock.advance(1.0)
+                stub.quotes = i
+                t0 = time.perf_counter()
+                q = client.get_quote(token)
+                lat.add(time.perf_counter() - t0)
+                missing += q.ask is None or q.bid is None
+        tag = "router" if routed else "fixed"
+        report[f"{tag}_calls_per_quote"] = round(sum(stub.calls.values()) / n, 2)
+        report[f"{tag}_failed_calls"] = stub.failed
+        report[f"{tag}_missing_quotes"] = missing
+        report[f"{tag}_p50_ms"] = round(lat.percentile(0.5) * 1000, 2)
+        report[f"{tag}_p99_ms"] = round(lat.percentile(0.99) * 1000, 2)
+        if routed:
+            report["router_served"] = {k: v["served"] for k, v in client.quote_stats().items()}
+            report["router_trips"] = {k: v["trips"] for k, v in client.quote_stats().items()}
+    return report
+
+
+def bench_slicing(n: int = 100, size: float = 100.0, depth: float = 30.0, rtt: float = 0.002,
+                  pipeline: int = 3) -> Dict[str, Any]:
+    """
+    大单执行：每档只有 depth，父单 size 远大于卖一。每个父单前虚拟时间走 1 秒（盘口补满）；
+    对比 一张 FOK 挂意图限价 / 一张 FOK 扫到 0.99 / 切片（子单一张等一张）/ 切片（子单并发）的
+    成交率、相对到达价的滑点、每个父单的墙钟时间（每次下单固定 rtt 秒）
+    """
+    from src.sim import SimTradingClient
+    from src.slicer import SlicedExecutor, SliceResult
+    from src.strategy import OrderIntent
+
+    class _Serial(SlicedExecutor):
+        def _send_wave(self, intent, children, account):
+            out = []
+            for c in children:
+                r = self._send(intent, c, account)
+                account = account or r[1]
+                out.append(r)
+            return out
+
+    start_ts = int(time.time()) // INTERVAL * INTERVAL
+    token = f"{start_ts // INTERVAL}:UP"
+    report: Dict[str, Any] = {"parents": n, "size": size, "depth_per_level": depth, "rtt_ms": rtt * 1000}
+    for tag in ("single_limit", "single_sweep", "sliced_serial", "sliced_pipelined"):
+        clock = VirtualClock(start_ts + 60)
+        exchange = SimExchange(clock, seed=1, depth=depth)
+        client = SimTradingClient(exchange, balance=1e9)
+
+        def route(token_id, side, price, size, order_type="FOK", account=None):
+            time.sleep(rtt)
+            return client.place_order(token_id, side, price, size, order_type), account or "main"
+
+        cls = _Serial if tag == "sliced_serial" else SlicedExecutor
+        slicer = cls(route, client.get_top_levels, buy_price=0.0, sell_price=1.0, price_tol=0.0, max_secs=3.0,
+                     pipeline=pipeline, interval=0.2, min_size=5.0, clock=clock)
+        filled = slip_qty = wall = 0.0
+        children = 0
+        for _ in range(n):
+            clock.advance(1.0)
+            q = exchange.quote(token)
+            if q is None or q[1] > 0.9:
+                continue
+            ask = q[1]
+            # 意图限价 = 卖一 + 2 分（三档以内）
+            intent = OrderIntent(token, "UP", "BUY", round(ask + 0.02, 2), size, ask)
+            t0 = time.perf_counter()
+            if tag.startswith("single"):
+                px = 0.99 if tag == "single_sweep" else intent.price
+                oid, _ = route(token, "BUY", px, size)
+                res = SliceResult("BUY", size if oid else 0.0, exchange.fills[-1]["price"] if oid else None,
+                                  ask, 1, 0 if oid else 1, (oid,) if oid else (), "main", 0.0, "")
+            else:
+                res = slicer.execute(intent)
+            wall += time.perf_counter() - t0
+            children += res.slices
+            filled += res.filled
+            if res.slippage_bps is not None:
+                slip_qty += res.slippage_bps * res.filled
+            if tag.startswith("sliced"):
+                clock.advance(max(0.0, 3.0 - res.elapsed))     # 下一个父单前盘口补满
+        slicer.shutdown()
+        report[f"{tag}_fill_ratio"] = round(filled / (n * size), 3)
+        report[f"{tag}_slippage_bps"] = round(slip_qty / filled, 1) if filled else None
+        report[f"{tag}_children"] = round(children / n, 2)
+        report[f"{tag}_wall_ms"] = round(wall / n * 1000, 2)
+    return report
+
+
+def bench_signing(n: int = 400, workers: int = 0, tokens: int = 8, threads: int = 8) -> Dict[str, Any]:
+    """
+    下单签名吞吐：n 张单分布在 tokens 个 token 上（多市场一串触发）。对比
+    交易线程里逐张签 / 签名进程池（预热耗时、预热后单张延迟、整批 sign_many、threads 个线程各自 sign）
+    workers 默认 = CPU 核数（至少 2）；单核机器上进程池只省掉交易线程的占用，吞吐不会变高
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    from src.signing import OrderSpec, SigningService, Wallet, sign_spec
+
+    workers = workers or max(2, os.cpu_count() or 1)
+    wallet = Wallet("0x" + "11" * 32, 137)
+    specs = [OrderSpec(wallet, "market" if i % 2 else "limit", str((1 << 250) + i % tokens),
+                       "BUY" if i % 3 else "SELL", 0.5 + (i % 40) / 100, 5.0 + i % 7) for i in range(n)]
+    report: Dict[str, Any] = {"orders": n, "tokens": tokens, "workers": workers, "cpus": os.cpu_count()}
+
+    sign_spec(specs[0])     # 导入 / 第一次签名不算
+    t0 = time.perf_counter()
+    for spec in specs:
+        sign_spec(spec)
+    inline = time.perf_counter() - t0
+    report["inline_orders_per_sec"] = round(n / inline, 1)
+    report["inline_ms_per_order"] = round(inline / n * 1000, 2)
+
+    svc = SigningService(workers=workers, timeout=120.0)
+    try:
+        report["warm_workers"] = svc.warm(wallet)
+        report["warm_ms"] = round(svc.warm_secs * 1000, 1)
+        t0 = time.perf_counter()
+        for spec in specs[:20]:
+            svc.sign(spec)
+        report["warm_single_order_ms"] = round((time.perf_counter() - t0) / 20 * 1000, 2)
+
+        t0 = time.perf_counter()
+        svc.sign_many(specs)
+        batch = time.perf_counter() - t0
+        report["pool_batch_orders_per_sec"] = round(n / batch, 1)
+
+        with ThreadPoolExecutor(max_workers=threads) as ex:
+            t0 = time.perf_counter()
+            list(ex.map(svc.sign, specs))
+            conc = time.perf_counter() - t0
+        report["pool_threads_orders_per_sec"] = round(n / conc, 1)
+        report["speedup_vs_inline"] = round(inline / batch, 2)
+        report["pool"] = svc.stats()
+    finally:
+        svc.shutdown()
+    return report
+
+
+def _rss_bytes() -> int:
+    """当前 RSS（Linux 读 /proc；其他平台退回历史峰值）"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def bench_soak(n: int = 60, warmup_days: int = 3, max_growth_mb: float = 2.0) -> Dict[str, Any]:
+    """
+    长跑内存：虚拟时钟下按 1 秒一 tick 跑 n 天（每天 96 场，带自动赎回），每天末尾记 RSS 和每场状态的容器大小。
+    预热后 RSS 增长超过 max_growth_mb，或任何容器随天数增长，记为 ok=False
+    """
+    from src.arbitrage_bot import ArbitrageBot
+    from src.sim import SimRedeemer, SimTradingClient
+
+    start_ts = int(time.time()) // INTERVAL * INTERVAL
+    clock = VirtualClock(start_ts)
+    exchange = SimExchange(clock)
+    client = SimTradingClient(exchange)
+    config = SimConfig()
+    days: List[Dict[str, Any]] = []
+    t0 = time.perf_counter()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        bot = ArbitrageBot(config=config, clock=clock, trading_client=client, market_source=exchange,
+                           redeemer=SimRedeemer(exchange, client))
+        bot.find_market()
+        for day in range(1, n + 1):
+            until = start_ts + day * 86400
+            # 同 run() 的主循环（不含启动 / 打印）
+            while clock.time() < until:
+                bot.sync_clock()
+                if bot._roll_market_if_needed():
+                    bot.scan_and_trade()
+                bot.redemption.pump()
+                clock.advance(1.0)
+            gc.collect()
+            days.append({
+                "rss": _rss_bytes(),
+                "guards": len(bot._buy_once_guard),
+                "order_accounts": len(bot.execution_pool._order_account),
+                "positions": len(bot.positions) + len(bot.pair_positions),
+                "resting": len(exchange.resting),
+                "redeem_pending": bot.redemption.stats().get("pending", 0),
+            })
+    wall = time.perf_counter() - t0
+
+    warm = days[min(warmup_days, n) - 1]
+    last = days[-1]
+    growth_mb = (last["rss"] - warm["rss"]) / 2 ** 20
+    # 容器大小：后一半的天数里还创新高的就是在随场次增长
+    ref = days[:max(warmup_days, n // 2)]
+    grown = sorted(k for k in warm if k != "rss" and last[k] > max(d[k] for d in ref))
+    return {
+        "days": n,
+        "markets": bot.stats["market_rolls"],
+        "buys": bot.stats["total_buys"],
+        "fills": exchange.fill_count,
+        "wall_seconds": round(wall, 1),
+        "rss_mb_after_warmup": round(warm["rss"] / 2 ** 20, 1),
+        "rss_mb_end": round(last["rss"] / 2 ** 20, 1),
+        "rss_growth_mb": round(growth_mb, 2),
+        "sizes_end": {k: v for k, v in last.items() if k != "rss"},
+        "grown": grown,
+        "ok": growth_mb <= max_growth_mb and not grown,
+    }
+
+
+BENCHES: Dict[str, Callable[..., Dict[str, Any]]] = {
+    "ticks": bench_ticks,
+    "gamma": bench_gamma,
+    "fair": bench_fair,
+    "maker": bench_maker,
+    "quotes": bench_quotes,
+    "soak": bench_soak,
+    "slicing": bench_slicing,
+    "signing": bench_signing,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="离线微基准")
+    parser.add_argument("name", choices=sorted(BENCHES))
+    parser.add_argument("--n", type=int, default=None, help="迭代次数")
+    args = parser.parse_args()
+
+    kwargs = {} if args.n is None else {"n": args.n}
+    report = BENCHES[args.name](**kwargs)
+    print(f"📏 bench[{args.name}]")
+    for k, v in report.items():
+        print(f"   {k}: {v}")
+    if report.get("ok") is False:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
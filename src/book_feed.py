@@ -0,0 +1,251 @@
+"""
+CLOB 盘口推送（Polymarket market 频道）
+- BookFeed：后台线程订阅 {POLYMARKET_WS_URL}/ws/market，按 book（全量）/ price_change（增量）
+  维护每个 token 的价位表，收到就更新买一卖一；断线指数退避重连，切场换订阅时重连
+- fetch(token_id)：给 QuoteRouter 当 ws 报价源；断线或还没收到该 token 的盘口时抛 QuoteSourceError
+  （报价的本地时间戳是该 token 盘口最后一次被推送消息更新时收到消息的时刻，不是读取时刻，
+   年龄如实反映盘口多久没动；超过 max_age 也抛 QuoteSourceError，路由改走 REST 源拿新报价；
+   连接上超过 SILENT_AFTER 秒什么都没收到（连 PONG 都没有）就当连接已经僵死）
+  依赖 websockets（同 SpotFeed）
+"""
+from __future__ import annotations
+
+import json
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from src.models import Quote
+from src.quote_router import QuoteSourceError
+
+try:
+    from websockets.sync.client import connect as _ws_connect  # 可选依赖
+except Exception:
+    _ws_connect = None  # type: ignore
+
+PING_INTERVAL = 10.0
+SILENT_AFTER = 2.5 * PING_INTERVAL
+
+
+class _Book:
+    __slots__ = ("bids", "asks", "bid", "ask", "exchange_ts", "recv_ts")
+
+    def __init__(self):
+        self.bids: Dict[float, float] = {}
+        self.asks: Dict[float, float] = {}
+        self.bid: Optional[float] = None
+        self.ask: Optional[float] = None
+        self.exchange_ts: Optional[float] = None
+        self.recv_ts = 0.0          # 本地单调时钟，最后一次更新这本盘口的消息收到的时刻
+
+    def reset(self, bids: Iterable[Any], asks: Iterable[Any]):
+        self.bids = dict(_levels(bids))
+        self.asks = dict(_levels(asks))
+        self.refresh()
+
+    def set_level(self, side: str, price: float, size: float):
+        levels = self.bids if side == "BUY" else self.asks
+        if size > 0:
+            levels[price] = size
+        else:
+            levels.pop(price, None)
+
+    def refresh(self):
+        self.bid = max(self.bids) if self.bids else None
+        self.ask = min(self.asks) if self.asks else None
+
+
+def _levels(raw: Iterable[Any]) -> List[Tuple[float, float]]:
+    out: List[Tuple[float, float]] = []
+    for lvl in raw or ():
+        try:
+            p, s = float(lvl["price"]), float(lvl["size"])
+        except (KeyError, TypeError, ValueError):
+            continue
+        if s > 0:
+            out.append((p, s))
+    return out
+
+
+def _event_ts(ev: Dict[str, Any]) -> Optional[float]:
+    """推送消息的 timestamp（毫秒字符串）-> unix 秒"""
+    try:
+        raw = ev.get("timestamp")
+        return float(raw) / 1000.0 if raw else None
+    except (TypeError, ValueError):
+        return None
+
+
+class BookFeed:
+    def __init__(self, url: str = "wss://ws-subscriptions-clob.polymarket.com", max_age: Optional[float] = None):
+        """max_age：盘口多少秒没被更新就不再当报价（None / 0 = 不限）"""
+        self.url = url.rstrip("/") + "/ws/market"
+        self.max_age = max_age or None
+        self._books: Dict[str, _Book] = {}
+        self._assets: Tuple[str, ...] = ()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._resubscribe = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.connected = False
+        self.reconnects = 0
+        self.bad_messages = 0
+        self.updates = 0
+        self.last_message = 0.0      # 本地单调时钟，最近一条消息（含 PONG）
+
+    def start(self) -> "BookFeed":
+        if _ws_connect is None:
+            raise RuntimeError("BookFeed 需要 websockets：pip install websockets")
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="book-feed", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def track(self, token_ids: Iterable[str]):
+        """换订阅（切场时调用）；旧 token 的盘口丢掉"""
+        assets = tuple(t for t in token_ids if t)
+        with self._lock:
+            if assets == self._assets:
+                return
+            self._assets = assets
+            self._books = {}
+        self._resubscribe.set()
+
+    # -----------------------------
+    # 读
+    # -----------------------------
+    def fetch(self, token_id: str) -> Quote:
+        now = time.monotonic()
+        if not self.connected:
+            raise QuoteSourceError("盘口推送未连接")
+        if now - self.last_message > SILENT_AFTER:
+            raise QuoteSourceError(f"盘口推送 {now - self.last_message:.0f}s 没有消息")
+        book = self._books.get(token_id)
+        if book is None:
+            raise QuoteSourceError(f"还没收到 {token_id[:10]}… 的盘口")
+        if self.max_age is not None and now - book.recv_ts > self.max_age:
+            raise QuoteSourceError(f"{token_id[:10]}… 的盘口 {now - book.recv_ts:.1f}s 没有更新")
+        return Quote(book.ask, book.bid, book.recv_ts, book.recv_ts, book.exchange_ts)
+
+    def levels(self, token_id: str, depth: int = 5) -> Dict[str, Any]:
+        """本地盘口前 depth 档（同 TradingClient.get_top_levels 的格式，不发请求）；不可用时同 fetch 抛 QuoteSourceError"""
+        self.fetch(token_id)
+        with self._lock:
+            book = self._books.get(token_id)
+            if book is None:
+                raise QuoteSourceError(f"还没收到 {token_id[:10]}… 的盘口")
+            asks = sorted(book.asks.items())[:depth]
+            bids = sorted(book.bids.items(), reverse=True)[:depth]
+        return {"asks": asks, "bids": bids, "recv_ts": book.recv_ts, "exchange_ts": book.exchange_ts}
+
+    # -----------------------------
+    # 消息
+    # -----------------------------
+    def handle(self, raw: Any):
+        now = self.last_message = time.monotonic()
+        if raw in ("PONG", b"PONG"):
+            return
+        try:
+            msg = json.loads(raw)
+        except (TypeError, ValueError):
+            self.bad_messages += 1
+            return
+        for ev in msg if isinstance(msg, list) else (msg,):
+            if isinstance(ev, dict):
+                self._apply(ev, now)
+
+    def _apply(self, ev: Dict[str, Any], recv_ts: Optional[float] = None):
+        """recv_ts：收到这条消息的本地单调时刻（解析 JSON 的耗时不算进盘口的新鲜度）"""
+        kind = ev.get("event_type")
+        if recv_ts is None:
+            recv_ts = time.monotonic()
+        exchange_ts = _event_ts(ev)
+        with self._lock:
+            if kind == "book":
+                book = self._book(ev.get("asset_id"), create=True)
+                if book is not None:
+                    book.reset(ev.get("bids") or ev.get("buys"), ev.get("asks") or ev.get("sells"))
+                    book.exchange_ts = exchange_ts
+                    book.recv_ts = recv_ts
+                    self.updates += 1
+            elif kind == "price_change":
+                # 新格式：price_changes 每条自带 asset_id；旧格式：顶层 asset_id + changes
+                changes = ev.get("price_changes")
+                if changes is None:
+                    changes = [dict(c, asset_id=ev.get("asset_id")) for c in ev.get("changes") or ()]
+                touched: Dict[int, _Book] = {}
+                for c in changes:
+                    book = self._book(c.get("asset_id"))
+                    if book is None:
+                        continue
+                    try:
+                        book.set_level(str(c.get("side", "")).upper(), float(c["price"]), float(c["size"]))
+                    except (KeyError, TypeError, ValueError):
+                        self.bad_messages += 1
+                        continue
+                    touched[id(book)] = book
+                    self.updates += 1
+                # 一条消息里同一 token 的多档变动只重算一次买一卖一
+                for book in touched.values():
+                    book.refresh()
+                    book.exchange_ts = exchange_ts
+                    book.recv_ts = recv_ts
+
+    def _book(self, asset_id: Any, create: bool = False) -> Optional[_Book]:
+        """增量只改已有全量快照的盘口：没收到 book 之前的 price_change 丢掉"""
+        if asset_id not in self._assets:
+            return None
+        book = self._books.get(asset_id)
+        if book is None and create:
+            book = self._books[asset_id] = _Book()
+        return book
+
+    # -----------------------------
+    # 连接
+    # -----------------------------
+    def _run(self):
+        backoff = 0.5
+        while not self._stop.is_set():
+            self._resubscribe.clear()
+            with self._lock:
+                assets = list(self._assets)
+                # 断线期间的变动收不到：重连后等新的全量快照
+                self._books = {}
+            if not assets:
+                # 还没有市场：等 track()
+                if self._stop.wait(0.5):
+                    break
+                continue
+            try:
+                with _ws_connect(self.url, open_timeout=10, compression=None) as ws:
+                    ws.send(json.dumps({"assets_ids": assets, "type": "market"}))
+                    self.connected = True
+                    self.last_message = time.monotonic()
+                    backoff = 0.5
+                    print(f"📡 盘口推送已连接: {len(assets)} 个 token")
+                    next_ping = time.monotonic() + PING_INTERVAL
+                    while not self._stop.is_set() and not self._resubscribe.is_set():
+                        if time.monotonic() >= next_ping:
+                            ws.send("PING")
+                            next_ping = time.monotonic() + PING_INTERVAL
+                        try:
+                            msg = ws.recv(timeout=1.0)
+                        except TimeoutError:
+                            continue
+                        self.handle(msg)
+                if self._resubscribe.is_set():
+                    self.connected = False
+                    continue
+            except Exception as e:
+                if self._stop.is_set():
+                    break
+                print(f"⚠️ 盘口推送断开: {e}（{backoff:.1f}s 后重连）")
+            self.connected = False
+            if self._stop.wait(backoff):
+                break
+            self.reconnects += 1
+            backoff = min(30.0, backoff * 2)
+        self.connected = False
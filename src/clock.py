@@ -0,0 +1,73 @@
+"""
+时钟抽象
+- SystemClock：真实时间（默认）
+- VirtualClock：虚拟时间，sleep 直接把时间往前拨，不真的等待
+  用于模拟/回放：一整天 96 场 15m 市场几秒钟跑完
+"""
+from __future__ import annotations
+
+import threading
+import time
+
+
+class Clock:
+    def time(self) -> float:
+        """墙钟时间（unix 秒），用于市场边界 / slug 计算"""
+        raise NotImplementedError
+
+    def monotonic(self) -> float:
+        """单调时钟，用于节奏控制 / 间隔计算"""
+        raise NotImplementedError
+
+    def sleep(self, seconds: float) -> None:
+        raise NotImplementedError
+
+    def wait(self, event: threading.Event, seconds: float) -> bool:
+        """睡 seconds 秒，event 被 set 时提前醒；返回是否被提前唤醒"""
+        self.sleep(seconds)
+        return False
+
+
+class SystemClock(Clock):
+    def time(self) -> float:
+        return time.time()
+
+    def monotonic(self) -> float:
+        return time.monotonic()
+
+    def sleep(self, seconds: float) -> None:
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def wait(self, event: threading.Event, seconds: float) -> bool:
+        woke = event.wait(max(0.0, seconds))
+        event.clear()
+        return woke
+
+
+class VirtualClock(Clock):
+    def __init__(self, start: float):
+        self._start = float(start)
+        self._now = float(start)
+        self._lock = threading.Lock()
+
+    def time(self) -> float:
+        return self._now
+
+    def monotonic(self) -> float:
+        return self._now - self._start
+
+    def sleep(self, seconds: float) -> None:
+        self.advance(seconds)
+
+    def advance(self, seconds: float) -> None:
+        if seconds > 0:
+            with self._lock:
+                self._now += float(seconds)
+
+    def set(self, ts: float) -> None:
+        with self._lock:
+            self._now = max(self._now, float(ts))
+
+
+SYSTEM_CLOCK = SystemClock()
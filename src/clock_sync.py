@@ -0,0 +1,182 @@
+"""
+交易所时钟同步（NTP 风格，连续过滤）
+- 每个样本：本地发请求前 t0、收到响应后 t1（本地墙钟）、服务端时间戳 server（分辨率 res，CLOB /time 是整秒）
+  服务端时间 - 本地时间 的真实偏移一定落在 [server - t1, server + res - t0] 这个区间里
+- 过滤：最近窗口内样本的区间求交集，多个整秒样本交出来能到亚秒精度；
+  交集为空（本机时钟在漂 / 有异常样本）时退回 RTT 最小那一半样本的中点中位数，并丢掉最老的样本
+- 取值：交集中点。服务端时间戳是截断的整秒，真实时间在 [stamp, stamp + res) 里，
+  不能当成请求中点的时间（那样平均慢半秒、最多慢 1 秒，正好是"收盘后才下单"的方向）
+- ExchangeClock：time() = 本地时间 + 偏移（单调不回退），市场边界 / is_live / 到期都用它；
+  偏移往回修正时按 max_slew 的速率慢慢拨（时间照走、只是走慢），不冻住；往前修正直接跳
+  monotonic() / sleep() 直接用本地时钟，调度节奏不受校时影响
+"""
+from __future__ import annotations
+
+import threading
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Deque, Dict, NamedTuple, Optional
+
+from src.clock import Clock
+
+
+class _Sample(NamedTuple):
+    t1: float
+    lo: float
+    hi: float
+    rtt: float
+
+
+def parse_server_time(raw: Any) -> Optional[float]:
+    """CLOB /time 返回整数秒（也兼容字符串 / {"time": ...} / 毫秒）"""
+    if isinstance(raw, dict):
+        raw = raw.get("time") or raw.get("timestamp") or raw.get("serverTime")
+    if raw is None or isinstance(raw, bool):
+        return None
+    try:
+        ts = float(raw)
+    except (TypeError, ValueError):
+        return None
+    if ts > 1e11:  # 毫秒
+        ts /= 1000.0
+    return ts if ts > 0 else None
+
+
+def http_date_ts(headers: Any) -> Optional[float]:
+    """HTTP Date 响应头 -> unix 秒（整秒分辨率）；没有或解析不了返回 None"""
+    if headers is None:
+        return None
+    try:
+        raw = headers.get("Date")
+    except Exception:
+        return None
+    if not raw:
+        return None
+    try:
+        return parsedate_to_datetime(raw).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+class ClockSync:
+    def __init__(self, window: int = 16, max_age: float = 900.0, max_rtt: float = 3.0):
+        self.window = int(window)
+        self.max_age = float(max_age)
+        self.max_rtt = float(max_rtt)
+        self._samples: Deque[_Sample] = deque(maxlen=self.window)
+        self._lock = threading.Lock()
+        self._offset = 0.0
+        self._error: Optional[float] = None
+        self._accepted = 0
+        self._rejected = 0
+        self._conflicts = 0
+
+    @property
+    def offset(self) -> float:
+        """服务端时间 - 本地时间（秒）；还没样本时为 0"""
+        return self._offset
+
+    @property
+    def synced(self) -> bool:
+        return self._error is not None
+
+    def add_sample(self, t0: float, server_ts: float, t1: float, resolution: float = 1.0) -> bool:
+        rtt = t1 - t0
+        if rtt < 0 or rtt > self.max_rtt:
+            with self._lock:
+                self._rejected += 1
+            return False
+        s = _Sample(t1=t1, lo=server_ts - t1, hi=server_ts + resolution - t0, rtt=rtt)
+        with self._lock:
+            self._samples.append(s)
+            self._accepted += 1
+            self._estimate(t1)
+        return True
+
+    def _estimate(self, now: float):
+        while self._samples and now - self._samples[0].t1 > self.max_age:
+            self._samples.popleft()
+        samples = list(self._samples)
+        if not samples:
+            return
+
+        lo = max(s.lo for s in samples)
+        hi = min(s.hi for s in samples)
+        if lo <= hi:
+            self._offset = (lo + hi) / 2.0
+            self._error = (hi - lo) / 2.0
+            return
+
+        # 区间互相矛盾：本机时钟在漂或有坏样本；用 RTT 最小那一半的中点，丢掉最老的样本让窗口尽快跟上
+        self._conflicts += 1
+        best = sorted(samples, key=lambda s: s.rtt)[: max(1, len(samples) // 2)]
+        mids = sorted((s.lo + s.hi) / 2.0 for s in best)
+        self._offset = mids[len(mids) // 2]
+        self._error = max((s.hi - s.lo) / 2.0 for s in best)
+        if len(self._samples) > 1:
+            self._samples.popleft()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            rtts = [s.rtt for s in self._samples]
+            return {
+                "offset_ms": round(self._offset * 1000, 1),
+                "error_ms": round(self._error * 1000, 1) if self._error is not None else None,
+                "min_rtt_ms": round(min(rtts) * 1000, 1) if rtts else None,
+                "samples": len(rtts),
+                "accepted": self._accepted,
+                "rejected": self._rejected,
+                "conflicts": self._conflicts,
+            }
+
+
+class ExchangeClock(Clock):
+    """本地时钟 + 交易所偏移"""
+
+    def __init__(self, base: Clock, sync: Optional[ClockSync] = None, max_slew: float = 0.5):
+        """max_slew：偏移往回修正时每过 1 秒本地时间最多拨回多少秒（< 1，对外时间仍然前进）"""
+        self.base = base
+        self.sync = sync or ClockSync()
+        self.max_slew = min(max(float(max_slew), 0.0), 0.99)
+        self._lock = threading.Lock()     # 交易线程 / 行情线程 / 控制面都会读
+        self._applied: Optional[float] = None
+        self._last_base = 0.0
+        self._last = 0.0
+
+    def time(self) -> float:
+        with self._lock:
+            base = self.base.time()
+            target = self.sync.offset
+            if self._applied is None or target >= self._applied:
+                self._applied = target
+            else:
+                # 往回拨：按速率收敛，避免同一个边界被判断两次，也不会把时间冻住几秒
+                step = max(0.0, base - self._last_base) * self.max_slew
+                self._applied = max(target, self._applied - step)
+            self._last_base = base
+            # 本地墙钟自己往回跳时仍然保证不回退
+            t = max(base + self._applied, self._last)
+            self._last = t
+            return t
+
+    def monotonic(self) -> float:
+        return self.base.monotonic()
+
+    def sleep(self, seconds: float) -> None:
+        self.base.sleep(seconds)
+
+    def wait(self, event: threading.Event, seconds: float) -> bool:
+        return self.base.wait(event, seconds)
+
+    def observe(self, t0: float, server_ts: Optional[float], t1: float, resolution: float = 1.0) -> bool:
+        """被动样本（例如 Gamma 响应的 Date 头）；t0/t1 必须是 base 时钟的时间"""
+        if server_ts is None:
+            return False
+        return self.sync.add_sample(t0, server_ts, t1, resolution)
+
+    def sample(self, fetch: Callable[[], Any], resolution: float = 1.0) -> bool:
+        """主动对时：fetch() 返回服务端时间戳（如 TradingClient.get_server_time）"""
+        t0 = self.base.time()
+        raw = fetch()
+        t1 = self.base.time()
+        return self.observe(t0, parse_server_time(raw), t1, resolution)
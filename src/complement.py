@@ -0,0 +1,156 @@
+"""
+UP + DOWN 互补套利
+- 同一场 UP 和 DOWN 到期必有一个值 1：
+  ask(UP) + ask(DOWN) < 1 - fee  -> 两边同时买入，持有到期稳拿 1（或价差回来时成对卖出）
+  bid(UP) + bid(DOWN) > 1 + fee  -> 手里有成对持仓时两边同时卖出
+  （没有库存时要先 split 铸造 UP+DOWN 才能卖，这里不做）
+- 两条腿并发提交（各自 FOK），单腿失败的处理（leg risk）：
+  1. 失败腿重新取价，在不吃掉全部利润的价格内再补一次 FOK
+  2. 还不成交就把已成交的那条腿按当前 bid 平掉
+  3. 平仓也失败的腿转成普通单腿持仓，交给阈值策略按 SELL_PRICE 退出
+"""
+from __future__ import annotations
+
+from concurrent.futures import Executor
+from typing import Callable, List, NamedTuple, Optional, Sequence, Tuple
+
+from src.models import Quote
+from src.strategy import MarketSnapshot, OrderIntent, Strategy
+
+# route(token_id, side, price, size, order_type, account) -> (order_id, account)
+RouteFn = Callable[..., Tuple[Optional[str], Optional[str]]]
+
+
+class ComplementArbStrategy(Strategy):
+    def __init__(self, fee: float = 0.01, size: float = 5.0, max_size: Optional[float] = None,
+                 buffer: float = 0.005, name: str = "complement"):
+        self.fee = float(fee)
+        self.size = float(size)
+        self.max_size = float(max_size if max_size is not None else size)
+        self.buffer = float(buffer)
+        self.name = name
+
+    @classmethod
+    def from_config(cls, config) -> "ComplementArbStrategy":
+        size = float(config.COMPLEMENT_SIZE or config.ORDER_SIZE)
+        return cls(fee=config.COMPLEMENT_FEE, size=size)
+
+    def evaluate(self, snap: MarketSnapshot) -> List[OrderIntent]:
+        up, down = snap.side("UP"), snap.side("DOWN")
+        if up is None or down is None:
+            return []
+        if None in (up.ask, up.bid, down.ask, down.bid):
+            return []
+        group = f"{self.name}:{snap.slug}"
+
+        # 成对卖出：两边都有成对库存、bid 之和 > 1 + fee
+        held = min(up.pair_size, down.pair_size)
+        bid_sum = up.bid + down.bid
+        if held > 0 and bid_sum > 1.0 + self.fee:
+            slack = self._slack(bid_sum - 1.0 - self.fee)
+            reason = f"Bid(UP)+Bid(DOWN)=${bid_sum:.4f} > {1.0 + self.fee:.4f}"
+            return [
+                OrderIntent(s.token_id, s.side_name, "SELL", round(max(0.01, s.bid - slack), 4),
+                            round(held, 2), s.bid, reason=reason, strategies=(self.name,), group=group)
+                for s in (up, down)
+            ]
+
+        # 成对买入：ask 之和 < 1 - fee，成对库存还没到上限
+        ask_sum = up.ask + down.ask
+        room = self.max_size - held
+        if room > 0 and ask_sum < 1.0 - self.fee:
+            size = round(min(self.size, room), 2)
+            slack = self._slack(1.0 - self.fee - ask_sum)
+            reason = f"Ask(UP)+Ask(DOWN)=${ask_sum:.4f} < {1.0 - self.fee:.4f}"
+            return [
+                OrderIntent(s.token_id, s.side_name, "BUY", round(min(0.99, s.ask + slack), 4),
+                            size, s.ask, reason=reason, strategies=(self.name,), group=group)
+                for s in (up, down)
+            ]
+        return []
+
+    def _slack(self, edge: float) -> float:
+        """每条腿的限价让步：最多 buffer，且两条腿加起来不超过一半的利润空间"""
+        return max(0.0, min(self.buffer, edge / 4.0))
+
+
+class LegFill(NamedTuple):
+    intent: OrderIntent
+    order_id: str
+    account: Optional[str]
+    price: float            # 记账价（盘口价）
+
+
+class PairResult(NamedTuple):
+    complete: bool                  # 两条腿都按计划成交
+    filled: Tuple[LegFill, ...]     # 按计划成交的腿（含补单成交）
+    naked: Tuple[LegFill, ...]      # 落单的腿：转为普通单腿持仓
+    unwind_pnl: float               # 平掉单腿的盈亏
+    retried: int
+    unwound: int
+
+
+def _submit(route: RouteFn, it: OrderIntent, price: float, account: Optional[str] = None):
+    return route(token_id=it.token_id, side=it.side, price=price, size=it.size,
+                 order_type="FOK", account=account or it.account)
+
+
+def execute_pair(
+    legs: Sequence[OrderIntent],
+    route: RouteFn,
+    requote: Callable[[str], Quote],
+    pool: Executor,
+    fee: float = 0.01,
+    buffer: float = 0.005,
+) -> PairResult:
+    """两条腿并发 FOK；单腿失败按 补单 -> 平仓 -> 转单腿持仓 处理"""
+    futs = [pool.submit(_submit, route, it, it.price) for it in legs]
+    results = [f.result() for f in futs]
+
+    done = [LegFill(it, oid, acct, it.ref_price) for it, (oid, acct) in zip(legs, results) if oid]
+    failed = [it for it, (oid, _) in zip(legs, results) if not oid]
+    if not done or not failed:
+        # 都成交 / 都没成交（FOK 没成交就什么都没发生）
+        return PairResult(not failed, tuple(done), (), 0.0, 0, 0)
+
+    retried = unwound = 0
+    pnl = 0.0
+    # 1. 补单：失败腿重新取价，在成对仍不亏（扣掉 fee）的范围内再来一次
+    leg = failed[0]
+    other = done[0]
+    q = requote(leg.token_id)
+    if leg.side == "BUY":
+        fresh = q.ask
+        limit = (1.0 - fee) - other.price
+        ok_price = fresh is not None and fresh <= limit
+        price = round(min(limit, 0.99, (fresh or 0.0) + buffer), 4)
+    else:
+        fresh = q.bid
+        limit = (1.0 + fee) - other.price
+        ok_price = fresh is not None and fresh >= limit
+        price = round(max(limit, 0.01, (fresh or 0.0) - buffer), 4)
+    if ok_price:
+        retried = 1
+        oid, acct = _submit(route, leg, price)
+        if oid:
+            return PairResult(True, (other, LegFill(leg, oid, acct, fresh)), (), 0.0, retried, 0)
+
+    if other.intent.side == "SELL":
+        # 卖出时单腿失败：没卖掉的那条腿转成普通持仓，交给阈值策略退出
+        print(f"⚠️ 互补套利：{leg.side_name} 卖出腿未成交，转为单腿持仓")
+        return PairResult(False, (other,), (LegFill(leg, "", leg.account, leg.ref_price),), 0.0, retried, 0)
+
+    # 2. 平仓：把已买到的那条腿按当前 bid 卖掉
+    bid = requote(other.intent.token_id).bid
+    if bid is not None:
+        unwound = 1
+        unwind = other.intent._replace(side="SELL")
+        oid, _ = _submit(route, unwind, round(max(0.01, bid - buffer), 4), account=other.account)
+        if oid:
+            pnl = (bid - other.price) * other.intent.size
+            print(f"🩹 互补套利：{leg.side_name} 腿未成交，已平掉 {other.intent.side_name} 腿（盈亏 ${pnl:.4f}）")
+            return PairResult(False, (), (), pnl, retried, unwound)
+
+    # 3. 平不掉：转成普通单腿持仓
+    print(f"⚠️ 互补套利：{other.intent.side_name} 腿平仓失败，转为单腿持仓")
+    return PairResult(False, (), (other,), 0.0, retried, unwound)
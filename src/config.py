@@ -17,13 +17,139 @@ class Config:
     POLYMARKET_SIGNATURE_TYPE = int(os.getenv("POLYMARKET_SIGNATURE_TYPE", "1"))
     POLYMARKET_FUNDER = os.getenv("POLYMARKET_FUNDER", "")
     
+    # 多账户执行池（JSON 账户文件，主账户之外的额外账户；留空=单账户）
+    POLYMARKET_ACCOUNTS_FILE = os.getenv("POLYMARKET_ACCOUNTS_FILE", "")
+    ACCOUNT_MAX_ORDERS_PER_MIN = int(os.getenv("ACCOUNT_MAX_ORDERS_PER_MIN", "0"))  # 0=不限
+    
+    # 客户端限频（令牌桶：每秒速率 / 桶容量），下单 > 撤单 > 报价 > 市场发现
+    CLOB_RATE_PER_SEC = float(os.getenv("CLOB_RATE_PER_SEC", "20"))
+    CLOB_BURST = float(os.getenv("CLOB_BURST", "40"))
+    GAMMA_RATE_PER_SEC = float(os.getenv("GAMMA_RATE_PER_SEC", "5"))
+    GAMMA_BURST = float(os.getenv("GAMMA_BURST", "10"))
+    
     # 交易配置
     BUY_PRICE = float(os.getenv("BUY_PRICE", "0.80"))
     SELL_PRICE = float(os.getenv("SELL_PRICE", "0.90"))
     ORDER_SIZE = int(os.getenv("ORDER_SIZE", "5"))
     DRY_RUN = os.getenv("DRY_RUN", "true").lower() == "true"
+    # 额外的阈值参数组（buy:sell[:size]，逗号分隔），和主参数共用同一次行情
+    STRATEGY_VARIANTS = os.getenv("STRATEGY_VARIANTS", "")
+    
+    # UP+DOWN 互补套利：ask 之和 < 1-fee 时两边同时买（成对持有），bid 之和 > 1+fee 时成对卖出
+    COMPLEMENT_ARB = os.getenv("COMPLEMENT_ARB", "false").lower() == "true"
+    COMPLEMENT_FEE = float(os.getenv("COMPLEMENT_FEE", "0.01"))
+    COMPLEMENT_SIZE = float(os.getenv("COMPLEMENT_SIZE", "0"))  # 0 = 用 ORDER_SIZE
+    
+    # BTC 现货参考价（交易所 WebSocket）：买入信号门控 / 现货异动时提前加速轮询
+    SPOT_FEED = os.getenv("SPOT_FEED", "false").lower() == "true"
+    SPOT_WS_URL = os.getenv("SPOT_WS_URL", "wss://stream.binance.com:9443/ws/btcusdt@trade")
+    SPOT_MOMENTUM_SECS = float(os.getenv("SPOT_MOMENTUM_SECS", "5"))
+    SPOT_MAX_AGE = float(os.getenv("SPOT_MAX_AGE", "2"))
+    SPOT_GATE = os.getenv("SPOT_GATE", "false").lower() == "true"
+    SPOT_GATE_BPS = float(os.getenv("SPOT_GATE_BPS", "5"))
+    SPOT_ARM_BPS = float(os.getenv("SPOT_ARM_BPS", "0"))  # 0 = 不提前唤醒
+
+    # 公允价模型（需要 SPOT_FEED）：P(UP) 闭式解，快照里每边带 fair / edge
+    FAIR_VALUE = os.getenv("FAIR_VALUE", "false").lower() == "true"
+    FAIR_TRADE = os.getenv("FAIR_TRADE", "false").lower() == "true"  # 额外跑 edge 策略
+    FAIR_MIN_EDGE = float(os.getenv("FAIR_MIN_EDGE", "0.05"))
+    FAIR_EXIT_EDGE = float(os.getenv("FAIR_EXIT_EDGE", "0.02"))
+    FAIR_DEFAULT_VOL = float(os.getenv("FAIR_DEFAULT_VOL", "0.5"))  # 年化；样本不够时用
+    FAIR_VOL_ESTIMATOR = os.getenv("FAIR_VOL_ESTIMATOR", "ewma").lower()  # ewma / window
+
+    # 做市模式：挂 post-only 限价单代替 FOK 吃单（开了之后阈值/互补策略不再下单）
+    MAKER_MODE = os.getenv("MAKER_MODE", "false").lower() == "true"
+    MAKER_HALF_SPREAD = float(os.getenv("MAKER_HALF_SPREAD", "0.02"))
+    MAKER_SIZE = float(os.getenv("MAKER_SIZE", "0"))  # 0 = 用 ORDER_SIZE
+    MAKER_MAX_INVENTORY = float(os.getenv("MAKER_MAX_INVENTORY", "0"))  # 每边最多持有；0 = 2 倍挂单量
+    MAKER_TICK = float(os.getenv("MAKER_TICK", "0.01"))
+    MAKER_REQUOTE_TICKS = int(os.getenv("MAKER_REQUOTE_TICKS", "1"))
+    MAKER_MIN_REST = float(os.getenv("MAKER_MIN_REST", "0.5"))
+    MAKER_MAX_ACTIONS = float(os.getenv("MAKER_MAX_ACTIONS", "10"))  # 每秒撤/挂次数上限
+    MAKER_STOP_SECS = float(os.getenv("MAKER_STOP_SECS", "30"))  # 离到期不到这么多秒全撤
+    MAKER_RECONCILE_SECS = float(os.getenv("MAKER_RECONCILE_SECS", "2"))
+
+    # 到期自动赎回（切场后后台把上一场赢家份额换回 USDC）
+    REDEEM_ENABLED = os.getenv("REDEEM_ENABLED", "false").lower() == "true"
+    POLYGON_RPC_URL = os.getenv("POLYGON_RPC_URL", "https://polygon-rpc.com")
+    REDEEM_POLL_SECS = float(os.getenv("REDEEM_POLL_SECS", "5"))
+    REDEEM_MAX_BATCH = int(os.getenv("REDEEM_MAX_BATCH", "10"))
+    REDEEM_MIN_TIP_GWEI = float(os.getenv("REDEEM_MIN_TIP_GWEI", "30"))
+    CTF_ADDRESS = os.getenv("CTF_ADDRESS", "0x4D97DCd97eC945f40cF65F87097ACe5EA0476045")
+    COLLATERAL_ADDRESS = os.getenv("COLLATERAL_ADDRESS", "0x2791Bca1f2de4661ED88A84C5894B8a01C45a8b2")
+    PROXY_FACTORY_ADDRESS = os.getenv("PROXY_FACTORY_ADDRESS", "0xaB45c5A4B0c941a2F231C04C3f49182e1A254052")
+    
+    # 自适应轮询（REST 模式）：离阈值/收盘越近轮询越快，离得远或未开盘时放慢
+    ADAPTIVE_POLL = os.getenv("ADAPTIVE_POLL", "false").lower() == "true"
+    POLL_MIN_INTERVAL = float(os.getenv("POLL_MIN_INTERVAL", "0.25"))
+    POLL_MAX_INTERVAL = float(os.getenv("POLL_MAX_INTERVAL", "5"))
+    POLL_NEAR_BAND = float(os.getenv("POLL_NEAR_BAND", "0.03"))
+    POLL_FAR_BAND = float(os.getenv("POLL_FAR_BAND", "0.20"))
+    POLL_CLOSE_WINDOW = float(os.getenv("POLL_CLOSE_WINDOW", "60"))
+    
+    # 对冲报价：get_price / orderbook 超过 p95 未返回就在独立连接上补发一次
+    HEDGE_QUOTES = os.getenv("HEDGE_QUOTES", "false").lower() == "true"
+    HEDGE_MIN_DELAY_MS = float(os.getenv("HEDGE_MIN_DELAY_MS", "50"))
+    HEDGE_MAX_DELAY_MS = float(os.getenv("HEDGE_MAX_DELAY_MS", "2000"))
+    
+    # 报价源路由：price / book / ws 按滚动成功率和延迟选源，连续失败熔断、冷却到期放探测请求
+    QUOTE_ROUTER = os.getenv("QUOTE_ROUTER", "true").lower() == "true"
+    QUOTE_HEALTH_WINDOW = int(os.getenv("QUOTE_HEALTH_WINDOW", "50"))
+    QUOTE_TRIP_AFTER = int(os.getenv("QUOTE_TRIP_AFTER", "3"))
+    QUOTE_MIN_SUCCESS = float(os.getenv("QUOTE_MIN_SUCCESS", "0.5"))
+    QUOTE_PROBE_SECS = float(os.getenv("QUOTE_PROBE_SECS", "5"))
+    QUOTE_PROBE_MAX_SECS = float(os.getenv("QUOTE_PROBE_MAX_SECS", "60"))
+    QUOTE_EXPLORE_EVERY = int(os.getenv("QUOTE_EXPLORE_EVERY", "50"))
+    # 行情新鲜度：从请求发出到决策 / 下单超过该毫秒数的报价不用（0=不检查）
+    QUOTE_MAX_AGE_MS = float(os.getenv("QUOTE_MAX_AGE_MS", "1000"))
+    
+    # 快速启动配置（崩溃重启时复用上次的市场快照，并行初始化客户端/查市场/查余额）
+    FAST_START = os.getenv("FAST_START", "false").lower() == "true"
+    MARKET_CACHE_FILE = os.getenv("MARKET_CACHE_FILE", ".market_cache.json")
+    
+    # 交易所对时：市场边界/到期按交易所时间判断（CLOB /time + Gamma Date 头估计本机偏移）
+    CLOCK_SYNC = os.getenv("CLOCK_SYNC", "true").lower() == "true"
+    CLOCK_SYNC_INTERVAL = float(os.getenv("CLOCK_SYNC_INTERVAL", "60"))
+    
+    # 本地控制面（查询状态 / 热更新参数）：只绑本机；CONTROL_PORT=0 不启动
+    CONTROL_PORT = int(os.getenv("CONTROL_PORT", "0"))
+    CONTROL_HOST = os.getenv("CONTROL_HOST", "127.0.0.1")
+    CONTROL_TOKEN = os.getenv("CONTROL_TOKEN", "")
+    
+    # 主备热切换：两个进程共用一个 SQLite 文件做租约 + 状态日志（HA_LEASE_DB 为空=单机）
+    HA_LEASE_DB = os.getenv("HA_LEASE_DB", "")
+    HA_NODE_ID = os.getenv("HA_NODE_ID", "")  # 空=主机名-pid
+    HA_LEASE_TTL_MS = float(os.getenv("HA_LEASE_TTL_MS", "800"))
+    HA_POLL_MS = float(os.getenv("HA_POLL_MS", "100"))
+    
+    # 长跑内存上限：每场市场的状态（已买标记 / 订单归属 / 模拟撮合记录）在市场到期后再保留这么久就淘汰
+    STATE_RETAIN_SECS = float(os.getenv("STATE_RETAIN_SECS", "900"))
+    
+    # 按需采样分析：kill -USR2 <pid> 或控制面 POST /profile 触发，火焰图写到 PROFILE_DIR
+    PROFILE_SIGNAL = os.getenv("PROFILE_SIGNAL", "true").lower() == "true"
+    PROFILE_SECS = float(os.getenv("PROFILE_SECS", "10"))
+    PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+    PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+    
+    # 录制场次 + 报价到 JSONL（python -m src.replay 回放比对）；空=不录
+    REPLAY_RECORD = os.getenv("REPLAY_RECORD", "")
+    
+    # 切片执行：下单量大于盘口可见深度时拆成并发的 FOK 子单，每轮重读盘口；
+    # 价格上限 买 <= BUY_PRICE + SLICE_PRICE_TOL / 卖 >= SELL_PRICE - SLICE_PRICE_TOL（意图限价更宽时以意图为准）
+    SLICE_EXECUTION = os.getenv("SLICE_EXECUTION", "false").lower() == "true"
+    SLICE_PRICE_TOL = float(os.getenv("SLICE_PRICE_TOL", "0.01"))
+    SLICE_MAX_SECS = float(os.getenv("SLICE_MAX_SECS", "3"))
+    SLICE_PIPELINE = int(os.getenv("SLICE_PIPELINE", "3"))            # 每轮最多并发几张子单
+    SLICE_DEPTH_FRACTION = float(os.getenv("SLICE_DEPTH_FRACTION", "0.8"))  # 只吃可见深度的这一部分
+    SLICE_INTERVAL_MS = float(os.getenv("SLICE_INTERVAL_MS", "200"))  # 两轮之间等盘口补上
+    SLICE_BOOK_DEPTH = int(os.getenv("SLICE_BOOK_DEPTH", "5"))
+    SLICE_MIN_SIZE = float(os.getenv("SLICE_MIN_SIZE", "5"))          # 子单最小数量（交易所最小下单量）
+    
+    # 多进程签名：>0 时订单在这么多个子进程里签（不占交易线程，多市场一串订单并行签；建议 CPU 核数 - 1）
+    SIGN_WORKERS = int(os.getenv("SIGN_WORKERS", "0"))
+    SIGN_TIMEOUT_MS = float(os.getenv("SIGN_TIMEOUT_MS", "2000"))     # 超时 / 进程挂掉时回落到交易线程签
     
-    # WebSocket配置
+    # WebSocket配置（USE_WSS=true：订阅 CLOB 盘口推送，作为报价路由的 ws 源）
     USE_WSS = os.getenv("USE_WSS", "false").lower() == "true"
     POLYMARKET_WS_URL = os.getenv("POLYMARKET_WS_URL", "wss://ws-subscriptions-clob.polymarket.com")
     
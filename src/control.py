@@ -0,0 +1,327 @@
+"""
+本地控制面（CONTROL_PORT > 0 时启动；只绑 127.0.0.1，可选 CONTROL_TOKEN）
+- 查询：GET /status /positions /metrics /book[?depth=5] /params /profile
+- 热更新：POST /params {"BUY_PRICE": 0.78, "DRY_RUN": true}
+- 采样分析：POST /profile {"seconds": 10}（火焰图写到 PROFILE_DIR，GET /profile 看进度和文件名）
+  控制线程校验后发布一份不可变的 ParamUpdate（版本号 + 累计覆盖值），主循环每 tick 开头
+  比一下版本号，变了才应用（重建策略 / 轮询策略 / 挂单报价器）——热路径只读一个引用，不加锁
+
+用法：
+    CONTROL_PORT=8787 python -m src.arbitrage_bot
+    curl -s 127.0.0.1:8787/metrics
+    curl -s -X POST 127.0.0.1:8787/params -d '{"BUY_PRICE": 0.78}'
+    curl -s -X POST 127.0.0.1:8787/profile -d '{"seconds": 10}'
+"""
+from __future__ import annotations
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import TYPE_CHECKING, Any, Callable, Dict, NamedTuple, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from src.rate_limit import budget_usage
+from src.signing import signing_stats
+
+if TYPE_CHECKING:
+    from src.arbitrage_bot import ArbitrageBot
+
+
+def _as_bool(v: Any) -> bool:
+    if isinstance(v, bool):
+        return v
+    if isinstance(v, str) and v.lower() in ("true", "false"):
+        return v.lower() == "true"
+    raise ValueError(f"需要 true/false: {v!r}")
+
+
+def _unit_price(v: Any) -> float:
+    p = float(v)
+    if not 0.0 < p < 1.0:
+        raise ValueError(f"价格必须在 (0, 1) 之间: {p}")
+    return p
+
+
+def _positive(cast: Callable[[Any], Any]) -> Callable[[Any], Any]:
+    def _parse(v: Any):
+        x = cast(v)
+        if x <= 0:
+            raise ValueError(f"必须大于 0: {x}")
+        return x
+    return _parse
+
+
+def _non_negative(v: Any) -> float:
+    x = float(v)
+    if x < 0:
+        raise ValueError(f"不能为负: {x}")
+    return x
+
+
+# 可热更新的参数 -> 解析 / 校验函数（其余配置牵扯连接、线程、账户，改了要重启）
+HOT_PARAMS: Dict[str, Callable[[Any], Any]] = {
+    "BUY_PRICE": _unit_price,
+    "SELL_PRICE": _unit_price,
+    "ORDER_SIZE": _positive(int),
+    "DRY_RUN": _as_bool,
+    "STRATEGY_VARIANTS": str,
+    "SPOT_GATE": _as_bool,
+    "SPOT_GATE_BPS": _non_negative,
+    "COMPLEMENT_FEE": _non_negative,
+    "FAIR_MIN_EDGE": float,
+    "FAIR_EXIT_EDGE": float,
+    "MAKER_HALF_SPREAD": _positive(float),
+    "QUOTE_MAX_AGE_MS": _non_negative,
+}
+
+
+class ParamUpdate(NamedTuple):
+    version: int
+    values: Dict[str, Any]      # 启动以来的全部覆盖值（跳过中间版本也不会丢）
+
+
+class _Overlay:
+    """候选配置：覆盖值优先，其余读原配置（只用于校验，不改原配置）"""
+    def __init__(self, base, values: Dict[str, Any]):
+        self._base = base
+        self._values = values
+
+    def __getattr__(self, name: str):
+        values = self.__dict__["_values"]
+        if name in values:
+            return values[name]
+        return getattr(self.__dict__["_base"], name)
+
+
+def parse_params(raw: Dict[str, Any]) -> Dict[str, Any]:
+    if not isinstance(raw, dict) or not raw:
+        raise ValueError("需要 JSON 对象，例如 {\"BUY_PRICE\": 0.78}")
+    out: Dict[str, Any] = {}
+    for k, v in raw.items():
+        parse = HOT_PARAMS.get(k)
+        if parse is None:
+            raise ValueError(f"{k} 不能热更新（可改: {', '.join(sorted(HOT_PARAMS))}）")
+        out[k] = parse(v)
+    return out
+
+
+class ControlPlane:
+    """参数发布（任意线程） + 状态采集（只读 bot，dict 先拷贝再遍历）"""
+
+    def __init__(self, bot: "ArbitrageBot"):
+        self.bot = bot
+        self._lock = threading.Lock()   # 只在控制线程之间互斥；主循环不碰
+        self.reloads = 0
+
+    # -----------------------------
+    # 热更新
+    # -----------------------------
+    def update_params(self, raw: Dict[str, Any]) -> ParamUpdate:
+        values = parse_params(raw)
+        with self._lock:
+            cur = self.bot.param_update
+            merged = dict(cur.values) if cur is not None else {}
+            merged.update(values)
+            candidate = _Overlay(self.bot.config, merged)
+            if candidate.BUY_PRICE >= candidate.SELL_PRICE:
+                raise ValueError(f"BUY_PRICE({candidate.BUY_PRICE}) 必须小于 SELL_PRICE({candidate.SELL_PRICE})")
+            # 按新参数完整建一次策略：格式错误（比如 STRATEGY_VARIANTS）在这里就报出来，不会带进主循环
+            from src.strategy import StrategyEngine
+            StrategyEngine.from_config(candidate)
+            upd = ParamUpdate((cur.version if cur is not None else 0) + 1, merged)
+            self.bot.param_update = upd     # 引用赋值是原子的：主循环下个 tick 开头看到
+            self.reloads += 1
+            return upd
+
+    def params(self) -> Dict[str, Any]:
+        cfg = self.bot.config
+        upd = self.bot.param_update
+        return {
+            "values": {k: getattr(cfg, k, None) for k in HOT_PARAMS},
+            "pending_version": upd.version if upd is not None else 0,
+            "applied_version": self.bot.param_version,
+        }
+
+    # -----------------------------
+    # 采样分析
+    # -----------------------------
+    def start_profile(self, raw: Dict[str, Any]) -> Dict[str, Any]:
+        seconds = _positive(float)(raw.get("seconds", self.bot.config.PROFILE_SECS))
+        if seconds > 300:
+            raise ValueError(f"seconds 最多 300: {seconds}")
+        prof = self.bot.start_profile(seconds)
+        if prof is None:
+            raise ValueError("上一次采样还没结束")
+        return {"seconds": seconds, "interval_ms": prof.interval * 1000}
+
+    def profile(self) -> Dict[str, Any]:
+        prof = self.bot.profiler
+        return prof.stats() if prof is not None else {"running": False}
+
+    # -----------------------------
+    # 查询
+    # -----------------------------
+    def status(self) -> Dict[str, Any]:
+        bot = self.bot
+        info = bot.market_info
+        pool = bot.execution_pool
+        return {
+            "mode": "dry_run" if bot.config.DRY_RUN else "live",
+            "now": bot.clock.time(),
+            "market": None if info is None else {
+                "slug": info.slug, "question": info.question,
+                "start_ts": info.start_ts, "end_ts": info.end_ts,
+            },
+            "tokens": bot.conditions.to_dict() if bot.conditions is not None else None,
+            "balance": pool.total_balance() if pool is not None else None,
+            "stats": dict(bot.stats),
+            "params_version": bot.param_version,
+        }
+
+    def positions(self) -> Dict[str, Any]:
+        bot = self.bot
+        return {
+            "single": [p._asdict() for p in list(bot.positions.values())],
+            "paired": [p._asdict() for p in list(bot.pair_positions.values())],
+        }
+
+    def metrics(self) -> Dict[str, Any]:
+        bot = self.bot
+        out: Dict[str, Any] = {
+            "quote_age_ms": _percentiles(bot.quote_age),
+            "quote_exchange_age_ms": _percentiles(bot.quote_exchange_age),
+            "rate_limit": budget_usage(),
+            "strategy_errors": dict(bot.engine.errors),
+        }
+        tc = bot.trading_client
+        if tc is not None:
+            out["quote_sources"] = tc.quote_stats()
+            out["hedging"] = tc.hedge_stats()
+        if bot.maker is not None:
+            out["maker"] = bot.maker.stats()
+        if bot.redemption is not None:
+            out["redemption"] = bot.redemption.stats()
+        if bot._slicer is not None:
+            out["slicing"] = bot._slicer.stats()
+        signing = signing_stats()
+        if signing is not None:
+            out["signing"] = signing
+        clock_sync = getattr(bot.clock, "sync", None)
+        if clock_sync is not None and clock_sync.synced:
+            out["clock_sync"] = clock_sync.stats()
+        return out
+
+    def book(self, depth: int = 0) -> Dict[str, Any]:
+        """默认只给本 tick 用过的报价（不发请求）；depth > 0 时现拉一次盘口"""
+        bot = self.bot
+        mono = bot.clock.monotonic()
+        out: Dict[str, Any] = {}
+        for side_name, q in list(bot.last_quotes().items()):
+            age = q.age(mono)
+            out[side_name] = {
+                "ask": q.ask, "bid": q.bid,
+                "age_ms": round(age * 1000, 1) if age is not None else None,
+                "exchange_ts": q.exchange_ts,
+            }
+        if depth > 0 and bot.conditions is not None and bot.trading_client is not None:
+            get_levels = getattr(bot.trading_client, "get_top_levels", None)
+            if get_levels is not None:
+                for side_name, token_id in bot.conditions.items():
+                    out.setdefault(side_name, {})["levels"] = get_levels(token_id, depth)
+        return out
+
+
+def _percentiles(tracker) -> Optional[Dict[str, float]]:
+    if not len(tracker):
+        return None
+    return {f"p{int(q * 100)}": round(tracker.percentile(q) * 1000, 1) for q in (0.5, 0.9, 0.99)}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    plane: ControlPlane
+    token: str = ""
+
+    def log_message(self, fmt, *args):  # 不往机器人的输出里刷访问日志
+        pass
+
+    def _send(self, code: int, body: Any):
+        data = json.dumps(body, ensure_ascii=False, default=str).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _authorized(self) -> bool:
+        if not self.token:
+            return True
+        if self.headers.get("Authorization", "") == f"Bearer {self.token}":
+            return True
+        self._send(401, {"error": "unauthorized"})
+        return False
+
+    def do_GET(self):
+        if not self._authorized():
+            return
+        url = urlparse(self.path)
+        plane = self.plane
+        try:
+            if url.path == "/status":
+                return self._send(200, plane.status())
+            if url.path == "/positions":
+                return self._send(200, plane.positions())
+            if url.path == "/metrics":
+                return self._send(200, plane.metrics())
+            if url.path == "/book":
+                depth = int(parse_qs(url.query).get("depth", ["0"])[0])
+                return self._send(200, plane.book(depth))
+            if url.path == "/params":
+                return self._send(200, plane.params())
+            if url.path == "/profile":
+                return self._send(200, plane.profile())
+        except Exception as e:
+            return self._send(500, {"error": str(e)})
+        self._send(404, {"error": f"unknown path {url.path}"})
+
+    def do_POST(self):
+        if not self._authorized():
+            return
+        path = urlparse(self.path).path
+        if path not in ("/params", "/profile"):
+            return self._send(404, {"error": f"unknown path {self.path}"})
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            raw = json.loads(self.rfile.read(length) or b"{}")
+            if path == "/profile":
+                return self._send(200, self.plane.start_profile(raw if isinstance(raw, dict) else {}))
+            upd = self.plane.update_params(raw)
+        except (ValueError, TypeError) as e:
+            return self._send(400, {"error": str(e)})
+        self._send(200, {"version": upd.version, "values": upd.values})
+
+
+class ControlServer:
+    def __init__(self, bot: "ArbitrageBot", host: str = "127.0.0.1", port: int = 8787, token: str = ""):
+        self.plane = ControlPlane(bot)
+        handler = type("ControlHandler", (_Handler,), {"plane": self.plane, "token": token})
+        self._server = ThreadingHTTPServer((host, port), handler)
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self._server.server_address[:2]
+
+    def start(self) -> "ControlServer":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._server.serve_forever, name="control", daemon=True)
+            self._thread.start()
+            host, port = self.address
+            print(f"🎛️ 控制面已启动: http://{host}:{port}")
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread = None
+        self._server.server_close()
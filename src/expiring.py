@@ -0,0 +1,126 @@
+"""
+按到期时间淘汰的容器（长跑进程里的“每场市场”状态）
+- ExpiringDict：每个 key 带一个到期时间（一般是市场 end_ts + 宽限），evict(now) 删掉已过期的；
+  最小堆按到期时间排，淘汰是 O(k log n)，查 / 写和普通 dict 一样
+- ExpiringSet：只要 key 的版本（_buy_once_guard 这种“本场某方向已经买过”）
+- max_size：兜底上限，超过时先淘汰最早到期的（到期时间没填对也涨不上去）
+"""
+from __future__ import annotations
+
+import heapq
+from typing import Dict, Generic, Hashable, Iterable, Iterator, List, Optional, Tuple, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class ExpiringDict(Generic[K, V]):
+    def __init__(self, max_size: int = 100_000):
+        self.max_size = int(max_size)
+        self._data: Dict[K, Tuple[V, float]] = {}
+        self._heap: List[Tuple[float, int, K]] = []
+        self._seq = 0               # 同一到期时间的 key 不互相比较（key 不一定可排序）
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._data
+
+    def __iter__(self) -> Iterator[K]:
+        return iter(list(self._data))
+
+    def get(self, key: K, default: Optional[V] = None) -> Optional[V]:
+        hit = self._data.get(key)
+        return hit[0] if hit is not None else default
+
+    def set(self, key: K, value: V, expires_at: float):
+        """同一个 key 再写一次：值和到期时间都以最后一次为准（堆里的旧条目淘汰时跳过）"""
+        self._data[key] = (value, float(expires_at))
+        self._seq += 1
+        heapq.heappush(self._heap, (float(expires_at), self._seq, key))
+        if len(self._data) > self.max_size:
+            self._evict_one()
+        elif len(self._heap) > 2 * len(self._data) + 64:
+            self._compact()
+
+    def pop(self, key: K, default: Optional[V] = None) -> Optional[V]:
+        hit = self._data.pop(key, None)
+        return hit[0] if hit is not None else default
+
+    def expires_at(self, key: K) -> Optional[float]:
+        hit = self._data.get(key)
+        return hit[1] if hit is not None else None
+
+    def evict(self, now: float) -> int:
+        """删掉 expires_at <= now 的 key，返回删了几个"""
+        n = 0
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            exp, _, key = heapq.heappop(heap)
+            hit = self._data.get(key)
+            if hit is not None and hit[1] == exp:
+                del self._data[key]
+                n += 1
+        self.evicted += n
+        return n
+
+    def _evict_one(self):
+        heap = self._heap
+        while heap:
+            exp, _, key = heapq.heappop(heap)
+            hit = self._data.get(key)
+            if hit is not None and hit[1] == exp:
+                del self._data[key]
+                self.evicted += 1
+                return
+
+    def _compact(self):
+        """反复覆盖同一批 key 时堆里会堆积失效条目：按现存数据重建"""
+        self._heap = [(exp, i, k) for i, (k, (_, exp)) in enumerate(self._data.items())]
+        heapq.heapify(self._heap)
+        self._seq = len(self._heap)
+
+    def items(self) -> List[Tuple[K, V]]:
+        return [(k, v) for k, (v, _) in list(self._data.items())]
+
+    def clear(self):
+        """清空数据和堆；evicted 是累计计数，不跟着清"""
+        self._data.clear()
+        self._heap = []
+        self._seq = 0
+
+
+class ExpiringSet(Generic[K]):
+    def __init__(self, max_size: int = 100_000):
+        self._d: ExpiringDict[K, None] = ExpiringDict(max_size)
+
+    def __len__(self) -> int:
+        return len(self._d)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._d
+
+    def __iter__(self) -> Iterator[K]:
+        return iter(self._d)
+
+    @property
+    def evicted(self) -> int:
+        return self._d.evicted
+
+    def add(self, key: K, expires_at: float):
+        self._d.set(key, None, expires_at)
+
+    def update(self, keys: Iterable[K], expires_at: float):
+        for k in keys:
+            self._d.set(k, None, expires_at)
+
+    def discard(self, key: K):
+        self._d.pop(key)
+
+    def evict(self, now: float) -> int:
+        return self._d.evict(now)
+
+    def clear(self):
+        self._d.clear()
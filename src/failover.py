@@ -0,0 +1,264 @@
+"""
+主备热切换（两个进程 / 两台机器共用一个 SQLite 文件做租约和状态日志）
+- 租约：lease 表一行（holder / fencing / expires）。后台线程每 ttl/4 续约一次，备机每 poll 秒抢一次；
+  主机挂掉后最多 ttl + poll 秒备机接管（默认 800ms + 100ms < 1s）
+- 自我隔离：主机只在 expires - margin 之前认为自己是主（本地比较一个 float，热路径无 I/O）；
+  续不上约（卡住 / 断网）时先于备机接管停止下单
+- 状态日志：journal 表，只有当前租约持有者（holder + fencing 都对得上）才写得进去，
+  被替换掉的旧主机写不了。两类记录：
+    guard：下买单之前先写（WAL），主机在下单和写快照之间挂掉，备机也知道这边已经试过
+    state：持仓 / 成对持仓 / 已买标记 / 统计 / 做市挂单 的完整快照（变了才写）
+- 备机：和主机一样完成启动（查市场、初始化客户端、订阅盘口），然后只跟日志、跟着切场，
+  拿到租约时应用最后的快照 + 之后的 guard，撤掉旧主机留下的挂单，再开始交易
+
+跨机器部署时 SQLite 放共享存储，两台机器要对时（租约按墙钟比较）；也可以换成别的协调服务，
+接口只有 try_acquire / append / tail
+"""
+from __future__ import annotations
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS lease (
+    name TEXT PRIMARY KEY, holder TEXT NOT NULL, fencing INTEGER NOT NULL, expires REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS journal (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT, fencing INTEGER NOT NULL, kind TEXT NOT NULL,
+    payload TEXT NOT NULL, ts REAL NOT NULL
+);
+"""
+
+
+class JournalEntry(NamedTuple):
+    seq: int
+    fencing: int
+    kind: str
+    payload: Dict[str, Any]
+
+
+def default_node_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, timeout=0.2, isolation_level=None, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class LeaseStore:
+    """租约 + 日志的 SQLite 实现；每个线程用自己的连接"""
+
+    def __init__(self, path: str, name: str = "leader"):
+        self.path = path
+        self.name = name
+        self._local = threading.local()
+        self._conn().executescript(_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = _connect(self.path)
+        return conn
+
+    def try_acquire(self, node_id: str, now: float, ttl: float) -> Optional[Tuple[int, float]]:
+        """抢 / 续租约：成功返回 (fencing, expires)，别人持有且未过期返回 None"""
+        conn = self._conn()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+        except sqlite3.OperationalError:
+            return None     # 另一边正在写：这一轮算没抢到
+        try:
+            row = conn.execute("SELECT holder, fencing, expires FROM lease WHERE name=?", (self.name,)).fetchone()
+            if row is None:
+                fencing = 1
+            elif row[0] == node_id:
+                fencing = row[1]
+            elif row[2] <= now:
+                fencing = row[1] + 1    # 换主：fencing 递增，旧主机的日志写入从此失效
+            else:
+                conn.execute("ROLLBACK")
+                return None
+            expires = now + ttl
+            conn.execute(
+                "INSERT INTO lease(name, holder, fencing, expires) VALUES(?,?,?,?) "
+                "ON CONFLICT(name) DO UPDATE SET holder=excluded.holder, fencing=excluded.fencing, "
+                "expires=excluded.expires",
+                (self.name, node_id, fencing, expires),
+            )
+            conn.execute("COMMIT")
+            return fencing, expires
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def release(self, node_id: str):
+        """正常退出时让出租约：备机下一次轮询就能接管，不用等过期"""
+        self._conn().execute("UPDATE lease SET expires=0 WHERE name=? AND holder=?", (self.name, node_id))
+
+    def append(self, node_id: str, fencing: int, kind: str, payload: Dict[str, Any], now: float) -> Optional[int]:
+        """只有租约仍归自己（holder + fencing 对得上）时写得进去；返回 seq，写不进去返回 None"""
+        cur = self._conn().execute(
+            "INSERT INTO journal(fencing, kind, payload, ts) "
+            "SELECT ?, ?, ?, ? WHERE EXISTS (SELECT 1 FROM lease WHERE name=? AND holder=? AND fencing=?)",
+            (fencing, kind, json.dumps(payload, separators=(",", ":")), now, self.name, node_id, fencing),
+        )
+        return cur.lastrowid if cur.rowcount == 1 else None
+
+    def tail(self, after_seq: int, limit: int = 1000) -> List[JournalEntry]:
+        rows = self._conn().execute(
+            "SELECT seq, fencing, kind, payload FROM journal WHERE seq > ? ORDER BY seq LIMIT ?", (after_seq, limit)
+        ).fetchall()
+        return [JournalEntry(seq, fencing, kind, json.loads(payload)) for seq, fencing, kind, payload in rows]
+
+    def prune(self, before_seq: int):
+        self._conn().execute("DELETE FROM journal WHERE seq < ?", (before_seq,))
+
+
+class HaNode:
+    def __init__(self, store: LeaseStore, node_id: Optional[str] = None, ttl: float = 0.8, poll: float = 0.1,
+                 clock: Callable[[], float] = time.time):
+        self.store = store
+        self.node_id = node_id or default_node_id()
+        self.ttl = float(ttl)
+        self.poll = float(poll)
+        self.renew_every = self.ttl / 4.0
+        # 比租约早这么久停手：续约线程晚一拍、两边时钟差一点都不会出现双主
+        self.margin = self.ttl / 4.0
+        self._clock = clock
+        self.fencing = 0
+        self._held_until = 0.0
+        self.became_leader = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.takeovers = 0
+        self.renew_failures = 0
+        # 日志：备机跟到哪里 / 最后一份快照 / 快照之后的 guard
+        self._seq = 0
+        self._state: Optional[Dict[str, Any]] = None
+        self._guards: List[Tuple[str, str]] = []
+        self._last_state_json = ""
+        self._state_seqs: List[int] = []
+
+    @classmethod
+    def from_config(cls, config) -> "HaNode":
+        return cls(LeaseStore(config.HA_LEASE_DB), node_id=config.HA_NODE_ID or None,
+                   ttl=config.HA_LEASE_TTL_MS / 1000.0, poll=config.HA_POLL_MS / 1000.0)
+
+    # -----------------------------
+    # 租约
+    # -----------------------------
+    def is_leader(self) -> bool:
+        return self._clock() < self._held_until
+
+    def start(self) -> "HaNode":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="ha-lease", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+        if self.is_leader():
+            self._held_until = 0.0
+            try:
+                self.store.release(self.node_id)
+            except sqlite3.Error:
+                pass
+
+    def renew(self) -> bool:
+        """抢 / 续一次租约（后台线程循环调用；测试可直接调）；返回之后是否为主"""
+        leader = self.is_leader()
+        now = self._clock()
+        try:
+            got = self.store.try_acquire(self.node_id, now, self.ttl)
+        except sqlite3.Error as e:
+            got = None
+            print(f"⚠️ 租约存储出错: {e}")
+        if got is not None:
+            fencing, expires = got
+            if fencing != self.fencing:
+                self.takeovers += 1
+            self.fencing = fencing
+            self._held_until = expires - self.margin
+            if not leader:
+                self.became_leader.set()
+        elif leader:
+            self.renew_failures += 1
+        return self.is_leader()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._stop.wait(self.renew_every if self.renew() else self.poll)
+
+    def wait_for_leadership(self, timeout: float) -> bool:
+        if self.became_leader.wait(timeout):
+            self.became_leader.clear()
+            return self.is_leader()
+        return False
+
+    # -----------------------------
+    # 日志（主机写）
+    # -----------------------------
+    def journal_guard(self, slug: str, side_name: str) -> bool:
+        """下买单前调用：写不进去（租约已经不是自己的）就不能下单"""
+        return self.store.append(self.node_id, self.fencing, "guard", {"slug": slug, "side": side_name},
+                                 self._clock()) is not None
+
+    def journal_state(self, state: Dict[str, Any]) -> bool:
+        """状态变了才写；写完顺手删掉旧记录（备机只需要最后一份快照和之后的 guard）"""
+        text = json.dumps(state, sort_keys=True, separators=(",", ":"))
+        if text == self._last_state_json:
+            return True
+        seq = self.store.append(self.node_id, self.fencing, "state", state, self._clock())
+        if seq is None:
+            return False
+        self._last_state_json = text
+        self._state_seqs.append(seq)
+        if len(self._state_seqs) >= 100:
+            # 留最近两份快照（备机可能正读到上一份）
+            self.store.prune(self._state_seqs[-2])
+            self._state_seqs = self._state_seqs[-2:]
+        return True
+
+    # -----------------------------
+    # 日志（备机跟）
+    # -----------------------------
+    def follow(self) -> int:
+        """读新增日志，留下最后一份快照和它之后的 guard；返回读到的条数"""
+        n = 0
+        while True:
+            entries = self.store.tail(self._seq)
+            if not entries:
+                return n
+            for e in entries:
+                self._seq = e.seq
+                if e.kind == "state":
+                    self._state = e.payload
+                    self._guards = []
+                elif e.kind == "guard":
+                    self._guards.append((e.payload["slug"], e.payload["side"]))
+            n += len(entries)
+
+    def recovered(self) -> Tuple[Optional[Dict[str, Any]], List[Tuple[str, str]]]:
+        self.follow()
+        return self._state, list(self._guards)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "node_id": self.node_id,
+            "leader": self.is_leader(),
+            "fencing": self.fencing,
+            "takeovers": self.takeovers,
+            "renew_failures": self.renew_failures,
+            "journal_seq": self._seq,
+        }
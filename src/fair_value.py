@@ -0,0 +1,227 @@
+"""
+UP/DOWN 公允价（闭式解，按现货 tick 批量重算）
+- 到期判定：end 时刻现货 >= 开盘价 -> UP 赢。无漂移对数正态下
+      P(UP) = Φ( (ln(S/S0) - σ²τ/2) / (σ√τ) )，DOWN = 1 - UP
+  S0 = start_ts 时刻现货，S = 当前现货，τ = 离 end_ts 的秒数，σ = 每秒波动率（SpotRing 增量估计）
+- FairValueEngine：跟踪多场市场（不同周期 / 同时挂着的几场），每个现货 tick 一次 NumPy 批量算完；
+  场数少于 NUMPY_MIN_BATCH 或没装 numpy 时逐场 math.erf（pip install numpy 可选）
+- edge = fair - ask：策略拿来比较，FairValueStrategy 是一个直接用 edge 下单的例子
+"""
+from __future__ import annotations
+
+import math
+import threading
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+from src.spot_feed import SpotRing
+from src.strategy import MarketSnapshot, OrderIntent, Strategy
+
+try:
+    import numpy as np  # 可选依赖
+except Exception:
+    np = None  # type: ignore
+
+_SQRT2 = math.sqrt(2.0)
+SECONDS_PER_YEAR = 365.0 * 86400.0
+# numpy 每次调用有几十微秒固定开销：场数少时逐场 math.erf 反而更快（python -m src.bench fair）
+NUMPY_MIN_BATCH = 32
+
+
+def _norm_cdf_np(x):
+    """Φ(x)，Abramowitz-Stegun 7.1.26（误差 < 1.5e-7），numpy 没有 erf"""
+    z = np.abs(x) / _SQRT2
+    t = 1.0 / (1.0 + 0.3275911 * z)
+    poly = t * (0.254829592 + t * (-0.284496736 + t * (1.421413741 + t * (-1.453152027 + t * 1.061405429))))
+    erf = 1.0 - poly * np.exp(-z * z)
+    return 0.5 * (1.0 + np.sign(x) * erf)
+
+
+def fair_up_batch(spot: float, anchors, tau, sigma: float):
+    """anchors / tau 是等长数组（numpy）；已到期（tau<=0）按现货是否 >= 开盘价给 1/0"""
+    anchors = np.asarray(anchors, dtype=float)
+    tau = np.asarray(tau, dtype=float)
+    live = tau > 0
+    s = sigma * np.sqrt(np.where(live, tau, 1.0))
+    logm = np.log(spot / anchors)
+    d = (logm - 0.5 * s * s) / s
+    settled = np.where(logm >= 0, 1.0, 0.0)
+    return np.where(live, _norm_cdf_np(d), settled)
+
+
+def fair_up(spot: float, anchor: float, tau: float, sigma: float) -> float:
+    """单场版本（纯 Python）"""
+    logm = math.log(spot / anchor)
+    if tau <= 0:
+        return 1.0 if logm >= 0 else 0.0
+    s = sigma * math.sqrt(tau)
+    d = (logm - 0.5 * s * s) / s
+    return 0.5 * (1.0 + math.erf(d / _SQRT2))
+
+
+class TrackedMarket(NamedTuple):
+    key: str                # 一般用 slug
+    start_ts: int
+    end_ts: int
+    up_token: str
+    down_token: str
+
+
+class FairValueEngine:
+    def __init__(self, ring: SpotRing, default_annual_vol: float = 0.5, vol_kind: str = "ewma",
+                 min_sigma: float = 1e-6):
+        self.ring = ring
+        self.default_sigma = float(default_annual_vol) / math.sqrt(SECONDS_PER_YEAR)
+        self.vol_kind = vol_kind
+        self.min_sigma = float(min_sigma)
+        self._lock = threading.Lock()
+        self._markets: List[TrackedMarket] = []
+        self._anchors: List[Optional[float]] = []
+        self._pending: List[int] = []
+        self._up_tokens: List[str] = []
+        self._down_tokens: List[str] = []
+        self._anchor_arr = None
+        self._ends = None
+        # token_id -> 公允价；每次重算整体替换（读方不加锁拿到的总是一份完整结果）
+        self._fair: Dict[str, float] = {}
+        self.sigma: float = self.default_sigma
+        self.recomputes = 0
+
+    @classmethod
+    def from_config(cls, ring: SpotRing, config) -> "FairValueEngine":
+        return cls(ring, default_annual_vol=config.FAIR_DEFAULT_VOL, vol_kind=config.FAIR_VOL_ESTIMATOR)
+
+    # -----------------------------
+    # 跟踪的市场
+    # -----------------------------
+    def track(self, markets: Sequence[TrackedMarket]):
+        """替换跟踪列表（切场时调用）；开盘价登记到 SpotRing，越过 start_ts 时自动捕获"""
+        with self._lock:
+            self._markets = list(markets)
+            self._anchors = [None] * len(self._markets)
+            self._pending = list(range(len(self._markets)))  # 还没拿到开盘价的下标
+            self._up_tokens = [m.up_token for m in self._markets]
+            self._down_tokens = [m.down_token for m in self._markets]
+            if np is not None:
+                self._anchor_arr = np.full(len(self._markets), np.nan)
+                self._ends = np.array([m.end_ts for m in self._markets], dtype=float)
+            for m in self._markets:
+                self.ring.watch(m.start_ts)
+            self._fair = {}
+
+    def attach(self):
+        """挂到 SpotRing 上：每个现货 tick 重算一次"""
+        self.ring.add_listener(lambda ring: self.recompute())
+
+    # -----------------------------
+    # 计算
+    # -----------------------------
+    def _sigma(self) -> float:
+        var = self.ring.realized_var(self.vol_kind)
+        if var is None or var <= 0:
+            return self.default_sigma
+        return max(self.min_sigma, math.sqrt(var))
+
+    def _fill_anchors(self, now: float):
+        """开盘价只取一次：之后每个 tick 不再逐场查 SpotRing"""
+        still: List[int] = []
+        for i in self._pending:
+            m = self._markets[i]
+            px = self.ring.anchor(m.start_ts) if now >= m.start_ts else None
+            if px is None:
+                still.append(i)
+                continue
+            self._anchors[i] = px
+            if np is not None:
+                self._anchor_arr[i] = px
+        self._pending = still
+
+    def recompute(self, now: Optional[float] = None) -> int:
+        """用最新现货重算所有跟踪市场；返回算出公允价的市场数"""
+        last = self.ring.last()
+        if last is None:
+            return 0
+        ts, spot = last
+        now = ts if now is None else now
+        with self._lock:
+            markets = self._markets
+            if not markets:
+                return 0
+            if self._pending:
+                self._fill_anchors(now)
+            sigma = self.sigma = self._sigma()
+            if np is not None and len(markets) >= NUMPY_MIN_BATCH:
+                # 没有开盘价的场是 nan：开盘前给 0.5（涨跌对称），开盘后拿不到开盘价的不出价
+                up = fair_up_batch(spot, self._anchor_arr, self._ends - now, sigma)
+                if self._pending:
+                    for i in self._pending:
+                        up[i] = 0.5 if now < markets[i].start_ts else np.nan
+                ups = up.tolist()
+            else:
+                ups = [
+                    fair_up(spot, a, m.end_ts - now, sigma) if a is not None
+                    else (0.5 if now < m.start_ts else math.nan)
+                    for m, a in zip(markets, self._anchors)
+                ]
+            fair: Dict[str, float] = {}
+            for u, d, p in zip(self._up_tokens, self._down_tokens, ups):
+                if p == p:  # 非 nan
+                    fair[u] = p
+                    fair[d] = 1.0 - p
+            self._fair = fair
+            self.recomputes += 1
+            return len(fair) // 2
+
+    # -----------------------------
+    # 读
+    # -----------------------------
+    def fair(self, token_id: str) -> Optional[float]:
+        return self._fair.get(token_id)
+
+    def edge(self, token_id: str, ask: Optional[float]) -> Optional[float]:
+        f = self._fair.get(token_id)
+        if f is None or ask is None:
+            return None
+        return f - ask
+
+
+class FairValueStrategy(Strategy):
+    """
+    用 edge 下单：
+    - 买入：无持仓、本场没买过、fair - ask >= min_edge
+    - 卖出：有持仓、bid - fair >= exit_edge（市场给的价比模型高）
+    """
+
+    def __init__(self, min_edge: float = 0.05, exit_edge: float = 0.02, size: float = 5.0,
+                 buffer: float = 0.005, name: str = "fair_value"):
+        self.min_edge = float(min_edge)
+        self.exit_edge = float(exit_edge)
+        self.size = float(size)
+        self.buffer = float(buffer)
+        self.name = name
+
+    @classmethod
+    def from_config(cls, config) -> "FairValueStrategy":
+        return cls(min_edge=config.FAIR_MIN_EDGE, exit_edge=config.FAIR_EXIT_EDGE, size=config.ORDER_SIZE)
+
+    def evaluate(self, snap: MarketSnapshot) -> List[OrderIntent]:
+        out: List[OrderIntent] = []
+        for s in snap.sides:
+            edge = s.edge
+            if edge is None or s.bid is None:
+                continue
+            if s.position is None:
+                if not s.bought and edge >= self.min_edge:
+                    out.append(OrderIntent(
+                        s.token_id, s.side_name, "BUY", round(min(0.99, s.ask + self.buffer), 4),
+                        round(self.size, 2), s.ask,
+                        reason=f"Fair=${s.fair:.4f} - Ask=${s.ask:.4f} = {edge:+.4f} >= {self.min_edge:.4f}",
+                        strategies=(self.name,),
+                    ))
+            elif s.bid - s.fair >= self.exit_edge:
+                out.append(OrderIntent(
+                    s.token_id, s.side_name, "SELL", round(max(0.01, s.bid - self.buffer), 4),
+                    round(s.position.size, 2), s.bid, account=s.position.account,
+                    reason=f"Bid=${s.bid:.4f} - Fair=${s.fair:.4f} >= {self.exit_edge:.4f}",
+                    strategies=(self.name,),
+                ))
+        return out
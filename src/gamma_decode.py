@@ -0,0 +1,180 @@
+"""
+Gamma 市场数据解码层
+- 有 orjson 就用 orjson（可选依赖：pip install orjson），没有退回标准库 json
+- 每个市场对象只取机器人需要的字段（slug / id / 起止时间 / closed / active / clobTokenIds / outcomes / conditionId），
+  一次遍历直接产出 GammaMarket，后面不再反复 .get / _safe_bool / 解析日期
+- 搜索结果先按 slug 过滤，不匹配的市场连投影都不做
+"""
+from __future__ import annotations
+
+import json
+from datetime import datetime
+from typing import Any, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from src.models import TokenPair
+
+try:
+    import orjson as _orjson  # 可选：比标准库 json 快数倍
+except Exception:
+    _orjson = None  # type: ignore
+
+_TRUE = frozenset(("true", "1", "yes", "y"))
+_FALSE = frozenset(("false", "0", "no", "n"))
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    if _orjson is not None:
+        return _orjson.loads(data)
+    return json.loads(data)
+
+
+class GammaMarket(NamedTuple):
+    market_id: Optional[int]
+    slug: str               # 已转小写
+    question: str
+    start_ts: Optional[int]
+    end_ts: Optional[int]
+    closed: bool
+    active: bool
+    is_live: bool
+    enable_order_book: bool
+    volume: float
+    tokens: Optional[TokenPair]
+    condition_id: str = ""
+
+
+def as_bool(v: Any, default: bool = False) -> bool:
+    if v is True or v is False:
+        return v
+    if v is None:
+        return default
+    s = str(v).strip().lower()
+    if s in _TRUE:
+        return True
+    if s in _FALSE:
+        return False
+    return default
+
+
+def as_ts(v: Any) -> Optional[int]:
+    """int/float 秒 或 ISO 时间（支持结尾 Z）-> unix 秒；解析不了返回 None"""
+    if v is None or v == "":
+        return None
+    if isinstance(v, (int, float)) and not isinstance(v, bool):
+        return int(v)
+    if isinstance(v, str):
+        s = v.strip()
+        if s.endswith("Z"):
+            s = s[:-1] + "+00:00"
+        try:
+            return int(datetime.fromisoformat(s).timestamp())
+        except ValueError:
+            return None
+    return None
+
+
+def as_list(v: Any) -> List[Any]:
+    """Gamma 里 outcomes / clobTokenIds 经常是“JSON 字符串里的数组”"""
+    if v is None:
+        return []
+    if isinstance(v, list):
+        return v
+    if isinstance(v, str):
+        s = v.strip()
+        if not s:
+            return []
+        if s[0] == "[":
+            try:
+                x = loads(s)
+                return x if isinstance(x, list) else []
+            except Exception:
+                pass
+        return [p.strip() for p in s.split(",") if p.strip()]
+    return []
+
+
+def token_pair(m: dict) -> Optional[TokenPair]:
+    """从市场对象里取 UP/DOWN clobTokenIds（outcomes 对齐 或 tokens 列表两种结构）"""
+    outcomes = as_list(m.get("outcomes") or m.get("shortOutcomes"))
+    token_ids = as_list(m.get("clobTokenIds"))
+    up = down = None
+    if len(outcomes) >= 2 and len(token_ids) >= 2:
+        for name, tid in zip(outcomes, token_ids):
+            n = str(name).strip().lower()
+            if n == "up":
+                up = str(tid)
+            elif n == "down":
+                down = str(tid)
+        if up and down:
+            return TokenPair(up=up, down=down)
+
+    tokens = m.get("tokens")
+    if isinstance(tokens, list):
+        up = down = None
+        for t in tokens:
+            if not isinstance(t, dict):
+                continue
+            name = (t.get("outcome") or t.get("name") or "").strip().lower()
+            tid = t.get("clobTokenId") or t.get("tokenId") or t.get("id")
+            if not tid:
+                continue
+            if name == "up":
+                up = str(tid)
+            elif name == "down":
+                down = str(tid)
+        if up and down:
+            return TokenPair(up=up, down=down)
+    return None
+
+
+def project(m: Any, slug: Optional[str] = None) -> Optional[GammaMarket]:
+    """单个 Gamma 市场对象 -> GammaMarket（只取需要的字段）"""
+    if not isinstance(m, dict):
+        return None
+    g = m.get
+    if slug is None:
+        slug = str(g("slug") or "").lower()
+    mid = g("id") or g("market_id") or g("marketId")
+    try:
+        market_id = int(mid) if mid is not None else None
+    except (TypeError, ValueError):
+        market_id = None
+    try:
+        volume = float(g("volume") or 0)
+    except (TypeError, ValueError):
+        volume = 0.0
+    return GammaMarket(
+        market_id=market_id,
+        slug=slug,
+        question=g("question") or g("title") or slug,
+        start_ts=as_ts(g("startDate") or g("start_time") or g("startTime")),
+        end_ts=as_ts(g("endDate") or g("end_time") or g("endTime")),
+        closed=as_bool(g("closed"), False),
+        active=as_bool(g("active"), True),
+        is_live=as_bool(g("is_live"), False),
+        enable_order_book=as_bool(g("enableOrderBook"), True),
+        volume=volume,
+        tokens=token_pair(m),
+        condition_id=str(g("conditionId") or g("condition_id") or ""),
+    )
+
+
+def decode_market(content: Union[bytes, str]) -> Optional[GammaMarket]:
+    """GET /markets/{id} 或 /markets/slug/{slug} 的响应体"""
+    return project(loads(content))
+
+
+def decode_market_list(content: Union[bytes, str], slug_patterns: Tuple[str, ...] = ()) -> Iterator[GammaMarket]:
+    """GET /markets 列表；给了 slug_patterns 时只投影 slug 命中的市场"""
+    data = loads(content)
+    if not isinstance(data, list):
+        return
+    for m in data:
+        if not isinstance(m, dict):
+            continue
+        slug = str(m.get("slug") or "").lower()
+        if slug_patterns and not any(p in slug for p in slug_patterns):
+            continue
+        rec = project(m, slug)
+        if rec is not None:
+            yield rec
@@ -0,0 +1,165 @@
+"""
+对冲请求（hedged request）：压报价尾延迟
+- 主请求超过“最近 p95 延迟”还没回来，就在另一条连接上补发一次，谁先回来用谁
+- 只有慢请求才会补发，正常情况下请求量基本不变（约 5%）
+- 统计：对冲率、对冲胜出率、主请求 vs 实际生效的 p50/p95/p99
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Deque, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class LatencyTracker:
+    """滚动窗口延迟样本（秒）"""
+    def __init__(self, window: int = 512):
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, q: float) -> Optional[float]:
+        with self._lock:
+            if not self._samples:
+                return None
+            xs = sorted(self._samples)
+        idx = min(len(xs) - 1, max(0, int(round(q * (len(xs) - 1)))))
+        return xs[idx]
+
+
+class HedgedCaller:
+    def __init__(
+        self,
+        name: str,
+        primary: Callable[..., Any],
+        hedge: Callable[..., Any],
+        quantile: float = 0.95,
+        min_delay: float = 0.05,
+        max_delay: float = 2.0,
+        timeout: float = 10.0,
+        warmup: int = 20,
+        allow_hedge: Optional[Callable[[], bool]] = None,
+        max_workers: int = 8,
+    ):
+        self.name = name
+        self._primary = primary
+        self._hedge = hedge
+        self.quantile = quantile
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.timeout = timeout
+        self.warmup = warmup
+        self._allow_hedge = allow_hedge
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"hedge-{name}")
+
+        self.primary_latency = LatencyTracker()   # 主请求自身的延迟（不管有没有被对冲）
+        self.effective_latency = LatencyTracker()  # 调用方实际等待的时间
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    def hedge_delay(self) -> float:
+        """p95 推出来的补发时间点；样本不足时用 max_delay（只对冲严重卡顿的请求）"""
+        if len(self.primary_latency) < self.warmup:
+            return self.max_delay
+        p = self.primary_latency.percentile(self.quantile) or self.max_delay
+        return min(self.max_delay, max(self.min_delay, p))
+
+    def _timed_primary(self, *args, **kwargs):
+        t0 = time.perf_counter()
+        try:
+            return self._primary(*args, **kwargs)
+        finally:
+            self.primary_latency.add(time.perf_counter() - t0)
+
+    def call(self, *args, **kwargs):
+        t0 = time.perf_counter()
+        with self._lock:
+            self.calls += 1
+        primary: Future = self._pool.submit(self._timed_primary, *args, **kwargs)
+        try:
+            done, _ = wait([primary], timeout=self.hedge_delay())
+            if done:
+                return primary.result()
+
+            if self._allow_hedge is not None and not self._allow_hedge():
+                return primary.result(timeout=max(0.0, self.timeout - (time.perf_counter() - t0)))
+
+            with self._lock:
+                self.hedged += 1
+            hedge: Future = self._pool.submit(self._hedge, *args, **kwargs)
+            pending = {primary, hedge}
+            last_err: Optional[BaseException] = None
+            while pending:
+                remaining = self.timeout - (time.perf_counter() - t0)
+                if remaining <= 0:
+                    break
+                done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    err = fut.exception()
+                    if err is not None:
+                        last_err = err
+                        continue
+                    if fut is hedge:
+                        with self._lock:
+                            self.hedge_wins += 1
+                    return fut.result()
+            if last_err is not None:
+                raise last_err
+            raise TimeoutError(f"{self.name}: 主请求和对冲请求都超时")
+        finally:
+            self.effective_latency.add(time.perf_counter() - t0)
+
+    def stats(self) -> Dict[str, Any]:
+        def ms(v: Optional[float]) -> Optional[float]:
+            return None if v is None else round(v * 1000.0, 1)
+
+        with self._lock:
+            calls, hedged, wins = self.calls, self.hedged, self.hedge_wins
+        return {
+            "calls": calls,
+            "hedge_rate": round(hedged / calls, 4) if calls else 0.0,
+            "hedge_win_rate": round(wins / hedged, 4) if hedged else 0.0,
+            "hedge_delay_ms": ms(self.hedge_delay()),
+            "primary_ms": {f"p{int(q * 100)}": ms(self.primary_latency.percentile(q)) for q in (0.5, 0.95, 0.99)},
+            "effective_ms": {f"p{int(q * 100)}": ms(self.effective_latency.percentile(q)) for q in (0.5, 0.95, 0.99)},
+        }
+
+
+class PublicQuoteSession:
+    """
+    CLOB 公共行情接口的独立连接池（requests.Session）
+    py_clob_client 用的是进程级 httpx 客户端，对冲请求走这里才是真正的“另一条连接”
+    返回格式与 ClobClient.get_price / get_order_book 的 dict 形态一致
+    """
+    def __init__(self, host: str, timeout: float = 5.0, pool_size: int = 4):
+        self.host = host.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({"User-Agent": "btc-15m-bot/1.0", "Accept": "application/json"})
+
+    def _get(self, path: str, params: Dict[str, Any]) -> Any:
+        r = self.session.get(f"{self.host}{path}", params=params, timeout=self.timeout)
+        r.raise_for_status()
+        return r.json()
+
+    def get_price(self, token_id: str, side: str) -> Any:
+        return self._get("/price", {"token_id": token_id, "side": side})
+
+    def get_order_book(self, token_id: str) -> Any:
+        return self._get("/book", {"token_id": token_id})
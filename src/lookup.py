@@ -8,115 +8,112 @@
 """
 from __future__ import annotations
 
-from typing import Optional, Dict, Any, List, Tuple
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
 import json
+import os
 import time
 import requests
 
-try:
-    from zoneinfo import ZoneInfo  # py3.9+
-except Exception:
-    ZoneInfo = None  # type: ignore
+from src.clock import SYSTEM_CLOCK, Clock
+from src.clock_sync import http_date_ts
+from src.gamma_decode import GammaMarket, decode_market, decode_market_list
+from src.models import MarketSlot, TokenPair
+from src.rate_limit import PRIORITY_DISCOVERY, get_scheduler
+from src.slot_calendar import default_calendar
 
 GAMMA_API = "https://gamma-api.polymarket.com"
-ET_TZ = "America/New_York"
 INTERVAL = 900  # 15 minutes
+_SEARCH_SLUG_PATTERNS = ("btc-updown-15m", "bitcoin-up-or-down-15-minute")
 
 
-def _safe_bool(v: Any, default: bool = False) -> bool:
-    if isinstance(v, bool):
-        return v
-    if v is None:
-        return default
-    s = str(v).strip().lower()
-    if s in ("true", "1", "yes", "y"):
-        return True
-    if s in ("false", "0", "no", "n"):
-        return False
-    return default
-
-
-def _parse_listish(v: Any) -> List[Any]:
-    if v is None:
-        return []
-    if isinstance(v, list):
-        return v
-    if isinstance(v, str):
-        s = v.strip()
-        if not s:
-            return []
-        try:
-            x = json.loads(s)
-            return x if isinstance(x, list) else []
-        except Exception:
-            return [p.strip() for p in s.split(",") if p.strip()]
-    return []
-
-
-def _is_tradeable_market(m: Dict[str, Any]) -> bool:
-    """
-    15m 市场过滤：不 closed + enableOrderBook
-    （active/acceptingOrders 在 Gamma 上可能延迟/为空，别用它卡死）
-    """
-    closed = _safe_bool(m.get("closed"), False)
-    enable_ob = _safe_bool(m.get("enableOrderBook"), True)
-    return (not closed) and enable_ob
+_GAMMA_HEADERS = {
+    "User-Agent": "btc-15m-bot/1.0",
+    "Cache-Control": "no-cache",
+    "Pragma": "no-cache",
+}
 
 
-def _get_market_by_slug(slug: str, timeout: int = 10) -> Optional[Dict[str, Any]]:
-    """
-    Gamma: GET /markets/slug/{slug}
-    """
+# 对时回调 (t0, server_ts, t1)：每个 Gamma 响应的 Date 头都是一个免费的对时样本
+_TIME_SAMPLER: Optional[Callable[[float, Optional[float], float], Any]] = None
+
+
+def set_time_sampler(fn: Optional[Callable[[float, Optional[float], float], Any]]):
+    """注册对时回调（ExchangeClock.observe）；t0/t1 是本地 time.time()"""
+    global _TIME_SAMPLER
+    _TIME_SAMPLER = fn
+
+
+def _sampled_get(url: str, **kwargs) -> requests.Response:
+    sampler = _TIME_SAMPLER
+    if sampler is None:
+        return requests.get(url, **kwargs)
+    t0 = time.time()
+    r = requests.get(url, **kwargs)
+    t1 = time.time()
     try:
-        r = requests.get(
-            f"{GAMMA_API}/markets/slug/{slug}",
-            timeout=timeout,
-            headers={
-                "User-Agent": "btc-15m-bot/1.0",
-                "Cache-Control": "no-cache",
-                "Pragma": "no-cache",
-            },
-        )
-        if r.status_code != 200:
-            return None
-        data = r.json()
-        return data if isinstance(data, dict) else None
+        sampler(t0, http_date_ts(r.headers), t1)
     except Exception:
-        return None
+        pass
+    return r
+
+
+def _gamma_get(url: str, params: Optional[Dict[str, Any]] = None, timeout: int = 10,
+               priority: int = PRIORITY_DISCOVERY) -> requests.Response:
+    """Gamma GET：走共享限频桶（429 自动按 Retry-After 暂停）；额度不足抛 RateLimited"""
+    return get_scheduler("gamma").call(
+        priority, _sampled_get, url, params=params, timeout=timeout, headers=_GAMMA_HEADERS
+    )
 
 
-def _et_floor_15m_start_ts(now_utc: int) -> int:
+def _is_tradeable_market(m: GammaMarket) -> bool:
     """
-    用美东时间把当前时刻 floor 到 15 分钟整点，然后转回 UTC timestamp（作为 slug ts）
+    15m 市场过滤：不 closed + enableOrderBook
+    （active/acceptingOrders 在 Gamma 上可能延迟/为空，别用它卡死）
     """
-    if ZoneInfo is None:
-        # 兜底：不用 tz，直接按 UTC floor（不推荐，但保证不崩）
-        return (now_utc // INTERVAL) * INTERVAL
+    return (not m.closed) and m.enable_order_book
 
-    from datetime import datetime, timezone
 
-    dt_utc = datetime.fromtimestamp(now_utc, tz=timezone.utc)
-    dt_et = dt_utc.astimezone(ZoneInfo(ET_TZ))
+# market_id -> TokenPair：查市场时顺手从同一份 payload 里拿到 clobTokenIds，
+# 之后 get_market_conditions 不用再打一次 Gamma（只留最近几场）
+_TOKEN_CACHE: "OrderedDict[int, TokenPair]" = OrderedDict()
+_TOKEN_CACHE_MAX = 64
 
-    # floor 到 15 分钟
-    minute = (dt_et.minute // 15) * 15
-    dt_floor = dt_et.replace(minute=minute, second=0, microsecond=0)
 
-    # 转回 UTC ts
-    dt_floor_utc = dt_floor.astimezone(timezone.utc)
-    return int(dt_floor_utc.timestamp())
+def _remember_tokens(m: GammaMarket):
+    if m.market_id is None or m.tokens is None:
+        return
+    _TOKEN_CACHE[m.market_id] = m.tokens
+    _TOKEN_CACHE.move_to_end(m.market_id)
+    while len(_TOKEN_CACHE) > _TOKEN_CACHE_MAX:
+        _TOKEN_CACHE.popitem(last=False)
 
 
-def _build_slug(ts: int) -> str:
-    return f"btc-updown-15m-{ts}"
+def _get_market_by_slug(slug: str, timeout: int = 10) -> Optional[GammaMarket]:
+    """
+    Gamma: GET /markets/slug/{slug}
+    """
+    try:
+        r = _gamma_get(f"{GAMMA_API}/markets/slug/{slug}", timeout=timeout)
+        if r.status_code != 200:
+            return None
+        m = decode_market(r.content)
+    except Exception:
+        return None
+    if m is not None:
+        _remember_tokens(m)
+    return m
 
 
-def find_btc_15min_market(host: str, forward_steps: int = 12, backward_steps: int = 4) -> Optional[Dict[str, Any]]:
+def find_btc_15min_market(host: str, forward_steps: int = 12, backward_steps: int = 4,
+                          clock: Optional[Clock] = None) -> Optional[MarketSlot]:
     """
     改进版：使用Gamma API搜索，不依赖硬编码slug
     优先查找active=true, is_live=true, volume>0的市场
+    clock: 可注入的时钟（模拟/回放用虚拟时钟），默认系统时钟
     """
-    now = int(time.time())
+    clock = clock or SYSTEM_CLOCK
+    now = int(clock.time())
     
     # 方法1: 使用Gamma API搜索
     try:
@@ -129,79 +126,38 @@ def find_btc_15min_market(host: str, forward_steps: int = 12, backward_steps: in
             "order": "desc",
             "search": "15m btc"
         }
-        r = requests.get(search_url, params=params, timeout=10, headers={
-            "User-Agent": "btc-15m-bot/1.0",
-            "Cache-Control": "no-cache",
-        })
+        r = _gamma_get(search_url, params=params, timeout=10)
         if r.status_code == 200:
-            markets = r.json()
-            if isinstance(markets, list):
-                for m in markets:
-                    slug = str(m.get("slug", "")).lower()
-                    # 过滤：slug包含btc-updown-15m，active/live，volume>0
-                    if "btc-updown-15m" in slug or "bitcoin-up-or-down-15-minute" in slug:
-                        closed = _safe_bool(m.get("closed"), False)
-                        active = _safe_bool(m.get("active"), True)
-                        is_live = _safe_bool(m.get("is_live"), False)
-                        volume = float(m.get("volume", 0) or 0)
-                        end_time = m.get("endDate") or m.get("end_time") or m.get("endTime")
-                        
-                        # 检查结束时间
-                        end_ts = None
-                        if end_time:
-                            try:
-                                from datetime import datetime
-                                if isinstance(end_time, (int, float)):
-                                    end_ts = int(end_time)
-                                elif isinstance(end_time, str):
-                                    # 尝试解析ISO格式
-                                    dt = datetime.fromisoformat(end_time.replace('Z', '+00:00'))
-                                    end_ts = int(dt.timestamp())
-                            except:
-                                pass
-                        
-                        # 过滤条件：未关闭，活跃，有交易量，未过期
-                        if not closed and active and volume > 0:
-                            if end_ts and end_ts <= now:
-                                continue  # 已过期
-                            
-                            mid = m.get("id") or m.get("market_id") or m.get("marketId")
-                            if mid:
-                                # 计算时间戳
-                                start_ts = m.get("startDate") or m.get("start_time") or m.get("startTime")
-                                if start_ts:
-                                    try:
-                                        if isinstance(start_ts, (int, float)):
-                                            start_ts_int = int(start_ts)
-                                        elif isinstance(start_ts, str):
-                                            from datetime import datetime
-                                            dt = datetime.fromisoformat(start_ts.replace('Z', '+00:00'))
-                                            start_ts_int = int(dt.timestamp())
-                                        else:
-                                            start_ts_int = now
-                                    except:
-                                        start_ts_int = now
-                                else:
-                                    start_ts_int = now
-                                
-                                if not end_ts:
-                                    end_ts = start_ts_int + INTERVAL
-                                
-                                is_live_check = (start_ts_int <= now < end_ts)
-                                
-                                result = {
-                                    "market_id": int(mid),
-                                    "question": m.get("question") or m.get("title") or slug,
-                                    "slug": slug,
-                                    "start_ts": start_ts_int,
-                                    "end_ts": end_ts,
-                                    "is_live": is_live_check or is_live,
-                                    "volume": volume
-                                }
-                                
-                                # 优先返回live的市场
-                                if is_live_check or is_live:
-                                    return result
+            # 过滤：slug包含btc-updown-15m，active/live，volume>0（只投影 slug 命中的市场）
+            for m in decode_market_list(r.content, _SEARCH_SLUG_PATTERNS):
+                # 过滤条件：未关闭，活跃，有交易量，未过期
+                if m.closed or not m.active or m.volume <= 0:
+                    continue
+                end_ts = m.end_ts
+                if end_ts and end_ts <= now:
+                    continue  # 已过期
+                if m.market_id is None:
+                    continue
+
+                start_ts_int = m.start_ts if m.start_ts is not None else now
+                if not end_ts:
+                    end_ts = start_ts_int + INTERVAL
+
+                is_live_check = (start_ts_int <= now < end_ts)
+
+                # 优先返回live的市场
+                if is_live_check or m.is_live:
+                    _remember_tokens(m)
+                    return MarketSlot(
+                        market_id=m.market_id,
+                        question=m.question,
+                        slug=m.slug,
+                        start_ts=start_ts_int,
+                        end_ts=end_ts,
+                        is_live=True,
+                        volume=m.volume,
+                        condition_id=m.condition_id,
+                    )
     except Exception as e:
         print(f"⚠️  Gamma API搜索失败: {e}")
     
@@ -223,49 +179,40 @@ def find_btc_15min_market(host: str, forward_steps: int = 12, backward_steps: in
     3) 再查：未来 forward_steps 场、过去 backward_steps 场
     4) 优先返回 live；否则返回 next（最接近未来的）
     """
-    now = int(time.time())
-    base_ts = _et_floor_15m_start_ts(now)
-
-    # 优先探测：上一场/当前场/下一场（保证能抓到你给的 1769046300 这种）
-    probe_ts = [base_ts - INTERVAL, base_ts, base_ts + INTERVAL]
+    now = int(clock.time())
 
-    # 扩展探测：未来/过去更多场（避免刚好卡边界）
-    for i in range(2, forward_steps + 1):
-        probe_ts.append(base_ts + i * INTERVAL)
-    for i in range(2, backward_steps + 1):
-        probe_ts.append(base_ts - i * INTERVAL)
+    # 当前场 + 过去 backward_steps 场 + 未来 forward_steps 场（日历里现成的 slug）
+    probes = default_calendar().neighbours("15m", now, backward_steps, forward_steps)
 
-    # 去重并排序（先查离现在近的）
-    uniq = sorted(set(probe_ts), key=lambda t: abs(t - now))
+    # 先查离现在近的（上一场/当前场/下一场排在最前）
+    probes.sort(key=lambda sl: abs(sl.start_ts - now))
 
-    live_pick: Optional[Tuple[int, Dict[str, Any]]] = None
-    next_pick: Optional[Tuple[int, Dict[str, Any]]] = None
+    live_pick: Optional[Tuple[int, MarketSlot]] = None
+    next_pick: Optional[Tuple[int, MarketSlot]] = None
 
-    for ts in uniq:
-        slug = _build_slug(ts)
+    for slot in probes:
+        ts, slug = slot.start_ts, slot.slug
         m = _get_market_by_slug(slug)
         if not m:
             continue
         if not _is_tradeable_market(m):
             continue
-
-        # 统一提取 market_id
-        mid = m.get("id") or m.get("market_id") or m.get("marketId")
-        if mid is None:
+        if m.market_id is None:
             continue
 
         start_ts = ts
-        end_ts = ts + INTERVAL
+        end_ts = slot.end_ts
         is_live = (start_ts <= now < end_ts)
 
-        pack = {
-            "market_id": int(mid),
-            "question": m.get("question") or m.get("title") or slug,
-            "slug": slug,
-            "start_ts": start_ts,
-            "end_ts": end_ts,
-            "is_live": is_live,
-        }
+        pack = MarketSlot(
+            market_id=m.market_id,
+            question=m.question,
+            slug=slug,
+            start_ts=start_ts,
+            end_ts=end_ts,
+            is_live=is_live,
+            condition_id=m.condition_id,
+        )
 
         if is_live:
             # 选最新正在进行的（start_ts 最大）
@@ -284,54 +231,82 @@ def find_btc_15min_market(host: str, forward_steps: int = 12, backward_steps: in
     return None
 
 
-def get_market_conditions(host: str, market_id: int) -> Optional[Dict[str, str]]:
+def get_market_conditions(host: str, market_id: int) -> Optional[TokenPair]:
     """
     获取 market_id 的 UP/DOWN clobTokenIds
-    返回：{"UP": "<token_id>", "DOWN": "<token_id>"}
+    返回：TokenPair(up="<token_id>", down="<token_id>")
+    查市场时已经从同一份 payload 拿到的直接用缓存，不再请求 Gamma
     """
+    cached = _TOKEN_CACHE.get(int(market_id))
+    if cached is not None:
+        return cached
     try:
-        r = requests.get(
-            f"{GAMMA_API}/markets/{market_id}",
-            timeout=10,
-            headers={
-                "User-Agent": "btc-15m-bot/1.0",
-                "Cache-Control": "no-cache",
-                "Pragma": "no-cache",
-            },
-        )
+        r = _gamma_get(f"{GAMMA_API}/markets/{market_id}", timeout=10)
         r.raise_for_status()
-        m = r.json() if isinstance(r.json(), dict) else {}
+        m = decode_market(r.content)
     except Exception:
         return None
+    if m is None:
+        return None
+    _remember_tokens(m)
+    return m.tokens
 
-    outcomes = _parse_listish(m.get("outcomes") or m.get("shortOutcomes"))
-    token_ids = _parse_listish(m.get("clobTokenIds"))
-
-    if len(outcomes) >= 2 and len(token_ids) >= 2:
-        out_map: Dict[str, str] = {}
-        for name, tid in zip(outcomes, token_ids):
-            n = str(name).strip().lower()
-            if n == "up":
-                out_map["UP"] = str(tid)
-            elif n == "down":
-                out_map["DOWN"] = str(tid)
-        if "UP" in out_map and "DOWN" in out_map:
-            return out_map
-
-    # 兼容 tokens 列表结构
-    tokens = m.get("tokens")
-    if isinstance(tokens, list):
-        out_map: Dict[str, str] = {}
-        for t in tokens:
-            name = (t.get("outcome") or t.get("name") or "").strip().lower()
-            tid = t.get("clobTokenId") or t.get("tokenId") or t.get("id")
-            if not tid:
-                continue
-            if name == "up":
-                out_map["UP"] = str(tid)
-            elif name == "down":
-                out_map["DOWN"] = str(tid)
-        if "UP" in out_map and "DOWN" in out_map:
-            return out_map
 
-    return None
+def save_market_snapshot(path: str, market: MarketSlot, conditions: TokenPair) -> bool:
+    """
+    把已解析的市场 + UP/DOWN token_id 落盘，崩溃重启时可直接复用（省掉一次 Gamma 查找）
+    写临时文件再 os.replace，避免进程中途被杀留下半个 JSON
+    """
+    if not path:
+        return False
+    try:
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({
+                "saved_at": int(time.time()),
+                "market": market._asdict(),
+                "conditions": conditions.to_dict(),
+            }, f)
+        os.replace(tmp, path)
+        return True
+    except Exception:
+        return False
+
+
+def load_market_snapshot(path: str, now: Optional[int] = None) -> Optional[Tuple[MarketSlot, TokenPair]]:
+    """
+    读取上次运行的市场快照；只有该场还没结束（end_ts > now）才返回 (market, conditions)
+    """
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        market = data.get("market") or {}
+        conditions = data.get("conditions") or {}
+    except Exception:
+        return None
+
+    if not market.get("market_id") or "UP" not in conditions or "DOWN" not in conditions:
+        return None
+
+    now = int(time.time()) if now is None else int(now)
+    end_ts = int(market.get("end_ts") or 0)
+    if end_ts <= now:
+        return None
+
+    start_ts = int(market.get("start_ts") or 0)
+    try:
+        slot = MarketSlot(
+            market_id=int(market["market_id"]),
+            question=str(market.get("question") or market.get("slug") or ""),
+            slug=str(market.get("slug") or ""),
+            start_ts=start_ts,
+            end_ts=end_ts,
+            is_live=start_ts <= now < end_ts,
+            volume=float(market.get("volume") or 0.0),
+            condition_id=str(market.get("condition_id") or ""),
+        )
+    except (TypeError, ValueError):
+        return None
+    return slot, TokenPair(up=str(conditions["UP"]), down=str(conditions["DOWN"]))
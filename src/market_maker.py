@@ -0,0 +1,354 @@
+"""
+做市模式（挂单 + 撤改单）
+- MakerQuoter：从快照算目标挂单。参考价 = 公允价（FAIR_VALUE 开着时）否则盘口中间价，
+  UP / DOWN 各挂一个买单 ref - half_spread；手里有货才挂卖单 ref + half_spread（不能裸卖空）
+  价格按 tick 取整，且不穿价（post-only：买 < 卖一、卖 > 买一）；库存到上限不再挂买；临近到期全撤
+- OrderTable：本地挂单表（每个 token 每个方向最多一张），按 get_order 的 size_matched 对账，
+  成交增量回调给机器人记持仓
+- MarketMaker.sync(targets)：目标和挂单比对，偏离 >= requote_ticks 个 tick 的撤了重挂
+  · 限频：独立的动作令牌桶，撤单优先（挂着的旧价是风险，少挂一张只是少赚）
+  · 刚挂上不到 min_rest 秒的单只有偏离很大时才撤（避免每个 tick 来回撤改把额度烧光）
+  · 撤单 / 挂单都走批量接口：一次 sync 的所有撤单一个请求、所有新单一个请求
+- 指标：requote 延迟（发现偏离 -> 新单确认）、撤单吞吐、批大小
+"""
+from __future__ import annotations
+
+import math
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from src.clock import Clock, SystemClock
+from src.rate_limit import PRIORITY_CANCEL, PRIORITY_ORDER, RequestScheduler
+from src.strategy import MarketSnapshot
+
+_EPS = 1e-9
+# 对账时认为订单已经不在簿上的状态
+_DONE_STATUSES = {"MATCHED", "FILLED", "CANCELED", "CANCELLED", "EXPIRED", "INVALID"}
+
+
+class MakerQuote(NamedTuple):
+    token_id: str
+    side_name: str          # "UP" / "DOWN"
+    side: str               # "BUY" / "SELL"
+    price: float
+    size: float
+
+
+class MakerOrder(NamedTuple):
+    order_id: str
+    token_id: str
+    side_name: str
+    side: str
+    price: float
+    size: float
+    filled: float           # 已对账的成交量
+    placed_at: float        # 本地 monotonic
+
+
+class OrderTable:
+    """本地挂单表：order_id -> MakerOrder，(token_id, side) -> order_id"""
+
+    def __init__(self):
+        self._orders: Dict[str, MakerOrder] = {}
+        self._slots: Dict[Tuple[str, str], str] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._orders)
+
+    def add(self, order: MakerOrder):
+        with self._lock:
+            self._orders[order.order_id] = order
+            self._slots[(order.token_id, order.side)] = order.order_id
+
+    def get(self, token_id: str, side: str) -> Optional[MakerOrder]:
+        oid = self._slots.get((token_id, side))
+        return self._orders.get(oid) if oid is not None else None
+
+    def pop(self, order_id: str) -> Optional[MakerOrder]:
+        with self._lock:
+            order = self._orders.pop(order_id, None)
+            if order is not None and self._slots.get((order.token_id, order.side)) == order_id:
+                del self._slots[(order.token_id, order.side)]
+            return order
+
+    def apply_fill(self, order_id: str, filled_total: float) -> float:
+        """更新累计成交量，返回新增成交"""
+        with self._lock:
+            order = self._orders.get(order_id)
+            if order is None or filled_total <= order.filled + _EPS:
+                return 0.0
+            delta = min(filled_total, order.size) - order.filled
+            self._orders[order_id] = order._replace(filled=order.filled + delta)
+            return delta
+
+    def orders(self) -> List[MakerOrder]:
+        with self._lock:
+            return list(self._orders.values())
+
+    def clear(self) -> List[MakerOrder]:
+        with self._lock:
+            out = list(self._orders.values())
+            self._orders.clear()
+            self._slots.clear()
+            return out
+
+
+def _floor_tick(price: float, tick: float) -> float:
+    return round(math.floor(price / tick + _EPS) * tick, 4)
+
+
+def _ceil_tick(price: float, tick: float) -> float:
+    return round(math.ceil(price / tick - _EPS) * tick, 4)
+
+
+class MakerQuoter:
+    def __init__(self, half_spread: float = 0.02, size: float = 5.0, max_inventory: float = 10.0,
+                 tick: float = 0.01, stop_secs: float = 30.0):
+        self.half_spread = float(half_spread)
+        self.size = float(size)
+        self.max_inventory = float(max_inventory)
+        self.tick = float(tick)
+        self.stop_secs = float(stop_secs)
+
+    @classmethod
+    def from_config(cls, config) -> "MakerQuoter":
+        size = float(config.MAKER_SIZE or config.ORDER_SIZE)
+        return cls(half_spread=config.MAKER_HALF_SPREAD, size=size,
+                   max_inventory=float(config.MAKER_MAX_INVENTORY or 2 * size),
+                   tick=config.MAKER_TICK, stop_secs=config.MAKER_STOP_SECS)
+
+    def targets(self, snap: MarketSnapshot) -> List[MakerQuote]:
+        if snap.time_to_expiry <= self.stop_secs:
+            return []
+        tick = self.tick
+        out: List[MakerQuote] = []
+        for s in snap.sides:
+            if s.ask is None or s.bid is None:
+                continue
+            ref = s.fair if s.fair is not None else (s.ask + s.bid) / 2.0
+            held = s.position.size if s.position is not None else 0.0
+            if held < self.max_inventory - _EPS:
+                # post-only：买价至少比卖一低一个 tick
+                bid = min(_floor_tick(ref - self.half_spread, tick), _floor_tick(s.ask - tick, tick))
+                size = round(min(self.size, self.max_inventory - held), 2)
+                if bid >= tick and size > 0:
+                    out.append(MakerQuote(s.token_id, s.side_name, "BUY", bid, size))
+            if held > _EPS:
+                ask = max(_ceil_tick(ref + self.half_spread, tick), _ceil_tick(s.bid + tick, tick))
+                if ask <= 1.0 - tick:
+                    out.append(MakerQuote(s.token_id, s.side_name, "SELL", ask, round(held, 2)))
+        return out
+
+
+# on_fill(order, qty) -> None
+FillFn = Callable[[MakerOrder, float], None]
+
+
+class MarketMaker:
+    def __init__(
+        self,
+        client,
+        clock: Optional[Clock] = None,
+        tick: float = 0.01,
+        requote_ticks: int = 1,
+        min_rest: float = 0.5,
+        urgent_ticks: int = 3,
+        max_actions_per_sec: float = 10.0,
+        reconcile_interval: float = 2.0,
+        on_fill: Optional[FillFn] = None,
+    ):
+        """
+        client：TradingClient（或 SimTradingClient），需要 place_limit_order / cancel_orders / get_order_status，
+        有 place_limit_orders 时新单批量挂
+        max_actions_per_sec：本模块自己的撤/挂预算（一次批量请求算一次），在全局 CLOB 限频之下再收一层
+        """
+        self.client = client
+        self.clock = clock or SystemClock()
+        self.tick = float(tick)
+        self.requote_ticks = int(requote_ticks)
+        self.min_rest = float(min_rest)
+        self.urgent_ticks = int(urgent_ticks)
+        self.reconcile_interval = float(reconcile_interval)
+        self.on_fill = on_fill
+        self.table = OrderTable()
+        self.budget = RequestScheduler(
+            "maker", rate=max_actions_per_sec, burst=max(1.0, max_actions_per_sec),
+            reserves={PRIORITY_ORDER: 0.0, PRIORITY_CANCEL: 0.0}, clock=self.clock.monotonic,
+        )
+        self._last_reconcile = -math.inf
+        self._requote_lat: Deque[float] = deque(maxlen=2048)
+        self._cancel_time = 0.0
+        self.counts = {"placed": 0, "place_failed": 0, "canceled": 0, "cancel_batches": 0,
+                       "cancel_failed": 0, "fills": 0, "deferred": 0}
+
+    @classmethod
+    def from_config(cls, client, config, clock: Optional[Clock] = None,
+                    on_fill: Optional[FillFn] = None) -> "MarketMaker":
+        return cls(client, clock=clock, tick=config.MAKER_TICK, requote_ticks=config.MAKER_REQUOTE_TICKS,
+                   min_rest=config.MAKER_MIN_REST, max_actions_per_sec=config.MAKER_MAX_ACTIONS,
+                   reconcile_interval=config.MAKER_RECONCILE_SECS, on_fill=on_fill)
+
+    # -----------------------------
+    # 撤改单
+    # -----------------------------
+    def sync(self, targets: Sequence[MakerQuote]) -> int:
+        """让簿上挂单向 targets 收敛；返回本次撤 + 挂的单数"""
+        t0 = time.perf_counter()
+        now = self.clock.monotonic()
+        want: Dict[Tuple[str, str], MakerQuote] = {(q.token_id, q.side): q for q in targets}
+
+        stale: List[Tuple[float, MakerOrder]] = []
+        for order in self.table.orders():
+            q = want.get((order.token_id, order.side))
+            if q is None:
+                stale.append((math.inf, order))
+                continue
+            moved = abs(q.price - order.price) / self.tick
+            if moved + _EPS < self.requote_ticks and abs(q.size - (order.size - order.filled)) < _EPS + 0.01:
+                del want[(order.token_id, order.side)]  # 挂着的就是想要的
+                continue
+            if now - order.placed_at < self.min_rest and moved + _EPS < self.urgent_ticks:
+                del want[(order.token_id, order.side)]  # 刚挂上：小幅偏离先不动
+                self.counts["deferred"] += 1
+                continue
+            stale.append((moved, order))
+
+        actions = 0
+        if stale:
+            # 一个批量请求撤掉所有过期单；额度不够就整批留到下个 tick
+            if not self.budget.try_acquire(PRIORITY_CANCEL):
+                self.counts["deferred"] += len(stale)
+                return 0
+            stale.sort(key=lambda x: -x[0])
+            ids = [o.order_id for _, o in stale]
+            c0 = time.perf_counter()
+            done = set(self.client.cancel_orders(ids))
+            self._cancel_time += time.perf_counter() - c0
+            self.counts["cancel_batches"] += 1
+            self.counts["canceled"] += len(done)
+            self.counts["cancel_failed"] += len(ids) - len(done)
+            actions += len(done)
+            self._settle([o for _, o in stale if o.order_id in done])
+            for _, o in stale:
+                if o.order_id not in done:
+                    # 撤不掉（多半刚成交）：这个位置这轮不补，等对账
+                    want.pop((o.token_id, o.side), None)
+
+        todo = [q for q in want.values() if self.table.get(q.token_id, q.side) is None]
+        if todo:
+            actions += self._place(todo)
+        if actions:
+            self._requote_lat.append(time.perf_counter() - t0)
+        return actions
+
+    def _place(self, quotes: List[MakerQuote]) -> int:
+        """有批量挂单接口时一个请求挂完（占一个动作额度），否则逐个挂、每单一个额度"""
+        batch_fn = getattr(self.client, "place_limit_orders", None)
+        if batch_fn is not None and len(quotes) > 1:
+            if not self.budget.try_acquire(PRIORITY_ORDER):
+                self.counts["deferred"] += len(quotes)
+                return 0
+            oids = batch_fn([(q.token_id, q.side, q.price, q.size) for q in quotes], post_only=True)
+        else:
+            oids = []
+            for q in quotes:
+                if not self.budget.try_acquire(PRIORITY_ORDER):
+                    self.counts["deferred"] += len(quotes) - len(oids)
+                    break
+                oids.append(self.client.place_limit_order(q.token_id, q.side, q.price, q.size, post_only=True))
+        placed = 0
+        mono = self.clock.monotonic()
+        for q, oid in zip(quotes, oids):
+            if not oid:
+                self.counts["place_failed"] += 1
+                continue
+            self.table.add(MakerOrder(oid, q.token_id, q.side_name, q.side, q.price, q.size, 0.0, mono))
+            placed += 1
+        self.counts["placed"] += placed
+        return placed
+
+    def cancel_all(self) -> int:
+        """全撤（切场 / 停机）；撤不掉的单多半刚成交，最后对一次账再清表"""
+        orders = self.table.orders()
+        if not orders:
+            return 0
+        done = set(self.client.cancel_orders([o.order_id for o in orders]))
+        self.counts["cancel_batches"] += 1
+        self.counts["canceled"] += len(done)
+        self._settle([o for o in orders if o.order_id in done])
+        if len(self.table):
+            self.reconcile(force=True)
+        self.table.clear()
+        return len(done)
+
+    # -----------------------------
+    # 对账
+    # -----------------------------
+    def reconcile(self, force: bool = False) -> float:
+        """按 reconcile_interval 查挂单状态：成交增量回调 on_fill，已结束的单移出本地表；返回新增成交量"""
+        now = self.clock.monotonic()
+        if not force and now - self._last_reconcile < self.reconcile_interval:
+            return 0.0
+        self._last_reconcile = now
+        total = 0.0
+        for order in self.table.orders():
+            delta, status = self._check(order)
+            total += delta
+            cur = self.table.get(order.token_id, order.side)
+            if status in _DONE_STATUSES or (cur is not None and cur.filled >= cur.size - _EPS):
+                self.table.pop(order.order_id)
+        return total
+
+    def _check(self, order: MakerOrder) -> Tuple[float, str]:
+        """查一张单的状态，成交增量记账并回调 on_fill；返回 (新增成交, 状态)"""
+        info = self.client.get_order_status(order.order_id)
+        if not isinstance(info, dict):
+            return 0.0, ""
+        matched = _as_float(info.get("size_matched", info.get("sizeMatched")))
+        status = str(info.get("status") or "").upper()
+        if matched is None and status in ("MATCHED", "FILLED"):
+            matched = order.size
+        delta = self.table.apply_fill(order.order_id, matched) if matched is not None else 0.0
+        if delta > 0:
+            self.counts["fills"] += 1
+            if self.on_fill is not None:
+                self.on_fill(order, delta)
+        return delta, status
+
+    def _settle(self, orders: Sequence[MakerOrder]) -> float:
+        """撤成功的单出表前最后查一次：上次对账到撤单之间的部分成交也要记到持仓里"""
+        total = 0.0
+        for order in orders:
+            total += self._check(order)[0]
+            self.table.pop(order.order_id)
+        return total
+
+    def stats(self) -> Dict[str, float]:
+        lat = sorted(self._requote_lat)
+
+        def pct(p: float) -> Optional[float]:
+            if not lat:
+                return None
+            return round(lat[min(len(lat) - 1, int(p * len(lat)))] * 1000, 2)
+
+        out: Dict[str, float] = dict(self.counts)
+        out["open"] = len(self.table)
+        out["requote_p50_ms"] = pct(0.5)
+        out["requote_p99_ms"] = pct(0.99)
+        out["cancels_per_sec"] = round(self.counts["canceled"] / self._cancel_time, 1) if self._cancel_time > 0 else None
+        out["avg_cancel_batch"] = (
+            round(self.counts["canceled"] / self.counts["cancel_batches"], 2) if self.counts["cancel_batches"] else None
+        )
+        return out
+
+
+def _as_float(v) -> Optional[float]:
+    if v is None:
+        return None
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return None
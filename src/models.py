@@ -0,0 +1,70 @@
+"""
+紧凑的类型化记录（NamedTuple：无 __dict__、不可变、字段访问是 C 级别的元组取值）
+- 在 I/O 边界（lookup / TradingClient）解析一次，策略热路径只碰 float / str
+"""
+from __future__ import annotations
+
+from typing import Iterator, NamedTuple, Optional, Tuple
+
+
+class MarketSlot(NamedTuple):
+    """一场市场（一个 15m 时间槽）"""
+    market_id: int
+    question: str
+    slug: str
+    start_ts: int
+    end_ts: int
+    is_live: bool
+    volume: float = 0.0
+    condition_id: str = ""  # CTF conditionId（赎回用；老快照里没有）
+
+
+class TokenPair(NamedTuple):
+    """同一场的 UP / DOWN clob token_id"""
+    up: str
+    down: str
+
+    def items(self) -> Iterator[Tuple[str, str]]:
+        """兼容原来的 {"UP": .., "DOWN": ..} 遍历方式"""
+        yield "UP", self.up
+        yield "DOWN", self.down
+
+    def get(self, side_name: str) -> Optional[str]:
+        if side_name == "UP":
+            return self.up
+        if side_name == "DOWN":
+            return self.down
+        return None
+
+    def to_dict(self) -> dict:
+        return {"UP": self.up, "DOWN": self.down}
+
+
+class Quote(NamedTuple):
+    """
+    单个 token 的买一/卖一（已是 float；取不到为 None）
+    sent_ts / recv_ts：本地单调时钟，最早那条腿发出请求 / 收到响应的时刻（推送源两者相同）
+    exchange_ts：交易所给的盘口时间（unix 秒；/price 不带，为 None）
+    """
+    ask: Optional[float]
+    bid: Optional[float]
+    sent_ts: Optional[float] = None
+    recv_ts: Optional[float] = None
+    exchange_ts: Optional[float] = None
+
+    def age(self, now_mono: float) -> Optional[float]:
+        """数据最多有多旧：从最早一次请求发出算起（在途时间也算，慢请求回来的价不会显得新鲜）"""
+        if self.sent_ts is None:
+            return None
+        return now_mono - self.sent_ts
+
+
+class Position(NamedTuple):
+    token_id: str
+    side_name: str
+    side: str
+    price: float
+    size: float
+    order_id: str
+    slug: str
+    account: Optional[str] = None
@@ -0,0 +1,148 @@
+"""
+轮询节奏策略（REST 轮询模式）
+- FixedPollPolicy：固定间隔（原来的 1 秒）
+- AdaptivePollPolicy：价格离最近的触发价越近、离收盘越近，轮询越快；
+  离得远或市场还没开始（is_live=False）就放慢
+  触发价从策略引擎里取：每个阈值策略（含 STRATEGY_VARIANTS）的买卖阈值，
+  公允价策略的 fair - min_edge / fair + exit_edge（要 SideQuote.fair）
+策略是纯函数（只看 PollState），方便单独测试 / 替换
+"""
+from __future__ import annotations
+
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+
+class SideQuote(NamedTuple):
+    ask: Optional[float]
+    bid: Optional[float]
+    can_buy: bool        # 本场这个方向还没买过且无持仓
+    has_position: bool
+    fair: Optional[float] = None     # 模型公允价（没开 FAIR_VALUE 或还算不出来时为 None）
+
+
+class PollState(NamedTuple):
+    now: float
+    start_ts: int
+    end_ts: int
+    is_live: bool
+    sides: Dict[str, SideQuote]
+    spot_momentum_bps: float = 0.0   # BTC 现货最近几秒的涨跌（没接现货行情时为 0）
+
+
+def strategy_triggers(strategies) -> Tuple[List[Tuple[float, float]], List[Tuple[float, float]]]:
+    """从策略里取触发价：阈值类（buy_price / sell_price）-> thresholds，公允价类（min_edge / exit_edge）-> fair_edges"""
+    thresholds: List[Tuple[float, float]] = []
+    fair_edges: List[Tuple[float, float]] = []
+    for s in strategies:
+        if hasattr(s, "buy_price") and hasattr(s, "sell_price"):
+            thresholds.append((s.buy_price, s.sell_price))
+        elif hasattr(s, "min_edge") and hasattr(s, "exit_edge"):
+            fair_edges.append((s.min_edge, s.exit_edge))
+    return thresholds, fair_edges
+
+
+class PollPolicy:
+    def next_interval(self, state: PollState) -> float:
+        raise NotImplementedError
+
+
+class FixedPollPolicy(PollPolicy):
+    def __init__(self, interval: float = 1.0):
+        self.interval = float(interval)
+
+    def next_interval(self, state: PollState) -> float:
+        return self.interval
+
+
+class AdaptivePollPolicy(PollPolicy):
+    def __init__(
+        self,
+        buy_price: float,
+        sell_price: float,
+        min_interval: float = 0.25,
+        max_interval: float = 5.0,
+        near_band: float = 0.03,
+        far_band: float = 0.20,
+        close_window: float = 60.0,
+        arm_bps: float = 0.0,
+        thresholds: Sequence[Tuple[float, float]] = (),
+        fair_edges: Sequence[Tuple[float, float]] = (),
+    ):
+        """
+        thresholds：其它阈值策略的 (buy_price, sell_price)，和 buy_price / sell_price 一起算最近的触发价
+        fair_edges：公允价策略的 (min_edge, exit_edge)
+        """
+        self.buy_price = float(buy_price)
+        self.sell_price = float(sell_price)
+        # 买看最高的买入阈值、卖看最低的卖出阈值（最先被碰到的那个）
+        self.buy_trigger = max([self.buy_price] + [float(b) for b, _ in thresholds])
+        self.sell_trigger = min([self.sell_price] + [float(s) for _, s in thresholds])
+        self.min_edge = min((float(e) for e, _ in fair_edges), default=None)
+        self.exit_edge = min((float(e) for _, e in fair_edges), default=None)
+        self.min_interval = float(min_interval)
+        self.max_interval = float(max_interval)
+        self.near_band = float(near_band)
+        self.far_band = max(float(far_band), self.near_band + 1e-9)
+        self.close_window = float(close_window)
+        self.arm_bps = float(arm_bps)
+
+    @classmethod
+    def from_config(cls, config, engine=None) -> "AdaptivePollPolicy":
+        """engine：策略引擎（StrategyEngine），触发价取自它的策略；不传只看 BUY_PRICE / SELL_PRICE"""
+        thresholds, fair_edges = strategy_triggers(engine.strategies) if engine is not None else ([], [])
+        return cls(
+            buy_price=config.BUY_PRICE,
+            sell_price=config.SELL_PRICE,
+            min_interval=config.POLL_MIN_INTERVAL,
+            max_interval=config.POLL_MAX_INTERVAL,
+            near_band=config.POLL_NEAR_BAND,
+            far_band=config.POLL_FAR_BAND,
+            close_window=config.POLL_CLOSE_WINDOW,
+            arm_bps=getattr(config, "SPOT_ARM_BPS", 0.0),
+            thresholds=thresholds,
+            fair_edges=fair_edges,
+        )
+
+    def trigger_distance(self, state: PollState) -> Optional[float]:
+        """离最近一个能触发的阈值还有多远；没有任何可触发条件返回 None；缺报价返回 0（尽快重试）"""
+        best: Optional[float] = None
+        for q in state.sides.values():
+            if q.can_buy:
+                if q.ask is None:
+                    return 0.0
+                d = max(0.0, q.ask - self.buy_trigger)
+                if self.min_edge is not None and q.fair is not None:
+                    d = min(d, max(0.0, q.ask - (q.fair - self.min_edge)))
+                best = d if best is None else min(best, d)
+            if q.has_position:
+                if q.bid is None:
+                    return 0.0
+                d = max(0.0, self.sell_trigger - q.bid)
+                if self.exit_edge is not None and q.fair is not None:
+                    d = min(d, max(0.0, q.fair + self.exit_edge - q.bid))
+                best = d if best is None else min(best, d)
+        return best
+
+    def next_interval(self, state: PollState) -> float:
+        lo, hi = self.min_interval, self.max_interval
+
+        # 市场未开始：睡到开盘（但不超过 hi，保证切场检查照常进行）
+        if not state.is_live:
+            if state.start_ts and state.start_ts > state.now:
+                return max(lo, min(hi, state.start_ts - state.now))
+            return hi
+
+        # 临近收盘：最快
+        if state.end_ts and (state.end_ts - state.now) <= self.close_window:
+            return lo
+
+        # 现货刚动（领先盘口几百毫秒）：最快
+        if self.arm_bps > 0 and abs(state.spot_momentum_bps) >= self.arm_bps:
+            return lo
+
+        d = self.trigger_distance(state)
+        if d is None:
+            return hi
+        frac = (d - self.near_band) / (self.far_band - self.near_band)
+        frac = min(1.0, max(0.0, frac))
+        return lo + (hi - lo) * frac
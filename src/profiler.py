@@ -0,0 +1,192 @@
+"""
+按需采样分析（生产环境 tick 变慢时看时间花在哪：JSON 解析 / 签名 / print / 重试分支 ...）
+- SamplingProfiler：后台线程每 interval 秒读一次交易线程的调用栈（sys._current_frames），
+  跑 N 秒后写火焰图文件：.collapsed（flamegraph.pl / speedscope 都能读）+ .speedscope.json
+  开销：默认 5ms 一次，每次只在采样线程里走一遍栈（几十微秒），交易线程不插桩
+  采样线程要拿到 GIL 才能读栈：落点偏向线程让出 GIL 的地方（网络等待 / 锁 / 每 switchinterval 一次的强制切换），
+  生产里 tick 以 I/O 为主时分布是准的；纯 CPU 的小段（微秒级）会被并到附近的等待点上
+- tick_phase：主循环各阶段打标签（roll / fetch / decide / post / sign / idle），
+  采样时作为栈的第一帧，火焰图最上层直接按阶段分开
+- 触发：kill -USR2 <pid>（PROFILE_SIGNAL）或控制面 POST /profile {"seconds": 10}
+
+用法：
+    kill -USR2 $(pgrep -f src.arbitrage_bot)     # 采 PROFILE_SECS 秒，写到 PROFILE_DIR
+    python -m src.sim --hours 6 --profile profiles/sim
+"""
+from __future__ import annotations
+
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from types import FrameType
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# 线程 id -> 当前阶段；只有打了标签的线程（加上 start 时指定的线程）会被采样
+_phases: Dict[int, str] = {}
+
+_Frame = Tuple[str, str, int]       # (函数名, 文件, 首行号)
+
+
+class tick_phase:
+    """with tick_phase("fetch"): ...  可嵌套，退出时恢复外层阶段；一次进出只是两次 dict 写"""
+    __slots__ = ("name", "_tid", "_prev")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        tid = self._tid = threading.get_ident()
+        self._prev = _phases.get(tid)
+        _phases[tid] = self.name
+        return self
+
+    def __exit__(self, *exc):
+        if self._prev is None:
+            _phases.pop(self._tid, None)
+        else:
+            _phases[self._tid] = self._prev
+        return False
+
+
+def current_phase(tid: Optional[int] = None) -> Optional[str]:
+    return _phases.get(threading.get_ident() if tid is None else tid)
+
+
+def _frame_key(f: FrameType) -> _Frame:
+    code = f.f_code
+    module = f.f_globals.get("__name__", "")
+    return f"{module}.{getattr(code, 'co_qualname', code.co_name)}", code.co_filename, code.co_firstlineno
+
+
+class SamplingProfiler:
+    def __init__(self, interval: float = 0.005, threads: Iterable[int] = (), max_depth: int = 96,
+                 on_done: Optional[Callable[["SamplingProfiler"], None]] = None):
+        self.interval = float(interval)
+        self.threads = set(threads)
+        self.max_depth = int(max_depth)
+        self.on_done = on_done
+        self.samples: Counter = Counter()       # (phase, 栈 root->leaf) -> 次数
+        self.sample_count = 0
+        self.sample_cost = 0.0                  # 采样线程自己花的时间（估算开销）
+        self.started_at = 0.0
+        self.duration = 0.0
+        self.paths: List[str] = []
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, seconds: float) -> "SamplingProfiler":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, args=(float(seconds),), name="profiler", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5.0)
+
+    def _run(self, seconds: float):
+        me = threading.get_ident()
+        self.started_at = time.time()
+        t0 = time.perf_counter()
+        deadline = t0 + seconds
+        while not self._stop.is_set() and time.perf_counter() < deadline:
+            s0 = time.perf_counter()
+            self.sample_once(exclude=me)
+            self.sample_cost += time.perf_counter() - s0
+            self._stop.wait(self.interval)
+        self.duration = time.perf_counter() - t0
+        if self.on_done is not None:
+            self.on_done(self)
+
+    def sample_once(self, exclude: Optional[int] = None):
+        frames = sys._current_frames()
+        for tid in self.threads | set(_phases):
+            if tid == exclude:
+                continue
+            f = frames.get(tid)
+            if f is None:
+                continue
+            stack: List[_Frame] = []
+            while f is not None and len(stack) < self.max_depth:
+                stack.append(_frame_key(f))
+                f = f.f_back
+            stack.reverse()
+            self.samples[(_phases.get(tid) or "other", tuple(stack))] += 1
+            self.sample_count += 1
+
+    # -----------------------------
+    # 输出
+    # -----------------------------
+    def by_phase(self) -> Dict[str, int]:
+        out: Counter = Counter()
+        for (ph, _), n in self.samples.items():
+            out[ph] += n
+        return dict(out.most_common())
+
+    def collapsed(self) -> str:
+        """flamegraph.pl 格式：phase;root;...;leaf 次数"""
+        lines = []
+        for (ph, stack), n in self.samples.most_common():
+            lines.append(";".join([f"[{ph}]"] + [name for name, _, _ in stack]) + f" {n}")
+        return "\n".join(lines) + "\n"
+
+    def speedscope(self, name: str = "trading loop") -> Dict:
+        """speedscope 的 sampled 格式：每个 (阶段, 栈) 一条样本，权重 = 次数 × 采样间隔（毫秒）"""
+        index: Dict[_Frame, int] = {}
+        frames: List[Dict] = []
+
+        def idx(fr: _Frame) -> int:
+            i = index.get(fr)
+            if i is None:
+                i = index[fr] = len(frames)
+                frames.append({"name": fr[0], "file": fr[1], "line": fr[2]})
+            return i
+
+        samples, weights = [], []
+        for (ph, stack), n in self.samples.most_common():
+            samples.append([idx((f"[{ph}]", "", 0))] + [idx(fr) for fr in stack])
+            weights.append(round(n * self.interval * 1000, 3))
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled", "name": name, "unit": "milliseconds",
+                "startValue": 0, "endValue": round(sum(weights), 3),
+                "samples": samples, "weights": weights,
+            }],
+            "exporter": "src.profiler",
+        }
+
+    def write(self, path: str) -> List[str]:
+        """写 <前缀>.speedscope.json 和 <前缀>.collapsed（path 带 .speedscope.json / 其他扩展名时先去掉）"""
+        base = path[:-len(".speedscope.json")] if path.endswith(".speedscope.json") else os.path.splitext(path)[0]
+        os.makedirs(os.path.dirname(os.path.abspath(base)), exist_ok=True)
+        out = [base + ".speedscope.json", base + ".collapsed"]
+        with open(out[0], "w", encoding="utf-8") as f:
+            json.dump(self.speedscope(), f, separators=(",", ":"))
+        with open(out[1], "w", encoding="utf-8") as f:
+            f.write(self.collapsed())
+        self.paths = out
+        return out
+
+    def stats(self) -> Dict:
+        return {
+            "running": self.running,
+            "samples": self.sample_count,
+            "duration_s": round(self.duration, 2),
+            "overhead_pct": round(self.sample_cost / self.duration * 100, 2) if self.duration else None,
+            "phases": self.by_phase(),
+            "files": self.paths,
+        }
+
+
+def default_path(directory: str) -> str:
+    return os.path.join(directory, time.strftime("profile-%Y%m%d-%H%M%S"))
@@ -0,0 +1,205 @@
+"""
+报价源路由（按健康度选源，而不是每 tick 先试一个失败了再退）
+- 报价源：price（/price 买卖各一次）、book（/book 一次拿买一卖一）、ws（BookFeed 推送的本地盘口）
+- SourceHealth：每个源滚动记录成功率 / 延迟；连续失败或成功率太低就熔断（open），
+  冷却时间到了放一个探测请求（half_open）：成功恢复，失败冷却翻倍（有上限）
+- QuoteRouter.get_quote：探测到期的源优先（顺便就是这次的报价），其余按 延迟 / 成功率 排序；
+  失败才换下一个源，每个源每次最多调一次（不再重复调用 get_price）
+  每 explore_every 次请求让排第二的健康源先上一次，免得备用源的延迟样本一直停在老数据上
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, NamedTuple, Optional, Sequence
+
+from src.hedging import LatencyTracker
+from src.models import Quote
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class QuoteSourceError(Exception):
+    """报价源没给出可用报价（行情断线 / 还没收到盘口 / 接口返回空）"""
+
+
+class QuoteSource(NamedTuple):
+    name: str
+    fetch: Callable[[str], Quote]     # token_id -> Quote；失败抛异常
+
+
+class SourceHealth:
+    def __init__(self, name: str, window: int = 50, trip_after: int = 3, min_success: float = 0.5,
+                 min_samples: int = 10, cooldown: float = 5.0, max_cooldown: float = 60.0):
+        self.name = name
+        self.trip_after = int(trip_after)
+        self.min_success = float(min_success)
+        self.min_samples = int(min_samples)
+        self.base_cooldown = float(cooldown)
+        self.max_cooldown = float(max_cooldown)
+        self._outcomes: Deque[bool] = deque(maxlen=window)
+        self.latency = LatencyTracker(window)
+        self.state = CLOSED
+        self.cooldown = self.base_cooldown
+        self.open_until = 0.0
+        self.probing = False
+        self.fail_streak = 0
+        self.calls = 0
+        self.failures = 0
+        self.trips = 0
+
+    # -----------------------------
+    # 统计
+    # -----------------------------
+    def success_rate(self) -> Optional[float]:
+        if not self._outcomes:
+            return None
+        return sum(self._outcomes) / len(self._outcomes)
+
+    def score(self) -> float:
+        """越小越好：p50 延迟 / 成功率；还没有样本的源记 0（先试一次才知道）"""
+        p50 = self.latency.percentile(0.5)
+        if p50 is None:
+            return 0.0
+        rate = self.success_rate()
+        return p50 / max(0.05, rate if rate is not None else 1.0)
+
+    # -----------------------------
+    # 熔断
+    # -----------------------------
+    def probe_due(self, now: float) -> bool:
+        return self.state == OPEN and now >= self.open_until and not self.probing
+
+    def record(self, ok: bool, seconds: float, now: float):
+        self.calls += 1
+        self._outcomes.append(ok)
+        if ok:
+            # 失败的请求多半是超时，延迟只记成功的，不然排序会被超时时长带偏
+            self.latency.add(seconds)
+            self.fail_streak = 0
+            if self.state != CLOSED:
+                self.state = CLOSED
+                self.cooldown = self.base_cooldown
+            self.probing = False
+            return
+        self.failures += 1
+        self.fail_streak += 1
+        if self.state != CLOSED:
+            # 探测失败：继续熔断，冷却翻倍
+            self.cooldown = min(self.max_cooldown, self.cooldown * 2)
+            self._trip(now)
+            return
+        rate = self.success_rate()
+        if self.fail_streak >= self.trip_after or (
+            len(self._outcomes) >= self.min_samples and rate is not None and rate < self.min_success
+        ):
+            self._trip(now)
+
+    def _trip(self, now: float):
+        if self.state == CLOSED:
+            self.trips += 1
+        self.state = OPEN
+        self.open_until = now + self.cooldown
+        self.probing = False
+        # 成功率窗口清空：恢复后重新积累，不被熔断前的失败拖着马上又熔断
+        self._outcomes.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        p50 = self.latency.percentile(0.5)
+        p99 = self.latency.percentile(0.99)
+        rate = self.success_rate()
+        return {
+            "state": self.state,
+            "calls": self.calls,
+            "failures": self.failures,
+            "trips": self.trips,
+            "success_rate": round(rate, 3) if rate is not None else None,
+            "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "p99_ms": round(p99 * 1000, 1) if p99 is not None else None,
+        }
+
+
+class QuoteRouter:
+    def __init__(self, sources: Sequence[QuoteSource] = (), clock: Callable[[], float] = time.monotonic,
+                 explore_every: int = 50, **health_kwargs):
+        self._clock = clock
+        self.explore_every = int(explore_every)
+        self._requests = 0
+        self._health_kwargs = health_kwargs
+        self._lock = threading.Lock()
+        self._sources: List[QuoteSource] = []
+        self.health: Dict[str, SourceHealth] = {}
+        self.served: Dict[str, int] = {}
+        self.exhausted = 0
+        for s in sources:
+            self.add(s)
+
+    @classmethod
+    def from_config(cls, config, sources: Sequence[QuoteSource] = ()) -> "QuoteRouter":
+        return cls(
+            sources,
+            window=config.QUOTE_HEALTH_WINDOW,
+            trip_after=config.QUOTE_TRIP_AFTER,
+            min_success=config.QUOTE_MIN_SUCCESS,
+            cooldown=config.QUOTE_PROBE_SECS,
+            max_cooldown=config.QUOTE_PROBE_MAX_SECS,
+            explore_every=config.QUOTE_EXPLORE_EVERY,
+        )
+
+    def add(self, source: QuoteSource):
+        """注册报价源（同名替换）；注册顺序是没有样本时的优先级"""
+        with self._lock:
+            self._sources = [s for s in self._sources if s.name != source.name] + [source]
+            self.health[source.name] = SourceHealth(source.name, **self._health_kwargs)
+            self.served.setdefault(source.name, 0)
+
+    def _plan(self, now: float) -> List[QuoteSource]:
+        """本次请求的尝试顺序：到期探测的源 -> 可用源按分数（同分按注册顺序）；熔断中的不试"""
+        probes: List[QuoteSource] = []
+        ready: List[QuoteSource] = []
+        with self._lock:
+            for s in self._sources:
+                h = self.health[s.name]
+                if h.probe_due(now):
+                    h.probing = True     # 并发请求只放一个探测
+                    h.state = HALF_OPEN
+                    probes.append(s)
+                elif h.state == CLOSED:
+                    ready.append(s)
+            ready.sort(key=lambda s: self.health[s.name].score())
+            self._requests += 1
+            if self.explore_every > 0 and self._requests % self.explore_every == 0 and len(ready) > 1:
+                ready[0], ready[1] = ready[1], ready[0]
+        return probes + ready
+
+    def get_quote(self, token_id: str) -> Quote:
+        """所有源都不可用（全熔断或全失败）时返回 Quote(None, None)，调用方按取不到行情处理"""
+        for s in self._plan(self._clock()):
+            t0 = time.perf_counter()
+            try:
+                q = s.fetch(token_id)
+                ok = True
+            except Exception:
+                q, ok = None, False
+            elapsed = time.perf_counter() - t0
+            with self._lock:
+                self.health[s.name].record(ok, elapsed, self._clock())
+                if ok:
+                    self.served[s.name] += 1
+            if ok:
+                return q
+        with self._lock:
+            self.exhausted += 1
+        return Quote(None, None)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            out = {}
+            for s in self._sources:
+                d = self.health[s.name].stats()
+                d["served"] = self.served[s.name]
+                out[s.name] = d
+            return out
@@ -0,0 +1,262 @@
+"""
+客户端限频（令牌桶 + 优先级）
+- 所有 CLOB / Gamma 请求先拿令牌再发
+- 优先级：下单 > 撤单 > 报价 > 市场发现
+  低优先级只能用桶里“保留线”以上的令牌，并且有高优先级在等时让路，
+  所以 1 秒轮询 / 10 秒切场检查再多，也不会把下单饿死
+- 收到 429 时按 Retry-After 暂停整个桶
+- usage() 返回当前额度使用情况
+"""
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+PRIORITY_ORDER = 0
+PRIORITY_CANCEL = 1
+PRIORITY_QUOTE = 2
+PRIORITY_DISCOVERY = 3
+
+PRIORITY_NAMES = {
+    PRIORITY_ORDER: "order",
+    PRIORITY_CANCEL: "cancel",
+    PRIORITY_QUOTE: "quote",
+    PRIORITY_DISCOVERY: "discovery",
+}
+
+# 每个优先级拿令牌时桶里至少要剩下的比例（相对 burst）
+DEFAULT_RESERVES = {
+    PRIORITY_ORDER: 0.0,
+    PRIORITY_CANCEL: 0.1,
+    PRIORITY_QUOTE: 0.3,
+    PRIORITY_DISCOVERY: 0.5,
+}
+
+# 各优先级默认最多等多久（秒）；等不到就放弃这次请求（报价/发现下一轮再来）
+DEFAULT_WAIT = {
+    PRIORITY_ORDER: 5.0,
+    PRIORITY_CANCEL: 3.0,
+    PRIORITY_QUOTE: 0.5,
+    PRIORITY_DISCOVERY: 2.0,
+}
+
+DEFAULT_429_PENALTY = 1.0
+
+
+class RateLimited(Exception):
+    """等不到令牌（或处于 Retry-After 暂停期）"""
+
+
+def retry_after_from(obj: Any) -> Optional[float]:
+    """
+    从 requests.Response / httpx.Response / PolyApiException 里识别 429，返回需要暂停的秒数
+    不是 429 返回 None
+    """
+    status = getattr(obj, "status_code", None)
+    if status != 429:
+        return None
+    headers = getattr(obj, "headers", None)
+    if headers is None:
+        headers = getattr(getattr(obj, "resp", None), "headers", None)
+    raw = None
+    if headers is not None:
+        try:
+            raw = headers.get("Retry-After")
+        except Exception:
+            raw = None
+    try:
+        return max(0.0, float(raw)) if raw is not None else DEFAULT_429_PENALTY
+    except (TypeError, ValueError):
+        return DEFAULT_429_PENALTY
+
+
+class RequestScheduler:
+    def __init__(
+        self,
+        name: str,
+        rate: float,
+        burst: float,
+        reserves: Optional[Dict[int, float]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self._reserves = dict(DEFAULT_RESERVES if reserves is None else reserves)
+        self._clock = clock
+        self._tokens = self.burst
+        self._last = clock()
+        self._blocked_until = 0.0
+        self._cond = threading.Condition()
+        self._waiting = {p: 0 for p in PRIORITY_NAMES}
+        self._n_waiting = 0
+        self._granted = {p: 0 for p in PRIORITY_NAMES}
+        self._rejected = {p: 0 for p in PRIORITY_NAMES}
+        self._throttled_429 = 0
+
+    # -----------------------------
+    # 令牌桶
+    # -----------------------------
+    def _refill(self, now: float):
+        if now > self._last:
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+
+    def _floor(self, priority: int) -> float:
+        return self._reserves.get(priority, 0.0) * self.burst
+
+    def _higher_waiting(self, priority: int) -> bool:
+        return any(n for p, n in self._waiting.items() if p < priority)
+
+    def _try_take(self, priority: int, now: float) -> Optional[float]:
+        """拿到返回 None；拿不到返回建议等待的秒数"""
+        if now < self._blocked_until:
+            return self._blocked_until - now
+        self._refill(now)
+        need = 1.0 + self._floor(priority)
+        if self._tokens >= need and not (self._n_waiting and self._higher_waiting(priority)):
+            self._tokens -= 1.0
+            return None
+        if self.rate <= 0:
+            return 0.05
+        return max(0.001, (need - self._tokens) / self.rate)
+
+    def try_acquire(self, priority: int = PRIORITY_QUOTE) -> bool:
+        with self._cond:
+            ok = self._try_take(priority, self._clock()) is None
+            if ok:
+                self._granted[priority] += 1
+            else:
+                self._rejected[priority] += 1
+            return ok
+
+    def acquire(self, priority: int = PRIORITY_QUOTE, timeout: Optional[float] = None) -> bool:
+        if timeout is None:
+            timeout = DEFAULT_WAIT.get(priority, 1.0)
+        with self._cond:
+            start = self._clock()
+            delay = self._try_take(priority, start)
+            if delay is None:
+                self._granted[priority] += 1
+                return True
+            self._waiting[priority] += 1
+            self._n_waiting += 1
+            try:
+                while True:
+                    remaining = timeout - (self._clock() - start)
+                    if remaining <= 0:
+                        self._rejected[priority] += 1
+                        return False
+                    self._cond.wait(min(delay, remaining))
+                    delay = self._try_take(priority, self._clock())
+                    if delay is None:
+                        self._granted[priority] += 1
+                        return True
+            finally:
+                self._waiting[priority] -= 1
+                self._n_waiting -= 1
+                self._cond.notify_all()
+
+    def penalize(self, seconds: float):
+        """服务端要求退避（Retry-After）：暂停整个桶并清空令牌"""
+        with self._cond:
+            self._throttled_429 += 1
+            self._blocked_until = max(self._blocked_until, self._clock() + max(0.0, float(seconds)))
+            self._tokens = 0.0
+            self._last = self._blocked_until
+
+    def call(self, priority: int, fn: Callable, *args, timeout: Optional[float] = None, **kwargs):
+        """拿令牌后调用 fn；识别 429（返回值或异常）并自动 penalize"""
+        if not self.acquire(priority, timeout):
+            raise RateLimited(f"{self.name}: {PRIORITY_NAMES.get(priority, priority)} 请求额度不足")
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            wait = retry_after_from(e)
+            if wait is not None:
+                self.penalize(wait)
+            raise
+        wait = retry_after_from(result)
+        if wait is not None:
+            self.penalize(wait)
+        return result
+
+    # -----------------------------
+    # 观测
+    # -----------------------------
+    def available(self) -> float:
+        with self._cond:
+            now = self._clock()
+            if now < self._blocked_until:
+                return 0.0
+            self._refill(now)
+            return self._tokens
+
+    def usage(self) -> Dict[str, Any]:
+        with self._cond:
+            now = self._clock()
+            if now >= self._blocked_until:
+                self._refill(now)
+            return {
+                "name": self.name,
+                "tokens": round(self._tokens, 3),
+                "burst": self.burst,
+                "rate": self.rate,
+                "used_pct": round(100.0 * (1.0 - self._tokens / self.burst), 1) if self.burst else 0.0,
+                "blocked_for": round(max(0.0, self._blocked_until - now), 3),
+                "granted": {PRIORITY_NAMES[p]: n for p, n in self._granted.items()},
+                "rejected": {PRIORITY_NAMES[p]: n for p, n in self._rejected.items()},
+                "waiting": {PRIORITY_NAMES[p]: n for p, n in self._waiting.items()},
+                "throttled_429": self._throttled_429,
+            }
+
+
+# -----------------------------
+# 进程级共享：lookup.py 和 TradingClient 用同一组桶
+# -----------------------------
+_SCHEDULERS: Dict[str, RequestScheduler] = {}
+_SCHEDULERS_LOCK = threading.Lock()
+
+# name -> (rate/s, burst)
+_BUILTIN_LIMITS = {
+    "clob": (20.0, 40.0),
+    "gamma": (5.0, 10.0),
+}
+_DEFAULT_LIMITS = dict(_BUILTIN_LIMITS)
+
+
+def configure_schedulers(config) -> None:
+    """按 Config 重建共享桶（启动时调用一次）"""
+    limits = {
+        "clob": (float(config.CLOB_RATE_PER_SEC), float(config.CLOB_BURST)),
+        "gamma": (float(config.GAMMA_RATE_PER_SEC), float(config.GAMMA_BURST)),
+    }
+    with _SCHEDULERS_LOCK:
+        for name, (rate, burst) in limits.items():
+            _DEFAULT_LIMITS[name] = (rate, burst)
+            _SCHEDULERS[name] = RequestScheduler(name, rate, burst)
+
+
+def reset_schedulers() -> None:
+    """丢掉共享桶并恢复内置额度（测试之间 / 同一进程里换一个机器人实例时调用）；
+    已经拿到旧桶的客户端继续用旧桶，之后 get_scheduler 拿到的是新桶"""
+    with _SCHEDULERS_LOCK:
+        _SCHEDULERS.clear()
+        _DEFAULT_LIMITS.clear()
+        _DEFAULT_LIMITS.update(_BUILTIN_LIMITS)
+
+
+def get_scheduler(name: str) -> RequestScheduler:
+    with _SCHEDULERS_LOCK:
+        sched = _SCHEDULERS.get(name)
+        if sched is None:
+            rate, burst = _DEFAULT_LIMITS.get(name, (10.0, 20.0))
+            sched = _SCHEDULERS[name] = RequestScheduler(name, rate, burst)
+        return sched
+
+
+def budget_usage() -> Dict[str, Dict[str, Any]]:
+    with _SCHEDULERS_LOCK:
+        scheds = list(_SCHEDULERS.values())
+    return {s.name: s.usage() for s in scheds}
@@ -0,0 +1,422 @@
+"""
+到期赎回（切场后把上一场的赢家份额换回 USDC，资金几秒内回到余额里给下一场用）
+- 切场时机器人把上一场的持仓（单腿 + 成对）打包成 RedeemItem 交给 RedemptionWorker
+- 后台线程按 poll_interval 查结算结果（CTF payoutDenominator / payoutNumerators），
+  结算了的：输家直接记 0，赢家攒成一批一起赎回
+- Web3Redeemer：
+  · POLYMARKET_SIGNATURE_TYPE=1（代理钱包，默认）：一笔 ProxyWalletFactory.proxy() 交易里带多个 redeemPositions
+  · POLYMARKET_SIGNATURE_TYPE=0（EOA）：每场一笔 redeemPositions，nonce 本地递增连发，再统一等回执
+  · POLYMARKET_SIGNATURE_TYPE=2（Gnosis Safe）：需要 Safe 签名流程，这里不支持；
+    代理钱包没配 PROXY_FACTORY_ADDRESS 同样不支持——这两种第一次处理时就放弃（打一次日志，留给手动赎回）
+  · nonce 本地管理（pending 计数起步，出错重新同步）；EIP-1559 手续费 = 2×baseFee + tip（tip 不低于 REDEEM_MIN_TIP_GWEI）
+- 多账户：持仓按 Position.account 分成各自的 RedeemItem，每个账户用自己的私钥 / funder 查余额、发赎回交易
+- 合约地址 / RPC 都可配置：指向本地 anvil 上部署的 CTF 就能端到端验证
+"""
+from __future__ import annotations
+
+import threading
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from src.account_pool import PRIMARY_ACCOUNT
+from src.clock import Clock, SystemClock
+from src.models import TokenPair
+
+ZERO_BYTES32 = b"\x00" * 32
+
+_CTF_ABI = [
+    {"name": "payoutDenominator", "type": "function", "stateMutability": "view",
+     "inputs": [{"name": "conditionId", "type": "bytes32"}], "outputs": [{"name": "", "type": "uint256"}]},
+    {"name": "payoutNumerators", "type": "function", "stateMutability": "view",
+     "inputs": [{"name": "conditionId", "type": "bytes32"}, {"name": "index", "type": "uint256"}],
+     "outputs": [{"name": "", "type": "uint256"}]},
+    {"name": "balanceOf", "type": "function", "stateMutability": "view",
+     "inputs": [{"name": "owner", "type": "address"}, {"name": "id", "type": "uint256"}],
+     "outputs": [{"name": "", "type": "uint256"}]},
+    {"name": "redeemPositions", "type": "function", "stateMutability": "nonpayable",
+     "inputs": [{"name": "collateralToken", "type": "address"}, {"name": "parentCollectionId", "type": "bytes32"},
+                {"name": "conditionId", "type": "bytes32"}, {"name": "indexSets", "type": "uint256[]"}],
+     "outputs": []},
+]
+
+_PROXY_FACTORY_ABI = [
+    {"name": "proxy", "type": "function", "stateMutability": "payable",
+     "inputs": [{"name": "calls", "type": "tuple[]", "components": [
+         {"name": "typeCode", "type": "uint8"}, {"name": "to", "type": "address"},
+         {"name": "value", "type": "uint256"}, {"name": "data", "type": "bytes"}]}],
+     "outputs": [{"name": "returnValues", "type": "bytes[]"}]},
+]
+
+# UP / DOWN 两个结果的 indexSet（outcomes 顺序 ["Up", "Down"]）
+_INDEX_SETS = [1, 2]
+_SHARE_DECIMALS = 1e6
+
+
+class RedeemItem(NamedTuple):
+    slug: str
+    condition_id: str
+    end_ts: int
+    tokens: TokenPair
+    sizes: Dict[str, float]     # token_id -> 机器人记账的份额
+    cost: float                 # 这些份额的买入成本（结算盈亏用）
+    account: str = PRIMARY_ACCOUNT  # 份额在哪个执行池账户里
+
+
+class RedeemResult(NamedTuple):
+    item: RedeemItem
+    payout: float               # 换回的 USDC（输家为 0）
+    tx: Optional[str]
+
+
+class Web3Redeemer:
+    def __init__(self, rpc_url: str, private_key: str, signature_type: int = 1, funder: str = "",
+                 ctf_address: str = "", collateral_address: str = "", proxy_factory_address: str = "",
+                 min_tip_gwei: float = 30.0, receipt_timeout: float = 120.0):
+        self.rpc_url = rpc_url
+        self._key = private_key
+        self.signature_type = int(signature_type)
+        self.funder = funder
+        self.ctf_address = ctf_address
+        self.collateral_address = collateral_address
+        self.proxy_factory_address = proxy_factory_address
+        self.min_tip = int(float(min_tip_gwei) * 1e9)
+        self.receipt_timeout = float(receipt_timeout)
+        self._w3 = None
+        self._account = None
+        self._ctf = None
+        self._factory = None
+        self._nonce: Optional[int] = None
+        self._nonce_lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config) -> "Web3Redeemer":
+        return cls(
+            rpc_url=config.POLYGON_RPC_URL,
+            private_key=config.POLYMARKET_PRIVATE_KEY,
+            signature_type=config.POLYMARKET_SIGNATURE_TYPE,
+            funder=getattr(config, "POLYMARKET_FUNDER", ""),
+            ctf_address=config.CTF_ADDRESS,
+            collateral_address=config.COLLATERAL_ADDRESS,
+            proxy_factory_address=config.PROXY_FACTORY_ADDRESS,
+            min_tip_gwei=config.REDEEM_MIN_TIP_GWEI,
+        )
+
+    # -----------------------------
+    # 连接（web3 延迟到后台线程第一次用时再导入）
+    # -----------------------------
+    def _connect(self):
+        if self._w3 is not None:
+            return self._w3
+        from eth_account import Account
+        from web3 import Web3
+
+        w3 = Web3(Web3.HTTPProvider(self.rpc_url, request_kwargs={"timeout": 15}))
+        self._account = Account.from_key(self._key)
+        self._ctf = w3.eth.contract(address=Web3.to_checksum_address(self.ctf_address), abi=_CTF_ABI)
+        if self.proxy_factory_address:
+            self._factory = w3.eth.contract(
+                address=Web3.to_checksum_address(self.proxy_factory_address), abi=_PROXY_FACTORY_ABI
+            )
+        self._w3 = w3
+        return w3
+
+    @property
+    def holder(self) -> str:
+        """份额实际在哪个地址：代理钱包 / Safe 是 funder，EOA 是自己"""
+        self._connect()
+        if self.signature_type in (1, 2) and self.funder:
+            return self._w3.to_checksum_address(self.funder)
+        return self._account.address
+
+    def unsupported_reason(self) -> Optional[str]:
+        """这个钱包类型 / 配置下没法自动赎回时返回原因（不发任何请求）"""
+        if self.signature_type == 2:
+            return "Gnosis Safe 钱包（POLYMARKET_SIGNATURE_TYPE=2）暂不支持自动赎回"
+        if self.signature_type == 1 and not self.proxy_factory_address:
+            return "代理钱包需要配置 PROXY_FACTORY_ADDRESS"
+        return None
+
+    # -----------------------------
+    # 读链
+    # -----------------------------
+    def resolution(self, condition_id: str) -> Optional[Tuple[float, ...]]:
+        """结算了返回每个结果的赔付比例（UP, DOWN）；还没结算返回 None"""
+        self._connect()
+        cid = _bytes32(condition_id)
+        den = self._ctf.functions.payoutDenominator(cid).call()
+        if not den:
+            return None
+        return tuple(self._ctf.functions.payoutNumerators(cid, i).call() / den for i in range(len(_INDEX_SETS)))
+
+    def balance_of(self, token_id: str) -> Optional[float]:
+        self._connect()
+        raw = self._ctf.functions.balanceOf(self.holder, int(token_id)).call()
+        return raw / _SHARE_DECIMALS
+
+    # -----------------------------
+    # 写链
+    # -----------------------------
+    def _redeem_calldata(self, condition_id: str) -> str:
+        args = [self._w3.to_checksum_address(self.collateral_address), ZERO_BYTES32,
+                _bytes32(condition_id), _INDEX_SETS]
+        encode = getattr(self._ctf, "encode_abi", None) or getattr(self._ctf, "encodeABI")
+        try:
+            return encode("redeemPositions", args=args)
+        except TypeError:
+            return encode(fn_name="redeemPositions", args=args)
+
+    def _take_nonce(self) -> int:
+        with self._nonce_lock:
+            if self._nonce is None:
+                self._nonce = self._w3.eth.get_transaction_count(self._account.address, "pending")
+            n = self._nonce
+            self._nonce += 1
+            return n
+
+    def _reset_nonce(self):
+        with self._nonce_lock:
+            self._nonce = None
+
+    def _fees(self) -> Dict[str, int]:
+        w3 = self._w3
+        try:
+            tip = max(self.min_tip, int(w3.eth.max_priority_fee))
+        except Exception:
+            tip = self.min_tip
+        base = w3.eth.get_block("latest").get("baseFeePerGas")
+        if base is None:
+            return {"gasPrice": int(w3.eth.gas_price)}
+        return {"maxFeePerGas": 2 * int(base) + tip, "maxPriorityFeePerGas": tip}
+
+    def _send(self, fn) -> str:
+        """构造 + 签名 + 发送；nonce 冲突时重新同步再发一次"""
+        w3 = self._w3
+        for attempt in (0, 1):
+            try:
+                tx = fn.build_transaction({
+                    "from": self._account.address,
+                    "nonce": self._take_nonce(),
+                    "chainId": w3.eth.chain_id,
+                    **self._fees(),
+                })
+                tx["gas"] = int(tx["gas"] * 1.25)  # build_transaction 已经估过 gas，留余量
+                signed = self._account.sign_transaction(tx)
+                raw = getattr(signed, "raw_transaction", None) or getattr(signed, "rawTransaction")
+                return w3.eth.send_raw_transaction(raw).hex()
+            except Exception as e:
+                msg = str(e).lower()
+                self._reset_nonce()
+                if attempt == 0 and ("nonce" in msg or "already known" in msg or "underpriced" in msg):
+                    continue
+                raise
+        raise RuntimeError("unreachable")
+
+    def redeem(self, batch: Sequence[Tuple[RedeemItem, float]]) -> Dict[str, str]:
+        """赎回一批（都已结算、都有赢家份额）；返回确认成功的 {condition_id: 交易哈希}"""
+        w3 = self._connect()
+        cids = [it.condition_id for it, _ in batch]
+        reason = self.unsupported_reason()
+        if reason:
+            print(f"⚠️ 赎回：{reason}，请手动赎回")
+            return {}
+        if self.signature_type == 1:
+            ctf = w3.to_checksum_address(self.ctf_address)
+            calls = [(1, ctf, 0, self._redeem_calldata(cid)) for cid in cids]
+            h = self._send(self._factory.functions.proxy(calls))
+            sent = [(cids, h)]
+        else:
+            # EOA：连发（nonce 连号），不等上一笔回执
+            collateral = w3.to_checksum_address(self.collateral_address)
+            sent = [
+                ([cid], self._send(self._ctf.functions.redeemPositions(collateral, ZERO_BYTES32, _bytes32(cid),
+                                                                        _INDEX_SETS)))
+                for cid in cids
+            ]
+        out: Dict[str, str] = {}
+        for group, h in sent:
+            receipt = w3.eth.wait_for_transaction_receipt(h, timeout=self.receipt_timeout)
+            if receipt.get("status") != 1:
+                print(f"❌ 赎回交易失败: {h}")
+                continue
+            for cid in group:
+                out[cid] = h
+        return out
+
+
+def _bytes32(hex_str: str) -> bytes:
+    h = hex_str[2:] if hex_str.startswith(("0x", "0X")) else hex_str
+    return bytes.fromhex(h.rjust(64, "0"))
+
+
+class RedemptionWorker:
+    def __init__(self, redeemer, clock: Optional[Clock] = None, poll_interval: float = 5.0,
+                 max_batch: int = 10, give_up_after: float = 6 * 3600.0,
+                 on_settled: Optional[Callable[[RedeemResult], None]] = None,
+                 redeemer_for: Optional[Callable[[str], Any]] = None):
+        """
+        redeemer：主账户的 Web3Redeemer（或模拟用的替身），需要 resolution / redeem，
+                  可选 balance_of / unsupported_reason；结算结果（链上全局）都用它查
+        redeemer_for：账户名 -> 该账户的赎回后端（第一次用时创建并缓存，返回 None = 没有这个账户）；
+                  不传时所有账户都用 redeemer（模拟 / 单账户）
+        on_settled：每场结算完成（赎回成功或输掉）时在工作线程里回调
+        """
+        self.redeemer = redeemer
+        self.redeemer_for = redeemer_for
+        self._by_account: Dict[str, Any] = {PRIMARY_ACCOUNT: redeemer}
+        self.clock = clock or SystemClock()
+        self.poll_interval = float(poll_interval)
+        self.max_batch = int(max_batch)
+        self.give_up_after = float(give_up_after)
+        self.on_settled = on_settled
+        self._pending: List[RedeemItem] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.counts = {"queued": 0, "redeemed": 0, "lost": 0, "txs": 0, "failed": 0, "abandoned": 0}
+        self.redeemed_usdc = 0.0
+
+    def submit(self, item: RedeemItem):
+        if not item.condition_id:
+            print(f"⚠️ 赎回：{item.slug} 没有 conditionId，跳过（需要手动赎回）")
+            return
+        with self._lock:
+            self._pending.append(item)
+            self.counts["queued"] += 1
+
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def _redeemer_of(self, account: str):
+        r = self._by_account.get(account)
+        if r is None and account not in self._by_account:
+            r = self.redeemer_for(account) if self.redeemer_for is not None else self.redeemer
+            self._by_account[account] = r
+        return r
+
+    def _abandon(self, it: RedeemItem, reason: str):
+        print(f"⚠️ 赎回：{it.slug}（账户 {it.account}）{reason}，放弃自动赎回（请手动赎回）")
+        self.counts["abandoned"] += 1
+
+    # -----------------------------
+    # 一轮处理
+    # -----------------------------
+    def pump(self) -> int:
+        """查一遍待结算的场，赎回结算了的赢家；返回本轮结算完的场数"""
+        now = self.clock.time()
+        with self._lock:
+            due = [it for it in self._pending if now >= it.end_ts]
+        if not due:
+            return 0
+
+        winners: Dict[str, List[Tuple[RedeemItem, float]]] = {}
+        done: List[RedeemItem] = []
+        for it in due:
+            redeemer = self._redeemer_of(it.account)
+            if redeemer is None:
+                self._abandon(it, "找不到账户")
+                done.append(it)
+                continue
+            reason_fn = getattr(redeemer, "unsupported_reason", None)
+            reason = reason_fn() if reason_fn is not None else None
+            if reason:
+                self._abandon(it, reason)
+                done.append(it)
+                continue
+            try:
+                payouts = self.redeemer.resolution(it.condition_id)
+            except Exception as e:
+                print(f"⚠️ 赎回：查询 {it.slug} 结算结果失败: {e}")
+                continue
+            if payouts is None:
+                if now - it.end_ts > self.give_up_after:
+                    self._abandon(it, f"到期 {self.give_up_after / 3600:.0f}h 仍未结算")
+                    done.append(it)
+                continue
+            payout = 0.0
+            for (side_name, token_id), ratio in zip(it.tokens.items(), payouts):
+                if ratio <= 0:
+                    continue
+                size = it.sizes.get(token_id, 0.0)
+                onchain = self._onchain_balance(redeemer, token_id)
+                if onchain is not None:
+                    size = onchain
+                payout += size * ratio
+            if payout <= 0:
+                self.counts["lost"] += 1
+                done.append(it)
+                self._settled(RedeemResult(it, 0.0, None))
+            else:
+                winners.setdefault(it.account, []).append((it, payout))
+
+        # 每个账户各自发赎回交易（份额在各自的 funder / EOA 名下）
+        batches = [(acct, items[i:i + self.max_batch])
+                   for acct, items in winners.items() for i in range(0, len(items), self.max_batch)]
+        for acct, batch in batches:
+            try:
+                confirmed = self._redeemer_of(acct).redeem(batch)
+            except Exception as e:
+                print(f"❌ 赎回失败（下一轮重试）: {e}")
+                confirmed = {}
+            if len(confirmed) < len(batch):
+                self.counts["failed"] += 1
+            self.counts["txs"] += len(set(confirmed.values()))
+            for it, payout in batch:
+                tx = confirmed.get(it.condition_id)
+                if tx is None:
+                    continue  # 下一轮重试
+                self.counts["redeemed"] += 1
+                self.redeemed_usdc += payout
+                done.append(it)
+                print(f"💵 赎回 {it.slug}: +${payout:.4f} USDC (tx={tx})")
+                self._settled(RedeemResult(it, payout, tx))
+
+        if done:
+            with self._lock:
+                ids = {id(it) for it in done}
+                self._pending = [it for it in self._pending if id(it) not in ids]
+        return len(done)
+
+    def _onchain_balance(self, redeemer, token_id: str) -> Optional[float]:
+        fn = getattr(redeemer, "balance_of", None)
+        if fn is None:
+            return None
+        try:
+            return fn(token_id)
+        except Exception:
+            return None
+
+    def _settled(self, result: RedeemResult):
+        if self.on_settled is not None:
+            try:
+                self.on_settled(result)
+            except Exception as e:
+                print(f"⚠️ 赎回回调出错: {e}")
+
+    # -----------------------------
+    # 后台线程
+    # -----------------------------
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="redeem", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.pump()
+            except Exception as e:
+                print(f"⚠️ 赎回线程出错: {e}")
+            self._stop.wait(self.poll_interval)
+
+    def stats(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = dict(self.counts)
+        out["pending"] = len(self._pending)
+        out["redeemed_usdc"] = round(self.redeemed_usdc, 4)
+        return out
@@ -0,0 +1,317 @@
+"""
+录制 / 回放决策路径（改策略、切场、行情解析之前先离线对一遍）
+- SessionRecorder：REPLAY_RECORD=<文件> 时机器人把 场次（切场）/ 每 tick 拿到的报价 按时间写成 JSONL，
+  开头一行记下策略参数（control.HOT_PARAMS + 模式开关）；模拟也能录：python -m src.sim --record s.jsonl
+- replay_session：虚拟时钟下把录下的场次 / 报价喂给真实 ArbitrageBot（交易所换成回放替身，按录制时的
+  买一卖一撮合），记下机器人发出的每一笔下单 / 挂单 / 撤单，和 golden 文件逐条比对；
+  同时报告每 tick CPU 时间和每 tick 临时内存峰值（tracemalloc，单独跑一遍，两遍的下单必须一致）
+
+用法：
+    python -m src.sim --hours 6 --record replays/s6.jsonl
+    python -m src.replay replays/s6.jsonl --update            # 生成 replays/s6.golden.jsonl
+    python -m src.replay replays/s6.jsonl                     # 对比 golden；不一致退出码 1
+
+现货行情（SPOT_GATE / FAIR_VALUE）不在录制范围内：回放时关掉现货，录制时开着现货门控的会话不能直接比对
+"""
+from __future__ import annotations
+
+import argparse
+import bisect
+import contextlib
+import json
+import os
+import sys
+import time
+import tracemalloc
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.clock import VirtualClock
+from src.control import HOT_PARAMS
+from src.models import MarketSlot, Quote, TokenPair
+from src.sim import SimConfig, SimExchange, SimTradingClient
+
+# 除了可热更新的参数，这些开关也决定决策路径
+MODE_FLAGS = ("COMPLEMENT_ARB", "MAKER_MODE", "ADAPTIVE_POLL")
+
+
+class SessionRecorder:
+    """机器人主线程调用；行缓冲写文件，进程挂掉也只丢最后一行"""
+
+    def __init__(self, path: str, clock, config):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._clock = clock
+        self._f = open(path, "w", encoding="utf-8", buffering=1)
+        self.events = 0
+        params = {k: getattr(config, k) for k in (*HOT_PARAMS, *MODE_FLAGS)}
+        self._write({"kind": "session", "t": clock.time(), "params": params})
+
+    def _write(self, ev: Dict[str, Any]):
+        self._f.write(json.dumps(ev, separators=(",", ":")) + "\n")
+        self.events += 1
+
+    def market(self, info: MarketSlot, tokens: TokenPair):
+        self._write({"kind": "market", "t": self._clock.time(), "market": info._asdict(), "tokens": tokens._asdict()})
+
+    def quote(self, token_id: str, q: Quote):
+        self._write({"kind": "quote", "t": self._clock.time(), "token": token_id, "ask": q.ask, "bid": q.bid,
+                     "exchange_ts": q.exchange_ts})
+
+    def close(self):
+        if not self._f.closed:
+            self._f.close()
+
+
+def load_session(path: str) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """返回 (开头的 session 行, 其余事件按时间排序)"""
+    header: Optional[Dict[str, Any]] = None
+    events: List[Dict[str, Any]] = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            ev = json.loads(line)
+            if ev.get("kind") == "session":
+                header = header or ev
+            else:
+                events.append(ev)
+    if header is None:
+        raise ValueError(f"{path} 不是录制文件（缺少 session 行）")
+    events.sort(key=lambda e: e["t"])
+    return header, events
+
+
+class ReplayExchange(SimExchange):
+    """
+    SimExchange 的回放版：场次和盘口来自录制文件（取 <= 当前时间的最后一条），
+    吃单按当时的买一卖一撮合，挂单在后续报价穿过挂价时成交
+    """
+
+    def __init__(self, clock, events: List[Dict[str, Any]]):
+        super().__init__(clock)
+        self._markets: List[Tuple[float, MarketSlot, TokenPair]] = []
+        quotes: Dict[str, List[Tuple[float, Optional[float], Optional[float]]]] = {}
+        for ev in events:
+            if ev["kind"] == "market":
+                self._markets.append((ev["t"], MarketSlot(**ev["market"]), TokenPair(**ev["tokens"])))
+            elif ev["kind"] == "quote":
+                quotes.setdefault(ev["token"], []).append((ev["t"], ev["ask"], ev["bid"]))
+        self._market_ts = [t for t, _, _ in self._markets]
+        self._quotes = quotes
+        self._quote_ts = {tok: [t for t, _, _ in rows] for tok, rows in quotes.items()}
+
+    def find_btc_15min_market(self, host: str, clock=None, **kwargs) -> Optional[MarketSlot]:
+        i = bisect.bisect_right(self._market_ts, (clock or self.clock).time()) - 1
+        return self._markets[max(i, 0)][1] if self._markets else None
+
+    def get_market_conditions(self, host: str, market_id: int) -> Optional[TokenPair]:
+        for _, info, tokens in reversed(self._markets):
+            if info.market_id == market_id:
+                return tokens
+        return None
+
+    def quote(self, token_id: str) -> Optional[Tuple[float, float]]:
+        ts = self._quote_ts.get(token_id)
+        if not ts:
+            return None
+        i = bisect.bisect_right(ts, self.now()) - 1
+        if i < 0:
+            return None
+        _, ask, bid = self._quotes[token_id][i]
+        if ask is None or bid is None:
+            return None
+        return bid, ask
+
+    def _elapsed(self, token_id: str) -> Tuple[int, str, int]:
+        return 0, "", 0         # 录制的 token 不是 "market_id:UP" 格式；挂单撮合不按逐秒路径
+
+    def _match(self, oid: str) -> Optional[Dict[str, Any]]:
+        o = self.resting.get(oid)
+        if o is None or o["status"] != "LIVE":
+            return o
+        q = self.quote(o["token_id"])
+        if q is not None:
+            bid, ask = q
+            if (o["side"] == "BUY" and ask <= o["price"]) or (o["side"] == "SELL" and bid >= o["price"]):
+                o["matched"] = o["size"]
+                o["status"] = "MATCHED"
+                self.fill_count += 1
+                self.fills.append({"id": oid, "token_id": o["token_id"], "side": o["side"], "price": o["price"],
+                                   "size": o["size"], "ts": self.now(), "maker": True})
+        return o
+
+    def resolution(self, market_id: int, delay: float = 60.0) -> Optional[Tuple[float, float]]:
+        return None
+
+
+class ReplayTradingClient(SimTradingClient):
+    """记下机器人发出的每个下单 / 挂单 / 撤单（golden 比对的对象）"""
+
+    def __init__(self, exchange: ReplayExchange, balance: float = 1000.0):
+        super().__init__(exchange, balance)
+        self.actions: List[Dict[str, Any]] = []
+
+    def _log(self, op: str, **kw):
+        self.actions.append({"t": round(self.exchange.clock.time(), 3), "op": op, **kw})
+
+    def place_order(self, token_id: str, side: str, price: float, size: float, order_type: str = "FAK") -> Optional[str]:
+        oid = super().place_order(token_id, side, price, size, order_type)
+        self._log("order", token=token_id, side=side.upper(), price=round(float(price), 4),
+                  size=round(float(size), 4), type=order_type, filled=oid is not None)
+        return oid
+
+    def place_limit_order(self, token_id: str, side: str, price: float, size: float,
+                          post_only: bool = True) -> Optional[str]:
+        oid = super().place_limit_order(token_id, side, price, size, post_only)
+        self._log("limit", token=token_id, side=side.upper(), price=round(float(price), 4),
+                  size=round(float(size), 4), id=oid)
+        return oid
+
+    def cancel_orders(self, order_ids: List[str]) -> List[str]:
+        done = super().cancel_orders(order_ids)
+        self._log("cancel", ids=list(order_ids), done=len(done))
+        return done
+
+
+def replay_config(header: Dict[str, Any]) -> SimConfig:
+    config = SimConfig()
+    for k, v in header.get("params", {}).items():
+        setattr(config, k, v)
+    # 回放只有录下来的东西：对时 / 现货 / 推送 / 赎回 / 主备 / 控制面 都关掉
+    config.CLOCK_SYNC = False
+    config.SPOT_FEED = False
+    config.SPOT_GATE = False
+    config.FAIR_VALUE = False
+    config.USE_WSS = False
+    config.REDEEM_ENABLED = False
+    config.HA_LEASE_DB = ""
+    config.CONTROL_PORT = 0
+    config.PROFILE_SIGNAL = False
+    config.REPLAY_RECORD = ""
+    return config
+
+
+def _run_once(header: Dict[str, Any], events: List[Dict[str, Any]], trace_alloc: bool) -> Dict[str, Any]:
+    from src.arbitrage_bot import ArbitrageBot
+
+    start = header["t"]
+    end = events[-1]["t"] if events else start
+    clock = VirtualClock(start)
+    exchange = ReplayExchange(clock, events)
+    client = ReplayTradingClient(exchange)
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        bot = ArbitrageBot(config=replay_config(header), clock=clock, trading_client=client,
+                           market_source=exchange)
+        scan = bot.scan_and_trade
+        ticks = 0
+        peaks = 0
+
+        def tick():
+            nonlocal ticks, peaks
+            ticks += 1
+            if not trace_alloc:
+                return scan()
+            base, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            scan()
+            peaks += tracemalloc.get_traced_memory()[1] - base
+
+        bot.scan_and_trade = tick
+        if trace_alloc:
+            tracemalloc.start()
+        cpu0 = time.process_time()
+        try:
+            bot.run(until=end + 1e-6)
+        finally:
+            cpu = time.process_time() - cpu0
+            if trace_alloc:
+                tracemalloc.stop()
+    return {"actions": client.actions, "ticks": ticks, "cpu": cpu, "peaks": peaks, "rolls": bot.stats["market_rolls"]}
+
+
+def golden_path(session: str) -> str:
+    base = session[:-len(".jsonl")] if session.endswith(".jsonl") else session
+    return base + ".golden.jsonl"
+
+
+def load_golden(path: str) -> List[Dict[str, Any]]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def first_diff(expected: List[Dict[str, Any]], actual: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    for i, (e, a) in enumerate(zip(expected, actual)):
+        if e != a:
+            return {"index": i, "expected": e, "actual": a}
+    if len(expected) != len(actual):
+        i = min(len(expected), len(actual))
+        return {"index": i, "expected": expected[i] if i < len(expected) else None,
+                "actual": actual[i] if i < len(actual) else None}
+    return None
+
+
+def replay_session(session: str, golden: Optional[str] = None, update: bool = False,
+                   trace_alloc: bool = True) -> Dict[str, Any]:
+    header, events = load_session(session)
+    run = _run_once(header, events, trace_alloc=False)
+    actions = run["actions"]
+    ticks = max(1, run["ticks"])
+    report: Dict[str, Any] = {
+        "session": session,
+        "events": len(events),
+        "hours": round(((events[-1]["t"] if events else header["t"]) - header["t"]) / 3600, 2),
+        "ticks": run["ticks"],
+        "market_rolls": run["rolls"],
+        "actions": len(actions),
+        "cpu_us_per_tick": round(run["cpu"] / ticks * 1e6, 2),
+    }
+    ok = True
+    if trace_alloc:
+        traced = _run_once(header, events, trace_alloc=True)
+        report["peak_alloc_bytes_per_tick"] = round(traced["peaks"] / max(1, traced["ticks"]), 1)
+        # 同一份输入跑两遍结果不同 = 决策路径里有不确定性（墙钟 / 随机数 / 线程竞争）
+        nondet = first_diff(actions, traced["actions"])
+        if nondet is not None:
+            report["nondeterministic"] = nondet
+            ok = False
+
+    golden = golden or golden_path(session)
+    if update:
+        with open(golden, "w", encoding="utf-8") as f:
+            for a in actions:
+                f.write(json.dumps(a, separators=(",", ":")) + "\n")
+        report["golden"] = f"已更新 {golden}"
+    elif not os.path.exists(golden):
+        report["golden"] = f"{golden} 不存在（先加 --update 生成）"
+        ok = False
+    else:
+        diff = first_diff(load_golden(golden), actions)
+        report["golden"] = golden
+        if diff is not None:
+            report["diff"] = diff
+            ok = False
+    report["ok"] = ok
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="回放录制的行情，比对机器人下单并报告每 tick 开销")
+    parser.add_argument("session", help="录制文件（REPLAY_RECORD / python -m src.sim --record）")
+    parser.add_argument("--golden", default=None, help="golden 文件（默认 <session>.golden.jsonl）")
+    parser.add_argument("--update", action="store_true", help="用这次回放的结果覆盖 golden")
+    parser.add_argument("--no-alloc", action="store_true", help="不跑 tracemalloc 那一遍")
+    args = parser.parse_args()
+
+    report = replay_session(args.session, args.golden, args.update, trace_alloc=not args.no_alloc)
+    print("=" * 60)
+    print("🎞️ 回放结果")
+    for k, v in report.items():
+        print(f"   {k}: {v}")
+    print("=" * 60)
+    if not report["ok"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+"""
+下单签名服务（多进程）
+- py_clob_client 的 create_order / create_market_order 在调用线程里做 EIP-712 哈希 + ECDSA 签名，
+  纯 Python 的 eth_account 一张要几毫秒（本机约 7ms）；多市场 / 多 token 同时触发时一串订单只能排队用一个核
+- SigningService：ProcessPoolExecutor，每个子进程按钱包缓存 OrderBuilder；交易线程只传 OrderSpec
+  （tick_size / neg_risk / 费率已经在交易线程解析好，子进程不发请求），拿回签好的订单字段（dict）
+- 预热：warm() 让每个子进程先签一张假单，把 spawn + 导入 web3 / eth_account + 第一次签名的开销挪到启动阶段
+- 子进程挂掉 / 超时：sign 抛 SigningError，TradingClient 回落到在交易线程里签（这一单不丢）；
+  池坏了在后台重建并重新预热，预热完成之前的请求直接抛 SigningError（不让交易线程等进程启动）
+- 进程内共享一个池（多账户共用，按 OrderSpec.wallet 区分）：get_signing_service / shutdown_signing_service
+私钥随 wallet 经本机管道传给子进程（不落盘、不打日志）；注意预热（启动时以及每次池坏了重建后）
+会用真实私钥签一张假单（价格 / 数量是假的，只在子进程里签、不提交）
+"""
+from __future__ import annotations
+
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Set
+
+from src.hedging import LatencyTracker
+
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+
+
+class SigningError(Exception):
+    pass
+
+
+class Wallet(NamedTuple):
+    private_key: str
+    chain_id: int
+    signature_type: Optional[int] = None
+    funder: Optional[str] = None
+
+    def __repr__(self) -> str:
+        return f"Wallet(chain_id={self.chain_id}, signature_type={self.signature_type}, funder={self.funder})"
+
+
+class OrderSpec(NamedTuple):
+    wallet: Wallet
+    kind: str               # "market"（amount：买=USDC，卖=份数）/ "limit"（size：份数）
+    token_id: str
+    side: str               # "BUY" / "SELL"
+    price: float
+    size: float
+    fee_rate_bps: int = 0
+    tick_size: str = "0.01"
+    neg_risk: bool = False
+    taker: str = ZERO_ADDRESS
+
+    def __repr__(self) -> str:
+        return (f"OrderSpec({self.kind} {self.side} {self.size:g} @ {self.price:g} "
+                f"token={self.token_id[:10]}… tick={self.tick_size} neg_risk={self.neg_risk})")
+
+
+class SignedPayload:
+    """子进程签好的订单（SignedOrder.dict() 的字段）；post_order / post_orders 只调用 .dict()"""
+    __slots__ = ("_d",)
+
+    def __init__(self, d: Dict[str, Any]):
+        self._d = d
+
+    def dict(self) -> Dict[str, Any]:
+        return dict(self._d)
+
+    def __repr__(self) -> str:
+        return f"SignedPayload(side={self._d.get('side')}, tokenId={str(self._d.get('tokenId'))[:10]}…)"
+
+
+# -----------------------------
+# 子进程
+# -----------------------------
+_builders: Dict[Wallet, Any] = {}
+
+
+def _builder(wallet: Wallet):
+    b = _builders.get(wallet)
+    if b is None:
+        from py_clob_client.order_builder.builder import OrderBuilder
+        from py_clob_client.signer import Signer
+
+        b = _builders[wallet] = OrderBuilder(Signer(wallet.private_key, wallet.chain_id),
+                                             sig_type=wallet.signature_type, funder=wallet.funder)
+    return b
+
+
+def sign_spec(spec: OrderSpec) -> Dict[str, Any]:
+    """签一张单（子进程里跑；bench 的单线程基线 / 回落也直接调用）"""
+    from py_clob_client.clob_types import CreateOrderOptions, MarketOrderArgs, OrderArgs
+
+    b = _builder(spec.wallet)
+    opts = CreateOrderOptions(tick_size=spec.tick_size, neg_risk=spec.neg_risk)
+    if spec.kind == "market":
+        args: Any = MarketOrderArgs(token_id=spec.token_id, amount=float(spec.size), side=spec.side,
+                                    price=float(spec.price), fee_rate_bps=int(spec.fee_rate_bps), taker=spec.taker)
+        return b.create_market_order(args, opts).dict()
+    args = OrderArgs(token_id=spec.token_id, price=float(spec.price), size=float(spec.size), side=spec.side,
+                     fee_rate_bps=int(spec.fee_rate_bps), taker=spec.taker)
+    return b.create_order(args, opts).dict()
+
+
+def _sign_chunk(specs: Sequence[OrderSpec]) -> List[Dict[str, Any]]:
+    return [sign_spec(s) for s in specs]
+
+
+def _warm(wallet: Wallet, hold: float) -> int:
+    """签一张假单；hold 秒后再返回，让同一批预热任务落到不同的子进程上"""
+    sign_spec(OrderSpec(wallet, "limit", str(1 << 200), "BUY", 0.5, 5.0))
+    time.sleep(hold)
+    return os.getpid()
+
+
+# -----------------------------
+# 交易进程
+# -----------------------------
+class SigningService:
+    def __init__(self, workers: int = 2, timeout: float = 2.0, start_method: str = "spawn"):
+        self.workers = max(1, int(workers))
+        self.timeout = float(timeout)
+        self._ctx = multiprocessing.get_context(start_method)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pending: Set[Future] = set()      # 已提交未完成（关池时手动取消：cancel_futures 要 3.9+）
+        self._lock = threading.Lock()
+        self.latency = LatencyTracker(512)      # 提交 -> 拿到签名（含进程间传输）
+        self.signed = 0
+        self.failures = 0
+        self.warm_pids: List[int] = []
+        self.warm_secs: Optional[float] = None
+        self.rebuilds = 0
+        self._ready = threading.Event()
+        self._wallet: Optional[Wallet] = None
+
+    @classmethod
+    def from_config(cls, config) -> "SigningService":
+        return cls(workers=config.SIGN_WORKERS, timeout=config.SIGN_TIMEOUT_MS / 1000.0)
+
+    def _executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=self._ctx)
+            return self._pool
+
+    def _submit(self, pool: ProcessPoolExecutor, fn, *args) -> Future:
+        fut = pool.submit(fn, *args)
+        with self._lock:
+            self._pending.add(fut)
+        fut.add_done_callback(self._done)
+        return fut
+
+    def _done(self, fut: Future):
+        with self._lock:
+            self._pending.discard(fut)
+
+    def _close(self, pool: ProcessPoolExecutor, wait: bool):
+        """取消还在排队的任务再关池（已经在子进程里跑的取消不了，等它结束或随池一起失败）"""
+        with self._lock:
+            pending = list(self._pending)
+        for fut in pending:
+            fut.cancel()
+        pool.shutdown(wait=wait)
+
+    def warm(self, wallet: Wallet, timeout: float = 60.0) -> int:
+        """每个子进程先签一张（同时提交 workers 张，每张占住进程 0.2s，池会把进程全部拉起来）；返回预热了几个进程"""
+        t0 = time.perf_counter()
+        self._wallet = wallet
+        pool = self._executor()
+        futs = [self._submit(pool, _warm, wallet, 0.2) for _ in range(self.workers)]
+        try:
+            pids = {f.result(timeout=timeout) for f in futs}
+        except Exception as e:
+            raise SigningError(f"签名进程预热失败: {e}") from e
+        self.warm_pids = sorted(pids)
+        self.warm_secs = time.perf_counter() - t0
+        self._ready.set()
+        return len(pids)
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    def _reset(self):
+        """池坏了（子进程被杀）：丢掉，后台重建 + 预热"""
+        with self._lock:
+            pool, self._pool = self._pool, None
+            if not self._ready.is_set():
+                return      # 已经在重建
+            self._ready.clear()
+            self.rebuilds += 1
+        if pool is not None:
+            self._close(pool, wait=False)
+        if self._wallet is not None:
+            threading.Thread(target=self._rewarm, name="sign-rewarm", daemon=True).start()
+
+    def _rewarm(self):
+        try:
+            self.warm(self._wallet)
+        except SigningError as e:
+            print(f"⚠️ {e}（签名继续在交易线程进行）")
+
+    def sign(self, spec: OrderSpec) -> SignedPayload:
+        return self.sign_many([spec])[0]
+
+    def sign_many(self, specs: Sequence[OrderSpec]) -> List[SignedPayload]:
+        """一批单按进程数隔张分组（每个进程一次往返），并行签；任何一张失败 / 超时整批抛 SigningError"""
+        if not specs:
+            return []
+        if not self._ready.is_set():
+            raise SigningError("签名进程未就绪")
+        t0 = time.perf_counter()
+        k = min(self.workers, len(specs))
+        try:
+            pool = self._executor()
+            futs = [self._submit(pool, _sign_chunk, specs[i::k]) for i in range(k)]
+            deadline = t0 + self.timeout
+            chunks = [f.result(timeout=max(0.0, deadline - time.perf_counter())) for f in futs]
+            out: List[SignedPayload] = [None] * len(specs)   # type: ignore[list-item]
+            for i, chunk in enumerate(chunks):
+                out[i::k] = [SignedPayload(d) for d in chunk]
+        except FutureTimeout as e:
+            self.failures += 1
+            raise SigningError(f"签名超时（{self.timeout * 1000:.0f}ms，{len(specs)} 单）") from e
+        except BrokenProcessPool as e:
+            self.failures += 1
+            self._reset()
+            raise SigningError(f"签名进程池已损坏，后台重建: {e}") from e
+        except Exception as e:
+            self.failures += 1
+            raise SigningError(f"签名失败: {e}") from e
+        dt = time.perf_counter() - t0
+        with self._lock:
+            self.signed += len(out)
+            self.latency.add(dt)
+        return out
+
+    def stats(self) -> Dict[str, Any]:
+        p50, p99 = self.latency.percentile(0.5), self.latency.percentile(0.99)
+        return {
+            "workers": self.workers,
+            "ready": self.ready,
+            "warm_workers": len(self.warm_pids),
+            "warm_ms": round(self.warm_secs * 1000, 1) if self.warm_secs is not None else None,
+            "signed": self.signed,
+            "failures": self.failures,
+            "rebuilds": self.rebuilds,
+            "p50_ms": round(p50 * 1000, 2) if p50 is not None else None,
+            "p99_ms": round(p99 * 1000, 2) if p99 is not None else None,
+        }
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            self._close(pool, wait=True)
+
+
+_SERVICE: Optional[SigningService] = None
+_SERVICE_LOCK = threading.Lock()
+
+
+def get_signing_service(config) -> Optional[SigningService]:
+    """SIGN_WORKERS > 0 时返回进程内共享的签名池（多账户共用）"""
+    global _SERVICE
+    if int(getattr(config, "SIGN_WORKERS", 0) or 0) <= 0:
+        return None
+    with _SERVICE_LOCK:
+        if _SERVICE is None:
+            _SERVICE = SigningService.from_config(config)
+        return _SERVICE
+
+
+def signing_stats() -> Optional[Dict[str, Any]]:
+    with _SERVICE_LOCK:
+        svc = _SERVICE
+    return svc.stats() if svc is not None else None
+
+
+def shutdown_signing_service():
+    global _SERVICE
+    with _SERVICE_LOCK:
+        svc, _SERVICE = _SERVICE, None
+    if svc is not None:
+        svc.shutdown()
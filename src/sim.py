@@ -0,0 +1,475 @@
+"""
+本地交易所替身 + 虚拟时钟模拟
+- SimExchange：按 15 分钟整点生成市场（slug / market_id / UP、DOWN token），
+  UP 的中间价是按 market_id 播种的随机游走（可复现），DOWN = 1 - UP
+- SimTradingClient：实现 ArbitrageBot 用到的 TradingClient 接口，FOK 按当前盘口撮合
+- 挂单（做市模式）：post-only 限价单挂在交易所替身里，按逐秒路径回放撮合——
+  买单在卖一跌到挂价时按挂价成交，卖单在买一涨到挂价时成交（不建模排队位置）
+- depth：每档挂单量（默认不限）。设了以后盘口有 5 档（间隔 1 分），吃单按档位走、FOK 深度不够就拒；
+  被吃掉的量下一秒补回（用来测切片执行）
+- run_simulation：用虚拟时钟把真实的 ArbitrageBot 跑完 N 小时，一天 96 场几秒钟
+- clock_skew：交易所时间比机器人本机快多少秒（模拟 VM 时钟漂移，用来验证对时）；
+  /time 按真实接口返回截断的整秒，每次请求花一段随机 RTT（推进虚拟时钟），
+  对时样本落在不同的亚秒相位上，估计偏差能在模拟里看出来
+
+用法：
+    python -m src.sim --hours 24
+    python -m src.sim --hours 24 --clock-skew 5 [--no-clock-sync]
+    python -m src.sim --hours 24 --maker
+    python -m src.sim --hours 24 --redeem
+    python -m src.sim --hours 6 --profile profiles/sim   # 整段采样，写火焰图
+    python -m src.sim --hours 6 --record replays/s6.jsonl  # 录制给 src.replay 回放
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import math
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from src.clock import Clock, VirtualClock
+from src.config import Config
+from src.models import MarketSlot, Quote, TokenPair
+
+INTERVAL = 900
+FILL_HISTORY = 1024     # 成交明细只留最近这么多条（对账只查刚成交的），总数另计
+
+
+class SimConfig(Config):
+    """模拟用配置：假私钥、不落盘快照、单账户"""
+    POLYMARKET_PRIVATE_KEY = "0x" + "11" * 32
+    POLYMARKET_API_KEY = ""
+    POLYMARKET_API_SECRET = ""
+    POLYMARKET_API_PASSPHRASE = ""
+    POLYMARKET_ACCOUNTS_FILE = ""
+    MARKET_CACHE_FILE = ""
+    FAST_START = False
+    HEDGE_QUOTES = False
+    DRY_RUN = False
+
+
+class SimExchange:
+    def __init__(self, clock: Clock, seed: int = 0, spread: float = 0.01, vol: float = 0.06,
+                 clock_skew: float = 0.0, depth: Optional[float] = None):
+        self.clock = clock
+        self.depth = depth
+        self._taken: Dict[Tuple[str, str], float] = {}     # 本秒被吃掉的量：(token, asks/bids) -> 数量
+        self._taken_sec = -1
+        self.clock_skew = float(clock_skew)
+        self.seed = seed
+        self.spread = spread
+        self.vol = vol
+        self._paths: Dict[int, List[float]] = {}
+        self.fills: Deque[Dict[str, Any]] = deque(maxlen=FILL_HISTORY)
+        self.fill_count = 0
+        self.rejects = 0
+        # 挂单：id -> {token_id, side, price, size, matched, status, checked(已撮合到第几秒)}
+        self.resting: Dict[str, Dict[str, Any]] = {}
+        self._rest_seq = 0
+
+    def now(self) -> float:
+        """交易所时间（撮合 / 盘口开关都按它）"""
+        return self.clock.time() + self.clock_skew
+
+    # -----------------------------
+    # 市场（与 src.lookup 同名同参；和 lookup 一样按调用方传入的时钟算当前场）
+    # -----------------------------
+    def _slot(self, ts: float) -> int:
+        return int(ts) // INTERVAL * INTERVAL
+
+    def find_btc_15min_market(self, host: str, clock: Optional[Clock] = None, **kwargs) -> Optional[MarketSlot]:
+        now = int((clock or self.clock).time())
+        start_ts = self._slot(now)
+        return MarketSlot(
+            market_id=start_ts // INTERVAL,
+            question=f"Bitcoin Up or Down (sim) {start_ts}",
+            slug=f"btc-updown-15m-{start_ts}",
+            start_ts=start_ts,
+            end_ts=start_ts + INTERVAL,
+            is_live=True,
+            condition_id=f"0x{start_ts // INTERVAL:064x}",
+        )
+
+    def get_market_conditions(self, host: str, market_id: int) -> Optional[TokenPair]:
+        return TokenPair(up=f"{market_id}:UP", down=f"{market_id}:DOWN")
+
+    # -----------------------------
+    # 盘口
+    # -----------------------------
+    def _path(self, market_id: int) -> List[float]:
+        path = self._paths.get(market_id)
+        if path is None:
+            rng = random.Random((self.seed << 32) ^ market_id)
+            x = 0.0
+            path = []
+            for _ in range(INTERVAL + 1):
+                path.append(1.0 / (1.0 + math.exp(-x)))
+                x += rng.gauss(0.0, self.vol)
+            # 只留最近两场，模拟一整个月也不涨内存
+            if len(self._paths) >= 2:
+                self._paths.pop(min(self._paths))
+                self._drop_resting(before=min(self._paths))
+            self._paths[market_id] = path
+        return path
+
+    def _elapsed(self, token_id: str) -> Tuple[int, str, int]:
+        mid_s, _, outcome = str(token_id).partition(":")
+        market_id = int(mid_s)
+        return market_id, outcome, int(self.now()) - market_id * INTERVAL
+
+    def _quote_at(self, market_id: int, outcome: str, elapsed: int) -> Tuple[float, float]:
+        up = self._path(market_id)[elapsed]
+        mid = up if outcome == "UP" else 1.0 - up
+        half = self.spread / 2.0
+        return max(0.01, round(mid - half, 2)), min(0.99, round(mid + half, 2))
+
+    def quote(self, token_id: str) -> Optional[Tuple[float, float]]:
+        """返回 (bid, ask)；已结束或未开始的市场返回 None"""
+        market_id, outcome, elapsed = self._elapsed(token_id)
+        if elapsed < 0 or elapsed >= INTERVAL:
+            return None
+        return self._quote_at(market_id, outcome, elapsed)
+
+    def levels(self, token_id: str, depth: int = 5) -> Optional[Dict[str, List[Tuple[float, float]]]]:
+        """盘口档位（卖盘从低到高、买盘从高到低），扣掉本秒已被吃掉的量"""
+        q = self.quote(token_id)
+        if q is None:
+            return None
+        bid, ask = q
+        if self.depth is None:
+            return {"asks": [(ask, 1e6)], "bids": [(bid, 1e6)]}
+        self._roll_taken()
+        out: Dict[str, List[Tuple[float, float]]] = {}
+        for book_side, top, step in (("asks", ask, 0.01), ("bids", bid, -0.01)):
+            taken = self._taken.get((token_id, book_side), 0.0)
+            lv = []
+            for i in range(depth):
+                px = round(top + step * i, 2)
+                if not 0.01 <= px <= 0.99:
+                    break
+                left = self.depth - min(self.depth, taken)
+                taken = max(0.0, taken - self.depth)
+                if left > 0:
+                    lv.append((px, left))
+            out[book_side] = lv
+        return out
+
+    def _roll_taken(self):
+        sec = int(self.now())
+        if sec != self._taken_sec:
+            self._taken_sec = sec
+            self._taken.clear()
+
+    def _walk(self, token_id: str, side: str, price: float, size: float) -> Optional[float]:
+        """按档位吃 size（不超过限价）；深度不够返回 None（FOK 不成交），否则记下吃掉的量并返回均价"""
+        book = self.levels(token_id, 5)
+        book_side = "asks" if side == "BUY" else "bids"
+        need, cost = size, 0.0
+        for px, avail in (book or {}).get(book_side, []):
+            if (side == "BUY" and px > price + 1e-9) or (side == "SELL" and px < price - 1e-9):
+                break
+            take = min(need, avail)
+            cost += take * px
+            need -= take
+            if need <= 1e-9:
+                key = (token_id, book_side)
+                self._taken[key] = self._taken.get(key, 0.0) + size
+                return cost / size
+        return None
+
+    # -----------------------------
+    # 挂单
+    # -----------------------------
+    def rest(self, token_id: str, side: str, price: float, size: float) -> Optional[str]:
+        """post-only 挂单：会立刻成交的价格直接拒绝"""
+        q = self.quote(token_id)
+        if q is None:
+            self.rejects += 1
+            return None
+        bid, ask = q
+        if (side == "BUY" and price >= ask) or (side == "SELL" and price <= bid):
+            self.rejects += 1
+            return None
+        self._rest_seq += 1
+        oid = f"rest-{self._rest_seq}"
+        self.resting[oid] = {
+            "token_id": token_id, "side": side, "price": float(price), "size": float(size),
+            "matched": 0.0, "status": "LIVE", "checked": self._elapsed(token_id)[2],
+        }
+        return oid
+
+    def _drop_resting(self, before: int):
+        """早于 before 场的挂单（机器人没再查状态的）丢掉：市场早已结束"""
+        for oid in [oid for oid, o in self.resting.items() if self._elapsed(o["token_id"])[0] < before]:
+            del self.resting[oid]
+
+    def _match(self, oid: str) -> Optional[Dict[str, Any]]:
+        """把挂单从上次检查到现在的每一秒过一遍；到期未成交的按过期处理"""
+        o = self.resting.get(oid)
+        if o is None or o["status"] != "LIVE":
+            return o
+        market_id, outcome, elapsed = self._elapsed(o["token_id"])
+        for t in range(o["checked"] + 1, min(elapsed, INTERVAL - 1) + 1):
+            bid, ask = self._quote_at(market_id, outcome, t)
+            if (o["side"] == "BUY" and ask <= o["price"]) or (o["side"] == "SELL" and bid >= o["price"]):
+                o["matched"] = o["size"]
+                o["status"] = "MATCHED"
+                self.fill_count += 1
+                self.fills.append({
+                    "id": oid, "token_id": o["token_id"], "side": o["side"], "price": o["price"],
+                    "size": o["size"], "ts": market_id * INTERVAL + t, "maker": True,
+                })
+                break
+        o["checked"] = max(o["checked"], elapsed)
+        if o["status"] == "LIVE" and elapsed >= INTERVAL:
+            o["status"] = "EXPIRED"
+        return o
+
+    def cancel(self, order_ids: List[str]) -> List[str]:
+        done = []
+        for oid in order_ids:
+            o = self._match(oid)
+            if o is not None and o["status"] == "LIVE":
+                o["status"] = "CANCELED"
+                done.append(oid)
+        # 撤掉的单留到机器人最后查一次状态（order_status 回报后删除；没人问的随旧场清掉）
+        return done
+
+    def order_status(self, oid: str) -> Optional[Dict[str, Any]]:
+        o = self._match(oid)
+        if o is None:
+            return None
+        out = {"status": o["status"], "size_matched": str(o["matched"]), "original_size": str(o["size"])}
+        if o["status"] != "LIVE":
+            del self.resting[oid]
+        return out
+
+    def resolution(self, market_id: int, delay: float = 60.0) -> Optional[Tuple[float, float]]:
+        """结算结果 (UP, DOWN)：到期 delay 秒后公布，收盘概率 >= 0.5 判 UP 赢"""
+        if self.now() < (market_id + 1) * INTERVAL + delay:
+            return None
+        up = self._path(market_id)[INTERVAL] >= 0.5
+        return (1.0, 0.0) if up else (0.0, 1.0)
+
+    def fill(self, token_id: str, side: str, price: float, size: float) -> Optional[str]:
+        q = self.quote(token_id)
+        if q is None:
+            self.rejects += 1
+            return None
+        bid, ask = q
+        if self.depth is None:
+            ok = ask <= price if side == "BUY" else bid >= price
+            px: Optional[float] = (ask if side == "BUY" else bid) if ok else None
+        else:
+            px = self._walk(token_id, side, price, size)
+        if px is None:
+            self.rejects += 1
+            return None
+        self.fill_count += 1
+        oid = f"sim-{self.fill_count}"
+        self.fills.append({
+            "id": oid, "token_id": token_id, "side": side, "price": px, "size": size, "ts": self.now(),
+        })
+        return oid
+
+
+class SimTradingClient:
+    """ArbitrageBot / ExecutionPool 用到的 TradingClient 接口子集"""
+    def __init__(self, exchange: SimExchange, balance: float = 1000.0):
+        self.exchange = exchange
+        self.balance = balance
+        self.orders_placed = 0
+        self._lock = threading.Lock()     # 切片 / 成对下单会从多个线程并发下单
+        self._rtt_rng = random.Random(exchange.seed)
+
+    def get_price(self, token_id: str, side: str = "BUY") -> Optional[Dict[str, Any]]:
+        q = self.exchange.quote(token_id)
+        if q is None:
+            return None
+        return {"price": q[1] if side.upper() == "BUY" else q[0]}
+
+    def get_best_price(self, token_id: str, side: str = "buy") -> Optional[float]:
+        info = self.get_price(token_id, side=side.upper())
+        return float(info["price"]) if info else None
+
+    def get_quote(self, token_id: str) -> Quote:
+        q = self.exchange.quote(token_id)
+        now = self.exchange.clock.monotonic()
+        if q is None:
+            return Quote(None, None, now, now)
+        return Quote(q[1], q[0], now, now, self.exchange.now())
+
+    def get_orderbook(self, token_id: str) -> Dict[str, Any]:
+        q = self.exchange.quote(token_id)
+        if q is None:
+            return {"asks": [], "bids": []}
+        return {"asks": [{"price": q[1], "size": 1e6}], "bids": [{"price": q[0], "size": 1e6}]}
+
+    def get_top_levels(self, token_id: str, depth: int = 5) -> Dict[str, Any]:
+        book = self.exchange.levels(token_id, depth) or {"asks": [], "bids": []}
+        now = self.exchange.clock.monotonic()
+        return {"asks": book["asks"][:depth], "bids": book["bids"][:depth], "recv_ts": now,
+                "exchange_ts": self.exchange.now()}
+
+    def place_order(self, token_id: str, side: str, price: float, size: float, order_type: str = "FAK") -> Optional[str]:
+        with self._lock:
+            self.orders_placed += 1
+            side_u = side.upper()
+            oid = self.exchange.fill(token_id, side_u, float(price), float(size))
+            if oid:
+                px = self.exchange.fills[-1]["price"]
+                self.balance += (-px if side_u == "BUY" else px) * float(size)
+            return oid
+
+    def place_limit_order(self, token_id: str, side: str, price: float, size: float,
+                          post_only: bool = True) -> Optional[str]:
+        self.orders_placed += 1
+        return self.exchange.rest(token_id, side.upper(), float(price), float(size))
+
+    def place_limit_orders(self, orders: List[Tuple[str, str, float, float]],
+                           post_only: bool = True) -> List[Optional[str]]:
+        return [self.place_limit_order(t, s, p, z, post_only) for t, s, p, z in orders]
+
+    def cancel_order(self, order_id: str) -> bool:
+        if order_id in self.exchange.resting:
+            return bool(self.exchange.cancel([order_id]))
+        return True
+
+    def cancel_orders(self, order_ids: List[str]) -> List[str]:
+        return self.exchange.cancel(list(order_ids))
+
+    def get_order_status(self, order_id: str) -> Optional[Dict]:
+        if order_id in self.exchange.resting:
+            info = self.exchange.order_status(order_id)
+            if info is not None and float(info["size_matched"]) > 0:
+                # 挂单成交的资金变动在对账时记（成交价 = 挂价）
+                fill = next((f for f in reversed(self.exchange.fills) if f["id"] == order_id), None)
+                if fill is not None:
+                    self.balance += (-fill["price"] if fill["side"] == "BUY" else fill["price"]) * fill["size"]
+            return info
+        return {"status": "FILLED"}
+
+    def get_balance(self) -> float:
+        return self.balance
+
+    def get_server_time(self) -> int:
+        """截断到整秒（同 CLOB /time）；往返 30~250ms，服务端在中途打时间戳"""
+        rtt = self._rtt_rng.uniform(0.03, 0.25)
+        clock = self.exchange.clock
+        clock.sleep(rtt / 2)
+        ts = int(self.exchange.now())
+        clock.sleep(rtt / 2)
+        return ts
+
+    def hedge_stats(self) -> Dict[str, Any]:
+        return {}
+
+    def quote_stats(self) -> Dict[str, Any]:
+        return {}
+
+
+class SimRedeemer:
+    """赎回替身：结算结果来自 SimExchange 的价格路径，赎回直接把 USDC 记回 SimTradingClient 余额"""
+    def __init__(self, exchange: SimExchange, client: SimTradingClient, delay: float = 60.0):
+        self.exchange = exchange
+        self.client = client
+        self.delay = float(delay)
+        self.txs = 0
+
+    def resolution(self, condition_id: str) -> Optional[Tuple[float, float]]:
+        return self.exchange.resolution(int(condition_id, 16), self.delay)
+
+    def redeem(self, batch) -> Dict[str, str]:
+        self.txs += 1
+        tx = f"0xsim{self.txs:x}"
+        for item, payout in batch:
+            self.client.balance += payout
+        return {item.condition_id: tx for item, _ in batch}
+
+
+def run_simulation(hours: float = 24.0, seed: int = 0, start_ts: Optional[int] = None,
+                   quiet: bool = True, clock_skew: float = 0.0, clock_sync: bool = True,
+                   maker: bool = False, redeem: bool = False, profile: Optional[str] = None,
+                   record: Optional[str] = None, depth: Optional[float] = None, slicing: bool = False,
+                   **bot_kwargs) -> Dict[str, Any]:
+    """虚拟时钟下跑真实 ArbitrageBot，返回统计"""
+    from src.arbitrage_bot import ArbitrageBot
+
+    if start_ts is None:
+        start_ts = int(time.time()) // INTERVAL * INTERVAL
+    clock = VirtualClock(start_ts)
+    exchange = SimExchange(clock, seed=seed, clock_skew=clock_skew, depth=depth)
+    client = SimTradingClient(exchange)
+    config = SimConfig()
+    config.CLOCK_SYNC = clock_sync
+    config.MAKER_MODE = maker
+    config.REPLAY_RECORD = record or ""
+    config.SLICE_EXECUTION = slicing
+    if redeem:
+        bot_kwargs.setdefault("redeemer", SimRedeemer(exchange, client))
+
+    t0 = time.perf_counter()
+    with open(os.devnull, "w") as devnull, contextlib.ExitStack() as stack:
+        if quiet:
+            stack.enter_context(contextlib.redirect_stdout(devnull))
+        bot = ArbitrageBot(config=config, clock=clock, trading_client=client,
+                           market_source=exchange, **bot_kwargs)
+        if profile:
+            bot.start_profile(seconds=1e9, path=profile)   # run() 结束时停止并写文件
+        bot.run(until=start_ts + hours * 3600)
+    wall = time.perf_counter() - t0
+
+    return {
+        "hours": hours,
+        "wall_seconds": round(wall, 3),
+        "speedup": round(hours * 3600 / wall, 1) if wall > 0 else None,
+        "market_rolls": bot.stats["market_rolls"],
+        "buys": bot.stats["total_buys"],
+        "sells": bot.stats["total_sells"],
+        "profit": round(bot.stats["total_profit"], 4),
+        "orders_placed": client.orders_placed,
+        "fills": exchange.fill_count,
+        "rejects": exchange.rejects,
+        "balance": round(client.balance, 4),
+        "clock_offset": round(getattr(getattr(bot.clock, "sync", None), "offset", 0.0), 3),
+        **({"maker": bot.maker.stats()} if bot.maker is not None else {}),
+        **({"redeem": bot.redemption.stats(), "settlement_pnl": round(bot.stats["settlement_pnl"], 4)}
+           if bot.redemption is not None else {}),
+        **({"profile": bot.profiler.stats()} if bot.profiler is not None else {}),
+        **({"slicing": bot.slicer.stats()} if bot.slicer is not None else {}),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="虚拟时钟模拟 BTC 15m 机器人")
+    parser.add_argument("--hours", type=float, default=24.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--verbose", action="store_true", help="输出机器人日志")
+    parser.add_argument("--clock-skew", type=float, default=0.0, help="交易所时间比本机快多少秒")
+    parser.add_argument("--no-clock-sync", action="store_true", help="关闭对时（对比用）")
+    parser.add_argument("--maker", action="store_true", help="做市模式（挂单按逐秒路径撮合）")
+    parser.add_argument("--redeem", action="store_true", help="到期结算并自动赎回（资金回到余额）")
+    parser.add_argument("--profile", default=None, help="采样整段运行，写 <前缀>.speedscope.json / .collapsed")
+    parser.add_argument("--record", default=None, help="把场次 / 报价录成 JSONL（python -m src.replay 回放）")
+    parser.add_argument("--depth", type=float, default=None, help="每档挂单量（默认不限，只有一档）")
+    parser.add_argument("--slice", action="store_true", help="切片执行（SLICE_EXECUTION）")
+    args = parser.parse_args()
+
+    report = run_simulation(hours=args.hours, seed=args.seed, quiet=not args.verbose,
+                            clock_skew=args.clock_skew, clock_sync=not args.no_clock_sync, maker=args.maker,
+                            redeem=args.redeem, profile=args.profile, record=args.record,
+                            depth=args.depth, slicing=args.slice)
+    print("=" * 60)
+    print("🧪 模拟结果")
+    for k, v in report.items():
+        print(f"   {k}: {v}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+"""
+切片执行（下单量大于盘口第一档时，不再一张 FOK 要么失败、要么一路吃穿盘口）
+- 父单 = 一个 OrderIntent；每一轮先读本地盘口（get_top_levels），把价格上限以内的可见深度
+  按 depth_fraction 打折后切成最多 pipeline 张子单（FOK），同一轮的子单并发发出（不是一张等一张）
+- 同一轮子单的限价都是这一轮总量走到的最深一档：并发子单到达顺序不定（后切的那张可能先吃掉第一档），
+  限价一样时谁先到都能成交，这一轮合计的成交价和顺序无关
+- 一轮有子单没成交 / 可见深度不够：等 interval 秒盘口补上后重读再切，直到 成交完 / 超时 / 没有可用深度
+- 价格上限相对阈值：买 <= max(意图限价, BUY_PRICE + price_tol)，卖 >= min(意图限价, SELL_PRICE - price_tol)
+- 回报：成交量、VWAP（按下单时那一轮盘口的档位估算）、到达价（开始时的卖一 / 买一）和相对到达价的滑点
+"""
+from __future__ import annotations
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from src.clock import SYSTEM_CLOCK, Clock
+from src.strategy import OrderIntent
+
+# route(token_id, side, price, size, order_type, account) -> (order_id, account)
+RouteFn = Callable[..., Tuple[Optional[str], Optional[str]]]
+# levels(token_id, depth) -> {"asks": [(price, size), ...], "bids": [...]}
+LevelsFn = Callable[[str, int], Dict[str, Any]]
+
+_EPS = 1e-9
+
+
+class SliceResult(NamedTuple):
+    side: str
+    filled: float
+    vwap: Optional[float]
+    arrival: Optional[float]
+    slices: int                 # 发出的子单数
+    failed: int                 # 没成交的子单数
+    order_ids: Tuple[str, ...]
+    account: Optional[str]
+    elapsed: float              # 秒（执行时钟）
+    reason: str                 # filled / timeout / no_depth
+
+    @property
+    def slippage_bps(self) -> Optional[float]:
+        """相对到达价的滑点（正数 = 比到达价差：买贵了 / 卖便宜了）"""
+        if self.vwap is None or not self.arrival:
+            return None
+        diff = self.vwap - self.arrival if self.side == "BUY" else self.arrival - self.vwap
+        return diff / self.arrival * 1e4
+
+
+def plan_slices(levels: Sequence[Tuple[float, float]], remaining: float, cap: float, side: str,
+                max_slices: int, fraction: float = 1.0, min_size: float = 0.0) -> List[Tuple[float, float, float]]:
+    """
+    按可见深度切子单：返回 [(限价, 数量, 估算成交均价), ...]
+    levels 已按 买：卖盘从低到高 / 卖：买盘从高到低 排好；价格超过 cap 的档位不用
+    估算均价按切的顺序走档位（单张是估算，合计准确）；限价统一取最深一档
+    """
+    usable: List[Tuple[float, float]] = []
+    for price, size in levels:
+        if (side == "BUY" and price > cap + _EPS) or (side == "SELL" and price < cap - _EPS):
+            break
+        if size * fraction > _EPS:
+            usable.append((price, size * fraction))
+    total = sum(s for _, s in usable)
+    budget = min(remaining, total)
+    if budget <= _EPS or max_slices <= 0:
+        return []
+    if budget < min_size and budget < remaining - _EPS:
+        return []       # 可见深度连一张最小单都不够：等盘口补上
+    # 子单数量：平均切，但每张不小于 min_size（剩余不足 min_size 时整张发）
+    n = max(1, min(max_slices, int(budget // min_size) if min_size > 0 else max_slices))
+    sizes = [round(budget / n, 2)] * n
+    sizes[-1] = round(budget - sum(sizes[:-1]), 2)
+    out: List[Tuple[float, float, float]] = []
+    li, left = 0, usable[0][1]
+    for size in sizes:
+        if size <= _EPS:
+            continue
+        need, cost, price = size, 0.0, usable[li][0]
+        while need > _EPS and li < len(usable):
+            take = min(need, left)
+            price = usable[li][0]
+            cost += take * price
+            need -= take
+            left -= take
+            if left <= _EPS and li + 1 < len(usable):
+                li += 1
+                left = usable[li][1]
+        filled = size - max(need, 0.0)
+        out.append((price, round(filled, 2), cost / filled if filled > _EPS else price))
+    limit = out[-1][0] if out else cap
+    return [(limit, size, est) for _, size, est in out]
+
+
+class SlicedExecutor:
+    def __init__(self, route: RouteFn, levels: LevelsFn, buy_price: float, sell_price: float,
+                 price_tol: float = 0.01, max_secs: float = 3.0, pipeline: int = 3, depth_fraction: float = 0.8,
+                 interval: float = 0.2, book_depth: int = 5, min_size: float = 5.0, clock: Optional[Clock] = None):
+        self.route = route
+        self.levels = levels
+        self.buy_price = float(buy_price)
+        self.sell_price = float(sell_price)
+        self.price_tol = float(price_tol)
+        self.max_secs = float(max_secs)
+        self.pipeline = max(1, int(pipeline))
+        self.depth_fraction = float(depth_fraction)
+        self.interval = float(interval)
+        self.book_depth = int(book_depth)
+        self.min_size = float(min_size)
+        self.clock = clock or SYSTEM_CLOCK
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.parents = 0
+        self.children = 0
+        self.child_failures = 0
+        self.filled_qty = 0.0
+        self.requested_qty = 0.0
+        self._slip_sum = 0.0        # 按成交量加权的滑点（bps × 数量）
+
+    @classmethod
+    def from_config(cls, route: RouteFn, levels: LevelsFn, config, clock: Optional[Clock] = None) -> "SlicedExecutor":
+        return cls(
+            route, levels, config.BUY_PRICE, config.SELL_PRICE,
+            price_tol=config.SLICE_PRICE_TOL,
+            max_secs=config.SLICE_MAX_SECS,
+            pipeline=config.SLICE_PIPELINE,
+            depth_fraction=config.SLICE_DEPTH_FRACTION,
+            interval=config.SLICE_INTERVAL_MS / 1000.0,
+            book_depth=config.SLICE_BOOK_DEPTH,
+            min_size=config.SLICE_MIN_SIZE,
+            clock=clock,
+        )
+
+    def cap_for(self, intent: OrderIntent) -> float:
+        if intent.side == "BUY":
+            return round(min(0.99, max(intent.price, self.buy_price + self.price_tol)), 4)
+        return round(max(0.01, min(intent.price, self.sell_price - self.price_tol)), 4)
+
+    def _send(self, intent: OrderIntent, child: Tuple[float, float, float],
+              account: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+        price, size, _ = child
+        return self.route(token_id=intent.token_id, side=intent.side, price=price, size=size,
+                          order_type="FOK", account=account)
+
+    def _send_wave(self, intent: OrderIntent, children: List[Tuple[float, float, float]],
+                   account: Optional[str]) -> List[Tuple[Optional[str], Optional[str]]]:
+        """一轮子单并发发出；还没定账户时先发第一张选出账户（持仓要落在同一个账户），其余再并发"""
+        if account is None:
+            first = self._send(intent, children[0], None)
+            if not first[0] or len(children) == 1:
+                return [first]
+            return [first] + self._send_wave(intent, children[1:], first[1])
+        if len(children) == 1:
+            return [self._send(intent, children[0], account)]
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.pipeline, thread_name_prefix="slicer")
+        return list(self._pool.map(lambda c: self._send(intent, c, account), children))
+
+    def execute(self, intent: OrderIntent) -> SliceResult:
+        side = intent.side
+        book_side = "asks" if side == "BUY" else "bids"
+        cap = self.cap_for(intent)
+        t0 = self.clock.monotonic()
+        deadline = t0 + self.max_secs
+        done_below = min(self.min_size, float(intent.size)) if self.min_size > 0 else 0.01
+        account = intent.account
+        remaining = float(intent.size)
+        filled = cost = 0.0
+        arrival: Optional[float] = None
+        ids: List[str] = []
+        sent = failed = 0
+        while True:
+            book = self.levels(intent.token_id, self.book_depth) or {}
+            levels = book.get(book_side) or []
+            if arrival is None and levels:
+                arrival = levels[0][0]
+            children = plan_slices(levels, remaining, cap, side, self.pipeline, self.depth_fraction, self.min_size)
+            if children:
+                results = self._send_wave(intent, children, account)
+                for (_, size, est), (oid, acct) in zip(children, results):
+                    sent += 1
+                    if not oid:
+                        failed += 1
+                        continue
+                    account = account or acct
+                    ids.append(oid)
+                    filled += size
+                    cost += size * est
+                    remaining = round(remaining - size, 2)
+            if remaining < done_below - _EPS:
+                reason = "filled"
+                break
+            if self.clock.monotonic() + self.interval > deadline:
+                reason = "timeout" if sent else "no_depth"
+                break
+            self.clock.sleep(self.interval)
+        vwap = cost / filled if filled > _EPS else None
+        res = SliceResult(side, round(filled, 2), vwap, arrival, sent, failed, tuple(ids), account,
+                          self.clock.monotonic() - t0, reason)
+        self._record(intent, res)
+        return res
+
+    def _record(self, intent: OrderIntent, res: SliceResult):
+        with self._lock:
+            self.parents += 1
+            self.children += res.slices
+            self.child_failures += res.failed
+            self.requested_qty += float(intent.size)
+            self.filled_qty += res.filled
+            slip = res.slippage_bps
+            if slip is not None:
+                self._slip_sum += slip * res.filled
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "parents": self.parents,
+                "children": self.children,
+                "child_failures": self.child_failures,
+                "fill_ratio": round(self.filled_qty / self.requested_qty, 3) if self.requested_qty else None,
+                "slippage_bps": round(self._slip_sum / self.filled_qty, 1) if self.filled_qty else None,
+            }
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
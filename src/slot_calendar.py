@@ -0,0 +1,163 @@
+"""
+美东（America/New_York）时间槽日历
+- 预先算好各周期（5m / 15m / 1h / 4h / daily）在滚动窗口内每一场的 start/end 时间戳和 slug
+- 查“当前场 / 下一场”是对有序数组二分（O(log n)），窗口用完自动往后滚
+- 5m/15m/1h 能整除 1 小时：美东与 UTC 只差整小时，整点对齐就是纯算术，不需要时区库，
+  夏令时切换那天（凌晨 1 点重复一小时）也天然正确
+- 4h / daily 按美东本地日对齐，用 zoneinfo 生成，夏令时当天的槽会是 3h / 5h、23h / 25h
+"""
+from __future__ import annotations
+
+import bisect
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, NamedTuple, Optional
+
+try:
+    from zoneinfo import ZoneInfo  # py3.9+
+except Exception:
+    ZoneInfo = None  # type: ignore
+
+ET_TZ = "America/New_York"
+
+# series -> 周期（秒）
+SERIES_INTERVALS: Dict[str, int] = {
+    "5m": 300,
+    "15m": 900,
+    "1h": 3600,
+    "4h": 4 * 3600,
+    "daily": 86400,
+}
+
+DEFAULT_SLUG_FORMAT = "btc-updown-{series}-{start_ts}"
+
+
+class Slot(NamedTuple):
+    series: str
+    start_ts: int
+    end_ts: int
+    slug: str
+
+
+class _SeriesIndex:
+    __slots__ = ("starts", "ends", "slugs", "lo", "hi")
+
+    def __init__(self):
+        self.starts: List[int] = []
+        self.ends: List[int] = []
+        self.slugs: List[str] = []
+        self.lo = 0
+        self.hi = 0
+
+
+class SlotCalendar:
+    def __init__(
+        self,
+        series=("15m",),
+        horizon: int = 2 * 86400,
+        lookback: int = 86400,
+        slug_formats: Optional[Dict[str, str]] = None,
+    ):
+        self.series = tuple(series)
+        for s in self.series:
+            if s not in SERIES_INTERVALS:
+                raise ValueError(f"未知周期: {s}（支持 {', '.join(SERIES_INTERVALS)}）")
+            if 3600 % SERIES_INTERVALS[s] != 0 and ZoneInfo is None:
+                raise RuntimeError(f"周期 {s} 需要 zoneinfo（Python 3.9+ 或安装 backports.zoneinfo + tzdata）")
+        self.horizon = int(horizon)
+        self.lookback = int(lookback)
+        self.slug_formats = dict(slug_formats or {})
+        self._index: Dict[str, _SeriesIndex] = {s: _SeriesIndex() for s in self.series}
+        self._lock = threading.Lock()
+
+    # -----------------------------
+    # 生成
+    # -----------------------------
+    def _slug(self, series: str, start_ts: int) -> str:
+        return self.slug_formats.get(series, DEFAULT_SLUG_FORMAT).format(series=series, start_ts=start_ts)
+
+    def _arith_starts(self, interval: int, lo: int, hi: int) -> List[int]:
+        first = lo // interval * interval
+        return list(range(first, hi + interval, interval))
+
+    def _et_local_starts(self, interval: int, lo: int, hi: int) -> List[int]:
+        """按美东本地日对齐：每个本地日从 00:00 起每 interval 一个边界（墙钟时间）"""
+        tz = ZoneInfo(ET_TZ)
+        day = datetime.fromtimestamp(lo, tz=timezone.utc).astimezone(tz).date() - timedelta(days=1)
+        last_day = datetime.fromtimestamp(hi, tz=timezone.utc).astimezone(tz).date() + timedelta(days=1)
+        per_day = max(1, 86400 // interval)
+        out: List[int] = []
+        while day <= last_day:
+            for k in range(per_day):
+                secs = k * interval
+                local = datetime(day.year, day.month, day.day, secs // 3600, (secs % 3600) // 60, tzinfo=tz)
+                out.append(int(local.timestamp()))
+            day += timedelta(days=1)
+        return sorted(set(out))
+
+    def _build(self, series: str, around: int):
+        interval = SERIES_INTERVALS[series]
+        lo, hi = around - self.lookback, around + self.horizon
+        if 3600 % interval == 0:
+            starts = self._arith_starts(interval, lo, hi)
+        else:
+            starts = self._et_local_starts(interval, lo, hi)
+        idx = _SeriesIndex()
+        # 最后一个边界只当作前一场的 end
+        idx.starts = starts[:-1]
+        idx.ends = starts[1:]
+        idx.slugs = [self._slug(series, s) for s in idx.starts]
+        idx.lo, idx.hi = idx.starts[0], idx.ends[-1]
+        self._index[series] = idx
+
+    def _ensure(self, series: str, ts: int) -> _SeriesIndex:
+        idx = self._index.get(series)
+        if idx is None:
+            raise ValueError(f"日历未包含周期: {series}")
+        # 留一个周期的余量，保证 next_slot 也在窗口内
+        margin = SERIES_INTERVALS[series]
+        if not idx.starts or ts < idx.lo or ts + margin >= idx.hi:
+            with self._lock:
+                idx = self._index[series]
+                if not idx.starts or ts < idx.lo or ts + margin >= idx.hi:
+                    self._build(series, ts)
+                    idx = self._index[series]
+        return idx
+
+    # -----------------------------
+    # 查询
+    # -----------------------------
+    def slot_at(self, series: str, ts: float) -> Slot:
+        """ts 所在的那一场（start_ts <= ts < end_ts）"""
+        t = int(ts)
+        idx = self._ensure(series, t)
+        i = bisect.bisect_right(idx.starts, t) - 1
+        return Slot(series, idx.starts[i], idx.ends[i], idx.slugs[i])
+
+    def next_slot(self, series: str, ts: float) -> Slot:
+        t = int(ts)
+        idx = self._ensure(series, t)
+        i = bisect.bisect_right(idx.starts, t)
+        return Slot(series, idx.starts[i], idx.ends[i], idx.slugs[i])
+
+    def neighbours(self, series: str, ts: float, back: int, forward: int) -> List[Slot]:
+        """当前场前 back 场 ~ 后 forward 场（含当前）"""
+        t = int(ts)
+        idx = self._ensure(series, t)
+        i = bisect.bisect_right(idx.starts, t) - 1
+        lo, hi = max(0, i - back), min(len(idx.starts), i + forward + 1)
+        return [Slot(series, idx.starts[j], idx.ends[j], idx.slugs[j]) for j in range(lo, hi)]
+
+
+_DEFAULT: Optional[SlotCalendar] = None
+_DEFAULT_LOCK = threading.Lock()
+
+
+def default_calendar() -> SlotCalendar:
+    """进程级共享日历（包含全部周期；4h/daily 在没有 zoneinfo 时不可用）"""
+    global _DEFAULT
+    with _DEFAULT_LOCK:
+        if _DEFAULT is None:
+            series = [s for s, iv in SERIES_INTERVALS.items() if 3600 % iv == 0 or ZoneInfo is not None]
+            _DEFAULT = SlotCalendar(series=series)
+        return _DEFAULT
@@ -0,0 +1,387 @@
+"""
+BTC 现货参考价（决定 15m 涨跌的标的）
+- SpotRing：定长环形缓冲（预分配，最多每 min_spacing 秒一个样本，间隔内的成交只覆盖最新价）
+  每次更新 O(1)：动量（horizon 秒前的价格）用一个只往前走的滞后指针维护；
+  开盘价（market start_ts 时刻的价格）登记后在更新时顺手捕获，错过了再二分查一次并缓存
+  已实现波动率：按 vol_spacing 秒重采样的对数收益，增量维护 EWMA 和滚动窗口两个估计（每秒方差）
+- SpotFeed：后台线程订阅交易所 WebSocket（默认 Binance btcusdt@trade），断线指数退避重连
+  依赖 websockets（web3 已经带了；单独装：pip install websockets）
+- serve_replay：本地回放服务器，把录好的 (ts, price) 行情按原节奏推给 SpotFeed（离线调试用）
+
+用法（本地回放）：
+    python -m src.spot_feed serve ticks.jsonl --port 8765 [--speed 10]
+    SPOT_WS_URL=ws://127.0.0.1:8765 python -m src.arbitrage_bot
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, NamedTuple, Optional, Tuple
+
+try:
+    from websockets.sync.client import connect as _ws_connect  # 可选依赖
+except Exception:
+    _ws_connect = None  # type: ignore
+
+DEFAULT_WS_URL = "wss://stream.binance.com:9443/ws/btcusdt@trade"
+
+
+class SpotView(NamedTuple):
+    price: float
+    ts: float
+    age: float                      # 最新价距现在多少秒
+    anchor_price: Optional[float]   # start_ts 时刻的价格
+    move_bps: Optional[float]       # 开盘以来涨跌（基点）
+    momentum_bps: float             # 最近 horizon 秒的涨跌（基点）
+
+
+def parse_tick(raw: Any, recv_ts: float) -> Optional[Tuple[float, float]]:
+    """
+    交易所消息 -> (ts, price)
+    - Binance trade / aggTrade：{"p": "...", "T": ms} / {"E": ms}
+    - Binance bookTicker：{"b": bid, "a": ask} -> 中间价（没有时间戳，用接收时间）
+    - 通用 / 本地回放：{"price": ..., "ts": 秒}
+    """
+    try:
+        m = json.loads(raw) if isinstance(raw, (str, bytes, bytearray)) else raw
+    except ValueError:
+        return None
+    if not isinstance(m, dict):
+        return None
+    if "data" in m and isinstance(m["data"], dict):  # Binance combined stream
+        m = m["data"]
+    try:
+        if "p" in m:
+            ms = m.get("T") or m.get("E")
+            return (float(ms) / 1000.0 if ms else recv_ts), float(m["p"])
+        if "b" in m and "a" in m:
+            return recv_ts, (float(m["b"]) + float(m["a"])) / 2.0
+        if "price" in m:
+            ts = m.get("ts")
+            return (float(ts) if ts is not None else recv_ts), float(m["price"])
+    except (TypeError, ValueError):
+        return None
+    return None
+
+
+class SpotRing:
+    def __init__(self, capacity: int = 16384, min_spacing: float = 0.1, horizon: float = 5.0,
+                 vol_spacing: float = 1.0, vol_halflife: float = 300.0, vol_window: int = 900,
+                 vol_min_samples: int = 30):
+        self.capacity = int(capacity)
+        self.min_spacing = float(min_spacing)
+        self.horizon = float(horizon)
+        # 波动率：成交价在买卖价之间跳（微观结构噪声），按 vol_spacing 秒重采样后再算收益
+        self.vol_spacing = float(vol_spacing)
+        self.vol_halflife = float(vol_halflife)
+        self.vol_min_samples = int(vol_min_samples)
+        self._vol_ts = 0.0
+        self._vol_px = 0.0
+        self._ewma_var: Optional[float] = None
+        self._vol_n = 0
+        self._win: Deque[Tuple[float, float]] = deque(maxlen=int(vol_window))  # (r², dt)
+        self._win_r2 = 0.0
+        self._win_dt = 0.0
+        self._ts: List[float] = [0.0] * self.capacity
+        self._px: List[float] = [0.0] * self.capacity
+        self._count = 0         # 写入过的样本总数（逻辑下标 = 0..count-1，环里只留最后 capacity 个）
+        self._lag = 0           # 逻辑下标：最后一个 ts <= 最新 ts - horizon 的样本
+        self._anchors: Dict[int, Optional[float]] = {}
+        self._lock = threading.Lock()
+        self.updates = 0
+        self._listeners: List[Callable[["SpotRing"], None]] = []
+
+    def add_listener(self, fn: Callable[["SpotRing"], None]):
+        """每次更新后在写入线程里回调（要快：动量越线唤醒、公允价重算）"""
+        self._listeners.append(fn)
+
+    # -----------------------------
+    # 写
+    # -----------------------------
+    def update(self, ts: float, price: float):
+        if price <= 0:
+            return
+        with self._lock:
+            self.updates += 1
+            n = self._count
+            cap = self.capacity
+            if n:
+                last = (n - 1) % cap
+                last_ts = self._ts[last]
+                if ts < last_ts:
+                    ts = last_ts  # 乱序消息：按最新时间处理，不让时间倒退
+                # 开盘价：第一笔越过 start_ts 的成交之前的那个价格
+                if self._anchors:
+                    for start_ts, px in self._anchors.items():
+                        if px is None and ts >= start_ts > last_ts:
+                            self._anchors[start_ts] = self._px[last]
+                if ts - last_ts < self.min_spacing:
+                    self._px[last] = price
+                    self._advance_lag(ts)
+                else:
+                    self._append(ts, price)
+            else:
+                self._append(ts, price)
+        for cb in self._listeners:
+            cb(self)
+
+    def _append(self, ts: float, price: float):
+        if self._count:
+            # 上一个样本已经定格（后面不会再被覆盖），拿它更新波动率
+            j = (self._count - 1) % self.capacity
+            self._vol_sample(self._ts[j], self._px[j])
+        i = self._count % self.capacity
+        self._ts[i] = ts
+        self._px[i] = price
+        self._count += 1
+        self._advance_lag(ts)
+
+    def _advance_lag(self, now: float):
+        lo = max(0, self._count - self.capacity)
+        if self._lag < lo:
+            self._lag = lo
+        cut = now - self.horizon
+        cap = self.capacity
+        # 只往前走：整体摊还 O(1)
+        while self._lag + 1 < self._count and self._ts[(self._lag + 1) % cap] <= cut:
+            self._lag += 1
+
+    def _vol_sample(self, ts: float, price: float):
+        if self._vol_px <= 0:
+            self._vol_ts, self._vol_px = ts, price
+            return
+        dt = ts - self._vol_ts
+        if dt < self.vol_spacing:
+            return
+        r = math.log(price / self._vol_px)
+        self._vol_ts, self._vol_px = ts, price
+        r2 = r * r
+        inst = r2 / dt
+        # EWMA（按时间衰减）
+        if self._ewma_var is None:
+            self._ewma_var = inst
+        else:
+            a = 1.0 - math.exp(-dt * math.log(2.0) / self.vol_halflife)
+            self._ewma_var += a * (inst - self._ewma_var)
+        # 滚动窗口：sum(r²) / sum(dt)
+        if len(self._win) == self._win.maxlen:
+            old_r2, old_dt = self._win[0]
+            self._win_r2 -= old_r2
+            self._win_dt -= old_dt
+        self._win.append((r2, dt))
+        self._win_r2 += r2
+        self._win_dt += dt
+        self._vol_n += 1
+
+    def realized_var(self, kind: str = "ewma") -> Optional[float]:
+        """每秒对数收益方差；样本不够返回 None。kind: "ewma" / "window" """
+        if self._vol_n < self.vol_min_samples:
+            return None
+        if kind == "window":
+            return self._win_r2 / self._win_dt if self._win_dt > 0 else None
+        return self._ewma_var
+
+    # -----------------------------
+    # 读
+    # -----------------------------
+    def __len__(self) -> int:
+        return min(self._count, self.capacity)
+
+    def last(self) -> Optional[Tuple[float, float]]:
+        n = self._count
+        if not n:
+            return None
+        i = (n - 1) % self.capacity
+        return self._ts[i], self._px[i]
+
+    def momentum_bps(self) -> float:
+        """最近 horizon 秒的涨跌（基点），O(1)"""
+        n = self._count
+        if not n:
+            return 0.0
+        lag_px = self._px[self._lag % self.capacity]
+        return (self._px[(n - 1) % self.capacity] / lag_px - 1.0) * 1e4 if lag_px > 0 else 0.0
+
+    def price_at(self, ts: float) -> Optional[float]:
+        """ts 时刻的价格（ts 之前最后一个样本）；早于缓冲区返回 None"""
+        with self._lock:
+            return self._price_at(ts)
+
+    def _price_at(self, ts: float) -> Optional[float]:
+        n = self._count
+        lo = max(0, n - self.capacity)
+        cap = self.capacity
+        if n == 0 or self._ts[lo % cap] > ts:
+            return None
+        hi = n - 1
+        while lo < hi:  # 最后一个 ts <= 目标
+            mid = (lo + hi + 1) // 2
+            if self._ts[mid % cap] <= ts:
+                lo = mid
+            else:
+                hi = mid - 1
+        return self._px[lo % cap]
+
+    def watch(self, start_ts: int):
+        """登记开盘时刻：价格在越过 start_ts 的那次更新里顺手记下"""
+        with self._lock:
+            if start_ts in self._anchors:
+                return
+            last = self.last()
+            self._anchors[start_ts] = self._price_at(start_ts) if last and last[0] >= start_ts else None
+            # 只留最近几场
+            while len(self._anchors) > 8:
+                self._anchors.pop(min(self._anchors))
+
+    def anchor(self, start_ts: int) -> Optional[float]:
+        with self._lock:
+            px = self._anchors.get(start_ts)
+            if px is None:
+                last = self.last()
+                if last and last[0] >= start_ts:
+                    px = self._price_at(start_ts)
+                    if px is not None:
+                        self._anchors[start_ts] = px
+            return px
+
+    def view(self, start_ts: Optional[int], now: float) -> Optional[SpotView]:
+        last = self.last()
+        if last is None:
+            return None
+        ts, price = last
+        anchor = self.anchor(start_ts) if start_ts is not None else None
+        return SpotView(
+            price=price,
+            ts=ts,
+            age=max(0.0, now - ts),
+            anchor_price=anchor,
+            move_bps=(price / anchor - 1.0) * 1e4 if anchor else None,
+            momentum_bps=self.momentum_bps(),
+        )
+
+
+class SpotFeed:
+    """后台线程：WebSocket -> SpotRing"""
+
+    def __init__(self, url: str = DEFAULT_WS_URL, ring: Optional[SpotRing] = None,
+                 subscribe: Optional[str] = None, clock: Callable[[], float] = time.time):
+        self.url = url
+        self.ring = ring or SpotRing()
+        self.subscribe = subscribe
+        self._clock = clock
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.connected = False
+        self.reconnects = 0
+        self.bad_messages = 0
+
+    def start(self) -> "SpotFeed":
+        if _ws_connect is None:
+            raise RuntimeError("SpotFeed 需要 websockets：pip install websockets")
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="spot-feed", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        backoff = 0.5
+        while not self._stop.is_set():
+            try:
+                with _ws_connect(self.url, open_timeout=10, compression=None) as ws:
+                    if self.subscribe:
+                        ws.send(self.subscribe)
+                    self.connected = True
+                    backoff = 0.5
+                    print(f"📡 现货行情已连接: {self.url}")
+                    while not self._stop.is_set():
+                        try:
+                            msg = ws.recv(timeout=1.0)
+                        except TimeoutError:
+                            continue
+                        tick = parse_tick(msg, self._clock())
+                        if tick is None:
+                            self.bad_messages += 1
+                            continue
+                        self.ring.update(*tick)
+            except Exception as e:
+                if self._stop.is_set():
+                    break
+                print(f"⚠️ 现货行情断开: {e}（{backoff:.1f}s 后重连）")
+            self.connected = False
+            if self._stop.wait(backoff):
+                break
+            self.reconnects += 1
+            backoff = min(30.0, backoff * 2)
+
+
+# -----------------------------
+# 本地回放服务器
+# -----------------------------
+def load_ticks(path: str) -> List[Tuple[float, float]]:
+    """jsonl（{"ts":..,"price":..}）或 csv（ts,price）"""
+    out: List[Tuple[float, float]] = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line[0] == "{":
+                tick = parse_tick(line, 0.0)
+                if tick:
+                    out.append(tick)
+                continue
+            parts = line.split(",")
+            try:
+                out.append((float(parts[0]), float(parts[1])))
+            except (IndexError, ValueError):
+                continue  # 表头
+    return out
+
+
+def serve_replay(ticks: List[Tuple[float, float]], host: str = "127.0.0.1", port: int = 8765,
+                 speed: float = 1.0, rebase: bool = True):
+    """
+    每个连接从头回放；rebase=True 时把时间戳平移到“现在”，speed>1 加速
+    """
+    from websockets.sync.server import serve
+
+    def handler(ws):
+        if not ticks:
+            return
+        t0 = ticks[0][0]
+        wall0 = time.time()
+        for ts, px in ticks:
+            due = wall0 + (ts - t0) / speed
+            delay = due - time.time()
+            if delay > 0:
+                time.sleep(delay)
+            out_ts = wall0 + (ts - t0) / speed if rebase else ts
+            ws.send(json.dumps({"ts": out_ts, "price": px}))
+
+    with serve(handler, host, port, compression=None) as server:
+        print(f"📼 回放服务器: ws://{host}:{port}（{len(ticks)} 笔，{speed}x）")
+        server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="现货行情工具")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("serve", help="本地回放服务器")
+    p.add_argument("file")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8765)
+    p.add_argument("--speed", type=float, default=1.0)
+    args = parser.parse_args()
+    if args.cmd == "serve":
+        serve_replay(load_ticks(args.file), args.host, args.port, args.speed)
+
+
+if __name__ == "__main__":
+    main()
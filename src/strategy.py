@@ -0,0 +1,234 @@
+"""
+策略引擎（一个 tick 只取一次行情，多个策略 / 参数组合共用）
+- MarketSnapshot：本 tick 的不可变快照（UP/DOWN 买一卖一、离到期时间、持仓、本场是否已买过）
+- Strategy.evaluate(snapshot) -> OrderIntent 列表：纯函数，不做 I/O、不下单
+- StrategyEngine：跑所有策略，把意图去重 / 对冲轧差后交给机器人执行
+  多跑几个参数组合不会多发一个网络请求
+"""
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from src.models import Position
+from src.spot_feed import SpotView
+
+_EPS = 1e-9
+
+
+class SideBook(NamedTuple):
+    token_id: str
+    side_name: str          # "UP" / "DOWN"
+    ask: Optional[float]
+    bid: Optional[float]
+    position: Optional[Position]
+    bought: bool            # 本场这个方向已经买过（每方向每场只买一次）
+    pair_size: float = 0.0  # 互补套利成对持有的数量（和单腿持仓分开记）
+    fair: Optional[float] = None    # 模型公允价（没开 FAIR_VALUE 或还算不出来时为 None）
+
+    @property
+    def edge(self) -> Optional[float]:
+        """fair - ask：正数说明卖一比模型便宜"""
+        if self.fair is None or self.ask is None:
+            return None
+        return self.fair - self.ask
+
+
+class MarketSnapshot(NamedTuple):
+    now: float
+    slug: str
+    start_ts: int
+    end_ts: int
+    sides: Tuple[SideBook, ...]
+    spot: Optional[SpotView] = None     # BTC 现货参考价（没接行情时为 None）
+
+    @property
+    def time_to_expiry(self) -> float:
+        return self.end_ts - self.now
+
+    def side(self, side_name: str) -> Optional[SideBook]:
+        for s in self.sides:
+            if s.side_name == side_name:
+                return s
+        return None
+
+
+class OrderIntent(NamedTuple):
+    token_id: str
+    side_name: str
+    side: str               # "BUY" / "SELL"
+    price: float            # 下单限价
+    size: float
+    ref_price: float        # 触发时的盘口价（记账用）
+    order_type: str = "FOK"
+    account: Optional[str] = None
+    reason: str = ""
+    strategies: Tuple[str, ...] = ()
+    group: str = ""         # 非空：同组意图必须成对执行（互补套利两条腿），不参与去重/轧差
+
+
+class Strategy:
+    name = "strategy"
+
+    def evaluate(self, snap: MarketSnapshot) -> Iterable[OrderIntent]:
+        raise NotImplementedError
+
+
+class ThresholdStrategy(Strategy):
+    """
+    原来的规则：
+    - 买入：无持仓、本场没买过、Ask <= buy_price，限价 ask + buffer（最高 0.99）
+    - 卖出：有持仓、Bid >= sell_price，限价 bid - buffer（最低 0.01）
+    - spot_gate_bps 不为 None 时买入还要现货确认：开盘以来的方向和要买的一边一致，
+      且最近几秒没有反向走超过 spot_gate_bps；现货行情缺失或过期时不买
+    """
+
+    def __init__(self, buy_price: float, sell_price: float, size: float,
+                 buffer: float = 0.005, name: Optional[str] = None,
+                 spot_gate_bps: Optional[float] = None, spot_max_age: float = 2.0):
+        self.buy_price = float(buy_price)
+        self.sell_price = float(sell_price)
+        self.size = float(size)
+        self.buffer = float(buffer)
+        self.name = name or f"threshold@{self.buy_price:g}/{self.sell_price:g}"
+        self.spot_gate_bps = spot_gate_bps
+        self.spot_max_age = float(spot_max_age)
+
+    @classmethod
+    def from_config(cls, config, name: str = "threshold") -> "ThresholdStrategy":
+        gate = float(config.SPOT_GATE_BPS) if getattr(config, "SPOT_GATE", False) else None
+        return cls(config.BUY_PRICE, config.SELL_PRICE, config.ORDER_SIZE, name=name,
+                   spot_gate_bps=gate, spot_max_age=getattr(config, "SPOT_MAX_AGE", 2.0))
+
+    def spot_confirms(self, spot: Optional[SpotView], side_name: str) -> bool:
+        if self.spot_gate_bps is None:
+            return True
+        if spot is None or spot.move_bps is None or spot.age > self.spot_max_age:
+            return False
+        if side_name == "UP":
+            return spot.move_bps >= 0 and spot.momentum_bps >= -self.spot_gate_bps
+        return spot.move_bps <= 0 and spot.momentum_bps <= self.spot_gate_bps
+
+    def evaluate(self, snap: MarketSnapshot) -> List[OrderIntent]:
+        out: List[OrderIntent] = []
+        for s in snap.sides:
+            if s.ask is None or s.bid is None:
+                continue
+            pos = s.position
+            if pos is None:
+                if not s.bought and s.ask <= self.buy_price and self.spot_confirms(snap.spot, s.side_name):
+                    out.append(OrderIntent(
+                        token_id=s.token_id, side_name=s.side_name, side="BUY",
+                        price=round(min(0.99, s.ask + self.buffer), 4), size=round(self.size, 2),
+                        ref_price=s.ask, reason=f"Ask=${s.ask:.4f} <= {self.buy_price:.4f}",
+                        strategies=(self.name,),
+                    ))
+            elif s.bid >= self.sell_price:
+                out.append(OrderIntent(
+                    token_id=s.token_id, side_name=s.side_name, side="SELL",
+                    price=round(max(0.01, s.bid - self.buffer), 4), size=round(pos.size, 2),
+                    ref_price=s.bid, account=pos.account,
+                    reason=f"Bid=${s.bid:.4f} >= {self.sell_price:.4f}",
+                    strategies=(self.name,),
+                ))
+        return out
+
+
+def parse_variants(spec: str, size: float) -> List[ThresholdStrategy]:
+    """STRATEGY_VARIANTS="0.75:0.95,0.70:0.92:10" -> 额外的阈值策略（buy:sell[:size]）"""
+    out: List[ThresholdStrategy] = []
+    for part in (spec or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        fields = part.split(":")
+        if len(fields) not in (2, 3):
+            raise ValueError(f"STRATEGY_VARIANTS 格式错误: {part}（应为 buy:sell[:size]）")
+        buy, sell = float(fields[0]), float(fields[1])
+        out.append(ThresholdStrategy(buy, sell, float(fields[2]) if len(fields) == 3 else size))
+    return out
+
+
+def _merge(group: List[OrderIntent]) -> OrderIntent:
+    """同一 token 同方向的意图去重：数量取最大，限价取最激进的"""
+    first = group[0]
+    if len(group) == 1:
+        return first
+    names: List[str] = []
+    for it in group:
+        names.extend(n for n in it.strategies if n not in names)
+    if first.side == "BUY":
+        best = max(group, key=lambda it: it.price)
+    else:
+        best = min(group, key=lambda it: it.price)
+    return best._replace(size=max(it.size for it in group), strategies=tuple(names))
+
+
+def net_intents(intents: Sequence[OrderIntent]) -> List[OrderIntent]:
+    """
+    按 token 合并：同方向去重；同一 token 既有买又有卖时轧差，只下净额那一边
+    输出顺序按 token 第一次出现的顺序；成组意图原样放在最前面
+    """
+    order: List[str] = []
+    groups: Dict[str, Dict[str, List[OrderIntent]]] = {}
+    paired: List[OrderIntent] = []
+    for it in intents:
+        if it.group:
+            paired.append(it)
+            continue
+        g = groups.get(it.token_id)
+        if g is None:
+            g = groups[it.token_id] = {"BUY": [], "SELL": []}
+            order.append(it.token_id)
+        g[it.side].append(it)
+
+    out: List[OrderIntent] = paired
+    for token_id in order:
+        g = groups[token_id]
+        buy = _merge(g["BUY"]) if g["BUY"] else None
+        sell = _merge(g["SELL"]) if g["SELL"] else None
+        if buy is not None and sell is not None:
+            net = buy.size - sell.size
+            if abs(net) < _EPS:
+                continue
+            if net > 0:
+                buy, sell = buy._replace(size=round(net, 2)), None
+            else:
+                buy, sell = None, sell._replace(size=round(-net, 2))
+        if buy is not None:
+            out.append(buy)
+        if sell is not None:
+            out.append(sell)
+    return out
+
+
+class StrategyEngine:
+    def __init__(self, strategies: Sequence[Strategy]):
+        if not strategies:
+            raise ValueError("至少需要一个策略")
+        self.strategies = list(strategies)
+        self.errors: Dict[str, int] = {}
+
+    @classmethod
+    def from_config(cls, config) -> "StrategyEngine":
+        strategies: List[Strategy] = [ThresholdStrategy.from_config(config)]
+        strategies.extend(parse_variants(getattr(config, "STRATEGY_VARIANTS", ""), config.ORDER_SIZE))
+        if getattr(config, "COMPLEMENT_ARB", False):
+            from src.complement import ComplementArbStrategy
+            strategies.append(ComplementArbStrategy.from_config(config))
+        if getattr(config, "FAIR_VALUE", False) and getattr(config, "FAIR_TRADE", False):
+            from src.fair_value import FairValueStrategy
+            strategies.append(FairValueStrategy.from_config(config))
+        return cls(strategies)
+
+    def evaluate(self, snap: MarketSnapshot) -> List[OrderIntent]:
+        intents: List[OrderIntent] = []
+        for strat in self.strategies:
+            try:
+                intents.extend(strat.evaluate(snap))
+            except Exception as e:
+                # 单个策略出错不影响其他策略
+                self.errors[strat.name] = self.errors.get(strat.name, 0) + 1
+                print(f"⚠️ 策略 {strat.name} 出错: {e}")
+        if len(self.strategies) == 1:
+            return intents
+        return net_intents(intents)
@@ -13,24 +13,51 @@
 from __future__ import annotations
 
 from decimal import Decimal
-from typing import Optional, Dict, Any, Tuple, List
-
-from eth_account import Account
-from py_clob_client.client import ClobClient
-from py_clob_client.constants import POLYGON
-
-# side 常量（不同版本位置可能不同）
-try:
-    from py_clob_client.order_builder.constants import BUY, SELL
-except Exception:
-    BUY, SELL = "BUY", "SELL"
-
-# OrderType（可能存在）
-try:
-    from py_clob_client.clob_types import OrderType  # noqa
-    HAS_ORDER_TYPE = True
-except Exception:
-    HAS_ORDER_TYPE = False
+from functools import lru_cache
+from typing import TYPE_CHECKING, Callable, Optional, Dict, Any, Tuple, List
+
+from src.clock import SYSTEM_CLOCK, Clock
+from src.hedging import HedgedCaller, PublicQuoteSession
+from src.models import Quote
+from src.profiler import tick_phase
+from src.quote_router import QuoteRouter, QuoteSource, QuoteSourceError
+from src.signing import OrderSpec, SigningError, SigningService, Wallet, get_signing_service
+from src.rate_limit import (
+    PRIORITY_CANCEL,
+    PRIORITY_DISCOVERY,
+    PRIORITY_ORDER,
+    PRIORITY_QUOTE,
+    RequestScheduler,
+    get_scheduler,
+    retry_after_from,
+)
+
+# 重依赖（web3 / eth_account / py_clob_client）延迟到 _initialize_client 再导入，
+# 这样 import 本模块几乎零成本，快速启动时可以和市场查找并行加载
+if TYPE_CHECKING:  # pragma: no cover
+    from py_clob_client.client import ClobClient
+
+
+@lru_cache(maxsize=None)
+def _side_constants() -> Tuple[Any, Any]:
+    """side 常量（不同版本位置可能不同）"""
+    try:
+        from py_clob_client.order_builder.constants import BUY, SELL
+    except Exception:
+        BUY, SELL = "BUY", "SELL"
+    return BUY, SELL
+
+
+def _as_price(info: Optional[Dict[str, Any]]) -> Optional[float]:
+    if not info:
+        return None
+    p = info.get("price")
+    if p is None:
+        return None
+    try:
+        return float(p)
+    except (TypeError, ValueError):
+        return None
 
 
 class _ArgsShim:
@@ -49,21 +76,65 @@ class _ArgsShim:
 
 
 class TradingClient:
-    def __init__(self, config):
+    def __init__(self, config, scheduler: Optional[RequestScheduler] = None, clock: Optional[Clock] = None):
         self.config = config
+        # 报价打时间戳用（单调时钟；模拟时和机器人共用虚拟时钟）
+        self.clock: Clock = clock or SYSTEM_CLOCK
         self.client: Optional[ClobClient] = None
         self.account = None
+        self._method_cache: Dict[Tuple[str, ...], Tuple[Any, Optional[Callable]]] = {}
+        # 与 lookup.py 共用的 CLOB 限频桶（下单 > 撤单 > 报价 > 其它）
+        self.scheduler = scheduler or get_scheduler("clob")
+        # 对冲报价（HEDGE_QUOTES=true 时启用）
+        self._price_hedger: Optional[HedgedCaller] = None
+        self._book_hedger: Optional[HedgedCaller] = None
+        self._chain_id: Optional[int] = None
         self._initialize_client()
+        # 多进程签名（SIGN_WORKERS > 0）：签名不占交易线程，多市场一串订单并行签；启动时预热
+        self.signing: Optional[SigningService] = None
+        if not getattr(config, "DRY_RUN", False):
+            self.signing = get_signing_service(config)
+            if self.signing is not None:
+                try:
+                    n = self.signing.warm(self._wallet())
+                    print(f"✅ 签名进程已预热: {n} 个（{self.signing.warm_secs:.1f}s）")
+                except SigningError as e:
+                    print(f"⚠️ {e}，改回交易线程签名")
+                    self.signing = None
+        if getattr(config, "HEDGE_QUOTES", False):
+            self._init_hedging()
+        # 报价源路由（QUOTE_ROUTER=true）：price / book 按健康度选，ws 源由机器人在开了 USE_WSS 时注册
+        self.quote_router: Optional[QuoteRouter] = None
+        if getattr(config, "QUOTE_ROUTER", False):
+            self.quote_router = QuoteRouter.from_config(config, [
+                QuoteSource("price", self._quote_from_prices),
+                QuoteSource("book", self._quote_from_book),
+            ])
 
     # -----------------------------
     # 兼容工具
     # -----------------------------
     def _get_method(self, *names):
+        # 热路径（每 tick 多次）：按 client 缓存解析结果，换 client 自动失效
+        hit = self._method_cache.get(names)
+        if hit is not None and hit[0] is self.client:
+            return hit[1]
+        found = None
         for n in names:
             fn = getattr(self.client, n, None)
             if callable(fn):
-                return fn
-        return None
+                found = fn
+                break
+        self._method_cache[names] = (self.client, found)
+        return found
+
+    def _throttled(self, priority: int, fn: Callable, *args, **kwargs):
+        return self.scheduler.call(priority, fn, *args, **kwargs)
+
+    def _note_throttle(self, err: Exception):
+        wait = retry_after_from(err)
+        if wait is not None:
+            self.scheduler.penalize(wait)
 
     def _coerce_api_creds(self, creds: Any) -> Any:
         """dict -> ApiCreds 对象（关键修复：L2 headers 需要 creds.api_secret）"""
@@ -106,7 +177,12 @@ class TradingClient:
     # 初始化
     # -----------------------------
     def _initialize_client(self):
+        from eth_account import Account
+        from py_clob_client.client import ClobClient
+        from py_clob_client.constants import POLYGON
+
         self.account = Account.from_key(self.config.POLYMARKET_PRIVATE_KEY)
+        self._chain_id = POLYGON
 
         client_params = {
             "host": self.config.POLYMARKET_HOST,
@@ -137,6 +213,42 @@ class TradingClient:
 
         print("✅ 交易客户端初始化成功")
 
+    # -----------------------------
+    # 签名（多进程）
+    # -----------------------------
+    def _wallet(self) -> Wallet:
+        return Wallet(self.config.POLYMARKET_PRIVATE_KEY, self._chain_id, self.config.POLYMARKET_SIGNATURE_TYPE,
+                      getattr(self.config, "POLYMARKET_FUNDER", None) or None)
+
+    def _order_spec(self, kind: str, token_id: str, side_u: str, price: float, size: float,
+                    taker: Optional[str] = None) -> Optional[OrderSpec]:
+        """
+        子进程签名用的订单参数：tick_size / neg_risk / 费率由 ClobClient 查（按 token 缓存，
+        和它自己 create_order 时查的是同一份）；client 没有这些接口时返回 None（回落到 create_*）
+        """
+        tick_fn = self._get_method("get_tick_size")
+        neg_fn = self._get_method("get_neg_risk")
+        fee_fn = self._get_method("get_fee_rate_bps")
+        if not (tick_fn and neg_fn and fee_fn):
+            return None
+        extra = {"taker": taker} if taker else {}
+        return OrderSpec(self._wallet(), kind, str(token_id), side_u, float(price), float(size),
+                         int(fee_fn(token_id) or 0), str(tick_fn(token_id)), bool(neg_fn(token_id)), **extra)
+
+    def _sign_remote(self, kind: str, token_id: str, side_u: str, price: float, size: float,
+                     taker: Optional[str] = None) -> Any:
+        """交给签名进程签；没开 / 失败返回 None，调用方在本线程用 create_* 签"""
+        if self.signing is None:
+            return None
+        try:
+            spec = self._order_spec(kind, token_id, side_u, price, size, taker)
+            return self.signing.sign(spec) if spec is not None else None
+        except SigningError as e:
+            print(f"⚠️ {e}，本单在交易线程签名")
+        except Exception as e:
+            print(f"⚠️ 签名参数查询失败: {e}，本单在交易线程签名")
+        return None
+
     # -----------------------------
     # 余额（USDC）
     # -----------------------------
@@ -160,11 +272,11 @@ class TradingClient:
 
             if upd_fn:
                 try:
-                    upd_fn(params)
+                    self._throttled(PRIORITY_DISCOVERY, upd_fn, params)
                 except Exception:
                     pass
 
-            result = get_fn(params)
+            result = self._throttled(PRIORITY_DISCOVERY, get_fn, params)
             bal_raw = result.get("balance") if isinstance(result, dict) else getattr(result, "balance", None)
             if bal_raw is None:
                 return 0.0
@@ -217,29 +329,97 @@ class TradingClient:
         except Exception:
             return None
 
-    def get_orderbook(self, token_id: str) -> Any:
+    # -----------------------------
+    # 对冲报价：主请求超过 p95 未返回时在独立连接上补发
+    # -----------------------------
+    def _init_hedging(self):
+        session = PublicQuoteSession(self.config.POLYMARKET_HOST)
+        kwargs = dict(
+            min_delay=float(self.config.HEDGE_MIN_DELAY_MS) / 1000.0,
+            max_delay=float(self.config.HEDGE_MAX_DELAY_MS) / 1000.0,
+            # 补发也要占报价额度；额度不够就不对冲，老老实实等主请求
+            allow_hedge=lambda: self.scheduler.try_acquire(PRIORITY_QUOTE),
+        )
+        self._price_hedger = HedgedCaller("price", self._fetch_price_raw, self._hedge_call(session.get_price), **kwargs)
+        self._book_hedger = HedgedCaller("book", self._fetch_book_raw, self._hedge_call(session.get_order_book), **kwargs)
+
+    def _hedge_call(self, fn: Callable) -> Callable:
+        def _call(*args, **kwargs):
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                resp = getattr(e, "response", None)
+                if resp is not None:
+                    self._note_throttle(resp)
+                raise
+        return _call
+
+    def hedge_stats(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {}
+        if self._price_hedger:
+            out["price"] = self._price_hedger.stats()
+        if self._book_hedger:
+            out["book"] = self._book_hedger.stats()
+        return out
+
+    def _fetch_book_raw(self, token_id: str) -> Any:
         fn = self._get_method("get_order_book", "get_orderbook", "getOrderBook")
         if not fn:
             raise AttributeError("无法找到 get_order_book/get_orderbook/getOrderBook 方法")
-        return fn(token_id)
+        return self._throttled(PRIORITY_QUOTE, fn, token_id)
+
+    def _fetch_price_raw(self, token_id: str, side: str) -> Any:
+        fn = self._get_method("get_price", "getPrice")
+        if not fn:
+            return None
+        return self._throttled(PRIORITY_QUOTE, fn, token_id, side=side)
+
+    def get_orderbook(self, token_id: str) -> Any:
+        if self._book_hedger is not None:
+            return self._book_hedger.call(token_id)
+        return self._fetch_book_raw(token_id)
+
+    def _price_info(self, result: Any) -> Optional[Dict[str, Any]]:
+        if isinstance(result, dict):
+            return result
+        elif hasattr(result, "price"):
+            return {"price": float(result.price)}
+        return None
+
+    def _call_price(self, token_id: str, side: str) -> Optional[Dict[str, Any]]:
+        """get_price 的一次调用（失败直接抛，给报价源路由记账）"""
+        if self._price_hedger is not None:
+            result = self._price_hedger.call(token_id, side)
+        else:
+            result = self._fetch_price_raw(token_id, side)
+        return self._price_info(result)
 
     def get_price(self, token_id: str, side: str = "BUY") -> Optional[Dict[str, Any]]:
         """
         使用get_price获取真实价格（推荐，比orderbook更准确）
         """
         try:
-            get_price_fn = self._get_method("get_price", "getPrice")
-            if get_price_fn:
-                result = get_price_fn(token_id, side=side)
-                if isinstance(result, dict):
-                    return result
-                elif hasattr(result, "price"):
-                    return {"price": float(result.price)}
-            return None
+            return self._call_price(token_id, side)
         except Exception as e:
             print(f"⚠️  get_price失败: {e}")
             return None
 
+    def _book_ts(self, ob: Any) -> Optional[float]:
+        """/book 的 timestamp（毫秒字符串）-> unix 秒"""
+        raw = ob.get("timestamp") if isinstance(ob, dict) else getattr(ob, "timestamp", None)
+        try:
+            return float(raw) / 1000.0 if raw else None
+        except (TypeError, ValueError):
+            return None
+
+    def _book_top(self, ob: Any) -> Quote:
+        """盘口的卖一 / 买一：不依赖接口返回的排序方向，直接取最小 ask / 最大 bid"""
+        asks, bids = self._extract_levels(ob)
+        ask_px = [p for p in map(self._level_price, asks) if p is not None]
+        bid_px = [p for p in map(self._level_price, bids) if p is not None]
+        return Quote(min(ask_px) if ask_px else None, max(bid_px) if bid_px else None,
+                     exchange_ts=self._book_ts(ob))
+
     def get_best_price(self, token_id: str, side: str = "buy") -> Optional[float]:
         """
         获取最佳价格（优先使用get_price，回退到orderbook）
@@ -253,37 +433,87 @@ class TradingClient:
         
         # 回退到orderbook
         try:
-            ob = self.get_orderbook(token_id)
-            asks, bids = self._extract_levels(ob)
-
-            if side == "buy":
-                if not asks:
-                    return None
-                return self._level_price(asks[0])
-            else:
-                if not bids:
-                    return None
-                return self._level_price(bids[0])
+            top = self._book_top(self.get_orderbook(token_id))
+            return top.ask if side == "buy" else top.bid
         except Exception as e:
             print(f"❌ 获取最佳价格失败: {e}")
             return None
 
-    def get_top_levels(self, token_id: str, depth: int = 5) -> Dict[str, List[Tuple[float, float]]]:
-        """给你调试盘口用"""
+    # -----------------------------
+    # 报价源：price（买卖各一次 /price）、book（一次 /book）；BookFeed 可注册成 ws 源
+    # -----------------------------
+    def _quote_from_prices(self, token_id: str) -> Quote:
+        mono = self.clock.monotonic
+        sent = mono()
+        ask = _as_price(self._call_price(token_id, "BUY"))
+        recv = mono()
+        bid = _as_price(self._call_price(token_id, "SELL"))
+        if ask is None and bid is None:
+            raise QuoteSourceError("get_price 买卖两边都没有价格")
+        # 只有一边：和非路由模式一样查一次 /book 补上（不补的话半边报价会被当成这个源的成功）
+        return self._fill_from_book(token_id, Quote(ask, bid, sent, recv))
+
+    def _fill_from_book(self, token_id: str, quote: Quote) -> Quote:
+        """/price 缺的那边用 /book 的买一 / 卖一补；/book 也失败时原样返回（调用方按取不到价格计数）"""
+        if quote.ask is not None and quote.bid is not None:
+            return quote
+        try:
+            top = self._quote_from_book(token_id)
+        except Exception as e:
+            print(f"❌ 获取最佳价格失败: {e}")
+            return quote
+        return quote._replace(ask=top.ask if quote.ask is None else quote.ask,
+                              bid=top.bid if quote.bid is None else quote.bid,
+                              exchange_ts=top.exchange_ts)
+
+    def _quote_from_book(self, token_id: str) -> Quote:
+        sent = self.clock.monotonic()
+        ob = self.get_orderbook(token_id)
+        return self._book_top(ob)._replace(sent_ts=sent, recv_ts=self.clock.monotonic())
+
+    def add_quote_source(self, source: QuoteSource):
+        if self.quote_router is not None:
+            self.quote_router.add(source)
+
+    def quote_stats(self) -> Dict[str, Dict[str, Any]]:
+        return self.quote_router.stats() if self.quote_router is not None else {}
+
+    def get_quote(self, token_id: str) -> Quote:
+        """
+        一个 token 的 ask/bid，在这里一次性转成 float（策略热路径不再 float()）
+        QUOTE_ROUTER=true：按健康度选源（熔断的源不再每 tick 白调一次）
+        否则固定顺序：get_price 两边，缺哪边再查一次 orderbook 补上（不重复调 get_price）
+        """
+        if self.quote_router is not None:
+            return self.quote_router.get_quote(token_id)
+        mono = self.clock.monotonic
+        sent = mono()
+        ask = _as_price(self.get_price(token_id, side="BUY"))
+        recv = mono()
+        bid = _as_price(self.get_price(token_id, side="SELL"))
+        return self._fill_from_book(token_id, Quote(ask, bid, sent, recv))
+
+    def get_top_levels(self, token_id: str, depth: int = 5) -> Dict[str, Any]:
+        """给你调试盘口用（recv_ts：本地单调时钟收到的时刻；exchange_ts：交易所盘口时间）"""
         ob = self.get_orderbook(token_id)
+        recv = self.clock.monotonic()
         asks, bids = self._extract_levels(ob)
         out_asks, out_bids = [], []
-        for lvl in (asks or [])[:depth]:
+        for lvl in asks or []:
             p = self._level_price(lvl)
             s = self._level_size(lvl)
             if p is not None and s is not None:
                 out_asks.append((p, s))
-        for lvl in (bids or [])[:depth]:
+        for lvl in bids or []:
             p = self._level_price(lvl)
             s = self._level_size(lvl)
             if p is not None and s is not None:
                 out_bids.append((p, s))
-        return {"asks": out_asks, "bids": out_bids}
+        # 接口返回的排序方向不保证：卖盘从低到高、买盘从高到低
+        out_asks.sort()
+        out_bids.sort(reverse=True)
+        return {"asks": out_asks[:depth], "bids": out_bids[:depth],
+                "recv_ts": recv, "exchange_ts": self._book_ts(ob)}
 
     # -----------------------------
     # 下单（盘口价成交优先：market order + price limit）
@@ -311,6 +541,11 @@ class TradingClient:
             print(f"❌ side必须BUY/SELL，当前={side}")
             return None
 
+        # 下单优先级最高：报价/发现再多也只能用保留线以上的令牌
+        if not self.scheduler.acquire(PRIORITY_ORDER):
+            print(f"❌ 下单限频：{self.scheduler.name} 额度不足，放弃本次 {side_u}")
+            return None
+
         token_id = str(token_id)
         px = float(price)
         sz = float(size)
@@ -330,6 +565,7 @@ class TradingClient:
         except:
             pass
         fee_bps = max(1, int(fee_bps))  # 确保至少为1，不能为0
+        BUY, SELL = _side_constants()
 
         create_market_fn = self._get_method("create_market_order", "createMarketOrder")
         create_limit_fn = self._get_method("create_order", "createOrder")
@@ -357,23 +593,28 @@ class TradingClient:
                     taker=self.account.address,  # 添加taker地址
                 )
 
-                signed = create_market_fn(m_args)
+                with tick_phase("sign"):
+                    signed = self._sign_remote("market", token_id, side_u, px, amount, self.account.address)
+                    if signed is None:
+                        signed = create_market_fn(m_args)
 
                 # post_order 的 orderType 参数：有的要关键字 orderType
-                try:
-                    resp = post_fn(signed, orderType=order_type)
-                except TypeError:
-                    # 有的只收 (signed, order_type) 或 (signed)
+                with tick_phase("post"):
                     try:
-                        resp = post_fn(signed, order_type)
+                        resp = post_fn(signed, orderType=order_type)
                     except TypeError:
-                        resp = post_fn(signed)
+                        # 有的只收 (signed, order_type) 或 (signed)
+                        try:
+                            resp = post_fn(signed, order_type)
+                        except TypeError:
+                            resp = post_fn(signed)
 
                 oid = self._extract_order_id(resp)
                 if oid:
                     return oid
             except Exception as e:
                 last_err = e
+                self._note_throttle(e)
 
         # ---------- B) 退回：limit order ----------
         if create_limit_fn and post_fn:
@@ -388,17 +629,22 @@ class TradingClient:
                     feeRateBps=int(fee_bps),
                     taker=self.account.address,  # 添加taker地址
                 )
-                signed = create_limit_fn(l_args)
-                try:
-                    resp = post_fn(signed)
-                except Exception:
-                    # 有的版本要求 orderType 关键字（即使 limit 也接收）
-                    resp = post_fn(signed, orderType=order_type)
+                with tick_phase("sign"):
+                    signed = self._sign_remote("limit", token_id, side_u, px, sz, self.account.address)
+                    if signed is None:
+                        signed = create_limit_fn(l_args)
+                with tick_phase("post"):
+                    try:
+                        resp = post_fn(signed)
+                    except Exception:
+                        # 有的版本要求 orderType 关键字（即使 limit 也接收）
+                        resp = post_fn(signed, orderType=order_type)
                 oid = self._extract_order_id(resp)
                 if oid:
                     return oid
             except Exception as e:
                 last_err = e
+                self._note_throttle(e)
 
         # ---------- C) 最后兜底：create_and_post_order ----------
         if create_and_post_fn:
@@ -414,12 +660,14 @@ class TradingClient:
                     feeRateBps=int(fee_bps),
                     taker=self.account.address,  # 添加taker地址
                 )
-                resp = create_and_post_fn(payload)
+                with tick_phase("post"):
+                    resp = create_and_post_fn(payload)
                 oid = self._extract_order_id(resp)
                 if oid:
                     return oid
             except Exception as e:
                 last_err = e
+                self._note_throttle(e)
 
         print(f"❌ 下单失败（market/limit/create_and_post 都不行）: {last_err}")
         return None
@@ -428,7 +676,8 @@ class TradingClient:
         if resp is None:
             return None
         if isinstance(resp, dict):
-            oid = resp.get("id") or resp.get("order_id") or resp.get("orderId")
+            # CLOB POST /order 返回的是 orderID
+            oid = resp.get("orderID") or resp.get("id") or resp.get("order_id") or resp.get("orderId")
             return str(oid) if oid else None
         oid = getattr(resp, "id", None) or getattr(resp, "order_id", None) or getattr(resp, "orderId", None)
         return str(oid) if oid else str(resp)
@@ -436,6 +685,17 @@ class TradingClient:
     # -----------------------------
     # 订单状态 / 取消
     # -----------------------------
+    def get_server_time(self) -> Optional[Any]:
+        """CLOB 服务端时间（整数秒，对时用）；失败返回 None"""
+        fn = self._get_method("get_server_time", "getServerTime")
+        if not fn:
+            return None
+        try:
+            return self._throttled(PRIORITY_DISCOVERY, fn)
+        except Exception as e:
+            print(f"⚠️ 获取服务端时间失败: {e}")
+            return None
+
     def get_order_status(self, order_id: str) -> Optional[Dict]:
         if getattr(self.config, "DRY_RUN", False):
             return {"status": "FILLED"}
@@ -444,7 +704,7 @@ class TradingClient:
             print("⚠️ 找不到 get_order/getOrder")
             return None
         try:
-            return fn(order_id)
+            return self._throttled(PRIORITY_CANCEL, fn, order_id)
         except Exception as e:
             print(f"❌ 获取订单状态失败: {e}")
             return None
@@ -453,13 +713,146 @@ class TradingClient:
         if getattr(self.config, "DRY_RUN", False):
             print(f"🔸 [模拟] cancel {order_id}")
             return True
-        fn = self._get_method("cancel_order", "cancelOrder")
+        # ClobClient 里撤单方法叫 cancel（DELETE /order）
+        fn = self._get_method("cancel", "cancel_order", "cancelOrder")
         if not fn:
-            print("⚠️ 找不到 cancel_order/cancelOrder")
+            print("⚠️ 找不到 cancel/cancel_order")
             return False
         try:
-            fn(order_id)
+            self._throttled(PRIORITY_CANCEL, fn, order_id)
             return True
         except Exception as e:
+            self._note_throttle(e)
             print(f"❌ 取消订单失败: {e}")
             return False
+
+    def cancel_orders(self, order_ids: List[str]) -> List[str]:
+        """
+        批量撤单（DELETE /orders，一批只占一个令牌）；返回确认撤掉的 id
+        没有批量接口时逐个撤
+        """
+        ids = [str(o) for o in order_ids]
+        if not ids:
+            return []
+        if getattr(self.config, "DRY_RUN", False):
+            print(f"🔸 [模拟] cancel {len(ids)} 单")
+            return ids
+        fn = self._get_method("cancel_orders", "cancelOrders")
+        if not fn:
+            return [oid for oid in ids if self.cancel_order(oid)]
+        try:
+            resp = self._throttled(PRIORITY_CANCEL, fn, ids)
+        except Exception as e:
+            self._note_throttle(e)
+            print(f"❌ 批量撤单失败: {e}")
+            return []
+        return _canceled_ids(resp, ids)
+
+    def _signed_limit(self, token_id: str, side_u: str, price: float, size: float, remote: bool = True) -> Any:
+        signed = self._sign_remote("limit", token_id, side_u, price, size) if remote else None
+        if signed is not None:
+            return signed
+        create_fn = self._get_method("create_order", "createOrder")
+        if not create_fn:
+            raise RuntimeError("找不到 create_order/createOrder")
+        BUY, SELL = _side_constants()
+        try:
+            from py_clob_client.clob_types import OrderArgs
+            args: Any = OrderArgs(token_id=str(token_id), price=float(price), size=float(size),
+                                  side=BUY if side_u == "BUY" else SELL)
+        except Exception:
+            args = _ArgsShim(token_id=str(token_id), tokenID=str(token_id), price=float(price),
+                             size=float(size), side=BUY if side_u == "BUY" else SELL)
+        return create_fn(args)
+
+    def _signed_limits(self, orders: List[Tuple[str, str, float, float]]) -> List[Any]:
+        """一批挂单：开了签名进程就整批并行签，否则 / 失败时逐张在本线程签"""
+        if self.signing is not None and len(orders) > 1:
+            try:
+                specs = [self._order_spec("limit", t, s.strip().upper(), p, z) for t, s, p, z in orders]
+                if all(spec is not None for spec in specs):
+                    return self.signing.sign_many(specs)
+            except SigningError as e:
+                print(f"⚠️ {e}，本批在交易线程签名")
+            except Exception as e:
+                print(f"⚠️ 签名参数查询失败: {e}，本批在交易线程签名")
+            return [self._signed_limit(t, s.strip().upper(), p, z, remote=False) for t, s, p, z in orders]
+        return [self._signed_limit(t, s.strip().upper(), p, z) for t, s, p, z in orders]
+
+    def place_limit_order(self, token_id: str, side: str, price: float, size: float,
+                          post_only: bool = True) -> Optional[str]:
+        """
+        挂单（GTC 限价，默认 post-only：会立刻成交的价格直接被拒，不会变成吃单）
+        做市模式用；盘口价成交仍然走 place_order
+        """
+        side_u = side.strip().upper()
+        if getattr(self.config, "DRY_RUN", False):
+            print(f"🔸 [模拟] 挂单 {side_u} size={size} @ price={price}")
+            return f"simulated_limit_{token_id}_{side_u}_{price}"
+        post_fn = self._get_method("post_order", "postOrder")
+        if not post_fn:
+            print("⚠️ 找不到 post_order/postOrder")
+            return None
+        if not self.scheduler.acquire(PRIORITY_ORDER):
+            print(f"❌ 挂单限频：{self.scheduler.name} 额度不足，放弃本次 {side_u}")
+            return None
+        try:
+            with tick_phase("sign"):
+                signed = self._signed_limit(token_id, side_u, price, size)
+            with tick_phase("post"):
+                try:
+                    resp = post_fn(signed, orderType="GTC", post_only=post_only)
+                except TypeError:
+                    resp = post_fn(signed, orderType="GTC")
+            return self._extract_order_id(resp)
+        except Exception as e:
+            self._note_throttle(e)
+            print(f"❌ 挂单失败: {e}")
+            return None
+
+    def place_limit_orders(self, orders: List[Tuple[str, str, float, float]],
+                           post_only: bool = True) -> List[Optional[str]]:
+        """
+        批量挂单（POST /orders，一批只占一个令牌）：orders = [(token_id, side, price, size), ...]
+        返回和输入一一对应的 order_id（失败为 None）；没有批量接口时逐个挂
+        """
+        if not orders:
+            return []
+        batch_fn = self._get_method("post_orders", "postOrders")
+        if getattr(self.config, "DRY_RUN", False) or not batch_fn:
+            return [self.place_limit_order(t, s, p, z, post_only) for t, s, p, z in orders]
+        try:
+            from py_clob_client.clob_types import PostOrdersArgs
+        except Exception:
+            return [self.place_limit_order(t, s, p, z, post_only) for t, s, p, z in orders]
+        if not self.scheduler.acquire(PRIORITY_ORDER):
+            print(f"❌ 挂单限频：{self.scheduler.name} 额度不足，放弃本批 {len(orders)} 单")
+            return [None] * len(orders)
+        try:
+            with tick_phase("sign"):
+                args = [PostOrdersArgs(order=o, orderType="GTC", postOnly=post_only)
+                        for o in self._signed_limits(orders)]
+            with tick_phase("post"):
+                resp = batch_fn(args)
+        except Exception as e:
+            self._note_throttle(e)
+            print(f"❌ 批量挂单失败: {e}")
+            return [None] * len(orders)
+        out: List[Optional[str]] = []
+        items = resp if isinstance(resp, list) else []
+        for i in range(len(orders)):
+            item = items[i] if i < len(items) else None
+            ok = isinstance(item, dict) and item.get("success", True) and not item.get("errorMsg")
+            out.append(self._extract_order_id(item) if ok else None)
+        return out
+
+
+def _canceled_ids(resp: Any, requested: List[str]) -> List[str]:
+    """CLOB 撤单响应 {"canceled": [...], "not_canceled": {id: 原因}}；格式不认识时按全部成功处理"""
+    if isinstance(resp, dict):
+        if "canceled" in resp:
+            return [str(o) for o in (resp.get("canceled") or [])]
+        if "not_canceled" in resp:
+            bad = set(map(str, resp.get("not_canceled") or {}))
+            return [o for o in requested if o not in bad]
+    return list(requested)
@@ -0,0 +1,11 @@
+import pytest
+
+from src.rate_limit import reset_schedulers
+
+
+@pytest.fixture(autouse=True)
+def _fresh_schedulers():
+    """每个测试用自己的限频桶（机器人构造时 configure_schedulers 会写进程级共享状态）"""
+    reset_schedulers()
+    yield
+    reset_schedulers()
@@ -0,0 +1,106 @@
+"""互补套利的单腿风险：并发 FOK -> 补单 -> 平仓 -> 转单腿持仓"""
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.complement import execute_pair
+from src.models import Quote
+from src.strategy import OrderIntent, net_intents
+
+
+def _legs(side="BUY", group="complement:s"):
+    return [
+        OrderIntent("up", "UP", side, 0.46, 5.0, 0.45, group=group, strategies=("complement",)),
+        OrderIntent("down", "DOWN", side, 0.51, 5.0, 0.50, group=group, strategies=("complement",)),
+    ]
+
+
+class _Route:
+    """按 (token, side) 预设每次调用的结果：账户名表示成交，None 表示 FOK 被拒"""
+
+    def __init__(self, script):
+        self.script = {k: list(v) for k, v in script.items()}
+        self.calls = []
+
+    def __call__(self, token_id, side, price, size, order_type="FOK", account=None):
+        self.calls.append((token_id, side, price, account))
+        acct = self.script[(token_id, side)].pop(0)
+        if acct is None:
+            return None, None
+        return f"{token_id}-{side}-{len(self.calls)}", account or acct
+
+
+def _quotes(**asks_bids):
+    return lambda token_id: Quote(*asks_bids[token_id])
+
+
+@pytest.fixture
+def pool():
+    with ThreadPoolExecutor(max_workers=2) as p:
+        yield p
+
+
+def test_both_legs_fill(pool):
+    route = _Route({("up", "BUY"): ["main"], ("down", "BUY"): ["acc2"]})
+    res = execute_pair(_legs(), route, _quotes(), pool)
+    assert res.complete and not res.naked
+    assert {(f.intent.token_id, f.account) for f in res.filled} == {("up", "main"), ("down", "acc2")}
+    assert (res.retried, res.unwound) == (0, 0)
+
+
+def test_rejected_leg_retried_at_fresh_price(pool):
+    route = _Route({("up", "BUY"): ["main"], ("down", "BUY"): [None, "main"]})
+    res = execute_pair(_legs(), route, _quotes(down=(0.52, 0.50)), pool, fee=0.01)
+    assert res.complete and res.retried == 1 and res.unwound == 0
+    retry = route.calls[-1]
+    assert retry[0] == "down" and retry[2] <= 1.0 - 0.01 - 0.45 + 1e-9
+    assert {f.intent.token_id: f.price for f in res.filled}["down"] == 0.52
+
+
+def test_retry_skipped_when_fresh_price_eats_the_edge(pool):
+    route = _Route({("up", "BUY"): ["main"], ("down", "BUY"): [None], ("up", "SELL"): ["main"]})
+    res = execute_pair(_legs(), route, _quotes(down=(0.60, 0.58), up=(0.46, 0.44)), pool)
+    assert res.retried == 0 and res.unwound == 1
+    assert [c[:2] for c in route.calls[2:]] == [("up", "SELL")]
+
+
+def test_retry_fails_then_unwind(pool):
+    route = _Route({("up", "BUY"): ["acc2"], ("down", "BUY"): [None, None], ("up", "SELL"): ["acc2"]})
+    res = execute_pair(_legs(), route, _quotes(down=(0.52, 0.50), up=(0.46, 0.43)), pool)
+    assert not res.complete and not res.filled and not res.naked
+    assert (res.retried, res.unwound) == (1, 1)
+    assert res.unwind_pnl == pytest.approx((0.43 - 0.45) * 5.0)
+    # 平仓必须从买到那条腿的账户卖
+    assert route.calls[-1][1] == "SELL" and route.calls[-1][3] == "acc2"
+
+
+def test_unwind_fails_keeps_naked_leg_on_its_account(pool):
+    route = _Route({("up", "BUY"): ["acc2"], ("down", "BUY"): [None, None], ("up", "SELL"): [None]})
+    res = execute_pair(_legs(), route, _quotes(down=(0.52, 0.50), up=(0.46, 0.43)), pool)
+    assert not res.complete and not res.filled
+    assert [(f.intent.token_id, f.account) for f in res.naked] == [("up", "acc2")]
+    assert (res.retried, res.unwound) == (1, 1)
+
+
+def test_both_legs_rejected_is_a_clean_miss(pool):
+    route = _Route({("up", "BUY"): [None], ("down", "BUY"): [None]})
+    res = execute_pair(_legs(), route, _quotes(), pool)
+    assert not res.complete and not res.filled and not res.naked
+    assert len(route.calls) == 2
+
+
+def test_sell_leg_failure_keeps_unsold_leg():
+    legs = [it._replace(account="acc2") for it in _legs("SELL")]
+    route = _Route({("up", "SELL"): ["acc2"], ("down", "SELL"): [None, None]})
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        res = execute_pair(legs, route, _quotes(down=(0.70, 0.60)), pool)
+    assert [f.intent.token_id for f in res.filled] == ["up"]
+    assert [(f.intent.token_id, f.account) for f in res.naked] == [("down", "acc2")]
+
+
+def test_grouped_intents_pass_through_net_intents():
+    legs = _legs()
+    single = OrderIntent("up", "UP", "SELL", 0.60, 5.0, 0.61, strategies=("threshold",))
+    out = net_intents([single, *legs])
+    assert out[:2] == legs
+    assert out[2] == single
@@ -0,0 +1,63 @@
+"""按到期时间淘汰的容器：覆盖写延后到期、max_size 兜底、堆压缩、clear 不丢计数"""
+from src.expiring import ExpiringDict, ExpiringSet
+
+
+def test_rewrite_with_later_expiry_survives_stale_heap_entry():
+    d = ExpiringDict()
+    d.set("a", 1, 10.0)
+    d.set("a", 2, 20.0)
+    assert d.evict(15.0) == 0
+    assert d.get("a") == 2 and d.expires_at("a") == 20.0
+    assert d.evict(20.0) == 1 and "a" not in d
+    assert d.evicted == 1
+
+
+def test_rewrite_with_earlier_expiry_takes_effect():
+    d = ExpiringDict()
+    d.set("a", 1, 20.0)
+    d.set("a", 2, 10.0)
+    assert d.evict(10.0) == 1 and "a" not in d
+    assert d.evict(20.0) == 0
+
+
+def test_max_size_evicts_earliest_expiry():
+    d = ExpiringDict(max_size=3)
+    d.set("late", 1, 30.0)
+    d.set("early", 2, 10.0)
+    d.set("mid", 3, 20.0)
+    d.set("new", 4, 40.0)
+    assert sorted(d) == ["late", "mid", "new"]
+    assert d.evicted == 1
+    # 覆盖写把 mid 延后：堆里 mid@20 是旧条目，兜底淘汰要跳过它，删真正最早的 late@30
+    d.set("mid", 5, 50.0)
+    d.set("newer", 6, 60.0)
+    assert sorted(d) == ["mid", "new", "newer"]
+    assert d.get("mid") == 5
+
+
+def test_compact_keeps_live_entries():
+    d = ExpiringDict()
+    for i in range(10):
+        d.set(f"k{i}", i, 100.0 + i)
+    for round_ in range(20):
+        for i in range(5):
+            d.set(f"k{i}", round_, 200.0 + round_)
+    assert len(d._heap) <= 2 * len(d) + 64 + 1
+    assert len(d) == 10
+    assert all(d.expires_at(f"k{i}") == 219.0 for i in range(5))
+    assert d.evict(150.0) == 5
+    assert sorted(d) == [f"k{i}" for i in range(5)]
+    assert d.evict(219.0) == 5 and len(d) == 0
+
+
+def test_set_clear_keeps_evicted_counter():
+    s = ExpiringSet()
+    s.update(["a", "b"], 10.0)
+    s.add("c", 20.0)
+    assert s.evict(10.0) == 2
+    s.clear()
+    assert len(s) == 0 and "c" not in s
+    assert s.evicted == 2
+    s.add("d", 30.0)
+    assert s.evict(20.0) == 0 and "d" in s
+    assert s.evict(30.0) == 1 and s.evicted == 3
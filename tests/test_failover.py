@@ -0,0 +1,89 @@
+"""主备切换：A -> B -> A 时本机的旧持仓 / 标记不能盖在新主机的快照上"""
+from types import SimpleNamespace
+
+from src.arbitrage_bot import ArbitrageBot
+from src.clock import VirtualClock
+from src.failover import HaNode, LeaseStore
+from src.models import Position
+from src.sim import INTERVAL, SimConfig, SimExchange, SimTradingClient
+
+START = 1_700_000_000 // INTERVAL * INTERVAL + 60
+TTL = 1.0
+
+
+def _bot(node_id, path, clock, exchange, client):
+    config = SimConfig()
+    config.CLOCK_SYNC = False
+    config.HA_LEASE_DB = path
+    config.HA_NODE_ID = node_id
+    bot = ArbitrageBot(config=config, clock=clock, trading_client=client, market_source=exchange)
+    bot.ha = HaNode(LeaseStore(path), node_id=node_id, ttl=TTL, poll=0.01, clock=clock.time)
+    assert bot.find_market()
+    return bot
+
+
+def _buy(bot, token_id, side_name):
+    slug = bot.market_info.slug
+    bot.positions[token_id] = Position(token_id, side_name, "BUY", 0.45, 5.0, f"{bot.ha.node_id}-{side_name}",
+                                       slug, "main")
+    bot._buy_once_guard.add((slug, side_name), bot._state_expiry())
+    bot._journal_state()
+
+
+def _lead(bot, clock):
+    """让 bot 抢到租约并走一遍 备机 -> 接管"""
+    assert bot.ha.renew()
+    assert bot._standby(until=clock.time() + 1)
+
+
+def test_leader_a_b_a(tmp_path):
+    path = str(tmp_path / "lease.db")
+    clock = VirtualClock(START)
+    exchange = SimExchange(clock, seed=1)
+    client = SimTradingClient(exchange)
+    a = _bot("A", path, clock, exchange, client)
+    b = _bot("B", path, clock, exchange, client)
+    up, down = a.conditions.up, a.conditions.down
+
+    _lead(a, clock)
+    _buy(a, up, "UP")
+
+    # A 卡住续不上约，B 接管并继承 A 的持仓
+    clock.advance(TTL * 2)
+    assert not a._may_trade()
+    _lead(b, clock)
+    assert set(b.positions) == {up}
+    assert b.ha.fencing == a.ha.fencing + 1
+
+    # B 卖掉 UP、买了 DOWN
+    del b.positions[up]
+    _buy(b, down, "DOWN")
+
+    # A 还没回到备机时切场：过期持仓不能交给赎回
+    queued = []
+    a.redemption = SimpleNamespace(submit=queued.append)
+    a._queue_redemption(a.market_info, a.conditions)
+    assert queued == []
+
+    # B 挂掉，A 重新接管：只认 B 的快照，自己手里那份 UP 作废
+    clock.advance(TTL * 2)
+    _lead(a, clock)
+    assert set(a.positions) == {down}
+    assert a.positions[down].order_id == "B-DOWN"
+    assert not a.pair_positions
+    assert {(a.market_info.slug, "UP"), (a.market_info.slug, "DOWN")} <= set(a._buy_once_guard)
+    assert a.ha.fencing == b.ha.fencing + 1
+
+
+def test_standby_drops_stale_state(tmp_path):
+    path = str(tmp_path / "lease.db")
+    clock = VirtualClock(START)
+    exchange = SimExchange(clock, seed=1)
+    client = SimTradingClient(exchange)
+    a = _bot("A", path, clock, exchange, client)
+
+    _lead(a, clock)
+    _buy(a, a.conditions.up, "UP")
+    clock.advance(TTL * 2)
+    assert not a._standby(until=clock.time())      # 到了 until：没拿到租约
+    assert not a.positions and not a._buy_once_guard
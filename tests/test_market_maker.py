@@ -0,0 +1,46 @@
+"""做市：撤掉的挂单出表前要把上次对账之后的部分成交记上"""
+from src.clock import VirtualClock
+from src.market_maker import MakerQuote, MarketMaker
+
+
+class _Client:
+    def __init__(self):
+        self.matched = {}
+        self.seq = 0
+
+    def place_limit_order(self, token_id, side, price, size, post_only=False):
+        self.seq += 1
+        oid = f"o{self.seq}"
+        self.matched[oid] = 0.0
+        return oid
+
+    def cancel_orders(self, ids):
+        return list(ids)
+
+    def get_order_status(self, oid):
+        return {"status": "CANCELED", "size_matched": str(self.matched[oid])}
+
+
+def _maker():
+    client = _Client()
+    fills = []
+    maker = MarketMaker(client, clock=VirtualClock(0), min_rest=0.0, reconcile_interval=60.0,
+                        on_fill=lambda order, qty: fills.append((order.order_id, qty)))
+    maker.sync([MakerQuote("t", "UP", "BUY", 0.40, 5.0)])
+    return maker, client, fills
+
+
+def test_requote_books_partial_fill_of_canceled_order():
+    maker, client, fills = _maker()
+    client.matched["o1"] = 2.0          # 上次对账之后成交了 2 份
+    maker.sync([MakerQuote("t", "UP", "BUY", 0.45, 5.0)])
+    assert fills == [("o1", 2.0)]
+    assert [o.order_id for o in maker.table.orders()] == ["o2"]
+
+
+def test_cancel_all_books_partial_fill():
+    maker, client, fills = _maker()
+    client.matched["o1"] = 3.0
+    assert maker.cancel_all() == 1
+    assert fills == [("o1", 3.0)]
+    assert len(maker.table) == 0
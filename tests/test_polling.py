@@ -0,0 +1,85 @@
+"""自适应轮询：离各策略触发价的远近 / 临近收盘 决定下一次间隔"""
+import pytest
+
+from src.fair_value import FairValueStrategy
+from src.polling import AdaptivePollPolicy, PollState, SideQuote
+from src.sim import SimConfig
+from src.strategy import StrategyEngine, ThresholdStrategy
+
+NOW = 1_000_000.0
+LO, HI = 0.25, 5.0
+BUY, SELL = 0.70, 0.95
+
+
+def _state(ask=None, bid=None, can_buy=True, has_position=False, fair=None, end_in=600.0):
+    return PollState(now=NOW, start_ts=int(NOW - 300), end_ts=int(NOW + end_in), is_live=True,
+                     sides={"UP": SideQuote(ask, bid, can_buy, has_position, fair)})
+
+
+def _held(bid, fair=None):
+    return _state(ask=bid + 0.01, bid=bid, can_buy=False, has_position=True, fair=fair)
+
+
+def _policy(*strategies):
+    config = SimConfig()
+    config.BUY_PRICE, config.SELL_PRICE = BUY, SELL
+    config.POLL_MIN_INTERVAL, config.POLL_MAX_INTERVAL = LO, HI
+    config.POLL_NEAR_BAND, config.POLL_FAR_BAND = 0.03, 0.20
+    config.POLL_CLOSE_WINDOW = 60.0
+    engine = StrategyEngine([ThresholdStrategy(BUY, SELL, 5.0), *strategies])
+    return AdaptivePollPolicy.from_config(config, engine)
+
+
+def test_near_base_threshold_polls_fastest():
+    assert _policy().next_interval(_state(ask=BUY + 0.02, bid=BUY)) == LO
+    assert _policy().next_interval(_held(bid=SELL - 0.02)) == LO
+
+
+def test_far_from_every_threshold_polls_slowest():
+    assert _policy().next_interval(_state(ask=BUY + 0.25, bid=BUY + 0.23)) == HI
+    assert _policy().next_interval(_held(bid=SELL - 0.25)) == HI
+
+
+def test_between_bands_interpolates():
+    interval = _policy().next_interval(_state(ask=BUY + 0.115, bid=BUY + 0.10))
+    assert interval == pytest.approx(LO + (HI - LO) * 0.5)
+
+
+def test_variant_buy_threshold_counts_as_near():
+    state = _state(ask=0.91, bid=0.89)
+    assert _policy().next_interval(state) == HI
+    assert _policy(ThresholdStrategy(0.90, 0.98, 5.0)).next_interval(state) == LO
+
+
+def test_variant_sell_threshold_counts_as_near():
+    state = _held(bid=0.74)
+    assert _policy().next_interval(state) == HI
+    assert _policy(ThresholdStrategy(0.60, 0.75, 5.0)).next_interval(state) == LO
+
+
+def test_fair_value_edges_count_as_near():
+    policy = _policy(FairValueStrategy(min_edge=0.05, exit_edge=0.02))
+    # 买点 fair - min_edge = 0.92：ask 0.93 离阈值 0.23，但离公允价策略只差 1 分
+    assert policy.next_interval(_state(ask=0.93, bid=0.91, fair=0.97)) == LO
+    # 卖点 fair + exit_edge = 0.72
+    assert policy.next_interval(_held(bid=0.71, fair=0.70)) == LO
+    # 模型还没算出公允价：只看阈值
+    assert policy.next_interval(_state(ask=0.93, bid=0.91)) == HI
+
+
+def test_fair_edges_ignored_without_fair_strategy():
+    assert _policy().next_interval(_state(ask=0.93, bid=0.91, fair=0.97)) == HI
+
+
+def test_near_expiry_polls_fastest_even_when_far():
+    far = dict(ask=BUY + 0.25, bid=BUY + 0.23)
+    assert _policy().next_interval(_state(end_in=30.0, **far)) == LO
+    assert _policy().next_interval(_state(end_in=61.0, **far)) == HI
+
+
+def test_missing_quote_retries_fast():
+    assert _policy().next_interval(_state(ask=None, bid=None)) == LO
+
+
+def test_nothing_to_trigger_polls_slowest():
+    assert _policy().next_interval(_state(ask=BUY + 0.02, bid=BUY, can_buy=False)) == HI
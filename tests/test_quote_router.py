@@ -0,0 +1,121 @@
+"""报价源熔断：连续失败 / 成功率低 熔断，冷却后只放一个探测，失败冷却翻倍，成功恢复"""
+import threading
+
+from src.models import Quote
+from src.quote_router import CLOSED, HALF_OPEN, OPEN, QuoteRouter, QuoteSource, SourceHealth
+
+
+class _Clock:
+    def __init__(self, t=0.0):
+        self.t = t
+
+    def __call__(self):
+        return self.t
+
+
+def _health(**kw):
+    kw = {"trip_after": 3, "min_success": 0.5, "min_samples": 10, "cooldown": 5.0, "max_cooldown": 20.0, **kw}
+    return SourceHealth("src", **kw)
+
+
+def test_trips_after_consecutive_failures():
+    h = _health()
+    h.record(False, 0.1, 0.0)
+    h.record(False, 0.1, 0.0)
+    assert h.state == CLOSED
+    h.record(False, 0.1, 1.0)
+    assert h.state == OPEN and h.trips == 1 and h.open_until == 6.0
+
+
+def test_trips_on_low_success_rate():
+    h = _health(trip_after=100)
+    for i in range(10):
+        h.record(i % 3 == 1, 0.1, 0.0)      # 3/10 成功，从不连续失败 3 次
+    assert h.fail_streak < 3
+    assert h.state == OPEN and h.trips == 1
+
+
+def test_success_rate_needs_min_samples():
+    h = _health(trip_after=100)
+    for ok in (True, False, False, True, False):
+        h.record(ok, 0.1, 0.0)
+    assert h.state == CLOSED
+
+
+def test_failed_probe_doubles_cooldown_up_to_max():
+    h = _health(trip_after=1)
+    h.record(False, 0.1, 0.0)
+    cooldowns = []
+    now = 0.0
+    for _ in range(4):
+        now = h.open_until
+        assert h.probe_due(now)
+        h.probing, h.state = True, HALF_OPEN
+        h.record(False, 0.1, now)
+        cooldowns.append(h.cooldown)
+        assert h.state == OPEN and h.open_until == now + h.cooldown
+    assert cooldowns == [10.0, 20.0, 20.0, 20.0]
+    assert h.trips == 1
+
+
+def test_successful_probe_closes_and_resets_cooldown():
+    h = _health(trip_after=1)
+    h.record(False, 0.1, 0.0)
+    h.probing, h.state = True, HALF_OPEN
+    h.record(False, 0.1, 5.0)
+    assert h.cooldown == 10.0
+    h.probing, h.state = True, HALF_OPEN
+    h.record(True, 0.1, 15.0)
+    assert h.state == CLOSED and h.cooldown == 5.0 and not h.probing and h.fail_streak == 0
+
+
+def _router(clock, *names, **kw):
+    sources = [QuoteSource(n, lambda t, n=n: Quote(0.5, 0.4)) for n in names]
+    return QuoteRouter(sources, clock=clock, **{"trip_after": 1, "cooldown": 5.0, **kw})
+
+
+def test_only_one_probe_when_concurrent_requests_find_it_due():
+    clock = _Clock()
+    router = _router(clock, "a", "b")
+    router.health["a"].record(False, 0.1, 0.0)
+    clock.t = 5.0
+    plans = []
+    barrier = threading.Barrier(8)
+
+    def plan():
+        barrier.wait()
+        plans.append([s.name for s in router._plan(clock())])
+
+    threads = [threading.Thread(target=plan) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sum("a" in p for p in plans) == 1
+    assert all(p[-1] == "b" for p in plans)
+    assert router.health["a"].state == HALF_OPEN
+
+
+def test_probe_served_first_and_recovers():
+    clock = _Clock()
+    calls = []
+    router = QuoteRouter([QuoteSource("a", lambda t: calls.append("a") or Quote(0.5, 0.4)),
+                          QuoteSource("b", lambda t: calls.append("b") or Quote(0.5, 0.4))],
+                         clock=clock, trip_after=1, cooldown=5.0)
+    router.health["a"].record(False, 0.1, 0.0)
+    router.get_quote("x")
+    assert calls == ["b"]                       # 熔断中：不试
+    clock.t = 5.0
+    router.get_quote("x")
+    assert calls == ["b", "a"]                  # 到期：探测就是这次的报价
+    assert router.health["a"].state == CLOSED
+
+
+def test_explore_every_swaps_two_best_sources():
+    clock = _Clock()
+    router = _router(clock, "fast", "slow", "slowest", explore_every=3)
+    for name, secs in (("fast", 0.01), ("slow", 0.05), ("slowest", 0.2)):
+        router.health[name].record(True, secs, 0.0)
+    orders = [[s.name for s in router._plan(0.0)] for _ in range(6)]
+    assert orders[0] == orders[1] == orders[3] == orders[4] == ["fast", "slow", "slowest"]
+    assert orders[2] == orders[5] == ["slow", "fast", "slowest"]
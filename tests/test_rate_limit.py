@@ -0,0 +1,98 @@
+"""令牌桶 + 优先级：下单 > 撤单 > 报价 > 发现；保留线；Retry-After 暂停"""
+import threading
+import time
+
+from src.rate_limit import (PRIORITY_CANCEL, PRIORITY_DISCOVERY, PRIORITY_ORDER, PRIORITY_QUOTE,
+                            RequestScheduler, configure_schedulers, get_scheduler, reset_schedulers)
+from src.sim import SimConfig
+
+
+class _Clock:
+    def __init__(self, t=100.0):
+        self.t = t
+
+    def __call__(self):
+        return self.t
+
+
+def _sched(rate=1.0, burst=10.0, clock=None):
+    return RequestScheduler("test", rate, burst, clock=clock or _Clock())
+
+
+def _drain_to(s, tokens):
+    while s.available() > tokens + 1e-9:
+        assert s.try_acquire(PRIORITY_ORDER)
+
+
+def test_priority_floors_under_contention():
+    s = _sched()
+    # 保留线（burst=10）：发现要剩 1+5，报价 1+3，撤单 1+1，下单 1
+    _drain_to(s, 5.0)
+    assert not s.try_acquire(PRIORITY_DISCOVERY)
+    assert s.try_acquire(PRIORITY_QUOTE)            # 5 -> 4
+    assert s.try_acquire(PRIORITY_QUOTE)            # 4 -> 3
+    assert not s.try_acquire(PRIORITY_QUOTE)
+    assert s.try_acquire(PRIORITY_CANCEL)           # 3 -> 2
+    assert s.try_acquire(PRIORITY_CANCEL)           # 2 -> 1
+    assert not s.try_acquire(PRIORITY_CANCEL)
+    assert s.try_acquire(PRIORITY_ORDER)            # 1 -> 0：下单能用到底
+    assert not s.try_acquire(PRIORITY_ORDER)
+
+
+def test_quotes_cannot_starve_orders():
+    s = _sched()
+    granted = sum(s.try_acquire(PRIORITY_QUOTE) for _ in range(100))
+    assert granted == 7                              # 10 -> 3：报价用到保留线就停
+    assert [s.try_acquire(PRIORITY_ORDER) for _ in range(4)] == [True, True, True, False]
+    usage = s.usage()
+    assert usage["rejected"]["quote"] == 93 and usage["granted"]["order"] == 3
+
+
+def test_waiting_order_blocks_lower_priorities():
+    clock = _Clock()
+    s = _sched(rate=10.0, clock=clock)
+    _drain_to(s, 0.0)
+    got = []
+    t = threading.Thread(target=lambda: got.append(s.acquire(PRIORITY_ORDER, timeout=60.0)))
+    t.start()
+    for _ in range(200):
+        if s.usage()["waiting"]["order"]:
+            break
+        time.sleep(0.005)
+    assert s.usage()["waiting"]["order"] == 1
+    clock.t += 1.0                                   # 桶满了，但下单还在排队：报价 / 撤单要让路
+    assert not s.try_acquire(PRIORITY_QUOTE)
+    assert not s.try_acquire(PRIORITY_CANCEL)
+    t.join(timeout=5.0)
+    assert got == [True]
+    assert s.try_acquire(PRIORITY_QUOTE)
+
+
+def test_retry_after_pauses_bucket():
+    clock = _Clock()
+    s = _sched(rate=10.0, clock=clock)
+
+    class _Resp:
+        status_code = 429
+        headers = {"Retry-After": "2"}
+
+    assert s.call(PRIORITY_QUOTE, lambda: _Resp()).status_code == 429
+    assert s.usage()["throttled_429"] == 1
+    assert s.available() == 0.0
+    assert not s.try_acquire(PRIORITY_ORDER)
+    clock.t += 1.9
+    assert not s.try_acquire(PRIORITY_ORDER)
+    clock.t += 0.2                                   # 暂停结束：令牌从 0 开始按速率补
+    assert s.available() < 2.0 + 1e-9
+    assert s.try_acquire(PRIORITY_ORDER)
+
+
+def test_reset_hook_gives_fresh_buckets():
+    config = SimConfig()
+    config.CLOB_RATE_PER_SEC, config.CLOB_BURST = 1.0, 2.0
+    configure_schedulers(config)
+    first = get_scheduler("clob")
+    assert first.burst == 2.0
+    reset_schedulers()
+    fresh = get_scheduler("clob")
+    assert fresh is not first and fresh.burst == 40.0
@@ -0,0 +1,108 @@
+"""切片执行：价格上限截断、深度打折、最小单下限、同轮统一限价、第一张子单定账户"""
+import threading
+
+import pytest
+
+from src.clock import VirtualClock
+from src.slicer import SlicedExecutor, plan_slices
+from src.strategy import OrderIntent
+
+
+def test_cap_cuts_off_deeper_levels():
+    asks = [(0.45, 10.0), (0.46, 10.0), (0.48, 10.0)]
+    out = plan_slices(asks, 50.0, 0.46, "BUY", 3, min_size=5.0)
+    assert sum(s for _, s, _ in out) == pytest.approx(20.0)
+    assert {p for p, _, _ in out} == {0.46}
+
+    bids = [(0.60, 10.0), (0.58, 10.0)]
+    out = plan_slices(bids, 50.0, 0.59, "SELL", 3, min_size=5.0)
+    assert sum(s for _, s, _ in out) == pytest.approx(10.0)
+    assert {p for p, _, _ in out} == {0.60}
+
+
+def test_depth_fraction_discounts_visible_size():
+    asks = [(0.45, 10.0), (0.46, 10.0)]
+    out = plan_slices(asks, 100.0, 0.50, "BUY", 2, fraction=0.5, min_size=5.0)
+    assert [s for _, s, _ in out] == [5.0, 5.0]
+    assert [round(e, 4) for _, _, e in out] == [0.45, 0.46]
+    assert all(p == 0.46 for p, _, _ in out)
+
+
+def test_min_size_floor():
+    # 12 股深度、每张至少 5：只切 2 张，不按 pipeline 切成 5 张碎单
+    assert [s for _, s, _ in plan_slices([(0.45, 12.0)], 30.0, 0.50, "BUY", 5, min_size=5.0)] == [6.0, 6.0]
+    # 深度连一张最小单都不够，且还没到收尾：等盘口补上
+    assert plan_slices([(0.45, 3.0)], 10.0, 0.50, "BUY", 3, min_size=5.0) == []
+    # 剩余本身不足最小单：整张发掉
+    assert plan_slices([(0.45, 10.0)], 3.0, 0.50, "BUY", 3, min_size=5.0) == [(0.45, 3.0, 0.45)]
+
+
+def test_wave_shares_deepest_limit():
+    asks = [(0.45, 5.0), (0.46, 5.0), (0.47, 5.0)]
+    out = plan_slices(asks, 15.0, 0.50, "BUY", 3, min_size=5.0)
+    assert [p for p, _, _ in out] == [0.47, 0.47, 0.47]
+    assert [round(e, 4) for _, _, e in out] == [0.45, 0.46, 0.47]
+    bids = [(0.60, 5.0), (0.59, 5.0)]
+    out = plan_slices(bids, 10.0, 0.50, "SELL", 2, min_size=5.0)
+    assert [p for p, _, _ in out] == [0.59, 0.59]
+
+
+class _Route:
+    """没指定账户时路由到 acct-b；fail 里的子单数量（按调用顺序）返回失败"""
+
+    def __init__(self, fail=()):
+        self.calls = []
+        self.fail = list(fail)
+        self._lock = threading.Lock()
+
+    def __call__(self, token_id, side, price, size, order_type, account):
+        with self._lock:
+            n = len(self.calls)
+            self.calls.append((price, size, account))
+        if n in self.fail:
+            return None, account
+        return f"o{n}", account or "acct-b"
+
+
+def _executor(route, asks, **kw):
+    book = {"asks": asks, "bids": []}
+    kw = {"pipeline": 3, "depth_fraction": 1.0, "min_size": 5.0, "max_secs": 1.0, "interval": 0.2, **kw}
+    return SlicedExecutor(route, lambda token, depth: book, 0.45, 0.60,
+                          clock=VirtualClock(1_000.0), **kw)
+
+
+def _intent(size, account=None):
+    return OrderIntent("up", "UP", "BUY", 0.47, size, 0.45, account=account)
+
+
+def test_first_child_fixes_account_for_wave_and_later_waves():
+    route = _Route(fail={2})
+    ex = _executor(route, [(0.45, 5.0), (0.46, 5.0), (0.47, 5.0)])
+    res = ex.execute(_intent(15.0))
+    accounts = [a for _, _, a in route.calls]
+    # 第一张先发（未定账户）选出 acct-b；同一轮其余两张、补单那一轮都落在 acct-b
+    assert accounts[0] is None
+    assert accounts[1:] == ["acct-b"] * (len(accounts) - 1)
+    assert len(accounts) == 4
+    assert res.account == "acct-b" and res.filled == 15.0 and res.failed == 1 and res.reason == "filled"
+    ex.shutdown()
+
+
+def test_failed_first_child_leaves_account_open():
+    route = _Route(fail={0})
+    ex = _executor(route, [(0.45, 5.0), (0.46, 5.0)])
+    res = ex.execute(_intent(10.0))
+    # 第一张失败：这一轮其余子单不发；下一轮重新由第一张选账户
+    assert route.calls[0][2] is None and route.calls[1][2] is None
+    assert [a for _, _, a in route.calls[2:]] == ["acct-b"]
+    assert res.account == "acct-b" and res.filled == 10.0
+    ex.shutdown()
+
+
+def test_intent_account_used_for_every_child():
+    route = _Route()
+    ex = _executor(route, [(0.45, 5.0), (0.46, 5.0), (0.47, 5.0)])
+    res = ex.execute(_intent(15.0, account="acct-a"))
+    assert [a for _, _, a in route.calls] == ["acct-a"] * 3
+    assert res.account == "acct-a"
+    ex.shutdown()
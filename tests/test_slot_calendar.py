@@ -0,0 +1,100 @@
+"""美东时间槽日历：夏令时切换当天的 4h / daily 槽边界、neighbours()、窗口懒重建"""
+from datetime import datetime, timezone
+
+import pytest
+
+from src.slot_calendar import ZoneInfo, SlotCalendar
+
+pytestmark = pytest.mark.skipif(ZoneInfo is None, reason="需要 zoneinfo")
+
+H = 3600
+
+
+def _utc(*args) -> int:
+    return int(datetime(*args, tzinfo=timezone.utc).timestamp())
+
+
+# 2026-03-08 02:00 EST -> 03:00 EDT；2026-11-01 02:00 EDT -> 01:00 EST
+SPRING_MIDNIGHT = _utc(2026, 3, 8, 5)      # 00:00 EST
+FALL_MIDNIGHT = _utc(2026, 11, 1, 4)       # 00:00 EDT
+
+
+def test_daily_slot_on_spring_forward_is_23h():
+    cal = SlotCalendar(series=("daily",))
+    slot = cal.slot_at("daily", SPRING_MIDNIGHT + 12 * H)
+    assert slot.start_ts == SPRING_MIDNIGHT
+    assert slot.end_ts == _utc(2026, 3, 9, 4)
+    assert slot.end_ts - slot.start_ts == 23 * H
+
+
+def test_daily_slot_on_fall_back_is_25h():
+    cal = SlotCalendar(series=("daily",))
+    slot = cal.slot_at("daily", FALL_MIDNIGHT + 24 * H + 30 * 60)    # 本地 23:30 EST，仍是同一天
+    assert slot.start_ts == FALL_MIDNIGHT
+    assert slot.end_ts == _utc(2026, 11, 2, 5)
+    assert slot.end_ts - slot.start_ts == 25 * H
+
+
+def test_4h_slots_around_spring_forward():
+    cal = SlotCalendar(series=("4h",))
+    slots = cal.neighbours("4h", SPRING_MIDNIGHT + H, back=1, forward=2)
+    assert [s.start_ts for s in slots] == [
+        SPRING_MIDNIGHT - 4 * H,        # 前一天 20:00 EST
+        SPRING_MIDNIGHT,                # 00:00 EST
+        _utc(2026, 3, 8, 8),            # 04:00 EDT：这一场只有 3h
+        _utc(2026, 3, 8, 12),           # 08:00 EDT
+    ]
+    assert [s.end_ts - s.start_ts for s in slots] == [4 * H, 3 * H, 4 * H, 4 * H]
+    assert all(a.end_ts == b.start_ts for a, b in zip(slots, slots[1:]))
+
+
+def test_4h_slots_around_fall_back():
+    cal = SlotCalendar(series=("4h",))
+    slot = cal.slot_at("4h", FALL_MIDNIGHT + 2 * H)     # 本地第一次 01:00 EDT
+    assert slot.start_ts == FALL_MIDNIGHT
+    assert slot.end_ts == _utc(2026, 11, 1, 9)          # 04:00 EST：这一场 5h
+    nxt = cal.next_slot("4h", FALL_MIDNIGHT + 2 * H)
+    assert nxt.start_ts == slot.end_ts and nxt.end_ts - nxt.start_ts == 4 * H
+    assert cal.slot_at("4h", slot.end_ts - 1) == slot
+    assert cal.slot_at("4h", slot.end_ts) == nxt
+
+
+def test_hourly_slots_stay_uniform_across_fall_back():
+    cal = SlotCalendar(series=("1h",))
+    slots = cal.neighbours("1h", FALL_MIDNIGHT + 2 * H, back=2, forward=2)
+    assert [s.end_ts - s.start_ts for s in slots] == [H] * 5
+    assert slots[2].start_ts == FALL_MIDNIGHT + 2 * H
+
+
+def test_neighbours_clipped_and_slugged():
+    cal = SlotCalendar(series=("daily",))
+    slots = cal.neighbours("daily", FALL_MIDNIGHT, back=1, forward=1)
+    assert [s.slug for s in slots] == [f"btc-updown-daily-{s.start_ts}" for s in slots]
+    assert slots[1].start_ts == FALL_MIDNIGHT
+    idx = cal._index["daily"]
+    # back 超出窗口时截断在窗口起点，不会绕到数组末尾
+    wide = cal.neighbours("daily", FALL_MIDNIGHT, back=1000, forward=0)
+    assert wide[0].start_ts == idx.starts[0] and wide[-1].start_ts == FALL_MIDNIGHT
+
+
+def test_index_rebuilds_lazily_when_window_runs_out():
+    cal = SlotCalendar(series=("15m",), horizon=2 * H, lookback=H)
+    t0 = SPRING_MIDNIGHT
+    first = cal.slot_at("15m", t0)
+    idx = cal._index["15m"]
+    assert idx.lo <= t0 - H and idx.hi >= t0 + 2 * H
+
+    # 窗口内（留一个周期余量）：不重建
+    cal.slot_at("15m", t0 + H)
+    cal.next_slot("15m", t0 + H)
+    assert cal._index["15m"] is idx
+
+    # 走出窗口：重建，且新窗口包住查询点
+    later = cal.slot_at("15m", t0 + 2 * H)
+    rebuilt = cal._index["15m"]
+    assert rebuilt is not idx and rebuilt.lo <= t0 + 2 * H < rebuilt.hi
+    assert later.start_ts == t0 + 2 * H and later.end_ts - later.start_ts == 900
+
+    # 往回查早于窗口的时间也会重建
+    assert cal.slot_at("15m", t0) == first
+    assert cal._index["15m"] is not rebuilt
@@ -0,0 +1,42 @@
+"""意图合并：同方向去重取最大数量 / 最激进限价，买卖轧差，成组意图原样放最前"""
+from src.strategy import OrderIntent, net_intents
+
+
+def _it(token, side, price, size, strat, **kw):
+    return OrderIntent(token, token.upper(), side, price, size, price, strategies=(strat,), **kw)
+
+
+def test_same_side_buys_merge():
+    out = net_intents([_it("up", "BUY", 0.44, 5.0, "a"), _it("up", "BUY", 0.46, 3.0, "b"),
+                       _it("up", "BUY", 0.45, 8.0, "a")])
+    assert len(out) == 1
+    assert out[0].price == 0.46 and out[0].size == 8.0
+    assert out[0].strategies == ("a", "b")
+
+
+def test_same_side_sells_take_lowest_price():
+    out = net_intents([_it("up", "SELL", 0.60, 5.0, "a"), _it("up", "SELL", 0.58, 2.0, "b")])
+    assert [(o.price, o.size, o.strategies) for o in out] == [(0.58, 5.0, ("a", "b"))]
+
+
+def test_buy_and_sell_net_to_remainder():
+    out = net_intents([_it("up", "BUY", 0.45, 8.0, "a"), _it("up", "SELL", 0.60, 3.0, "b")])
+    assert [(o.side, o.price, o.size) for o in out] == [("BUY", 0.45, 5.0)]
+    out = net_intents([_it("up", "BUY", 0.45, 2.0, "a"), _it("up", "SELL", 0.60, 5.5, "b")])
+    assert [(o.side, o.price, o.size) for o in out] == [("SELL", 0.60, 3.5)]
+
+
+def test_equal_buy_and_sell_drop():
+    out = net_intents([_it("up", "BUY", 0.45, 5.0, "a"), _it("up", "SELL", 0.60, 5.0, "b"),
+                       _it("down", "BUY", 0.40, 5.0, "a")])
+    assert [(o.token_id, o.side) for o in out] == [("down", "BUY")]
+
+
+def test_groups_first_and_untouched_tokens_in_order():
+    legs = [_it("up", "BUY", 0.46, 5.0, "complement", group="g1"),
+            _it("down", "BUY", 0.51, 5.0, "complement", group="g1")]
+    singles = [_it("down", "SELL", 0.70, 5.0, "a"), _it("up", "BUY", 0.47, 9.0, "a"),
+               _it("up", "BUY", 0.45, 2.0, "b")]
+    out = net_intents([singles[0], legs[0], singles[1], legs[1], singles[2]])
+    assert out[:2] == legs
+    assert [(o.token_id, o.side, o.size) for o in out[2:]] == [("down", "SELL", 5.0), ("up", "BUY", 9.0)]